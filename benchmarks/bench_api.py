@@ -0,0 +1,103 @@
+"""
+Compara requests por segundo del formulario HTML contra la API JSON v1. Los dos guardan la
+orden y arrancan el cobro con la misma compra (servicios.comprar), así que corren contra una
+base SQLite temporal. También mide lo que cuesta por request armar los servicios de la compra.
+
+Uso: python benchmarks/bench_api.py [iteraciones]
+Corre en proceso con el cliente de test de Django, así que mide el costo
+del servidor (parseo, validación, guardado, render) sin red de por medio.
+"""
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+
+def proxima_fecha_abierta():
+    fecha = datetime.date.today() + datetime.timedelta(days=1)
+    while fecha.weekday() == 0:
+        fecha += datetime.timedelta(days=1)
+    return fecha.isoformat()
+
+
+def medir(nombre, pedir, iteraciones):
+    pedir()  # calentamiento (carga de templates, imports)
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        respuesta = pedir()
+    duracion = time.perf_counter() - inicio
+    cuerpo = respuesta.content
+    print(f"{nombre:<18} {iteraciones / duracion:>8.0f} req/s  {len(cuerpo):>6} bytes/respuesta")
+
+
+def medir_armado():
+    from comprar_entradas.repositorio import usuario_registrado
+    from comprar_entradas.servicios import servicios_configurados
+    from comprar_entradas.views import enrutador_pagos_simple, reloj_simple, repositorio_simple, servicio_mail_simple
+
+    def por_request():
+        # Lo que armaba comprar_view en cada request antes de servicios_configurados
+        return {"repositorio": {**repositorio_simple(), "usuario_registrado": usuario_registrado},
+                "enrutador_pagos": enrutador_pagos_simple(), "servicio_mail": servicio_mail_simple(),
+                "reloj": reloj_simple()}
+
+    for nombre, armar in (("por request", por_request), ("por proceso", servicios_configurados)):
+        repeticiones = 200_000
+        segundos = min(timeit.repeat(armar, number=repeticiones, repeat=3))
+        print(f"armado {nombre:<11} {segundos / repeticiones * 1e6:>8.3f} µs/request")
+
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    directorio = tempfile.TemporaryDirectory()
+    settings.DATABASES["default"]["NAME"] = os.path.join(directorio.name, "bench.sqlite3")
+    settings.ALLOWED_HOSTS = ["*"]
+    # Todas las compras van a la misma fecha: que no se agote el cupo
+    settings.CAPACIDAD_DIARIA = 10 * iteraciones
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.test import Client
+
+    call_command("migrate", verbosity=0)
+    client = Client()
+    fecha = proxima_fecha_abierta()
+    visitantes = [{"nombre": f"Visitante {i}", "edad": 20 + i} for i in range(4)]
+
+    formulario = {
+        "usuario_nombre": "Marco Figueroa",
+        "usuario_email": "marco.figueroa@example.com",
+        "fecha_visita": fecha,
+        "tipo_pase": "VIP",
+        "forma_pago": "TARJETA",
+        "cantidad_visitantes": len(visitantes),
+    }
+    for i, visitante in enumerate(visitantes):
+        formulario[f"visitante_{i}_nombre"] = visitante["nombre"]
+        formulario[f"visitante_{i}_edad"] = str(visitante["edad"])
+
+    payload = json.dumps({
+        "usuario": {"nombre": "Marco Figueroa", "email": "marco.figueroa@example.com"},
+        "fecha_visita": fecha,
+        "tipo_pase": "VIP",
+        "forma_pago": "TARJETA",
+        "visitantes": visitantes,
+    })
+
+    medir("HTML (formulario)", lambda: client.post("/comprar-entradas/", formulario), iteraciones)
+    medir("API v1 compras", lambda: client.post("/comprar-entradas/api/v1/compras", payload,
+                                                 content_type="application/json"), iteraciones)
+    medir_armado()
+    directorio.cleanup()
+
+
+if __name__ == "__main__":
+    main()
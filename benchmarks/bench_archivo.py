@@ -0,0 +1,114 @@
+"""
+Tamaño de las tablas calientes y latencia de inserción a medida que crece el historial,
+con y sin `archivar_ordenes`.
+
+Genera N meses de órdenes pasadas (bulk_create directo, 2-3 líneas por orden) en una base
+SQLite temporal y en cada punto de control mide guardar_pendiente para el mes en curso.
+
+Uso: python benchmarks/bench_archivo.py [ordenes_por_mes] [meses]
+"""
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+HOY = datetime.date(2027, 1, 15)
+INSERCIONES = 500
+
+
+def generar_mes(mes, cantidad):
+    from comprar_entradas.models import LineaOrden, Orden
+    azar = random.Random(mes.toordinal())
+    ordenes = Orden.objects.bulk_create([
+        Orden(usuario_nombre=f"Cliente {i}", usuario_email=f"cliente{i}@example.com",
+              fecha_visita=mes.replace(day=azar.randint(1, 28)), tipo_pase="REGULAR", forma_pago="TARJETA",
+              estado="PAGADA", total=10000)
+        for i in range(cantidad)
+    ], batch_size=2000)
+    LineaOrden.objects.bulk_create([
+        LineaOrden(orden=orden, nombre=f"Visitante {j}", edad=30, monto=5000)
+        for orden in ordenes for j in range(azar.randint(2, 3))
+    ], batch_size=2000)
+
+
+def medir_inserciones(repositorio):
+    latencias = []
+    for i in range(INSERCIONES):
+        borrador = {
+            "usuario": {"nombre": "Marco", "email": "marco.figueroa@example.com"},
+            "fecha_visita": HOY + datetime.timedelta(days=1 + i % 10),
+            "tipo_pase": "REGULAR", "forma_pago": "TARJETA", "total": 10000,
+            "lineas": [{"nombre": "Ana", "edad": 30, "precio": {"monto": 5000}}] * 2,
+        }
+        inicio = time.perf_counter()
+        repositorio["guardar_pendiente"](borrador)
+        latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+    return statistics.median(latencias) * 1000, latencias[int(len(latencias) * .99)] * 1000
+
+
+def paginas_usadas():
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA page_count")
+        paginas = cursor.fetchone()[0]
+        cursor.execute("PRAGMA freelist_count")
+        libres = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return (paginas - libres) * cursor.fetchone()[0] / 1e6
+
+
+def correr(ordenes_por_mes, meses, archivar, directorio):
+    from django.core.management import call_command
+    from django.db import connection
+    from comprar_entradas.archivo import archivar_meses, mes_siguiente
+    from comprar_entradas.models import CupoDiario, LineaOrden, Orden
+    from comprar_entradas.repositorio import repositorio_db
+
+    connection.close()
+    settings.DATABASES["default"]["NAME"] = os.path.join(directorio, f"bench-{archivar}.sqlite3")
+    settings.ARCHIVO_ORDENES_DIR = os.path.join(directorio, f"archivo-{archivar}")
+    call_command("migrate", verbosity=0)
+
+    print(f"\n{'con' if archivar else 'sin'} archivado")
+    print(f"{'meses':>6} {'órdenes':>9} {'líneas':>9} {'MB usados':>10} {'p50 ms':>7} {'p99 ms':>7} {'archivado s':>12}")
+    mes = mes_siguiente(HOY.replace(day=1) - datetime.timedelta(days=31 * meses))
+    for generado in range(1, meses + 1):
+        generar_mes(mes, ordenes_por_mes)
+        mes = mes_siguiente(mes)
+        if generado % max(1, meses // 4):
+            continue
+        duracion = ""
+        if archivar:
+            inicio = time.perf_counter()
+            archivar_meses(HOY, lote=2000)
+            duracion = f"{time.perf_counter() - inicio:12.1f}"
+        tamaño = f"{generado:>6} {Orden.objects.count():>9} {LineaOrden.objects.count():>9} {paginas_usadas():>10.1f}"
+        p50, p99 = medir_inserciones(repositorio_db())
+        print(f"{tamaño} {p50:>7.2f} {p99:>7.2f} {duracion}")
+        # Las órdenes de la medición no cuentan para el siguiente punto
+        Orden.objects.filter(fecha_visita__gt=HOY).delete()
+        CupoDiario.objects.all().delete()
+
+
+def main():
+    ordenes_por_mes = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    meses = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+
+    import django
+    django.setup()
+    with tempfile.TemporaryDirectory() as directorio:
+        for archivar in (False, True):
+            correr(ordenes_por_mes, meses, archivar, directorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Memoria por línea y tiempo de construcción de construir_borrador_orden.
+
+Compara las líneas actuales (LineaOrden con __slots__ y Precio compartido en centavos)
+contra la representación anterior (copia del dict del visitante + dict de precio anidado).
+
+Uso: python benchmarks/bench_borrador.py [cantidad_de_lineas]
+"""
+import datetime
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+import django
+
+django.setup()
+
+from comprar_entradas.views import construir_borrador_orden
+
+
+def construir_borrador_con_dicts(usuario, fecha_visita, visitantes, tipo_pase, forma_pago, motor_precios):
+    # Representación anterior, para comparar
+    lineas = []
+    total = 0
+    for visitante in visitantes:
+        precio = motor_precios(visitante, tipo_pase)
+        linea = visitante.copy()
+        linea["precio"] = precio
+        lineas.append(linea)
+        total += precio["monto"]
+    return {"usuario": usuario, "fecha_visita": fecha_visita, "forma_pago": forma_pago,
+            "tipo_pase": tipo_pase, "lineas": lineas, "total": total}
+
+
+def motor_precios(visitante, tipo_pase):
+    # Como los motores reales: un dict nuevo por llamada
+    return {"monto": 8000 if visitante["edad"] < 12 else 15000, "moneda": "ARS"}
+
+
+def medir(nombre, construir, visitantes):
+    argumentos = ({"id": 1}, datetime.date.today(), visitantes, "VIP", "TARJETA", motor_precios)
+
+    # Tiempo sin tracemalloc (lo distorsiona); mejor de 3 corridas
+    duracion = float("inf")
+    for _ in range(3):
+        gc.collect()
+        inicio = time.perf_counter()
+        construir(*argumentos)
+        duracion = min(duracion, time.perf_counter() - inicio)
+
+    gc.collect()
+    tracemalloc.start()
+    borrador = construir(*argumentos)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(borrador["lineas"])
+    print(f"{nombre:<22} {memoria / n:>7.1f} bytes/línea  {duracion * 1e9 / n:>7.0f} ns/línea  total={borrador['total']}")
+    return borrador
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    visitantes = [{"nombre": f"Visitante {i}", "edad": i % 90} for i in range(cantidad)]
+    print(f"{cantidad} líneas")
+    medir("dicts (anterior)", construir_borrador_con_dicts, visitantes)
+    medir("LineaOrden + Precio", construir_borrador_orden, visitantes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Búsqueda de órdenes contra una base SQLite temporal con N órdenes (350.000 por defecto) de 3
+visitantes cada una (~1 millón de nombres), repartidas en un año de fechas de visita.
+
+Arma el índice como lo hace indexar_ordenes (IndiceOrden + triggers FTS5) y mide buscar_ordenes
+con consultas típicas de boletería, con y sin fecha de visita:
+
+  - apellido completo ("garcía"), comienzo ("garc"), nombre y apellido parciales ("ana garc")
+  - parte de una palabra ("arcí", por trigramas) y comienzo del email ("lucia.garcia12")
+  - el código de una entrada
+
+Uso: python benchmarks/bench_busqueda.py [ordenes]
+"""
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+NOMBRES = ["Ana", "Lucía", "Martín", "José", "María", "Sofía", "Tomás", "Valentina", "Joaquín", "Camila",
+           "Matías", "Julieta", "Benjamín", "Agustina", "Nicolás", "Florencia", "Iñaki", "Begoña", "Raúl", "Inés"]
+APELLIDOS = ["García", "González", "Rodríguez", "Fernández", "López", "Martínez", "Pérez", "Gómez", "Díaz",
+             "Sánchez", "Romero", "Sosa", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores", "Benítez", "Acosta",
+             "Medina", "Herrera", "Suárez", "Aguirre", "Giménez", "Gutiérrez", "Pereyra", "Rojas", "Molina",
+             "Castro", "Ortiz", "Silva", "Núñez", "Luna", "Juárez", "Cabrera", "Ríos", "Ferreyra", "Godoy",
+             "Morales", "Domínguez", "Peña", "Muñoz", "Quiroga", "Ibáñez", "Ávila", "Ledesma", "Vega", "Campos"]
+INICIO = datetime.date(2030, 1, 1)
+REPETICIONES = 200
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 350_000
+    azar = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from django.db import transaction
+        from comprar_entradas.busqueda import buscar_ordenes, indice_de, plegar
+        from comprar_entradas.mail import codigo_entrada
+        from comprar_entradas.models import IndiceOrden, Orden
+
+        call_command("migrate", verbosity=0)
+
+        def persona():
+            return f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)}"
+
+        def email(nombre):
+            return f"{plegar(nombre).replace(' ', '.')}{azar.randrange(1000)}@example.com"
+
+        inicio = time.perf_counter()
+        lote = 10_000
+        for desde in range(0, cantidad, lote):
+            with transaction.atomic():
+                ordenes = Orden.objects.bulk_create(
+                    Orden(usuario_nombre=nombre, usuario_email=email(nombre),
+                          fecha_visita=INICIO + datetime.timedelta(days=azar.randrange(365)), tipo_pase="REGULAR",
+                          forma_pago="TARJETA")
+                    for nombre in (persona() for _ in range(min(lote, cantidad - desde))))
+                IndiceOrden.objects.bulk_create(
+                    indice_de(orden.pk, {"nombre": orden.usuario_nombre, "email": orden.usuario_email},
+                              [{"nombre": persona()} for _ in range(3)], [orden.fecha_visita])
+                    for orden in ordenes)
+        print(f"{cantidad:,} órdenes con {3 * cantidad:,} visitantes indexadas en "
+              f"{time.perf_counter() - inicio:.0f} s")
+
+        fechas = [INICIO + datetime.timedelta(days=azar.randrange(365)) for _ in range(REPETICIONES)]
+        consultas = {
+            "apellido": lambda i: azar.choice(APELLIDOS),
+            "comienzo": lambda i: azar.choice(APELLIDOS)[:4],
+            "nombre y apellido": lambda i: f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)[:4]}",
+            "parte de palabra": lambda i: azar.choice(APELLIDOS)[1:5],
+            "email": lambda i: email(persona())[:-15],
+            "código de entrada": lambda i: codigo_entrada(azar.randrange(1, cantidad), 1),
+        }
+        for nombre, consulta in consultas.items():
+            for con_fecha in (False, True):
+                tiempos = []
+                encontradas = 0
+                for i in range(REPETICIONES):
+                    texto = consulta(i)
+                    inicio = time.perf_counter()
+                    encontradas += len(buscar_ordenes(texto, fechas[i] if con_fecha else None))
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                print(f"{nombre:18} {'con fecha' if con_fecha else 'sin fecha':9}  "
+                      f"p50 {statistics.median(tiempos):6.2f} ms  p95 {tiempos[int(len(tiempos) * 0.95)]:6.2f} ms  "
+                      f"máx {tiempos[-1]:6.2f} ms  ({encontradas / REPETICIONES:.1f} resultados)")
+
+
+if __name__ == "__main__":
+    main()
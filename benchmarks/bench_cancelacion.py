@@ -0,0 +1,125 @@
+"""
+Cierre de un día con N órdenes vendidas (por defecto 30.000, 2/3 pagadas) contra una base
+SQLite temporal. El proveedor de pagos se simula con una latencia fija por reintegro.
+
+Compara cerrar_fecha con el camino ingenuo (por cada orden: UPDATE, reintegro y mail, uno
+detrás del otro), que se mide sobre una muestra y se extrapola.
+
+Uso: python benchmarks/bench_cancelacion.py [ordenes] [latencia_ms] [concurrencia] [reembolsos_por_segundo]
+"""
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+FECHA = datetime.date(2030, 1, 8)
+MUESTRA_INGENUA = 300
+
+
+def preparar(ruta_db, ordenes):
+    db = sqlite3.connect(ruta_db)
+    db.execute("PRAGMA journal_mode=OFF")
+    db.execute("PRAGMA synchronous=OFF")
+    db.executemany(
+        "INSERT INTO comprar_entradas_orden (id, usuario_nombre, usuario_email, fecha_visita, tipo_pase, "
+        "forma_pago, estado, total, pagada_en) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, "Cliente", f"cliente{i}@example.com", FECHA.isoformat(), "REGULAR", "TARJETA",
+          "PENDIENTE" if i % 3 == 0 else "PAGADA", 10000, None if i % 3 == 0 else "2030-01-02 12:00:00")
+         for i in range(1, ordenes + 1)))
+    db.executemany(
+        "INSERT INTO comprar_entradas_lineaorden (orden_id, nombre, edad, monto) VALUES (?, ?, ?, ?)",
+        ((i, "Visitante", 30, 5000) for i in range(1, ordenes + 1) for _ in range(2)))
+    db.execute("INSERT INTO comprar_entradas_cupodiario (fecha, capacidad, vendidas) VALUES (?, ?, ?)",
+               (FECHA.isoformat(), ordenes * 2, ordenes * 2))
+    db.commit()
+    db.close()
+
+
+class Proveedor:
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.claves = set()
+        self.duplicados = 0
+
+    def reembolsar(self, orden, clave_idempotencia):
+        time.sleep(self.latencia)
+        if clave_idempotencia in self.claves:
+            self.duplicados += 1
+        self.claves.add(clave_idempotencia)
+        return f"R-{orden['id']}"
+
+
+def ingenuo(proveedor, servicio_mail, cantidad):
+    from django.db.models import F
+    from comprar_entradas.models import CupoDiario, Orden
+    from comprar_entradas.repositorio import orden_a_dict
+
+    for orden in Orden.objects.filter(fecha_visita=FECHA, estado__in=("PENDIENTE", "PAGADA")).order_by("pk")[:cantidad]:
+        Orden.objects.filter(pk=orden.pk).update(estado="CANCELADA")
+        CupoDiario.objects.filter(fecha=FECHA).update(vendidas=F("vendidas") - orden.lineas.count())
+        if orden.estado == "PAGADA":
+            proveedor.reembolsar(orden_a_dict(orden, ()), f"reembolso-orden-{orden.pk}")
+        servicio_mail["enviar_cancelacion"](orden_a_dict(orden, orden.lineas.all()), "tormenta")
+
+
+def main():
+    ordenes = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    latencia = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    concurrencia = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    por_segundo = float(sys.argv[4]) if len(sys.argv) > 4 else 200
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from django.db import connection
+        from comprar_entradas.cancelacion import cerrar_fecha
+        from comprar_entradas.models import CancelacionOrden, CupoDiario, Orden
+
+        call_command("migrate", verbosity=0)
+        preparar(settings.DATABASES["default"]["NAME"], ordenes)
+        pagadas = Orden.objects.filter(estado="PAGADA").count()
+        print(f"{ordenes} órdenes ({pagadas} pagadas), latencia del proveedor {latencia * 1000:.0f} ms")
+
+        # Mail: se simula un costo de 1 ms por mensaje (el envío real va por el PoolSMTP)
+        mails = {"enviar_cancelacion": lambda orden, motivo: time.sleep(0.001),
+                 "enviar_cancelaciones": lambda ordenes, motivo: time.sleep(0.001 * len(ordenes) / 4)}
+
+        inicio = time.perf_counter()
+        ingenuo(Proveedor(latencia), mails, MUESTRA_INGENUA)
+        por_orden = (time.perf_counter() - inicio) / MUESTRA_INGENUA
+        print(f"Ingenuo: {por_orden * 1000:.1f} ms por orden -> {por_orden * ordenes / 60:.0f} min estimados")
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE comprar_entradas_orden SET estado = CASE WHEN id % 3 = 0 THEN 'PENDIENTE' "
+                           "ELSE 'PAGADA' END WHERE estado = 'CANCELADA'")
+        CupoDiario.objects.update(vendidas=ordenes * 2)
+
+        proveedor = Proveedor(latencia)
+        inicio = time.perf_counter()
+        resumen = cerrar_fecha(FECHA, "tormenta", {"reembolsar": proveedor.reembolsar}, mails,
+                               lote=1000, concurrencia=concurrencia, reembolsos_por_segundo=por_segundo,
+                               mails_por_segundo=0)
+        duracion = time.perf_counter() - inicio
+        print(f"cerrar_fecha (concurrencia {concurrencia}, {por_segundo:.0f} reintegros/s): "
+              f"{duracion:.1f} s = {duracion / 60:.1f} min")
+        print(dict(resumen))
+
+        # Segunda corrida: no debe volver a pedir ningún reintegro
+        inicio = time.perf_counter()
+        resumen = cerrar_fecha(FECHA, "tormenta", {"reembolsar": proveedor.reembolsar}, mails)
+        print(f"Segunda corrida: {time.perf_counter() - inicio:.2f} s, {dict(resumen)}; "
+              f"reintegros duplicados en el proveedor: {proveedor.duplicados}; "
+              f"cupo vendido: {CupoDiario.objects.get(fecha=FECHA).vendidas}; "
+              f"reintegros realizados: {CancelacionOrden.objects.filter(reembolso_estado='REALIZADO').count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Conciliación de una liquidación grande contra una base SQLite temporal.
+
+Genera N órdenes (insert directo con sqlite3, sin el ORM, para que la preparación no domine)
+y una liquidación de N filas ordenada por id_orden con ~0,1% de discrepancias de cada tipo,
+y corre ejecutar_conciliacion (con --aplicar). Informa tiempo, filas/s y memoria máxima.
+
+Uso: python benchmarks/bench_conciliacion.py [filas]
+"""
+import csv
+import datetime
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+FECHA = datetime.date(2025, 10, 13)
+
+
+def preparar(ruta_db, ruta_csv, filas):
+    azar = random.Random(1)
+    pagada_en = "2025-10-13 12:00:00"
+    db = sqlite3.connect(ruta_db)
+
+    def ordenes():
+        for i in range(1, filas + 1):
+            sin_webhook = azar.random() < 0.001
+            yield (i, "Cliente", "cliente@example.com", "2025-10-20", "REGULAR", "TARJETA",
+                   "PENDIENTE" if sin_webhook else "PAGADA", 10000, None if sin_webhook else pagada_en)
+
+    db.execute("PRAGMA journal_mode=OFF")
+    db.execute("PRAGMA synchronous=OFF")
+    db.executemany(
+        "INSERT INTO comprar_entradas_orden (id, usuario_nombre, usuario_email, fecha_visita, tipo_pase, "
+        "forma_pago, estado, total, pagada_en) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ordenes())
+    db.commit()
+    db.close()
+
+    with open(ruta_csv, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["fecha", "id_orden", "id_pago", "monto", "medio"])
+        for i in range(1, filas + 1):
+            r = azar.random()
+            if r < 0.001:
+                continue  # pagada sin cobro
+            monto = "9999.00" if r < 0.002 else "10000.00"
+            escritor.writerow(["2025-10-13", i, f"MP{i:010d}", monto, "visa"])
+            if r > 0.999:
+                escritor.writerow(["2025-10-13", i, f"MP{i:010d}-2", monto, "visa"])
+        escritor.writerow(["2025-10-13", filas + 10, "MP-huerfano", "10000.00", "visa"])
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from comprar_entradas.conciliacion import ejecutar_conciliacion
+
+        call_command("migrate", verbosity=0)
+        ruta_csv = os.path.join(directorio, "liquidacion.csv")
+        inicio = time.perf_counter()
+        preparar(settings.DATABASES["default"]["NAME"], ruta_csv, filas)
+        print(f"Preparación de {filas} órdenes y filas: {time.perf_counter() - inicio:.0f} s "
+              f"(CSV {os.path.getsize(ruta_csv) / 1e6:.0f} MB)")
+
+        memoria_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        inicio = time.perf_counter()
+        resumen = ejecutar_conciliacion(ruta_csv, FECHA, os.path.join(directorio, "reporte.csv"), aplicar=True)
+        duracion = time.perf_counter() - inicio
+        memoria = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        print(f"Conciliación: {duracion:.1f} s, {resumen['cobros'] / duracion:,.0f} filas/s, "
+              f"memoria máxima {memoria:.0f} MB (antes de conciliar: {memoria_inicial:.0f} MB)")
+        print(dict(resumen))
+
+
+if __name__ == "__main__":
+    main()
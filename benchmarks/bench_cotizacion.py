@@ -0,0 +1,59 @@
+"""
+Tiempo de servidor por cotización: el POST de siempre (construye el borrador de la orden)
+contra la cotización rápida por GET (tabla de precios memoizada) y su revalidación con
+If-None-Match (304).
+
+Uso: python benchmarks/bench_cotizacion.py [iteraciones]
+Corre en proceso con el cliente de test de Django (con todo el middleware), sin red.
+"""
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.test import Client
+
+settings.ALLOWED_HOSTS = ["*"]
+URL = "/comprar-entradas/api/v1/cotizaciones"
+
+
+def medir(nombre, pedir, iteraciones, estado):
+    assert pedir().status_code == estado  # calentamiento
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        pedir()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    print(f"{nombre:<34} p50 {statistics.median(tiempos) * 1000:6.3f} ms   "
+          f"p99 {tiempos[int(len(tiempos) * .99)] * 1000:6.3f} ms")
+
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    cliente = Client()
+    fecha = (datetime.date.today() + datetime.timedelta(days=5)).isoformat()
+    edades = [35, 33, 9, 6, 70]
+    payload = json.dumps({"fecha_visita": fecha, "tipo_pase": "VIP",
+                          "visitantes": [{"nombre": f"Visitante {i}", "edad": e} for i, e in enumerate(edades)]})
+    consulta = f"{URL}?fecha_visita={fecha}&tipo_pase=VIP&edades={','.join(map(str, edades))}"
+    etag = cliente.get(consulta)["ETag"]
+
+    medir("POST (borrador completo)", lambda: cliente.post(URL, payload, content_type="application/json"),
+          iteraciones, 200)
+    medir("GET (tabla memoizada)", lambda: cliente.get(consulta), iteraciones, 200)
+    medir("GET con If-None-Match (304)", lambda: cliente.get(consulta, HTTP_IF_NONE_MATCH=etag), iteraciones, 304)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Códigos de descuento contra una base SQLite temporal.
+
+  - generación de N códigos de un uso (1.000.000 por defecto): executemany vs bulk_create
+    (este último con una muestra de 100.000 y extrapolado)
+  - buscar_descuento + aplicar a un borrador de 4 entradas, con la regla ya compilada
+  - canje concurrente: 16 hilos guardan a la vez órdenes con el mismo código de un uso;
+    exactamente una debe ganar y las demás no deben consumir cupo
+
+Uso: python benchmarks/bench_descuentos.py [codigos]
+"""
+import datetime
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+FECHA = datetime.date(2030, 1, 5)
+HILOS = 16
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from django.db import connection
+        from comprar_entradas.descuentos import buscar_descuento, hash_codigo
+        from comprar_entradas.models import Campania, CodigoDescuento, CupoDiario, Orden
+        from comprar_entradas.repositorio import repositorio_db
+        from comprar_entradas.views import construir_borrador_orden, motor_precios_simple
+
+        call_command("migrate", verbosity=0)
+        Campania.objects.create(nombre="Lanzamiento", tipo="PORCENTAJE", valor=15)
+
+        ruta = os.path.join(directorio, "codigos.txt")
+        inicio = time.perf_counter()
+        call_command("generar_codigos", "Lanzamiento", cantidad, salida=ruta, stdout=io.StringIO())
+        duracion = time.perf_counter() - inicio
+        print(f"generar_codigos: {cantidad:,} en {duracion:.1f} s ({cantidad / duracion:,.0f}/s)")
+
+        muestra = 100_000
+        otra = Campania.objects.create(nombre="Comparación", tipo="PORCENTAJE", valor=15)
+        inicio = time.perf_counter()
+        CodigoDescuento.objects.bulk_create(
+            (CodigoDescuento(hash=hash_codigo(f"BULK{i:08d}"), campania=otra) for i in range(muestra)), batch_size=5000)
+        por_codigo = (time.perf_counter() - inicio) / muestra
+        print(f"bulk_create:     {muestra:,} en {por_codigo * muestra:.1f} s "
+              f"(~{por_codigo * cantidad:.0f} s para {cantidad:,})")
+
+        with open(ruta) as archivo:
+            codigos = [next(archivo).strip() for _ in range(2000)]
+        visitantes = [{"nombre": "A", "edad": 40}, {"nombre": "B", "edad": 38}, {"nombre": "C", "edad": 9},
+                      {"nombre": "D", "edad": 6}]
+        buscar_descuento(codigos[0])  # compila la regla
+        inicio = time.perf_counter()
+        for codigo in codigos:
+            construir_borrador_orden({"id": 1}, FECHA, visitantes, "REGULAR", "TARJETA", motor_precios_simple,
+                                     buscar_descuento(codigo))
+        print(f"buscar + aplicar: {(time.perf_counter() - inicio) / len(codigos) * 1e6:.0f} µs por compra "
+              f"(índice único sobre {CodigoDescuento.objects.count():,} hashes)")
+
+        CupoDiario.objects.create(fecha=FECHA, capacidad=1000)
+        descuento = buscar_descuento(codigos[1])
+        usuario = {"id": 1, "nombre": "Ana", "email": "ana@example.com"}
+        resultados = []
+        barrera = threading.Barrier(HILOS)
+
+        def canjear():
+            borrador = construir_borrador_orden(usuario, FECHA, visitantes, "REGULAR", "EFECTIVO",
+                                                motor_precios_simple, descuento)
+            barrera.wait()
+            try:
+                repositorio_db()["guardar_pendiente"](borrador)
+                resultados.append("ok")
+            except ValueError as e:
+                resultados.append(str(e))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=canjear) for _ in range(HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        print(f"canje concurrente: {resultados.count('ok')} de {HILOS} ganaron, "
+              f"usos del código {CodigoDescuento.objects.get(pk=descuento.codigo_id).usos}, "
+              f"cupo consumido {CupoDiario.objects.get(fecha=FECHA).vendidas} (esperado {len(visitantes)}), "
+              f"órdenes {Orden.objects.count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Transiciones de estado de órdenes bajo contención, contra una base SQLite temporal.
+
+Por cada orden pendiente llegan 3 webhooks de pago (duplicados), un intento de expiración y,
+para el 10%, una cancelación, todos mezclados y repartidos entre H hilos. Antes de cambiar el
+estado cada evento consulta al proveedor de pagos (LATENCIA simulada). Se comparan:
+
+  - cas:     la consulta al proveedor va afuera y el cambio es un compare-and-swap por versión
+             (repositorio.transicionar)
+  - bloqueo: transacción con select_for_update que retiene la fila (en SQLite, toda la base)
+             durante la consulta al proveedor
+
+Informa eventos/s por cantidad de hilos y verifica que cada orden salió de PENDIENTE una sola
+vez (ningún pago y expiración ganaron los dos) y que hubo un mail por orden pagada.
+
+Uso: python benchmarks/bench_estados.py [ordenes]
+"""
+import collections
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+LATENCIA = 0.002
+HILOS = (1, 4, 8, 16)
+
+
+def crear_ordenes(cantidad):
+    from comprar_entradas.models import Orden
+    Orden.objects.all().delete()
+    Orden.objects.bulk_create([
+        Orden(usuario_nombre="Cliente", usuario_email="cliente@example.com", fecha_visita="2030-01-05",
+              tipo_pase="REGULAR", forma_pago="TARJETA", total=3000)
+        for _ in range(cantidad)
+    ])
+    return list(Orden.objects.values_list("pk", flat=True))
+
+
+def eventos(ids):
+    azar = random.Random(1)
+    lista = []
+    for pk in ids:
+        lista += [(pk, "PAGADA")] * 3 + [(pk, "EXPIRADA")]
+        if azar.random() < 0.1:
+            lista.append((pk, "CANCELADA"))
+    azar.shuffle(lista)
+    return lista
+
+
+def transicion_cas(pk, destino):
+    from comprar_entradas.repositorio import transicionar
+    time.sleep(LATENCIA)  # consulta al proveedor, sin nada bloqueado
+    return transicionar(pk, destino)
+
+
+def transicion_bloqueo(pk, destino):
+    from django.db import transaction
+    from comprar_entradas.estados import puede_transicionar
+    from comprar_entradas.models import Orden
+    with transaction.atomic():
+        orden = Orden.objects.select_for_update().get(pk=pk)
+        time.sleep(LATENCIA)  # consulta al proveedor con la fila bloqueada
+        if not puede_transicionar(orden.estado, destino):
+            return False
+        orden.estado = destino
+        orden.version += 1
+        orden.save(update_fields=["estado", "version"])
+        return True
+
+
+def correr(transicion, lista, hilos):
+    from django.db import connection
+    pendientes = collections.deque(lista)
+    ganadores = collections.defaultdict(list)
+    lock = threading.Lock()
+
+    def trabajar():
+        try:
+            while True:
+                try:
+                    pk, destino = pendientes.popleft()
+                except IndexError:
+                    return
+                if transicion(pk, destino):
+                    with lock:
+                        ganadores[pk].append(destino)
+        finally:
+            connection.close()
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    return time.perf_counter() - inicio, ganadores
+
+
+def verificar(ganadores, ids):
+    from comprar_entradas.models import Orden
+    estados = dict(Orden.objects.values_list("pk", "estado"))
+    errores = 0
+    for pk in ids:
+        transiciones = ganadores.get(pk, [])
+        salidas = [d for d in transiciones if d in ("PAGADA", "EXPIRADA")]
+        desde_pendiente = len(salidas) + (transiciones[:1] == ["CANCELADA"])
+        final = transiciones[-1] if transiciones else "PENDIENTE"
+        if desde_pendiente != 1 or final != estados[pk]:
+            errores += 1
+    mails = sum(d == "PAGADA" for t in ganadores.values() for d in t)
+    return errores, mails
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        import django
+        django.setup()
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
+
+        print(f"{cantidad} órdenes, latencia del proveedor {LATENCIA * 1000:.0f} ms por evento")
+        for nombre, transicion in (("cas", transicion_cas), ("bloqueo", transicion_bloqueo)):
+            for hilos in HILOS:
+                ids = crear_ordenes(cantidad)
+                lista = eventos(ids)
+                duracion, ganadores = correr(transicion, lista, hilos)
+                errores, mails = verificar(ganadores, ids)
+                print(f"{nombre:8} {hilos:3} hilos: {len(lista) / duracion:7,.0f} eventos/s "
+                      f"({duracion:5.1f} s)  mails {mails}  órdenes inconsistentes {errores}")
+
+
+if __name__ == "__main__":
+    main()
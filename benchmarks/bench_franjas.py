@@ -0,0 +1,109 @@
+"""
+Franjas de ingreso de 15 minutos durante una temporada completa, contra una base SQLite temporal.
+
+Crea las franjas de un año (09:00 a 19:00, sin lunes ni feriados) con los primeros 300 días casi
+llenos, y mide:
+
+  - construir el índice en memoria de la temporada
+  - disponibilidad de un día: índice vs consulta a la base
+  - siguiente franja con lugar para un grupo desde una fecha: bitset vs recorrido lineal vs base
+  - guardar_pendiente con asignación de franja vs sin franjas (fechas de ingreso libre)
+
+Uso: python benchmarks/bench_franjas.py
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+DESDE = datetime.date(2030, 1, 1)
+HASTA = datetime.date(2030, 12, 31)
+CAPACIDAD = 60
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        funcion(i)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from django.db.models import F, Q
+        from comprar_entradas.franjas import cargar_indice
+        from comprar_entradas.models import CupoDiario, FranjaIngreso
+        from comprar_entradas.repositorio import repositorio_db
+
+        call_command("migrate", verbosity=0)
+        call_command("crear_franjas", desde=DESDE.isoformat(), hasta=HASTA.isoformat(), apertura="09:00",
+                     cierre="19:00", minutos=15, capacidad=CAPACIDAD, verbosity=0)
+        azar = random.Random(1)
+        limite_lleno = DESDE + datetime.timedelta(days=300)
+        franjas = list(FranjaIngreso.objects.order_by("fecha", "inicio"))
+        for franja in franjas:
+            casi_lleno = franja.fecha < limite_lleno
+            franja.vendidas = CAPACIDAD - azar.randrange(3) if casi_lleno else azar.randrange(CAPACIDAD)
+        FranjaIngreso.objects.bulk_update(franjas, ["vendidas"], batch_size=1000)
+        dias = sorted({f.fecha for f in franjas})
+        print(f"{len(franjas)} franjas en {len(dias)} días abiertos")
+
+        inicio = time.perf_counter()
+        indice = cargar_indice(DESDE)
+        print(f"Construir el índice de la temporada: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+        def dia(i):
+            return dias[i * 7919 % len(dias)]
+
+        por_indice = medir(lambda i: indice.disponibilidad(dia(i), 4), 2000)
+        por_base = medir(lambda i: list(FranjaIngreso.objects.filter(fecha=dia(i)).order_by("inicio")
+                                        .values_list("inicio", "capacidad", "vendidas")), 500)
+        print(f"Disponibilidad de un día: índice {por_indice:.1f} µs, base {por_base:.0f} µs")
+
+        # Siguiente franja con lugar para 4 desde un día casi lleno: hay que saltear ~12.000 franjas
+        grupo = 4
+        desde = [indice.dias[dia(i) if dia(i) < limite_lleno else dias[0]][0] for i in range(500)]
+
+        def lineal(i):
+            libres = indice.libres
+            return next((j for j in range(desde[i], len(libres)) if libres[j] >= grupo), None)
+
+        def base(i):
+            fecha, hora = indice.franjas[desde[i]]
+            return (FranjaIngreso.objects.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, inicio__gte=hora),
+                                                 vendidas__lte=F("capacidad") - grupo)
+                    .order_by("fecha", "inicio").values_list("fecha", "inicio").first())
+
+        assert all(indice.primera(desde[i], grupo) == lineal(i) for i in range(50))
+        print(f"Siguiente franja para {grupo}: bitset {medir(lambda i: indice.primera(desde[i], grupo), 500):.1f} µs, "
+              f"lineal {medir(lineal, 500):.0f} µs, base {medir(base, 100):.0f} µs")
+
+        # Asignación al guardar la orden: con franjas (último tramo de la temporada, con lugar) y sin franjas
+        repositorio = repositorio_db()
+        fechas_libres = [d for d in dias if d >= limite_lleno]
+        CupoDiario.objects.bulk_create([CupoDiario(fecha=d, capacidad=100000) for d in dias])
+
+        def borrador(fecha):
+            return {"usuario": {"nombre": "Ana", "email": "ana@example.com"}, "fecha_visita": fecha,
+                    "tipo_pase": "REGULAR", "forma_pago": "TARJETA", "total": 6000, "hora_ingreso": None,
+                    "lineas": [{"nombre": "A", "edad": 30, "precio": {"monto": 3000}}] * 2}
+
+        con_franja = medir(lambda i: repositorio["guardar_pendiente"](borrador(fechas_libres[i % len(fechas_libres)])), 1000)
+        FranjaIngreso.objects.filter(fecha__gte=limite_lleno).delete()
+        sin_franja = medir(lambda i: repositorio["guardar_pendiente"](borrador(fechas_libres[i % len(fechas_libres)])), 1000)
+        print(f"guardar_pendiente: con franja {con_franja:.0f} µs, ingreso libre {sin_franja:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Importación del export de socios del CRM contra una base SQLite temporal.
+
+Genera un CSV de N filas (~5% de emails repetidos con otra capitalización y ~0,1% inválidos),
+corre importar_usuarios, lo corta a la mitad y lo retoma, e informa filas/s y memoria máxima.
+
+Uso: python benchmarks/bench_importacion_usuarios.py [filas]
+"""
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+
+class Corte(Exception):
+    pass
+
+
+def generar(ruta, filas):
+    azar = random.Random(1)
+    with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["email", "nombre", "registrado"])
+        for i in range(filas):
+            r = azar.random()
+            if r < 0.001:
+                email = f"socio{i}-sin-arroba.example.com"
+            elif r < 0.05 and i:
+                email = f"  SOCIO{azar.randrange(i)}@Example.com"
+            else:
+                email = f"socio{i}@example.com"
+            escritor.writerow([email, f"Socio {i}", "1"])
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from comprar_entradas.importacion_usuarios import importar_usuarios
+        from comprar_entradas.models import UsuarioRegistrado
+
+        call_command("migrate", verbosity=0)
+        ruta = os.path.join(directorio, "socios.csv")
+        inicio = time.perf_counter()
+        generar(ruta, filas)
+        print(f"CSV de {filas} filas: {os.path.getsize(ruta) / 1e6:.0f} MB en {time.perf_counter() - inicio:.0f} s")
+
+        memoria_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        inicio = time.perf_counter()
+        resumen = importar_usuarios(ruta)
+        duracion = time.perf_counter() - inicio
+        memoria = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"Importación completa: {duracion:.1f} s, {filas / duracion:,.0f} filas/s, "
+              f"memoria máxima {memoria:.0f} MB (antes: {memoria_inicial:.0f} MB)")
+        print(dict(resumen))
+
+        # Re-importar el mismo archivo modificado (upsert sobre filas existentes), cortando a la mitad
+        with open(ruta, "a", encoding="utf-8") as archivo:
+            archivo.write("nuevo@example.com,Nuevo,1\n")
+
+        def cortar(resumen):
+            if resumen["importados"] >= filas // 2:
+                raise Corte
+
+        inicio = time.perf_counter()
+        try:
+            importar_usuarios(ruta, progreso=cortar)
+        except Corte:
+            pass
+        cortada = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        resumen = importar_usuarios(ruta)
+        retomada = time.perf_counter() - inicio
+        print(f"Upsert cortado a la mitad: {cortada:.1f} s; retomado: {retomada:.1f} s "
+              f"({resumen['salteados']} salteados, {resumen['importados']} importados)")
+        print(f"Usuarios en la tabla: {UsuarioRegistrado.objects.count()}")
+
+
+if __name__ == "__main__":
+    main()
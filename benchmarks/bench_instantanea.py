@@ -0,0 +1,87 @@
+"""
+Memoria por worker del registro de socios: copia en cada proceso vs instantánea compartida por mmap.
+
+Con N socios (1.000.000 por defecto) escribe la instantánea y, en un proceso nuevo por variante
+(como un worker de gunicorn recién levantado), carga el registro y hace 200.000 búsquedas
+(mitad socios, mitad no). Informa la RSS del worker separada en memoria anónima (privada, se
+multiplica por la cantidad de workers) y páginas de archivo (page cache, una sola copia para
+todos), y el tiempo por búsqueda.
+
+  - set:         set de Python con los emails normalizados, cargado en cada worker
+  - instantanea: Instantanea sobre el archivo con mmap y bisección
+
+Uso: python benchmarks/bench_instantanea.py [socios]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+BUSQUEDAS = 200_000
+
+
+def email(i):
+    return f"socio.{i:07d}@example.com"
+
+
+def memoria():
+    campos = {}
+    with open("/proc/self/status") as archivo:
+        for linea in archivo:
+            nombre, _, valor = linea.partition(":")
+            if nombre in ("VmRSS", "RssAnon", "RssFile"):
+                campos[nombre] = int(valor.split()[0]) / 1024
+    return campos
+
+
+def worker(variante, ruta, socios):
+    import django
+    django.setup()
+    from comprar_entradas.instantanea import Instantanea
+
+    consultas = [email(i * 7919 % socios) if i % 2 else f"otro.{i}@example.com" for i in range(BUSQUEDAS)]
+    antes = memoria()
+    inicio = time.perf_counter()
+    if variante == "set":
+        registro = {email(i) for i in range(socios)}
+        contiene = registro.__contains__
+    else:
+        contiene = Instantanea(ruta).contiene_email
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    encontrados = sum(map(contiene, consultas))
+    busqueda = (time.perf_counter() - inicio) / BUSQUEDAS * 1e6
+    assert encontrados == BUSQUEDAS // 2
+    despues = memoria()
+    print(f"{variante:12} carga {carga * 1000:7.0f} ms  búsqueda {busqueda:5.2f} µs  "
+          f"anónima +{despues['RssAnon'] - antes['RssAnon']:6.1f} MB  "
+          f"archivo +{despues['RssFile'] - antes['RssFile']:5.1f} MB  (RSS total {despues['VmRSS']:.0f} MB)")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    socios = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    import django
+    django.setup()
+    from comprar_entradas.instantanea import escribir_instantanea
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "registro.bin")
+        inicio = time.perf_counter()
+        escribir_instantanea(ruta, (email(i) for i in range(socios)), [])
+        print(f"{socios:,} socios: instantánea de {os.path.getsize(ruta) / 2**20:.1f} MB "
+              f"escrita en {time.perf_counter() - inicio:.1f} s")
+        for variante in ("set", "instantanea"):
+            subprocess.run([sys.executable, __file__, "--worker", variante, ruta, str(socios)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Ráfaga de mails de confirmación contra un sumidero SMTP local.
+
+Compara el envío "ingenuo" (render en el mismo proceso y una conexión SMTP nueva por mensaje,
+como django.core.mail.send_mail) con ServicioMail: render en un pool de procesos, cache por
+hash de contenido y un pool chico de conexiones persistentes con PIPELINING.
+
+Uso: python benchmarks/bench_mail.py [confirmaciones] [procesos] [conexiones]
+
+El modo ingenuo se mide sobre una muestra (1/10 de la ráfaga) y se extrapola.
+"""
+import datetime
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+import django
+
+django.setup()
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from comprar_entradas import mail
+from comprar_entradas.mail import PoolSMTP, ServicioMail, renderizar_confirmacion
+
+REMITENTE = "entradas@parque.example"
+
+
+class Sumidero(socketserver.StreamRequestHandler):
+    """
+    SMTP que acepta y descarta todo (anuncia PIPELINING). Solo cuenta mensajes y conexiones.
+    """
+
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        self.server.conexiones += 1
+        escribir = self.wfile.write
+        escribir(b"220 sumidero\r\n")
+        for linea in self.rfile:
+            comando = linea[:4].upper()
+            if comando == b"EHLO":
+                escribir(b"250-sumidero\r\n250-PIPELINING\r\n250 8BITMIME\r\n")
+            elif comando == b"DATA":
+                escribir(b"354 Adelante\r\n")
+                for linea_datos in self.rfile:
+                    if linea_datos == b".\r\n":
+                        break
+                self.server.mensajes += 1
+                escribir(b"250 OK\r\n")
+            elif comando == b"QUIT":
+                escribir(b"221 Chau\r\n")
+                return
+            else:
+                escribir(b"250 OK\r\n")
+
+
+def orden(i):
+    return {
+        "id": i,
+        "usuario": {"nombre": f"Cliente {i}", "email": f"cliente{i}@example.com"},
+        "fecha_visita": datetime.date(2030, 1, 8),
+        "tipo_pase": "REGULAR",
+        "total": 8000,
+        "lineas": [
+            {"nombre": "Ana", "edad": 25, "precio": {"monto": 5000}},
+            {"nombre": "Luis", "edad": 8, "precio": {"monto": 3000}},
+        ],
+    }
+
+
+def ingenuo(ordenes, port, renderizados=None):
+    for i, o in enumerate(ordenes):
+        datos = renderizados[i] if renderizados else renderizar_confirmacion(o, REMITENTE)
+        with smtplib.SMTP("127.0.0.1", port) as conexion:
+            conexion.sendmail(REMITENTE, [o["usuario"]["email"]], datos)
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    procesos = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    conexiones = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Sumidero)
+    servidor.daemon_threads = True
+    servidor.conexiones = servidor.mensajes = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    port = servidor.server_address[1]
+
+    ordenes = [orden(i) for i in range(cantidad)]
+    print(f"{cantidad} confirmaciones, {procesos} procesos de render, {conexiones} conexiones SMTP, "
+          f"{os.cpu_count()} CPU, qrcode={'sí' if mail.qrcode else 'no'}, reportlab={'sí' if mail.canvas else 'no'}")
+
+    muestra = ordenes[:max(1, cantidad // 10)]
+    inicio = time.perf_counter()
+    ingenuo(muestra, port)
+    duracion = time.perf_counter() - inicio
+    print(f"{'ingenuo (conexión por mensaje)':<38} {len(muestra) / duracion:8.0f} mails/s  "
+          f"~{duracion * cantidad / len(muestra):7.1f} s la ráfaga (extrapolado)")
+
+    renderizados = [renderizar_confirmacion(o, REMITENTE) for o in muestra]
+    inicio = time.perf_counter()
+    ingenuo(muestra, port, renderizados)
+    duracion = time.perf_counter() - inicio
+    print(f"{'ingenuo, solo envío (ya renderizados)':<38} {len(muestra) / duracion:8.0f} mails/s  "
+          f"~{duracion * cantidad / len(muestra):7.1f} s la ráfaga (extrapolado)")
+
+    servidor.conexiones = servidor.mensajes = 0
+    servicio = ServicioMail(PoolSMTP("127.0.0.1", port, tamaño=conexiones), REMITENTE, procesos=procesos,
+                            cache=LocMemCache("bench-mail", {"OPTIONS": {"MAX_ENTRIES": cantidad * 2}}))
+    try:
+        for nombre in ("ServicioMail, cache frío", "ServicioMail, cache caliente (reenvío)"):
+            inicio = time.perf_counter()
+            resultado = servicio.enviar_confirmaciones(ordenes)
+            duracion = time.perf_counter() - inicio
+            assert resultado["enviados"] == cantidad and not resultado["errores"], resultado["errores"][:3]
+            print(f"{nombre:<38} {cantidad / duracion:8.0f} mails/s  {duracion:8.1f} s la ráfaga")
+
+        inicio = time.perf_counter()
+        futuros = [servicio.enviar_confirmacion(o) for o in ordenes]
+        encolado = time.perf_counter() - inicio
+        assert all(futuro.result() for futuro in futuros)
+        duracion = time.perf_counter() - inicio
+        print(f"{'enviar_confirmacion x N (cola)':<38} {cantidad / duracion:8.0f} mails/s  {duracion:8.1f} s la ráfaga"
+              f"  ({encolado / cantidad * 1e6:.0f} µs por llamada en el request)")
+    finally:
+        servicio.cerrar()
+    print(f"Conexiones SMTP abiertas por ServicioMail: {servidor.conexiones}, mensajes recibidos: {servidor.mensajes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Throughput de compras de varias fechas contra el repositorio real (ORM + SQLite temporal).
+
+Compara una orden de una fecha (realizar_compra) con órdenes de N fechas
+(realizar_compra_multifecha) y con la alternativa de hacer N compras de una fecha.
+
+Uso: python benchmarks/bench_multifecha.py [compras] [fechas_por_orden]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+USUARIO = {"id": 1, "nombre": "Marco Figueroa", "email": "marco.figueroa@example.com"}
+VISITANTES = [{"nombre": "Ana", "edad": 25}, {"nombre": "Luis", "edad": 8}, {"nombre": "Sofía", "edad": 70}]
+
+
+def servicios(repositorio):
+    from comprar_entradas.views import (
+        enrutador_pagos_simple, motor_precios_simple, proveedor_horarios_simple, reloj_simple,
+        servicio_mail_simple,
+    )
+    return {
+        "usuario": USUARIO,
+        "cantidad_entradas": len(VISITANTES),
+        "visitantes": VISITANTES,
+        "tipo_pase": "REGULAR",
+        "forma_pago": "TARJETA",
+        "proveedor_horarios": proveedor_horarios_simple,
+        "motor_precios": motor_precios_simple,
+        "repositorio": repositorio,
+        "enrutador_pagos": enrutador_pagos_simple(),
+        "servicio_mail": servicio_mail_simple(),
+        "reloj": reloj_simple(),
+    }
+
+
+def medir(nombre, compras, compra):
+    inicio = time.perf_counter()
+    for i in range(compras):
+        compra(i)
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<40} {compras / duracion:8.0f} órdenes/s  {duracion / compras * 1000:6.2f} ms/orden")
+    return duracion / compras
+
+
+def main():
+    compras = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    fechas_por_orden = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        settings.CAPACIDAD_DIARIA = 10 ** 9
+        import django
+        django.setup()
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
+
+        from comprar_entradas.repositorio import repositorio_db
+        from comprar_entradas.views import fechas_temporada, realizar_compra, realizar_compra_multifecha
+
+        base = servicios(repositorio_db())
+        fechas = fechas_temporada(datetime.date.today() + datetime.timedelta(days=30),
+                                  datetime.date.today() + datetime.timedelta(days=400))
+        fechas = fechas[:fechas_por_orden]
+
+        una = medir("1 fecha (realizar_compra)", compras,
+                    lambda i: realizar_compra(fecha_visita=fechas[0], **base))
+        varias = medir(f"{fechas_por_orden} fechas (realizar_compra_multifecha)", compras,
+                       lambda i: realizar_compra_multifecha(fechas_visita=fechas, **base))
+
+        def por_separado(i):
+            for fecha in fechas:
+                realizar_compra(fecha_visita=fecha, **base)
+        separadas = medir(f"{fechas_por_orden} compras de 1 fecha", compras, por_separado)
+
+        print(f"\nOrden de {fechas_por_orden} fechas: {varias / una:.2f}x el costo de una de 1 fecha, "
+              f"{separadas / varias:.2f}x más rápida que {fechas_por_orden} compras separadas")
+
+
+if __name__ == "__main__":
+    main()
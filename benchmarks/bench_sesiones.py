@@ -0,0 +1,87 @@
+"""
+Escrituras en la base (INSERT/UPDATE/DELETE) por flujo, con cada modo de sesiones:
+SESIONES=db (tabla django_session), cache y cookie (ver project/settings.py).
+
+Flujos: una compra por el formulario HTML (GET + POST, uno válido y uno con error) y una
+sesión de admin (login + 3 páginas). Corre en proceso con el cliente de test de Django.
+
+Uso: python benchmarks/bench_sesiones.py [repeticiones]
+"""
+import collections
+import datetime
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+MODOS = {
+    "db": ("django.contrib.sessions.backends.db", "django.contrib.messages.storage.fallback.FallbackStorage"),
+    "cache": ("django.contrib.sessions.backends.cache", "django.contrib.messages.storage.cookie.CookieStorage"),
+    "cookie": ("django.contrib.sessions.backends.signed_cookies",
+               "django.contrib.messages.storage.cookie.CookieStorage"),
+}
+ESCRITURA = re.compile(r'^(INSERT INTO|UPDATE|DELETE FROM) "(\w+)"')
+
+
+def compra(cliente):
+    cliente.get("/comprar-entradas/")
+    fecha = datetime.date.today() + datetime.timedelta(days=3)
+    while fecha.weekday() == 0:
+        fecha += datetime.timedelta(days=1)
+    datos = {"csrfmiddlewaretoken": cliente.cookies["csrftoken"].value, "usuario_nombre": "Marco",
+             "usuario_email": "marco.figueroa@example.com", "fecha_visita": fecha.isoformat(), "tipo_pase": "VIP",
+             "forma_pago": "TARJETA", "cantidad_visitantes": 1, "visitante_0_nombre": "Ana", "visitante_0_edad": "30"}
+    cliente.post("/comprar-entradas/", datos)
+    cliente.post("/comprar-entradas/", {**datos, "usuario_email": "no.registrado@example.com"})
+
+
+def admin(cliente):
+    cliente.get("/admin/login/")
+    cliente.post("/admin/login/?next=/admin/", {"username": "admin", "password": "clave-segura-123",
+                                                "csrfmiddlewaretoken": cliente.cookies["csrftoken"].value})
+    for url in ("/admin/", "/admin/comprar_entradas/orden/", "/admin/comprar_entradas/cupodiario/"):
+        assert cliente.get(url).status_code == 200
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        settings.ALLOWED_HOSTS = ["*"]
+        import django
+        django.setup()
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test import Client, override_settings
+        from django.test.utils import CaptureQueriesContext
+
+        call_command("migrate", verbosity=0)
+        User.objects.create_superuser("admin", "admin@example.com", "clave-segura-123")
+
+        print(f"{'modo':<8} {'flujo':<8} {'escrituras/flujo':>17}  por tabla")
+        for modo, (motor, mensajes) in MODOS.items():
+            with override_settings(SESSION_ENGINE=motor, MESSAGE_STORAGE=mensajes):
+                for nombre, flujo in (("compra", compra), ("admin", admin)):
+                    por_tabla = collections.Counter()
+                    for _ in range(repeticiones):
+                        cliente = Client(enforce_csrf_checks=True)
+                        with CaptureQueriesContext(connection) as consultas:
+                            flujo(cliente)
+                        for consulta in consultas.captured_queries:
+                            escritura = ESCRITURA.match(consulta["sql"])
+                            if escritura:
+                                por_tabla[escritura.group(2)] += 1
+                    total = sum(por_tabla.values()) / repeticiones
+                    detalle = ", ".join(f"{tabla} {n / repeticiones:g}" for tabla, n in sorted(por_tabla.items()))
+                    print(f"{modo:<8} {nombre:<8} {total:>17g}  {detalle}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Notificaciones de pago contra una base SQLite temporal, con N órdenes PENDIENTES (20.000 por
+defecto) y una ráfaga de notificaciones con un 10% de reintentos repetidos.
+
+  - por llamada: confirmar_pago con repositorio_db, una notificación a la vez (lo que hace hoy
+    /ordenes/<id>/pago por cada pedido)
+  - webhook: POST a /api/v1/notificaciones-pago con el cliente de pruebas de Django (token,
+    validación, INSERT y respuesta 202)
+  - consumidor: procesar_notificaciones sobre la cola que dejó el webhook, en lotes de 500
+
+Uso: python benchmarks/bench_webhooks.py [ordenes]
+"""
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+FECHA = datetime.date(2030, 1, 5)
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as directorio:
+        settings.DATABASES["default"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+        settings.API_PAGOS_TOKEN = "bench"
+        settings.ALLOWED_HOSTS = ["*"]
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from django.test import Client
+        from comprar_entradas.models import Orden
+        from comprar_entradas.repositorio import repositorio_db
+        from comprar_entradas.views import confirmar_pago, reloj_simple, servicio_mail_simple
+        from comprar_entradas.webhooks import procesar_notificaciones
+
+        call_command("migrate", verbosity=0)
+
+        def crear_ordenes():
+            Orden.objects.bulk_create(
+                (Orden(usuario_nombre="Ana", usuario_email="ana@example.com", fecha_visita=FECHA,
+                       tipo_pase="REGULAR", forma_pago="TARJETA") for _ in range(cantidad)), batch_size=2000)
+            ids = list(Orden.objects.filter(estado="PENDIENTE").values_list("pk", flat=True))
+            rafaga = ids + random.Random(7).sample(ids, cantidad // 10)
+            random.Random(8).shuffle(rafaga)
+            return rafaga
+
+        rafaga = crear_ordenes()
+        repositorio, mail, reloj = repositorio_db(), servicio_mail_simple(), reloj_simple()
+        inicio = time.perf_counter()
+        for orden_id in rafaga:
+            confirmar_pago({"id_orden": orden_id, "estado": "aprobado"}, repositorio, mail, reloj)
+        duracion = time.perf_counter() - inicio
+        print(f"por llamada:  {len(rafaga):,} notificaciones en {duracion:.1f} s ({len(rafaga) / duracion:,.0f}/s)")
+
+        rafaga = crear_ordenes()
+        cliente = Client()
+        inicio = time.perf_counter()
+        for orden_id in rafaga:
+            respuesta = cliente.post("/comprar-entradas/api/v1/notificaciones-pago",
+                                     json.dumps({"id_orden": orden_id, "estado": "aprobado"}),
+                                     content_type="application/json", HTTP_AUTHORIZATION="Bearer bench")
+            assert respuesta.status_code == 202
+        duracion = time.perf_counter() - inicio
+        print(f"webhook:      {len(rafaga):,} respuestas 202 en {duracion:.1f} s ({len(rafaga) / duracion:,.0f}/s, "
+              f"{duracion / len(rafaga) * 1e3:.2f} ms por respuesta)")
+
+        inicio = time.perf_counter()
+        resultados = procesar_notificaciones(lote=500, servicio_mail=mail)
+        duracion = time.perf_counter() - inicio
+        print(f"consumidor:   {sum(resultados.values()):,} notificaciones en {duracion:.1f} s "
+              f"({sum(resultados.values()) / duracion:,.0f}/s) {dict(resultados)}")
+        print(f"órdenes pagadas: {Orden.objects.filter(estado='PAGADA').count():,} de {2 * cantidad:,}")
+
+
+if __name__ == "__main__":
+    main()
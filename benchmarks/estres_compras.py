@@ -0,0 +1,282 @@
+"""
+Harness de estrés del flujo de compra contra el repositorio real (ORM + SQLite).
+
+Corre realizar_compra y confirmar_pago desde varios procesos e hilos a la vez,
+con un reloj controlable por hilo, y al final verifica los invariantes:
+
+  - no hay sobreventa: vendidas <= capacidad y vendidas == entradas de las órdenes guardadas
+  - cada orden pagada recibió exactamente un mail de confirmación
+  - cada orden pagada tiene un único pago ganador y su pagada_en es el de ese pago
+
+Uso:
+    python benchmarks/estres_compras.py --procesos 4 --hilos 8 --compras 40 --capacidad 600
+
+Usa una base SQLite temporal (nunca db.sqlite3). Sale con código 1 si se viola algún invariante.
+"""
+import argparse
+import collections
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+from django.conf import settings
+
+EMAIL_REGISTRADO = "marco.figueroa@example.com"
+INICIO = datetime.datetime(2025, 10, 13, 10, 0, tzinfo=datetime.timezone.utc)
+
+
+def configurar_django(ruta_db):
+    settings.DATABASES["default"]["NAME"] = ruta_db
+    import django
+    django.setup()
+
+
+class Medidor:
+    """
+    Execute wrapper que mide cuánto tarda cada BEGIN IMMEDIATE, es decir, la espera por el lock
+    de escritura de SQLite.
+    """
+
+    def __init__(self):
+        self.esperas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith("BEGIN"):
+            return execute(sql, params, many, context)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.esperas.append(time.perf_counter() - inicio)
+
+
+def hilo_compras(indice, compras, fecha, resultados):
+    from django.db import connection, OperationalError
+    from comprar_entradas.repositorio import repositorio_db
+    from comprar_entradas.views import realizar_compra, reloj_controlable, motor_precios_simple
+
+    reloj = reloj_controlable(INICIO)
+    repositorio = repositorio_db(reloj)
+    medidor = Medidor()
+    azar = random.Random(indice)
+    local = {"latencias": [], "ordenes": [], "sin_cupo": 0, "errores_lock": 0}
+
+    with connection.execute_wrapper(medidor):
+        for _ in range(compras):
+            visitantes = [{"nombre": f"V{i}", "edad": 30} for i in range(azar.randint(1, 4))]
+            inicio = time.perf_counter()
+            try:
+                resultado = realizar_compra(
+                    usuario={"id": 1, "nombre": "Estrés", "email": EMAIL_REGISTRADO},
+                    fecha_visita=fecha,
+                    cantidad_entradas=len(visitantes),
+                    visitantes=visitantes,
+                    tipo_pase="REGULAR",
+                    forma_pago="TARJETA",
+                    proveedor_horarios=lambda fecha: True,
+                    motor_precios=motor_precios_simple,
+                    repositorio=repositorio,
+                    enrutador_pagos={"iniciar_flujo_tarjeta": lambda orden: f"https://mercadopago.test/{orden['id']}"},
+                    servicio_mail={},
+                    reloj=reloj,
+                )
+                local["ordenes"].append(resultado["orden_id"])
+            except ValueError:
+                local["sin_cupo"] += 1
+            except OperationalError:
+                local["errores_lock"] += 1
+            local["latencias"].append(time.perf_counter() - inicio)
+            reloj["avanzar"](datetime.timedelta(seconds=1))
+
+    connection.close()
+    local["esperas_lock"] = medidor.esperas
+    resultados.append(local)
+
+
+def hilo_confirmaciones(semilla, notificaciones, resultados):
+    from django.db import connection, OperationalError
+    from comprar_entradas.repositorio import repositorio_db
+    from comprar_entradas.views import confirmar_pago, reloj_controlable
+
+    # Cada hilo arranca en un instante distinto y avanza 1 µs por llamada, así cada
+    # intento de pago tiene un timestamp único y se puede identificar al ganador
+    reloj = reloj_controlable(INICIO + datetime.timedelta(seconds=semilla))
+    repositorio = repositorio_db(reloj)
+    medidor = Medidor()
+    local = {"latencias": [], "mails": [], "ganadores": [], "errores_lock": 0}
+
+    marcar_pagada = repositorio["marcar_pagada"]
+
+    def marcar_y_registrar(orden_id, momento):
+        marcada = marcar_pagada(orden_id, momento)
+        if marcada:
+            local["ganadores"].append((orden_id, momento))
+        return marcada
+
+    repositorio["marcar_pagada"] = marcar_y_registrar
+    servicio_mail = {"enviar_confirmacion": lambda orden: local["mails"].append(orden["id"])}
+
+    with connection.execute_wrapper(medidor):
+        for orden_id in notificaciones:
+            inicio = time.perf_counter()
+            try:
+                confirmar_pago({"id_orden": orden_id, "estado": "aprobado"}, repositorio, servicio_mail, reloj)
+            except OperationalError:
+                local["errores_lock"] += 1
+            local["latencias"].append(time.perf_counter() - inicio)
+            reloj["avanzar"](datetime.timedelta(microseconds=1))
+
+    connection.close()
+    local["esperas_lock"] = medidor.esperas
+    resultados.append(local)
+
+
+def proceso(ruta_db, funcion, trabajos):
+    """
+    Punto de entrada de cada proceso: levanta un hilo por trabajo y devuelve sus métricas.
+    """
+    configurar_django(ruta_db)
+    resultados = []
+    hilos = [threading.Thread(target=globals()[funcion], args=(*trabajo, resultados)) for trabajo in trabajos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def correr_fase(ruta_db, funcion, trabajos_por_proceso):
+    contexto = multiprocessing.get_context("spawn")
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(trabajos_por_proceso), mp_context=contexto) as pool:
+        futuros = [pool.submit(proceso, ruta_db, funcion, trabajos) for trabajos in trabajos_por_proceso]
+        resultados = [hilo for futuro in futuros for hilo in futuro.result()]
+    return resultados, time.perf_counter() - inicio
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def reportar(nombre, resultados, duracion, operaciones):
+    latencias = [l for r in resultados for l in r["latencias"]]
+    esperas = [e for r in resultados for e in r["esperas_lock"]]
+    errores = sum(r["errores_lock"] for r in resultados)
+    print(f"\n{nombre}")
+    print(f"  operaciones: {operaciones} en {duracion:.2f}s -> {operaciones / duracion:.0f} op/s")
+    print(f"  latencia ms: p50={percentil(latencias, .5) * 1000:.1f} "
+          f"p95={percentil(latencias, .95) * 1000:.1f} p99={percentil(latencias, .99) * 1000:.1f}")
+    if esperas:
+        print(f"  espera de lock ms: media={statistics.mean(esperas) * 1000:.2f} "
+              f"p99={percentil(esperas, .99) * 1000:.1f} max={max(esperas) * 1000:.1f} "
+              f"total={sum(esperas):.2f}s")
+    print(f"  errores 'database is locked': {errores}")
+
+
+def verificar_invariantes(fecha, ordenes, capacidad, confirmaciones):
+    from comprar_entradas.models import CupoDiario, Orden, LineaOrden
+
+    violaciones = []
+
+    cupo = CupoDiario.objects.get(fecha=fecha)
+    entradas = LineaOrden.objects.filter(orden__fecha_visita=fecha).count()
+    if cupo.vendidas > capacidad:
+        violaciones.append(f"sobreventa: vendidas={cupo.vendidas} > capacidad={capacidad}")
+    if cupo.vendidas != entradas:
+        violaciones.append(f"lost update: vendidas={cupo.vendidas} pero hay {entradas} entradas guardadas")
+    if Orden.objects.count() != len(ordenes):
+        violaciones.append(f"órdenes guardadas={Orden.objects.count()} vs reportadas={len(ordenes)}")
+
+    mails = collections.Counter(m for r in confirmaciones for m in r["mails"])
+    ganadores = collections.defaultdict(list)
+    for r in confirmaciones:
+        for orden_id, momento in r["ganadores"]:
+            ganadores[orden_id].append(momento)
+
+    for orden in Orden.objects.filter(estado="PAGADA").values("id", "pagada_en"):
+        if mails[orden["id"]] != 1:
+            violaciones.append(f"orden {orden['id']}: {mails[orden['id']]} mails de confirmación")
+        if len(ganadores[orden["id"]]) != 1:
+            violaciones.append(f"orden {orden['id']}: {len(ganadores[orden['id']])} pagos ganadores")
+        elif ganadores[orden["id"]][0] != orden["pagada_en"]:
+            violaciones.append(f"orden {orden['id']}: pagada_en no coincide con el pago ganador")
+
+    pendientes = Orden.objects.filter(estado="PENDIENTE").count()
+    if pendientes:
+        violaciones.append(f"{pendientes} órdenes quedaron PENDIENTE pese a recibir notificación")
+
+    return cupo, violaciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--compras", type=int, default=40, help="compras por hilo")
+    parser.add_argument("--capacidad", type=int, default=600)
+    parser.add_argument("--duplicados", type=int, default=3, help="notificaciones de pago por orden")
+    parser.add_argument("--db", help="ruta de la base SQLite (por defecto, un archivo temporal)")
+    args = parser.parse_args()
+
+    ruta_db = args.db or os.path.join(tempfile.mkdtemp(prefix="estres_"), "estres.sqlite3")
+    configurar_django(ruta_db)
+
+    from django.core.management import call_command
+    from django.db import connections
+    from comprar_entradas.models import CupoDiario
+
+    call_command("migrate", verbosity=0)
+    fecha = datetime.date(2030, 1, 5)
+    CupoDiario.objects.create(fecha=fecha, capacidad=args.capacidad)
+    connections.close_all()
+
+    print(f"Base: {ruta_db}")
+    print(f"{args.procesos} procesos x {args.hilos} hilos, {args.compras} compras por hilo, "
+          f"capacidad {args.capacidad}")
+
+    # Fase 1: compras concurrentes por el mismo cupo
+    trabajos = [
+        [(p * args.hilos + h, args.compras, fecha) for h in range(args.hilos)]
+        for p in range(args.procesos)
+    ]
+    compras, duracion = correr_fase(ruta_db, "hilo_compras", trabajos)
+    ordenes = [orden_id for r in compras for orden_id in r["ordenes"]]
+    reportar("Fase 1: realizar_compra", compras, duracion, args.procesos * args.hilos * args.compras)
+    print(f"  órdenes creadas: {len(ordenes)}, rechazadas por cupo: {sum(r['sin_cupo'] for r in compras)}")
+
+    # Fase 2: notificaciones de pago duplicadas y mezcladas entre procesos e hilos
+    notificaciones = ordenes * args.duplicados
+    random.Random(0).shuffle(notificaciones)
+    total_hilos = args.procesos * args.hilos
+    trabajos = [
+        [(p * args.hilos + h, notificaciones[p * args.hilos + h::total_hilos]) for h in range(args.hilos)]
+        for p in range(args.procesos)
+    ]
+    confirmaciones, duracion = correr_fase(ruta_db, "hilo_confirmaciones", trabajos)
+    reportar("Fase 2: confirmar_pago", confirmaciones, duracion, len(notificaciones))
+
+    cupo, violaciones = verificar_invariantes(fecha, ordenes, args.capacidad, confirmaciones)
+    print(f"\nCupo final: {cupo.vendidas}/{cupo.capacidad}")
+    if violaciones:
+        print("INVARIANTES VIOLADOS:")
+        for violacion in violaciones[:20]:
+            print(f"  - {violacion}")
+        sys.exit(1)
+    print("Invariantes OK: sin sobreventa, un mail y un pago por orden")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,83 @@
 from django.contrib import admin
 
+from .models import (ArchivoMensual, Campania, CancelacionOrden, CierreFecha, CodigoDescuento, CupoDiario,
+                     Feriado, FranjaIngreso, ImportacionUsuarios, LineaOrden, NotificacionPago, Orden,
+                     UsuarioRegistrado)
+
 # Register your models here.
+class LineaOrdenInline(admin.TabularInline):
+    model = LineaOrden
+    extra = 0
+
+
+@admin.register(Orden)
+class OrdenAdmin(admin.ModelAdmin):
+    list_display = ('id', 'usuario_email', 'fecha_visita', 'estado', 'total')
+    list_filter = ('estado', 'fecha_visita')
+    inlines = [LineaOrdenInline]
+
+
+admin.site.register(CupoDiario)
+
+
+@admin.register(FranjaIngreso)
+class FranjaIngresoAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'inicio', 'vendidas', 'capacidad')
+    date_hierarchy = 'fecha'
+
+
+@admin.register(ArchivoMensual)
+class ArchivoMensualAdmin(admin.ModelAdmin):
+    list_display = ('mes', 'archivo', 'ordenes', 'lineas', 'fecha_min', 'fecha_max')
+
+
+@admin.register(CierreFecha)
+class CierreFechaAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'motivo', 'creado_en', 'terminado_en')
+
+
+@admin.register(CancelacionOrden)
+class CancelacionOrdenAdmin(admin.ModelAdmin):
+    list_display = ('orden', 'cierre', 'reembolso_estado', 'reembolso_intentos', 'mail_enviado')
+    list_filter = ('cierre', 'reembolso_estado', 'mail_enviado')
+
+
+@admin.register(UsuarioRegistrado)
+class UsuarioRegistradoAdmin(admin.ModelAdmin):
+    list_display = ('email', 'nombre', 'registrado', 'actualizado_en')
+    list_filter = ('registrado',)
+    search_fields = ('=email',)  # búsqueda exacta: con millones de socios un icontains recorre la tabla
+
+
+@admin.register(ImportacionUsuarios)
+class ImportacionUsuariosAdmin(admin.ModelAdmin):
+    list_display = ('archivo', 'importados', 'ultimo_email', 'iniciada_en', 'terminada_en')
+
+
+@admin.register(Campania)
+class CampaniaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'tipo', 'valor', 'tipo_pase', 'vence_en', 'activa')
+    list_filter = ('activa', 'tipo')
+
+
+@admin.register(CodigoDescuento)
+class CodigoDescuentoAdmin(admin.ModelAdmin):
+    # Solo se guarda el hash: los códigos se generan con `manage.py generar_codigos`
+    list_display = ('hash', 'campania', 'usos', 'usos_maximos')
+    list_filter = ('campania',)
+    readonly_fields = ('hash',)
+    search_fields = ('=hash',)
+
+
+@admin.register(NotificacionPago)
+class NotificacionPagoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'orden_id', 'estado', 'recibida_en', 'procesada_en', 'resultado')
+    list_filter = ('resultado',)
+    search_fields = ('=orden_id',)
+
+
+@admin.register(Feriado)
+class FeriadoAdmin(admin.ModelAdmin):
+    # Los workers toman los cambios en unos segundos, sin reiniciar (ver comprar_entradas.configuracion)
+    list_display = ('fecha', 'nombre')
+    date_hierarchy = 'fecha'
@@ -0,0 +1,330 @@
+import array
+import collections
+import functools
+import hashlib
+import operator
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Etapa anti-abuso delante de realizar_compra: cuenta los intentos de compra por email, por IP
+# y por compra repetida (mismo email, fecha y visitantes) en ventanas deslizantes de
+# count-min sketches. La memoria es fija (subventanas x profundidad x ancho contadores por
+# dimensión) sin importar cuántos emails o IPs distintos lleguen;
+# el precio es que una clave puede sobrestimarse por colisiones, nunca subestimarse.
+#
+# Cada worker cuenta en memoria y cada `sincronizar_cada` segundos publica su total de la
+# ventana en el cache compartido y trae los de los demás, así un bot que reparte pedidos
+# entre workers igual llega al umbral.
+
+PREFIJO_CACHE = "antiabuso:"
+CLAVE_TRABAJADORES = PREFIJO_CACHE + "trabajadores"
+
+OK = "ok"
+MARCAR = "marcar"  # se deja pasar pero queda en el reporte
+FRENAR = "frenar"  # se rechaza la compra
+
+MAX_REPORTE = 1000
+
+
+class CompraFrenada(ValueError):
+    """
+    Demasiados intentos de compra en la ventana. Es ValueError para que el formulario lo muestre
+    como cualquier otra regla de negocio; la API lo contesta con 429.
+    """
+
+    def __init__(self, dimension, reintentar_en):
+        super().__init__("Demasiados intentos de compra. Probá de nuevo en unos minutos.")
+        self.dimension = dimension
+        self.reintentar_en = reintentar_en
+
+
+class CountMinSketch:
+    """
+    `profundidad` filas de `ancho` contadores; cada clave cae en una columna por fila y su
+    estimación es el mínimo de esas columnas.
+    """
+
+    __slots__ = ("ancho", "profundidad", "contadores")
+
+    def __init__(self, ancho, profundidad, contadores=None):
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.contadores = contadores if contadores is not None else array.array("i", [0]) * (ancho * profundidad)
+
+    def posiciones(self, clave):
+        # blake2b y no hash(): las posiciones tienen que coincidir entre procesos
+        digest = hashlib.blake2b(clave.encode(), digest_size=4 * self.profundidad).digest()
+        ancho = self.ancho
+        return [fila * ancho + valor % ancho
+                for fila, valor in enumerate(struct.unpack(f"<{self.profundidad}I", digest))]
+
+    def a_bytes(self):
+        return zlib.compress(self.contadores.tobytes(), 1)
+
+    @classmethod
+    def desde_bytes(cls, datos, ancho, profundidad):
+        contadores = array.array("i")
+        contadores.frombytes(zlib.decompress(datos))
+        return cls(ancho, profundidad, contadores)
+
+
+class VentanaDeslizante:
+    """
+    Conteo aproximado por clave en los últimos `ventana` segundos, en `subventanas` sketches
+    que rotan. `total` es la suma de las subventanas vivas (se le resta la que vence), así
+    estimar es O(profundidad).
+
+    Usa actualización conservadora: en cada subventana solo suben las celdas que están por
+    debajo de la nueva estimación de la clave. Sobrestima mucho menos que sumar en todas las
+    filas y sigue sin subestimar nunca.
+    """
+
+    def __init__(self, ventana, subventanas, ancho, profundidad):
+        self.paso = ventana / subventanas
+        self.subventanas = subventanas
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.total = CountMinSketch(ancho, profundidad)
+        self.sketches = {}  # id de subventana -> CountMinSketch
+        self.vigente = None
+
+    def id_actual(self, ahora):
+        return int(ahora // self.paso)
+
+    def avanzar(self, ahora):
+        actual = self.id_actual(ahora)
+        if actual == self.vigente:
+            return
+        self.vigente = actual
+        primera_viva = actual - self.subventanas + 1
+        for vencida in [i for i in self.sketches if i < primera_viva]:
+            restar = self.sketches.pop(vencida).contadores
+            self.total.contadores = array.array("i", map(operator.sub, self.total.contadores, restar))
+
+    def agregar(self, posiciones, ahora):
+        actual = self.id_actual(ahora)
+        sketch = self.sketches.get(actual)
+        if sketch is None:
+            sketch = self.sketches[actual] = CountMinSketch(self.ancho, self.profundidad)
+        celdas = sketch.contadores
+        total = self.total.contadores
+        nuevo = min(celdas[p] for p in posiciones) + 1
+        for p in posiciones:
+            anterior = celdas[p]
+            if anterior < nuevo:
+                celdas[p] = nuevo
+                total[p] += nuevo - anterior
+
+
+class DetectorAbuso:
+    """
+    Cuenta cada intento de compra y decide OK, MARCAR o FRENAR según los umbrales por dimensión
+    ({"email": {"marcar": 5, "frenar": 10}, ...}). Es seguro entre hilos; una instancia por proceso.
+    """
+
+    def __init__(self, umbrales, ventana=600, subventanas=10, ancho=1 << 14, profundidad=4,
+                 cache=None, sincronizar_cada=5, trabajador=None, reloj=time.time):
+        self.umbrales = umbrales
+        self.ventana = ventana
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.ventanas = {dimension: VentanaDeslizante(ventana, subventanas, ancho, profundidad)
+                         for dimension in umbrales}
+        # Totales de la ventana publicados por los otros workers, por dimensión
+        self.remotos = {dimension: [] for dimension in umbrales}
+        self.cache = cache
+        self.sincronizar_cada = sincronizar_cada
+        self.trabajador = trabajador or f"{socket.gethostname()}-{os.getpid()}"
+        self.reloj = reloj
+        self.ultima_sincronizacion = reloj()
+        # (dimensión, clave) -> {"decision", "veces", "estimado", "ultimo"}, del visto hace más al más reciente
+        self.reporte_local = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def registrar(self, claves):
+        """
+        Cuenta un intento con las claves de cada dimensión ({"email": ..., "ip": ...}; las None
+        se ignoran) y devuelve (decisión, dimensión que la causó). FRENAR gana sobre MARCAR.
+        """
+        ahora = self.reloj()
+        if self.cache is not None and ahora - self.ultima_sincronizacion >= self.sincronizar_cada:
+            self.sincronizar()
+
+        decision, causa = OK, None
+        with self.lock:
+            for dimension, clave in claves.items():
+                if clave is None or dimension not in self.ventanas:
+                    continue
+                ventana = self.ventanas[dimension]
+                ventana.avanzar(ahora)
+                posiciones = ventana.total.posiciones(clave)
+                ventana.agregar(posiciones, ahora)
+                total = ventana.total.contadores
+                remotos = self.remotos[dimension]
+                if remotos:
+                    estimado = min(total[p] + sum(remoto[p] for remoto in remotos) for p in posiciones)
+                else:
+                    estimado = min(total[p] for p in posiciones)
+
+                umbral = self.umbrales[dimension]
+                if estimado >= umbral["frenar"]:
+                    resultado = FRENAR
+                elif estimado >= umbral["marcar"]:
+                    resultado = MARCAR
+                else:
+                    continue
+                self._anotar(dimension, clave, resultado, estimado, ahora)
+                if decision != FRENAR:
+                    decision, causa = resultado, dimension
+        return decision, causa
+
+    def _anotar(self, dimension, clave, decision, estimado, ahora):
+        entrada = self.reporte_local.setdefault((dimension, clave), {"decision": decision, "veces": 0})
+        self.reporte_local.move_to_end((dimension, clave))
+        if decision == FRENAR:
+            entrada["decision"] = FRENAR
+        entrada["veces"] += 1
+        entrada["estimado"] = estimado
+        entrada["ultimo"] = ahora
+        if len(self.reporte_local) > MAX_REPORTE:
+            # Se descarta la clave vista hace más tiempo: el reporte también ocupa memoria acotada
+            self.reporte_local.popitem(last=False)
+
+    def verificar(self, email, ip, compra=None):
+        """
+        Etapa a poner delante de realizar_compra. Lanza CompraFrenada si hay que frenar.
+        `compra` identifica la compra (por ejemplo email + fecha + visitantes) para detectar repetidas.
+        """
+        decision, causa = self.registrar({"email": email.strip().lower() if email else None, "ip": ip,
+                                          "compra": compra})
+        if decision == FRENAR:
+            raise CompraFrenada(causa, int(self.ventanas[causa].paso) + 1)
+        return decision
+
+    def sincronizar(self):
+        """
+        Publica en el cache el total de la ventana de este worker y trae el de los demás.
+        """
+        ahora = self.reloj()
+        self.ultima_sincronizacion = ahora
+        trabajadores = self.cache.get(CLAVE_TRABAJADORES) or {}
+        trabajadores = {t: visto for t, visto in trabajadores.items() if ahora - visto < self.ventana}
+        trabajadores[self.trabajador] = ahora
+        # Lectura-modificación-escritura sin lock: si dos workers pisan la lista, el que se perdió
+        # se vuelve a anotar en su próxima sincronización
+        self.cache.set(CLAVE_TRABAJADORES, trabajadores, timeout=self.ventana)
+
+        with self.lock:
+            publicar = {}
+            for dimension, ventana in self.ventanas.items():
+                ventana.avanzar(ahora)
+                publicar[f"{PREFIJO_CACHE}{dimension}:{self.trabajador}"] = ventana.total.a_bytes()
+            publicar[f"{PREFIJO_CACHE}reporte:{self.trabajador}"] = dict(self.reporte_local)
+        self.cache.set_many(publicar, timeout=self.ventana)
+
+        otros = [t for t in trabajadores if t != self.trabajador]
+        publicados = self.cache.get_many([f"{PREFIJO_CACHE}{dimension}:{t}" for dimension in self.ventanas
+                                          for t in otros])
+        remotos = {
+            dimension: [CountMinSketch.desde_bytes(publicados[clave], self.ancho, self.profundidad).contadores
+                        for clave in (f"{PREFIJO_CACHE}{dimension}:{t}" for t in otros) if clave in publicados]
+            for dimension in self.ventanas
+        }
+        with self.lock:
+            self.remotos = remotos
+
+    def reporte(self):
+        """
+        Claves marcadas o frenadas en todos los workers: las publicadas en el cache más las
+        de este proceso, que pueden ser más nuevas que su última publicación.
+        """
+        combinado = leer_reportes(self.cache, excluir=self.trabajador) if self.cache is not None else {}
+        with self.lock:
+            _combinar_reporte(combinado, self.reporte_local)
+        return _ordenar_reporte(combinado)
+
+
+def leer_reportes(cache, excluir=None):
+    trabajadores = cache.get(CLAVE_TRABAJADORES) or {}
+    combinado = {}
+    publicados = cache.get_many([f"{PREFIJO_CACHE}reporte:{t}" for t in trabajadores if t != excluir])
+    for reporte in publicados.values():
+        _combinar_reporte(combinado, reporte)
+    return combinado
+
+
+def reporte_compartido(cache=None):
+    """
+    Reporte armado solo con lo que publicaron los workers (para consultarlo desde otro proceso,
+    por ejemplo el comando reporte_antiabuso). Necesita un cache compartido como Redis.
+    """
+    return _ordenar_reporte(leer_reportes(cache or caches["default"]))
+
+
+def _ordenar_reporte(combinado):
+    # Primero las frenadas, y entre ellas las que más intentos tuvieron
+    return sorted(
+        ({"dimension": dimension, "clave": clave, **datos} for (dimension, clave), datos in combinado.items()),
+        key=lambda fila: (fila["decision"] != FRENAR, -fila["veces"], fila["dimension"], fila["clave"]),
+    )
+
+
+def _combinar_reporte(combinado, reporte):
+    for clave, datos in reporte.items():
+        actual = combinado.get(clave)
+        if actual is None:
+            combinado[clave] = dict(datos)
+            continue
+        actual["veces"] += datos["veces"]
+        actual["estimado"] = max(actual["estimado"], datos["estimado"])
+        actual["ultimo"] = max(actual["ultimo"], datos["ultimo"])
+        if datos["decision"] == FRENAR:
+            actual["decision"] = FRENAR
+
+
+def clave_compra(email, fechas, visitantes):
+    """
+    Identifica una compra repetida: mismo email, mismas fechas y mismos visitantes.
+    """
+    visitantes = sorted((v.get("nombre", "").strip().lower(), v.get("edad")) for v in visitantes)
+    return f"{(email or '').strip().lower()}|{','.join(sorted(str(f) for f in fechas))}|{visitantes}"
+
+
+def ip_cliente(request):
+    """
+    IP del cliente. Detrás de `proxies` proxies confiables (Traefik, un balanceador) REMOTE_ADDR
+    es el último proxy y la IP real es la entrada correspondiente de X-Forwarded-For, contando
+    desde la derecha (las de la izquierda las puede inventar el cliente).
+    """
+    proxies = settings.ANTIABUSO["proxies"]
+    if proxies:
+        reenviadas = [ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if ip.strip()]
+        if len(reenviadas) >= proxies:
+            return reenviadas[-proxies]
+    return request.META.get("REMOTE_ADDR")
+
+
+@functools.lru_cache(maxsize=None)
+def detector_configurado():
+    """
+    Detector del proceso con la configuración ANTIABUSO de settings, o None si está desactivado.
+    """
+    configuracion = settings.ANTIABUSO
+    if not configuracion["activo"]:
+        return None
+    return DetectorAbuso(
+        configuracion["umbrales"],
+        ventana=configuracion["ventana"],
+        subventanas=configuracion["subventanas"],
+        ancho=configuracion["ancho"],
+        profundidad=configuracion["profundidad"],
+        cache=caches["default"],
+        sincronizar_cada=configuracion["sincronizar_cada"],
+    )
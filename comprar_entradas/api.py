@@ -0,0 +1,355 @@
+import hashlib
+import hmac
+import json
+
+from django.conf import settings
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from .antiabuso import CompraFrenada, ip_cliente
+from .busqueda import buscar_ordenes
+from .esquemas import ErrorEsquema, compilar_esquema
+from .franjas import TTL_INDICE, indice_vigente
+from .precios import VERSION_TABLA, cotizar
+from .servicios import comprar, servicios_configurados
+from .views import confirmar_pago, construir_borrador_orden, motor_precios_simple
+from .webhooks import encolar_notificacion
+
+# Esquemas de la API v1. Se compilan una única vez al importar el módulo.
+ESQUEMA_VISITANTE = {
+    "tipo": "objeto",
+    "campos": {
+        "nombre": {"tipo": "texto", "max_largo": 100},
+        "edad": {"tipo": "entero", "min": 0, "max": 120},
+    },
+}
+
+ESQUEMA_VISITANTES = {"tipo": "lista", "items": ESQUEMA_VISITANTE, "min_items": 1, "max_items": 10}
+
+validar_cotizacion = compilar_esquema({
+    "tipo": "objeto",
+    "campos": {
+        "fecha_visita": {"tipo": "fecha"},
+        "tipo_pase": {"tipo": "opcion", "opciones": ["REGULAR", "VIP"]},
+        "visitantes": ESQUEMA_VISITANTES,
+    },
+})
+
+# Cotización rápida por query string (GET): solo edades, sin nombres
+validar_cotizacion_rapida = compilar_esquema({
+    "tipo": "objeto",
+    "campos": {
+        "fecha_visita": {"tipo": "fecha"},
+        "tipo_pase": {"tipo": "opcion", "opciones": ["REGULAR", "VIP"]},
+        "edades": {"tipo": "lista", "items": ESQUEMA_VISITANTE["campos"]["edad"], "min_items": 1, "max_items": 10},
+    },
+})
+
+# Una cotización no cambia mientras no cambie la tabla de precios
+CACHE_CONTROL_COTIZACION = "public, max-age=300"
+
+validar_compra = compilar_esquema({
+    "tipo": "objeto",
+    "campos": {
+        "usuario": {
+            "tipo": "objeto",
+            "campos": {
+                "nombre": {"tipo": "texto", "max_largo": 100},
+                "email": {"tipo": "email"},
+            },
+        },
+        # Una fecha, o varias en una sola orden (fechas_visita)
+        "fecha_visita": {"tipo": "fecha", "requerido": False},
+        "fechas_visita": {"tipo": "lista", "items": {"tipo": "fecha"}, "min_items": 1, "max_items": 366,
+                          "requerido": False},
+        "tipo_pase": {"tipo": "opcion", "opciones": ["REGULAR", "VIP"]},
+        "forma_pago": {"tipo": "opcion", "opciones": ["EFECTIVO", "TARJETA"]},
+        "visitantes": ESQUEMA_VISITANTES,
+        # Franja de ingreso preferida (solo con fecha_visita), ver /api/v1/franjas
+        "hora_ingreso": {"tipo": "hora", "requerido": False},
+        # Código de una campaña (ver comprar_entradas.descuentos); se canjea al guardar la orden
+        "codigo_descuento": {"tipo": "texto", "max_largo": 30, "requerido": False},
+    },
+})
+
+validar_consulta_franjas = compilar_esquema({
+    "tipo": "objeto",
+    "campos": {
+        "fecha_visita": {"tipo": "fecha"},
+        "cantidad": {"tipo": "entero", "min": 1, "max": 10, "requerido": False, "defecto": 1},
+    },
+})
+
+# La disponibilidad cambia con cada compra; alcanza con absorber los refrescos seguidos
+CACHE_CONTROL_FRANJAS = f"public, max-age={TTL_INDICE}"
+
+validar_notificacion = compilar_esquema({
+    "tipo": "objeto",
+    "campos": {
+        "estado": {"tipo": "opcion", "opciones": ["aprobado"]},
+    },
+})
+
+validar_busqueda = compilar_esquema({
+    "tipo": "objeto",
+    "campos": {
+        "q": {"tipo": "texto", "max_largo": 100},
+        "fecha_visita": {"tipo": "fecha", "requerido": False},
+        "limite": {"tipo": "entero", "min": 1, "max": 50, "requerido": False, "defecto": 20},
+    },
+})
+
+# Notificación para encolar: la orden viaja en el body en vez de la URL
+validar_notificacion_encolada = compilar_esquema({
+    "tipo": "objeto",
+    "campos": {
+        "id_orden": {"tipo": "entero", "min": 1},
+        "estado": {"tipo": "opcion", "opciones": ["aprobado"]},
+    },
+})
+
+
+def respuesta_errores(errores, status=400):
+    return JsonResponse({"errores": errores}, status=status)
+
+
+def leer_json(request, validar):
+    """
+    Parsea el body JSON y lo valida con el esquema compilado.
+    Lanza ErrorEsquema tanto si el JSON es inválido como si no cumple el esquema.
+    """
+    try:
+        datos = json.loads(request.body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ErrorEsquema([{"campo": None, "codigo": "json", "mensaje": "El body no es un JSON válido"}])
+    return validar(datos)
+
+
+def token_pagos_valido(request):
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    return bool(settings.API_PAGOS_TOKEN) and hmac.compare_digest(token, settings.API_PAGOS_TOKEN)
+
+
+def resumen_lineas(borrador):
+    return [
+        {"nombre": linea["nombre"], "edad": linea["edad"], "precio": linea["precio"]["monto"]}
+        for linea in borrador["lineas"]
+    ]
+
+
+def _edad(valor):
+    valor = valor.strip()
+    return int(valor) if valor.isdigit() else valor
+
+
+def cotizacion_rapida(request):
+    """
+    GET /api/v1/cotizaciones?fecha_visita=AAAA-MM-DD&tipo_pase=VIP&edades=30,8: la usa la página
+    para mostrar el total mientras se edita la lista de visitantes. Sale de la tabla de precios
+    memoizada y se puede cachear: el ETag identifica la consulta y la versión de la tabla, así
+    que un If-None-Match igual se contesta 304 sin calcular nada.
+    """
+    consulta = {
+        "fecha_visita": request.GET.get("fecha_visita"),
+        "tipo_pase": request.GET.get("tipo_pase"),
+        "edades": [_edad(e) for e in request.GET["edades"].split(",")] if request.GET.get("edades") else None,
+    }
+    clave = f"{VERSION_TABLA}|{consulta['fecha_visita']}|{consulta['tipo_pase']}|{request.GET.get('edades')}"
+    etag = f'"{hashlib.sha1(clave.encode()).hexdigest()[:20]}"'
+    # GZipMiddleware debilita el ETag al comprimir; para comparar se ignora el W/
+    if etag in [e.removeprefix("W/") for e in parse_etags(request.headers.get("If-None-Match", ""))]:
+        respuesta = HttpResponseNotModified()
+    else:
+        try:
+            datos = validar_cotizacion_rapida(consulta)
+        except ErrorEsquema as e:
+            return respuesta_errores(e.errores)
+        respuesta = JsonResponse(cotizar(datos["fecha_visita"], datos["tipo_pase"], datos["edades"]))
+    respuesta["ETag"] = etag
+    respuesta["Cache-Control"] = CACHE_CONTROL_COTIZACION
+    return respuesta
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def cotizar_view(request):
+    """
+    POST /api/v1/cotizaciones: calcula el precio de cada visitante y el total sin guardar nada.
+    Por GET hace la cotización rápida (ver cotizacion_rapida).
+    """
+    if request.method == "GET":
+        return cotizacion_rapida(request)
+
+    try:
+        datos = leer_json(request, validar_cotizacion)
+    except ErrorEsquema as e:
+        return respuesta_errores(e.errores)
+
+    borrador = construir_borrador_orden(
+        usuario=None,
+        fecha_visita=datos["fecha_visita"],
+        visitantes=datos["visitantes"],
+        tipo_pase=datos["tipo_pase"],
+        forma_pago=None,
+        motor_precios=motor_precios_simple
+    )
+    return JsonResponse({"lineas": resumen_lineas(borrador), "total": borrador["total"]})
+
+
+@csrf_exempt
+@require_POST
+def comprar_view(request):
+    """
+    POST /api/v1/compras: misma compra que el formulario HTML, pero con payload y respuesta JSON.
+    """
+    try:
+        datos = leer_json(request, validar_compra)
+    except ErrorEsquema as e:
+        return respuesta_errores(e.errores)
+
+    if (datos["fecha_visita"] is None) == (datos["fechas_visita"] is None):
+        return respuesta_errores([{"campo": "fecha_visita", "codigo": "requerido",
+                                   "mensaje": "Indique fecha_visita o fechas_visita (solo uno de los dos)"}])
+
+    usuario = {
+        "id": 1,  # Simulamos usuario registrado, igual que el formulario
+        "nombre": datos["usuario"]["nombre"],
+        "email": datos["usuario"]["email"]
+    }
+    try:
+        resultado = comprar(usuario, datos["visitantes"], datos["tipo_pase"], datos["forma_pago"],
+                            fecha_visita=datos["fecha_visita"], fechas_visita=datos["fechas_visita"],
+                            hora_ingreso=datos["hora_ingreso"], codigo_descuento=datos["codigo_descuento"],
+                            ip=ip_cliente(request))
+    except CompraFrenada as e:
+        respuesta = respuesta_errores([{"campo": None, "codigo": "demasiados_intentos", "mensaje": str(e)}],
+                                      status=429)
+        respuesta["Retry-After"] = str(e.reintentar_en)
+        return respuesta
+    except ValueError as e:
+        return respuesta_errores([{"campo": None, "codigo": "regla_negocio", "mensaje": str(e)}], status=422)
+
+    return JsonResponse(resultado, status=201)
+
+
+@require_GET
+def franjas_view(request):
+    """
+    GET /api/v1/franjas?fecha_visita=AAAA-MM-DD&cantidad=3: franjas de ingreso de la fecha con sus
+    lugares libres y, si ninguna alcanza para el grupo, la siguiente franja con lugar de la temporada.
+    Sale del índice en memoria (ver franjas.IndiceFranjas), sin consultar la base en cada pedido.
+    """
+    cantidad = request.GET.get("cantidad", "1")
+    try:
+        datos = validar_consulta_franjas({
+            "fecha_visita": request.GET.get("fecha_visita"),
+            "cantidad": int(cantidad) if cantidad.isdigit() else cantidad,
+        })
+    except ErrorEsquema as e:
+        return respuesta_errores(e.errores)
+
+    disponibilidad = indice_vigente().disponibilidad(datos["fecha_visita"], datos["cantidad"], timezone.localtime())
+    respuesta = JsonResponse({
+        "fecha_visita": datos["fecha_visita"],
+        "por_horario": disponibilidad["por_horario"],
+        "franjas": [{"inicio": f"{franja['inicio']:%H:%M}", "libres": franja["libres"]}
+                    for franja in disponibilidad["franjas"]],
+        "siguiente": disponibilidad["siguiente"] and {
+            "fecha_visita": disponibilidad["siguiente"]["fecha_visita"],
+            "inicio": f"{disponibilidad['siguiente']['inicio']:%H:%M}",
+        },
+    })
+    respuesta["Cache-Control"] = CACHE_CONTROL_FRANJAS
+    return respuesta
+
+
+@require_GET
+def orden_view(request, orden_id):
+    """
+    GET /api/v1/ordenes/<id>: estado y resumen de una orden.
+    """
+    orden = servicios_configurados()["repositorio"]["buscar"](orden_id)
+    if orden is None:
+        return respuesta_errores([{"campo": None, "codigo": "no_encontrada", "mensaje": "La orden no existe"}], status=404)
+
+    return JsonResponse({
+        "id": orden["id"],
+        "estado": orden.get("estado", "PENDIENTE"),
+        "fecha_visita": orden["fecha_visita"],
+        "cantidad_entradas": len(orden["lineas"]),
+        "total": orden.get("total"),
+    })
+
+
+@require_GET
+def buscar_ordenes_view(request):
+    """
+    GET /api/v1/ordenes/buscar?q=garcia&fecha_visita=AAAA-MM-DD: órdenes por nombre de un
+    visitante o del comprador, email, código de entrada o número (ver comprar_entradas.busqueda).
+    Solo para el personal (sesión del admin): devuelve datos personales.
+    """
+    if not request.user.is_staff:
+        return respuesta_errores([{"campo": None, "codigo": "no_autorizado", "mensaje": "Solo para el personal"}],
+                                 status=403)
+    limite = request.GET.get("limite", "20")
+    try:
+        datos = validar_busqueda({
+            "q": request.GET.get("q"),
+            "fecha_visita": request.GET.get("fecha_visita"),
+            "limite": int(limite) if limite.isdigit() else limite,
+        })
+    except ErrorEsquema as e:
+        return respuesta_errores(e.errores)
+
+    return JsonResponse({"ordenes": buscar_ordenes(datos["q"], datos["fecha_visita"], datos["limite"])})
+
+
+@csrf_exempt
+@require_POST
+def pago_view(request, orden_id):
+    """
+    POST /api/v1/ordenes/<id>/pago: notificación del proveedor de pagos.
+    Requiere el token compartido en el header Authorization: Bearer <token>.
+    """
+    if not token_pagos_valido(request):
+        return respuesta_errores([{"campo": None, "codigo": "no_autorizado", "mensaje": "Token inválido"}], status=401)
+
+    try:
+        datos = leer_json(request, validar_notificacion)
+    except ErrorEsquema as e:
+        return respuesta_errores(e.errores)
+
+    servicios = servicios_configurados()
+    try:
+        resultado = confirmar_pago(
+            notificacion_pago={"id_orden": orden_id, "estado": datos["estado"]},
+            repositorio=servicios["repositorio"],
+            servicio_mail=servicios["servicio_mail"],
+            reloj=servicios["reloj"],
+        )
+    except ValueError as e:
+        return respuesta_errores([{"campo": None, "codigo": "no_encontrada", "mensaje": str(e)}], status=404)
+
+    return JsonResponse(resultado)
+
+
+@csrf_exempt
+@require_POST
+def notificaciones_pago_view(request):
+    """
+    POST /api/v1/notificaciones-pago: igual que /ordenes/<id>/pago, pero solo verifica y encola
+    la notificación (ver comprar_entradas.webhooks) y responde 202 sin esperar a procesarla.
+    """
+    if not token_pagos_valido(request):
+        return respuesta_errores([{"campo": None, "codigo": "no_autorizado", "mensaje": "Token inválido"}], status=401)
+
+    try:
+        datos = leer_json(request, validar_notificacion_encolada)
+    except ErrorEsquema as e:
+        return respuesta_errores(e.errores)
+
+    notificacion_id = encolar_notificacion(datos["id_orden"], datos["estado"], timezone.now())
+    return JsonResponse({"id": notificacion_id}, status=202)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ComprarEntradasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'comprar_entradas'
+
+    def ready(self):
+        from .configuracion import conectar_senales
+        conectar_senales()
@@ -0,0 +1,259 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.db.models.functions import Coalesce
+
+from .models import ArchivoMensual, CancelacionOrden, LineaOrden, Orden
+from .repositorio import orden_a_dict
+
+# Archivo de órdenes frías: las órdenes cuya última fecha de visita cae en un mes ya terminado
+# se mueven a un .jsonl.gz por mes y se borran de las tablas calientes. Cada mes se archiva una
+# sola vez: una orden nueva nunca puede tener todas sus fechas en un mes que ya pasó. La excepción
+# son las órdenes canceladas con el reintegro en curso, que siguen cambiando: quedan en las tablas
+# hasta que el reintegro termina y entonces se agregan al archivo de su mes.
+
+# Estados de reintegro (CancelacionOrden.reembolso_estado) que todavía pueden cambiar
+REEMBOLSOS_EN_CURSO = ("PENDIENTE", "PROCESANDO", "FALLIDO")
+
+
+def primer_dia(fecha):
+    return fecha.replace(day=1)
+
+
+def mes_siguiente(mes):
+    return (mes + datetime.timedelta(days=32)).replace(day=1)
+
+
+def directorio_archivo():
+    return Path(settings.ARCHIVO_ORDENES_DIR)
+
+
+def nombre_archivo(mes):
+    return f"ordenes-{mes:%Y-%m}.jsonl.gz"
+
+
+def ordenes_con_cierre():
+    """
+    Órdenes anotadas con `cierre`: su última fecha de visita (en las de varias fechas, la de la
+    última línea). Es la clave de partición del archivo.
+    """
+    return Orden.objects.annotate(cierre=Coalesce(Max("lineas__fecha_visita"), "fecha_visita"))
+
+
+def ordenes_del_mes(mes):
+    """
+    Órdenes de un mes cerrado, en orden de pk.
+    """
+    return ordenes_con_cierre().filter(cierre__gte=mes, cierre__lt=mes_siguiente(mes)).order_by("pk")
+
+
+def meses_cerrados(hoy=None):
+    """
+    Meses terminados que todavía tienen órdenes en las tablas calientes, del más viejo al más nuevo.
+    """
+    mes_actual = primer_dia(hoy or datetime.date.today())
+    primera = Orden.objects.filter(fecha_visita__lt=mes_actual).order_by("fecha_visita").first()
+    if primera is None:
+        return []
+
+    meses = []
+    mes = primer_dia(primera.fecha_visita)
+    while mes < mes_actual:
+        meses.append(mes)
+        mes = mes_siguiente(mes)
+    return meses
+
+
+def orden_a_registro(orden, lineas):
+    """
+    El dict de repositorio.buscar más lo que se pierde al borrar la orden: su creación y, si se
+    canceló por un cierre, el estado del reintegro (la CancelacionOrden se borra con la orden).
+    """
+    registro = orden_a_dict(orden, lineas)
+    registro["creada_en"] = orden.creada_en
+    cancelacion = getattr(orden, "cancelacion", None)
+    registro["cancelacion"] = None if cancelacion is None else {
+        "fecha_cierre": cancelacion.cierre.fecha,
+        "motivo": cancelacion.cierre.motivo,
+        "reembolso_estado": cancelacion.reembolso_estado,
+        "reembolso_id": cancelacion.reembolso_id,
+        "reembolso_intentos": cancelacion.reembolso_intentos,
+        "reembolso_error": cancelacion.reembolso_error,
+        "reembolsado_en": cancelacion.reembolsado_en,
+        "mail_enviado": cancelacion.mail_enviado,
+    }
+    return registro
+
+
+def registro_a_orden(registro):
+    """
+    Inversa de la serialización JSON: devuelve el mismo dict que repositorio.buscar.
+    """
+    registro["fecha_visita"] = datetime.date.fromisoformat(registro["fecha_visita"])
+    for campo in ("creada_en", "pagada_en"):
+        if registro.get(campo):
+            registro[campo] = datetime.datetime.fromisoformat(registro[campo])
+    if registro.get("hora_ingreso"):
+        registro["hora_ingreso"] = datetime.time.fromisoformat(registro["hora_ingreso"])
+    registro["fechas_visita"] = [datetime.date.fromisoformat(f) for f in registro["fechas_visita"]]
+    cancelacion = registro.get("cancelacion")
+    if cancelacion:
+        cancelacion["fecha_cierre"] = datetime.date.fromisoformat(cancelacion["fecha_cierre"])
+        if cancelacion["reembolsado_en"]:
+            cancelacion["reembolsado_en"] = datetime.datetime.fromisoformat(cancelacion["reembolsado_en"])
+    for linea in registro["lineas"]:
+        if "fecha_visita" in linea:
+            linea["fecha_visita"] = datetime.date.fromisoformat(linea["fecha_visita"])
+    registro["archivada"] = True
+    return registro
+
+
+def _serializar(valor):
+    if isinstance(valor, (datetime.date, datetime.datetime, datetime.time)):
+        return valor.isoformat()
+    raise TypeError(f"No se puede serializar {type(valor).__name__}")
+
+
+def exportar_mes(mes, lote=500, archivo_mensual=None):
+    """
+    Escribe las órdenes de un mes cerrado a su .jsonl.gz (primero a un temporal, después rename
+    atómico) y registra el ArchivoMensual. No borra nada: eso lo hace purgar_mes.
+    Las órdenes con el reintegro en curso se dejan afuera; si el mes ya tiene `archivo_mensual`,
+    se le agregan (como otro miembro gzip) las que todavía no estaban y se actualiza el registro.
+    """
+    archivadas = ids_archivados(archivo_mensual) if archivo_mensual else set()
+    ids = [
+        pk for pk in ordenes_del_mes(mes).exclude(cancelacion__reembolso_estado__in=REEMBOLSOS_EN_CURSO)
+        .values_list("pk", flat=True) if pk not in archivadas
+    ]
+    if not ids:
+        return archivo_mensual
+
+    directorio = directorio_archivo()
+    directorio.mkdir(parents=True, exist_ok=True)
+    destino = directorio / nombre_archivo(mes)
+    temporal = destino.with_name(destino.name + ".tmp")
+    if archivo_mensual:
+        shutil.copyfile(destino, temporal)
+
+    cantidad_lineas = 0
+    fechas = []
+    with open(temporal, "ab") as crudo:
+        with gzip.GzipFile(fileobj=crudo, mode="wb", mtime=0) as archivo:
+            for inicio in range(0, len(ids), lote):
+                ordenes = (Orden.objects.filter(pk__in=ids[inicio:inicio + lote]).order_by("pk")
+                           .select_related("cancelacion__cierre").prefetch_related("lineas"))
+                for orden in ordenes:
+                    registro = orden_a_registro(orden, orden.lineas.all())
+                    cantidad_lineas += len(registro["lineas"])
+                    fechas.append(registro["fechas_visita"][0])
+                    fechas.append(registro["fechas_visita"][-1])
+                    archivo.write(json.dumps(registro, default=_serializar, ensure_ascii=False).encode() + b"\n")
+        crudo.flush()
+        os.fsync(crudo.fileno())
+
+    sha256 = hashlib.sha256(temporal.read_bytes()).hexdigest()
+    os.replace(temporal, destino)
+
+    if archivo_mensual:
+        archivo_mensual.ordenes += len(ids)
+        archivo_mensual.lineas += cantidad_lineas
+        archivo_mensual.id_min = min(archivo_mensual.id_min, ids[0])
+        archivo_mensual.id_max = max(archivo_mensual.id_max, ids[-1])
+        archivo_mensual.fecha_min = min(archivo_mensual.fecha_min, *fechas)
+        archivo_mensual.fecha_max = max(archivo_mensual.fecha_max, *fechas)
+        archivo_mensual.sha256 = sha256
+        archivo_mensual.save()
+        return archivo_mensual
+    return ArchivoMensual.objects.create(
+        mes=mes,
+        archivo=destino.name,
+        ordenes=len(ids),
+        lineas=cantidad_lineas,
+        id_min=ids[0],
+        id_max=ids[-1],
+        fecha_min=min(fechas),
+        fecha_max=max(fechas),
+        sha256=sha256,
+    )
+
+
+def ids_archivados(archivo_mensual):
+    with gzip.open(directorio_archivo() / archivo_mensual.archivo, "rt", encoding="utf-8") as archivo:
+        return {json.loads(linea)["id"] for linea in archivo}
+
+
+def purgar_mes(archivo_mensual, lote=500):
+    """
+    Borra de las tablas calientes las órdenes de un mes que ya están en su archivo, en lotes
+    chicos para no retener el lock de escritura. Se puede repetir si se cortó a mitad de camino.
+    Las que no están en el archivo (reintegro en curso) no se tocan.
+    """
+    archivadas = ids_archivados(archivo_mensual)
+    ids = [pk for pk in ordenes_del_mes(archivo_mensual.mes).values_list("pk", flat=True) if pk in archivadas]
+    for inicio in range(0, len(ids), lote):
+        with transaction.atomic():
+            CancelacionOrden.objects.filter(orden_id__in=ids[inicio:inicio + lote]).delete()
+            LineaOrden.objects.filter(orden_id__in=ids[inicio:inicio + lote]).delete()
+            Orden.objects.filter(pk__in=ids[inicio:inicio + lote]).delete()
+    return len(ids)
+
+
+def archivar_meses(hoy=None, lote=500):
+    """
+    Archiva y purga todos los meses cerrados. Devuelve [(mes, órdenes archivadas, órdenes borradas)].
+    """
+    resultado = []
+    for mes in meses_cerrados(hoy):
+        # Si el mes ya está archivado solo se agregan las órdenes cuyo reintegro terminó desde entonces
+        archivo_mensual = exportar_mes(mes, lote, ArchivoMensual.objects.filter(mes=mes).first())
+        if archivo_mensual is None:
+            continue
+        resultado.append((mes, archivo_mensual.ordenes, purgar_mes(archivo_mensual, lote)))
+    return resultado
+
+
+def leer_archivo(archivo_mensual):
+    # gzip.open lee seguidos todos los miembros del archivo (ver exportar_mes)
+    with gzip.open(directorio_archivo() / archivo_mensual.archivo, "rt", encoding="utf-8") as archivo:
+        for linea in archivo:
+            yield registro_a_orden(json.loads(linea))
+
+
+def buscar_archivada(orden_id):
+    """
+    Busca una orden en el archivo frío. Solo se leen los meses cuyo rango de ids la incluye.
+    """
+    for archivo_mensual in ArchivoMensual.objects.filter(id_min__lte=orden_id, id_max__gte=orden_id).order_by("mes"):
+        for orden in leer_archivo(archivo_mensual):
+            if orden["id"] == orden_id:
+                return orden
+    return None
+
+
+def ordenes_para_auditoria(desde, hasta):
+    """
+    Todas las órdenes con alguna fecha de visita entre `desde` y `hasta` (inclusive), estén en las
+    tablas calientes o en el archivo. Del archivo solo se leen los meses cuyo rango de fechas se
+    superpone con el pedido.
+    """
+    calientes = (
+        Orden.objects.filter(Q(fecha_visita__range=(desde, hasta)) | Q(lineas__fecha_visita__range=(desde, hasta)))
+        .distinct().order_by("pk").prefetch_related("lineas")
+    )
+    for orden in calientes:
+        yield orden_a_dict(orden, orden.lineas.all())
+
+    archivos = ArchivoMensual.objects.filter(fecha_min__lte=hasta, fecha_max__gte=desde).order_by("mes")
+    for archivo_mensual in archivos:
+        for orden in leer_archivo(archivo_mensual):
+            if any(desde <= fecha <= hasta for fecha in orden["fechas_visita"]):
+                yield orden
@@ -0,0 +1,145 @@
+import re
+import unicodedata
+
+from django.db import connection
+
+from .mail import codigo_entrada
+from .models import IndiceOrden, Orden
+
+# Búsqueda de órdenes por datos parciales ("garcía", "ana garc", el código de una entrada) para
+# boletería y soporte. Cada orden tiene una fila en IndiceOrden con su texto ya plegado (sin
+# acentos, minúsculas, solo letras y números), escrita en la misma transacción que la orden.
+# En SQLite la indexan dos tablas FTS5 mantenidas por triggers (ver la migración 0011):
+#   - busqueda_prefijos: palabras completas o su comienzo ("garc" encuentra "García")
+#   - busqueda_trigramas: cualquier parte de una palabra ("arci" también), como segunda pasada
+# Con fecha de visita se usa la columna fechas del índice para traer solo las órdenes de ese día
+# y los términos se buscan sobre ellas. En otras bases se busca con LIKE.
+
+LIMITE = 20
+# Las subcadenas de menos de 3 letras no tienen trigramas
+MINIMO_TRIGRAMA = 3
+LARGO_CODIGO_ENTRADA = 16  # ver mail.codigo_entrada
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+
+def plegar(texto):
+    """
+    Minúsculas, sin acentos (García -> garcia, Ñandú -> nandu) y con los separadores como espacios.
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_marcas = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_marcas.lower()).strip()
+
+
+def formatear_fecha(fecha):
+    return fecha.strftime("%Y%m%d")
+
+
+def indice_de(orden_id, usuario, lineas, fechas):
+    """
+    La fila de IndiceOrden de una orden: comprador, email, visitantes y el código de cada entrada.
+    """
+    partes = [usuario.get("nombre", ""), usuario.get("email", "")]
+    for indice, linea in enumerate(lineas):
+        partes.append(linea["nombre"] or "")
+        partes.append(codigo_entrada(orden_id, indice))
+    return IndiceOrden(orden_id=orden_id, texto=plegar(" ".join(partes)),
+                       fechas=" ".join(sorted({formatear_fecha(fecha) for fecha in fechas})))
+
+
+def indexar_ordenes(ordenes):
+    """
+    Crea las filas de IndiceOrden que falten para las órdenes dadas (con sus líneas precargadas).
+    Devuelve cuántas creó.
+    """
+    filas = []
+    for orden in ordenes:
+        lineas = list(orden.lineas.all())
+        fechas = {orden.fecha_visita} | {linea.fecha_visita for linea in lineas if linea.fecha_visita}
+        filas.append(indice_de(orden.pk, {"nombre": orden.usuario_nombre, "email": orden.usuario_email},
+                               [{"nombre": linea.nombre} for linea in lineas], fechas))
+    return len(IndiceOrden.objects.bulk_create(filas, ignore_conflicts=True))
+
+
+def _consulta_fts(terminos, prefijo):
+    # Los términos ya están plegados (solo [a-z0-9]), así que se pueden poner entre comillas tal cual
+    return " AND ".join(f'texto : "{termino}"{"*" if prefijo else ""}' for termino in terminos)
+
+
+def _buscar_fts(tabla, terminos, limite, excluir):
+    sql = f"SELECT rowid FROM {tabla} WHERE {tabla} MATCH %s"
+    parametros = [_consulta_fts(terminos, prefijo=tabla == "busqueda_prefijos")]
+    if excluir:
+        sql += f" AND rowid NOT IN ({', '.join(['%s'] * len(excluir))})"
+        parametros.extend(excluir)
+    # Las más recientes primero: FTS5 recorre por rowid y corta en el límite, mientras que ordenar
+    # por relevancia (rank) obliga a puntuar todas las coincidencias ("garcia" son decenas de miles)
+    sql += " ORDER BY rowid DESC LIMIT %s"
+    parametros.append(limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _buscar_en_fecha(terminos, fecha, limite):
+    # Las órdenes de un día son pocas (las acota el cupo diario): se traen con su texto y se buscan
+    # los términos acá, en una sola pasada. Cruzar la fecha con las listas de cada término en FTS5
+    # es más lento, porque los términos comunes ("ana", "gar") tienen cientos de miles de órdenes.
+    sql = (f"SELECT orden_id, texto FROM {IndiceOrden._meta.db_table} WHERE orden_id IN "
+           f"(SELECT rowid FROM busqueda_prefijos WHERE busqueda_prefijos MATCH %s) ORDER BY orden_id DESC")
+    por_parte = all(len(termino) >= MINIMO_TRIGRAMA for termino in terminos)
+    por_comienzo = [f" {termino}" for termino in terminos]
+    comienzan, contienen = [], []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [f'fechas : "{formatear_fecha(fecha)}"'])
+        for orden_id, texto in cursor.fetchall():
+            texto = f" {texto}"
+            if all(termino in texto for termino in por_comienzo):
+                comienzan.append(orden_id)
+                if len(comienzan) == limite:
+                    break
+            elif por_parte and len(contienen) < limite and all(termino in texto for termino in terminos):
+                contienen.append(orden_id)
+    return (comienzan + contienen)[:limite]
+
+
+def _buscar_like(terminos, fecha, limite):
+    consulta = IndiceOrden.objects.all()
+    for termino in terminos:
+        consulta = consulta.filter(texto__contains=termino)
+    if fecha is not None:
+        consulta = consulta.filter(fechas__contains=formatear_fecha(fecha))
+    return list(consulta.order_by("-orden_id").values_list("orden_id", flat=True)[:limite])
+
+
+def buscar_ordenes(texto, fecha_visita=None, limite=LIMITE):
+    """
+    Hasta `limite` órdenes cuyo comprador, email, visitantes o códigos de entrada contienen todas
+    las palabras de `texto`, opcionalmente solo las que visitan en `fecha_visita`. Primero las que
+    coinciden por comienzo de palabra y después por parte de palabra, cada grupo de la más reciente
+    a la más antigua.
+    Un número solo (más corto que un código de entrada) se busca como número de orden.
+    """
+    terminos = plegar(texto).split()
+    if not terminos:
+        return []
+
+    if len(terminos) == 1 and terminos[0].isdigit() and len(terminos[0]) < LARGO_CODIGO_ENTRADA:
+        # Un número corto es un número de orden, no el comienzo de un código de entrada
+        ids = list(Orden.objects.filter(pk=int(terminos[0])).values_list("pk", flat=True))
+    elif connection.vendor != "sqlite":
+        ids = _buscar_like(terminos, fecha_visita, limite)
+    elif fecha_visita is not None:
+        ids = _buscar_en_fecha(terminos, fecha_visita, limite)
+    else:
+        ids = _buscar_fts("busqueda_prefijos", terminos, limite, [])
+        # Con un término de menos de 3 letras el índice de trigramas no tiene qué buscar
+        if len(ids) < limite and all(len(termino) >= MINIMO_TRIGRAMA for termino in terminos):
+            ids += _buscar_fts("busqueda_trigramas", terminos, limite - len(ids), ids)
+
+    ordenes = Orden.objects.in_bulk(ids)
+    return [
+        {"id": orden.pk, "estado": orden.estado, "fecha_visita": orden.fecha_visita,
+         "usuario": {"nombre": orden.usuario_nombre, "email": orden.usuario_email}, "total": orden.total}
+        for orden in (ordenes[pk] for pk in ids if pk in ordenes)
+    ]
@@ -0,0 +1,130 @@
+import collections
+import copy
+import threading
+import time
+import uuid
+
+from django.core.cache import caches
+
+# Operaciones del repositorio que cambian el estado de una orden (primer argumento: orden_id)
+OPERACIONES_DE_ESCRITURA = ("marcar_pagada", "transicionar")
+# Ídem, pero en lote (primer argumento: lista de orden_id)
+OPERACIONES_DE_ESCRITURA_EN_LOTE = ("marcar_pagadas",)
+
+
+def clave_version(orden_id):
+    return f"orden:{orden_id}:version"
+
+
+def invalidar_ordenes(orden_ids, cache_compartido=None):
+    """
+    Invalida en todos los workers las órdenes que se cambiaron por fuera del repositorio
+    (por ejemplo, una cancelación masiva): sin token, la próxima lectura crea uno nuevo.
+    """
+    (cache_compartido or caches["default"]).delete_many([clave_version(orden_id) for orden_id in orden_ids])
+
+
+class CacheOrdenes:
+    """
+    LRU acotado en memoria del worker, con TTL, cuyas entradas se validan contra un token de
+    versión guardado en el cache compartido (Redis/memcached en producción).
+
+    Cada escritura reemplaza el token, así ningún worker vuelve a servir su copia vieja:
+    si otro worker marcó la orden PAGADA, el token ya no coincide y se relee del repositorio.
+    """
+
+    def __init__(self, cache_compartido, max_entradas=1024, ttl=30, reloj=time.monotonic):
+        self.compartido = cache_compartido
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.reloj = reloj
+        self.entradas = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def version(self, orden_id):
+        token = self.compartido.get(clave_version(orden_id))
+        if token is None:
+            # Primera lectura o el cache compartido desalojó el token: se crea uno nuevo,
+            # lo que invalida cualquier copia local que tuviera el token anterior
+            self.compartido.add(clave_version(orden_id), uuid.uuid4().hex, timeout=None)
+            token = self.compartido.get(clave_version(orden_id))
+        return token
+
+    def obtener(self, orden_id, version):
+        with self.lock:
+            entrada = self.entradas.get(orden_id)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            version_entrada, vence, orden = entrada
+            if version_entrada != version or vence < self.reloj():
+                del self.entradas[orden_id]
+                self.fallos += 1
+                return None
+            self.entradas.move_to_end(orden_id)
+            self.aciertos += 1
+            return orden
+
+    def guardar(self, orden_id, version, orden):
+        with self.lock:
+            self.entradas[orden_id] = (version, self.reloj() + self.ttl, orden)
+            self.entradas.move_to_end(orden_id)
+            while len(self.entradas) > self.max_entradas:
+                self.entradas.popitem(last=False)
+
+    def invalidar(self, orden_id):
+        self.compartido.set(clave_version(orden_id), uuid.uuid4().hex, timeout=None)
+        with self.lock:
+            self.entradas.pop(orden_id, None)
+
+
+def repositorio_con_cache(repositorio, cache=None, max_entradas=1024, ttl=30):
+    """
+    Envuelve un repositorio de órdenes con un cache de lectura (read-through).
+    `buscar` sirve desde el cache; las operaciones de escritura invalidan la orden en todos los workers.
+    """
+    cache = cache or CacheOrdenes(caches["default"], max_entradas=max_entradas, ttl=ttl)
+    envuelto = dict(repositorio)
+
+    def buscar(orden_id):
+        # La versión se lee antes de ir al repositorio: si otro worker escribe mientras tanto,
+        # la entrada queda guardada con la versión vieja y la próxima lectura la descarta
+        version = cache.version(orden_id)
+        orden = cache.obtener(orden_id, version)
+        if orden is None:
+            orden = repositorio["buscar"](orden_id)
+            if orden is None:
+                return None
+            orden = copy.deepcopy(orden)
+            cache.guardar(orden_id, version, orden)
+        # Se devuelve una copia para que quien llama no pueda modificar la entrada cacheada
+        return copy.deepcopy(orden)
+
+    def escritura(operacion):
+        def ejecutar(orden_id, *args, **kwargs):
+            try:
+                return operacion(orden_id, *args, **kwargs)
+            finally:
+                cache.invalidar(orden_id)
+        return ejecutar
+
+    def escritura_en_lote(operacion):
+        def ejecutar(orden_ids, *args, **kwargs):
+            try:
+                return operacion(orden_ids, *args, **kwargs)
+            finally:
+                for orden_id in orden_ids:
+                    cache.invalidar(orden_id)
+        return ejecutar
+
+    envuelto["buscar"] = buscar
+    for nombre in OPERACIONES_DE_ESCRITURA:
+        if nombre in repositorio:
+            envuelto[nombre] = escritura(repositorio[nombre])
+    for nombre in OPERACIONES_DE_ESCRITURA_EN_LOTE:
+        if nombre in repositorio:
+            envuelto[nombre] = escritura_en_lote(repositorio[nombre])
+    envuelto["invalidar"] = cache.invalidar
+    return envuelto
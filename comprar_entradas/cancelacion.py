@@ -0,0 +1,285 @@
+import collections
+import concurrent.futures
+import datetime
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache_ordenes import invalidar_ordenes
+from .instantanea import generar_instantanea
+from .models import CancelacionOrden, CierreFecha, CupoDiario, LineaOrden, Orden
+from .repositorio import liberar_codigos, liberar_cupos, liberar_franjas, orden_a_dict
+
+# Cierre del parque en una fecha ya vendida (tormenta, corte de luz): se cancelan todas las
+# órdenes de esa fecha, se reintegran las pagadas y se avisa a todos por mail. El proceso
+# tiene tres fases y cada una se puede cortar y retomar volviendo a correrlo:
+#   1. cancelación por lotes con UPDATEs sobre conjuntos de órdenes (checkpoint en CierreFecha)
+#   2. reintegros en paralelo y con límite de tasa (estado por orden en CancelacionOrden)
+#   3. avisos por mail, también con límite de tasa
+
+ESTADOS_CANCELABLES = ("PENDIENTE", "PAGADA")
+MAX_INTENTOS_REEMBOLSO = 5
+# Un reintegro reclamado que no terminó en este tiempo se da por abandonado (el proceso murió)
+VENCIMIENTO_RECLAMO = datetime.timedelta(minutes=10)
+
+
+class LimiteTasa:
+    """
+    Token bucket compartido entre hilos: como mucho `por_segundo` operaciones por segundo.
+    Quien pide fichas que no hay se las reserva igual y duerme lo que tarden en reponerse,
+    así los hilos salen espaciados en vez de despertarse todos juntos.
+    """
+
+    def __init__(self, por_segundo, rafaga=1, reloj=time.monotonic, dormir=time.sleep):
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga
+        self.fichas = rafaga
+        self.reloj = reloj
+        self.dormir = dormir
+        self.ultimo = reloj()
+        self.lock = threading.Lock()
+
+    def esperar(self, cantidad=1):
+        if not self.por_segundo:
+            return
+        with self.lock:
+            ahora = self.reloj()
+            self.fichas = min(self.rafaga, self.fichas + (ahora - self.ultimo) * self.por_segundo)
+            self.ultimo = ahora
+            self.fichas -= cantidad
+            espera = -self.fichas / self.por_segundo if self.fichas < 0 else 0
+        if espera:
+            self.dormir(espera)
+
+
+def clave_idempotencia(orden_id):
+    """
+    Una orden se cancela una sola vez, así que su reintegro tiene siempre la misma clave: si el
+    proceso muere después de pedirlo y antes de registrarlo, repetir el pedido no reintegra dos veces.
+    """
+    return f"reembolso-orden-{orden_id}"
+
+
+def ordenes_de_la_fecha(fecha):
+    """
+    Órdenes con alguna entrada para `fecha`: las de una fecha por orden.fecha_visita y las de
+    varias fechas por sus líneas.
+    """
+    return Orden.objects.filter(
+        Q(fecha_visita=fecha) | Q(pk__in=LineaOrden.objects.filter(fecha_visita=fecha).values("orden_id"))
+    )
+
+
+def iniciar_cierre(fecha, motivo, ahora):
+    """
+    Crea (o retoma) el cierre y deja la fecha sin capacidad para que no entren ventas nuevas
+    mientras se cancela.
+    """
+    cierre, _ = CierreFecha.objects.get_or_create(fecha=fecha, defaults={"motivo": motivo, "creado_en": ahora})
+    CupoDiario.objects.bulk_create([CupoDiario(fecha=fecha, capacidad=0)], ignore_conflicts=True)
+    CupoDiario.objects.filter(fecha=fecha).update(capacidad=0)
+    return cierre
+
+
+def cancelar_lote(cierre, lote):
+    """
+    Cancela el siguiente lote de órdenes de la fecha en una transacción: registra cada una en
+    CancelacionOrden, las pasa a CANCELADA con un solo UPDATE, devuelve su cupo en todas sus
+    fechas y avanza el checkpoint. Devuelve los ids cancelados (vacío si no quedan).
+    """
+    with transaction.atomic():
+        # select_for_update bloquea las filas en PostgreSQL; en SQLite la transacción IMMEDIATE ya serializa.
+        # Así un webhook de pago no puede colarse entre leer el estado y cancelar.
+        filas = list(
+            ordenes_de_la_fecha(cierre.fecha).select_for_update()
+            .filter(pk__gt=cierre.ultima_orden, estado__in=ESTADOS_CANCELABLES)
+            .order_by("pk").values_list("pk", "estado")[:lote]
+        )
+        if not filas:
+            return []
+        ids = [pk for pk, _ in filas]
+
+        CancelacionOrden.objects.bulk_create([
+            CancelacionOrden(orden_id=pk, cierre=cierre,
+                             reembolso_estado="PENDIENTE" if estado == "PAGADA" else "NO_CORRESPONDE")
+            for pk, estado in filas
+        ], ignore_conflicts=True)
+        Orden.objects.filter(pk__in=ids).update(estado="CANCELADA", version=F("version") + 1)
+
+        entradas = (
+            LineaOrden.objects.filter(orden_id__in=ids)
+            .values(dia=Coalesce("fecha_visita", "orden__fecha_visita")).annotate(cantidad=Count("pk"))
+        )
+        liberar_cupos({fila["dia"]: fila["cantidad"] for fila in entradas})
+        liberar_franjas(ids)
+        liberar_codigos(ids)
+
+        cierre.ultima_orden = ids[-1]
+        cierre.save(update_fields=["ultima_orden"])
+
+    invalidar_ordenes(ids)
+    return ids
+
+
+def reclamar_reembolsos(cierre, desde, lote, ahora):
+    """
+    Reclama con un UPDATE condicional el siguiente lote de reintegros por hacer (pendientes o
+    reclamados por un proceso que murió) con pk > desde. Solo se devuelven las filas que quedaron
+    con el reclamo de esta llamada: si dos procesos corren a la vez, cada reintegro lo pide uno.
+    """
+    reclamo = uuid.uuid4().hex
+    por_hacer = Q(reembolso_estado="PENDIENTE") | Q(reembolso_estado="PROCESANDO",
+                                                     reclamado_en__lt=ahora - VENCIMIENTO_RECLAMO)
+    with transaction.atomic():
+        ids = list(
+            CancelacionOrden.objects.filter(por_hacer, cierre=cierre, pk__gt=desde)
+            .order_by("pk").values_list("pk", flat=True)[:lote]
+        )
+        CancelacionOrden.objects.filter(por_hacer, pk__in=ids).update(
+            reembolso_estado="PROCESANDO", reclamo=reclamo, reclamado_en=ahora)
+    return list(CancelacionOrden.objects.filter(reclamo=reclamo).select_related("orden").order_by("pk"))
+
+
+def registrar_reembolsos(filas, resultados, ahora):
+    """
+    Guarda el resultado de cada reintegro, solo en las filas que siguen teniendo nuestro reclamo.
+    Los que fallaron vuelven a PENDIENTE para la próxima corrida, o quedan FALLIDOS si agotaron
+    los intentos.
+    """
+    with transaction.atomic():
+        vigentes = set(
+            CancelacionOrden.objects.filter(pk__in=[fila.pk for fila in filas], reclamo=filas[0].reclamo)
+            .values_list("pk", flat=True)
+        )
+        actualizar = []
+        for fila, (id_reembolso, error) in zip(filas, resultados):
+            if fila.pk not in vigentes:
+                continue
+            fila.reembolso_intentos += 1
+            fila.reclamo = ""
+            if error is None:
+                fila.reembolso_estado = "REALIZADO"
+                fila.reembolso_id = id_reembolso
+                fila.reembolsado_en = ahora
+                fila.reembolso_error = ""
+            else:
+                fila.reembolso_estado = "FALLIDO" if fila.reembolso_intentos >= MAX_INTENTOS_REEMBOLSO else "PENDIENTE"
+                fila.reembolso_error = str(error)[:200]
+            actualizar.append(fila)
+        CancelacionOrden.objects.bulk_update(actualizar, ["reembolso_estado", "reembolso_id", "reembolso_intentos",
+                                                          "reembolso_error", "reclamo", "reembolsado_en"])
+    return actualizar
+
+
+def reembolsar(cierre, enrutador_pagos, hilos, limite, lote, reloj_ahora):
+    """
+    Pide los reintegros de a lotes: las llamadas al proveedor corren en `hilos` (concurrencia
+    acotada) pasando por `limite`; la base solo se toca desde este hilo, antes y después de cada lote.
+    Cada fila se intenta una vez por corrida. Devuelve un Counter con realizados y fallidos.
+    """
+    def pedir(fila):
+        limite.esperar()
+        try:
+            orden = orden_a_dict(fila.orden, ())
+            return enrutador_pagos["reembolsar"](orden, clave_idempotencia(fila.orden_id)), None
+        except Exception as e:
+            return None, e
+
+    resumen = collections.Counter()
+    desde = 0
+    while True:
+        filas = reclamar_reembolsos(cierre, desde, lote, reloj_ahora())
+        if not filas:
+            return resumen
+        desde = filas[-1].pk
+        resultados = list(hilos.map(pedir, filas))
+        for fila in registrar_reembolsos(filas, resultados, reloj_ahora()):
+            resumen["reembolsos_realizados" if fila.reembolso_estado == "REALIZADO" else "reembolsos_fallidos"] += 1
+
+
+def avisar(cierre, servicio_mail, hilos, limite, lote):
+    """
+    Manda el aviso de cancelación a las órdenes que todavía no lo recibieron, de a lotes.
+    El mail sale al menos una vez: si el proceso muere entre mandar un lote y marcarlo,
+    ese lote se vuelve a mandar al retomar. Solo se marcan los avisos que salieron; los
+    rechazados quedan pendientes para la próxima corrida. Devuelve un Counter con enviados y fallidos.
+    """
+    def enviar(orden):
+        limite.esperar()
+        try:
+            return servicio_mail["enviar_cancelacion"](orden, cierre.motivo) is not False
+        except Exception:
+            return False
+
+    resumen = collections.Counter(mails=0)
+    desde = 0
+    while True:
+        filas = list(
+            CancelacionOrden.objects.filter(cierre=cierre, mail_enviado=False, pk__gt=desde)
+            .select_related("orden").prefetch_related("orden__lineas").order_by("pk")[:lote]
+        )
+        if not filas:
+            return resumen
+        desde = filas[-1].pk
+
+        ordenes = []
+        for fila in filas:
+            orden = orden_a_dict(fila.orden, fila.orden.lineas.all())
+            if fila.reembolso_estado != "NO_CORRESPONDE":
+                orden["reembolso"] = fila.reembolso_estado
+            ordenes.append(orden)
+
+        if "enviar_cancelaciones" in servicio_mail:
+            limite.esperar(len(ordenes))
+            try:
+                resultado = servicio_mail["enviar_cancelaciones"](ordenes, cierre.motivo)
+                rechazados = {indice for *_, indice in resultado["errores"]}
+                salieron = [i not in rechazados for i in range(len(ordenes))]
+            except Exception:
+                salieron = [False] * len(ordenes)
+        else:
+            salieron = list(hilos.map(enviar, ordenes))
+
+        enviadas = [fila.pk for fila, salio in zip(filas, salieron) if salio]
+        CancelacionOrden.objects.filter(pk__in=enviadas).update(mail_enviado=True)
+        resumen["mails"] += len(enviadas)
+        resumen["mails_fallidos"] += len(filas) - len(enviadas)
+
+
+def cerrar_fecha(fecha, motivo, enrutador_pagos, servicio_mail=None, reloj=None, lote=1000, concurrencia=8,
+                 reembolsos_por_segundo=50, mails_por_segundo=100):
+    """
+    Cierra el parque en `fecha`: cancela todas sus órdenes, reintegra las pagadas por
+    enrutador_pagos["reembolsar"] y avisa por mail. Se puede volver a correr: retoma el
+    checkpoint, reintenta los reintegros que fallaron y no repite los que ya se hicieron.
+    Las órdenes de varias fechas se cancelan (y reintegran) completas.
+    Devuelve un Counter con canceladas, reintegros realizados y fallidos y mails enviados y fallidos.
+    """
+    reloj_ahora = reloj["ahora"] if reloj else timezone.now
+    resumen = collections.Counter()
+    cierre = iniciar_cierre(fecha, motivo, reloj_ahora())
+    # Publicar el cierre antes de cancelar, así los workers dejan de vender la fecha
+    if settings.INSTANTANEA_REGISTRO:
+        generar_instantanea()
+
+    while True:
+        ids = cancelar_lote(cierre, lote)
+        if not ids:
+            break
+        resumen["canceladas"] += len(ids)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix="cierre") as hilos:
+        resumen.update(reembolsar(cierre, enrutador_pagos, hilos, LimiteTasa(reembolsos_por_segundo), lote, reloj_ahora))
+        if servicio_mail:
+            resumen.update(avisar(cierre, servicio_mail, hilos, LimiteTasa(mails_por_segundo), lote))
+
+    incompletas = ~Q(reembolso_estado__in=("NO_CORRESPONDE", "REALIZADO")) | Q(mail_enviado=False)
+    if not cierre.cancelaciones.filter(incompletas).exists():
+        CierreFecha.objects.filter(pk=cierre.pk).update(terminado_en=reloj_ahora())
+    return resumen
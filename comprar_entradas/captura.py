@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Logger dedicado: cada registro es una línea NDJSON, sin formato extra
+logger_captura = logging.getLogger("comprar_entradas.captura")
+
+# Campos que nunca se guardan: los códigos de descuento son secretos (en la base solo está su
+# hash) y reproducirlos intentaría canjearlos
+CAMPOS_DESCARTADOS = {"csrfmiddlewaretoken", "codigo_descuento"}
+
+# Texto libre que puede traer nombres o emails (la búsqueda de órdenes): se enmascara entero
+CAMPOS_TEXTO_LIBRE = {"q"}
+
+# Header que agrega reproducir_trafico: esos requests no se vuelven a capturar
+HEADER_REPRODUCCION = "X-Reproduccion-Trafico"
+
+
+def seudonimo_email(email):
+    """
+    Reemplaza un email por uno estable pero anónimo (mismo email -> mismo seudónimo).
+    """
+    digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:12]
+    return f"usuario-{digest}@captura.invalid"
+
+
+def sanitizar_campo(nombre, valor):
+    if nombre.endswith("email"):
+        return seudonimo_email(valor) if valor else valor
+    if nombre.endswith("nombre") or nombre in CAMPOS_TEXTO_LIBRE:
+        return "X" * len(valor) if isinstance(valor, str) else valor
+    return valor
+
+
+def sanitizar_json(datos):
+    if isinstance(datos, dict):
+        return {
+            nombre: sanitizar_json(valor) if isinstance(valor, (dict, list)) else sanitizar_campo(nombre, valor)
+            for nombre, valor in datos.items()
+            if nombre not in CAMPOS_DESCARTADOS
+        }
+    if isinstance(datos, list):
+        return [sanitizar_json(item) for item in datos]
+    return datos
+
+
+def sanitizar_query(query):
+    """
+    Sanitiza un query string (o un body de formulario) campo por campo, igual que los bodies.
+    """
+    campos = parse_qsl(query, keep_blank_values=True)
+    return urlencode([(n, sanitizar_campo(n, v)) for n, v in campos if n not in CAMPOS_DESCARTADOS])
+
+
+def ruta_del_proceso(ruta):
+    """
+    captura.ndjson -> captura.<pid>.ndjson: cada worker de gunicorn escribe y rota su propio
+    archivo, porque RotatingFileHandler rota mal si varios procesos comparten uno.
+    reproducir_trafico ya acepta varios archivos y los mezcla por tiempo.
+    """
+    ruta = Path(ruta)
+    return ruta.with_name(f"{ruta.stem}.{os.getpid()}{ruta.suffix}")
+
+
+def sanitizar_body(content_type, body):
+    """
+    Devuelve el body sin tokens ni datos personales: los emails pasan a seudónimos y los nombres
+    se enmascaran conservando el largo, así el replay produce requests del mismo tamaño.
+    """
+    if not body:
+        return ""
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return sanitizar_query(body.decode("utf-8", "replace"))
+    if content_type.startswith("application/json"):
+        try:
+            return json.dumps(sanitizar_json(json.loads(body)), ensure_ascii=False)
+        except ValueError:
+            return ""
+    # Otros formatos (multipart, binarios) no se capturan
+    return ""
+
+
+class CapturaTraficoMiddleware:
+    """
+    Graba en un NDJSON rotativo por proceso los requests a los endpoints de compra, ya
+    sanitizados, para poder reproducirlos después con `manage.py reproducir_trafico`.
+    Se activa solo si settings.CAPTURA_TRAFICO tiene una ruta de archivo.
+    """
+
+    def __init__(self, get_response):
+        config = getattr(settings, "CAPTURA_TRAFICO", None) or {}
+        if not config.get("ruta"):
+            raise MiddlewareNotUsed("Captura de tráfico desactivada")
+
+        self.get_response = get_response
+        self.prefijos = tuple(config.get("prefijos", ["/comprar-entradas/"]))
+        self.config = config
+        self.pid = None
+
+    def _abrir_archivo(self):
+        # Se abre en el primer request y no en __init__: con --preload el middleware se arma
+        # antes del fork y todos los workers heredarían el mismo archivo
+        if self.pid == os.getpid() and logger_captura.handlers:
+            return
+        self.pid = os.getpid()
+        for handler in list(logger_captura.handlers):
+            handler.close()
+            logger_captura.removeHandler(handler)
+        handler = logging.handlers.RotatingFileHandler(
+            ruta_del_proceso(self.config["ruta"]),
+            maxBytes=self.config.get("max_bytes", 50 * 1024 * 1024),
+            backupCount=self.config.get("copias", 10),
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger_captura.addHandler(handler)
+        logger_captura.setLevel(logging.INFO)
+        logger_captura.propagate = False
+
+    def __call__(self, request):
+        if not request.path_info.startswith(self.prefijos) or HEADER_REPRODUCCION in request.headers:
+            return self.get_response(request)
+
+        # Leer el body antes que la vista para que quede cacheado en request.body
+        content_type = request.content_type or ""
+        body = request.body if request.method in ("POST", "PUT", "PATCH") else b""
+        inicio = time.time()
+
+        respuesta = self.get_response(request)
+
+        self._abrir_archivo()
+        logger_captura.info(json.dumps({
+            "ts": round(inicio, 3),
+            "metodo": request.method,
+            "ruta": request.path_info,
+            "query": sanitizar_query(request.META.get("QUERY_STRING", "")),
+            "content_type": content_type,
+            "body": sanitizar_body(content_type, body),
+            "status": respuesta.status_code,
+            "duracion_ms": round((time.time() - inicio) * 1000, 2),
+        }, ensure_ascii=False))
+        return respuesta
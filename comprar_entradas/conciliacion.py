@@ -0,0 +1,242 @@
+import collections
+import csv
+import datetime
+import heapq
+import itertools
+import operator
+import os
+import tempfile
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.utils import timezone
+
+from .cache_ordenes import invalidar_ordenes
+from .models import Orden
+from .repositorio import marcar_pagadas, orden_a_dict
+from .tipos import desde_centavos
+
+# Columnas obligatorias de la liquidación diaria del proveedor de pagos (puede traer más)
+COLUMNAS_LIQUIDACION = ("id_orden", "id_pago", "monto")
+
+COLUMNAS_REPORTE = ("tipo", "id_orden", "estado_orden", "total_orden", "cobrado", "id_pagos", "aplicada")
+
+# Tipos de discrepancia
+SIN_WEBHOOK = "sin_webhook"  # hay cobro pero la orden sigue PENDIENTE (no llegó la notificación)
+MONTO_DISTINTO = "monto_distinto"  # el cobro no coincide con el total de la orden
+COBRO_DUPLICADO = "cobro_duplicado"  # más de un pago distinto para la misma orden
+ORDEN_INEXISTENTE = "orden_inexistente"  # cobro de una orden que no está en la base
+PAGADA_SIN_COBRO = "pagada_sin_cobro"  # orden pagada ese día que no figura en la liquidación
+COBRO_ORDEN_EXPIRADA = "cobro_orden_expirada"  # el pago llegó después de que venció la reserva: hay que reintegrarlo
+COBRO_ORDEN_CANCELADA = "cobro_orden_cancelada"  # cobro de una orden cancelada antes de pagarse: hay que reintegrarlo
+
+# Una orden en estado final (ver estados.ESTADOS_FINALES) ya no se puede pagar: su cobro es para reintegrar
+COBROS_NO_PAGABLES = {"EXPIRADA": COBRO_ORDEN_EXPIRADA, "CANCELADA": COBRO_ORDEN_CANCELADA}
+
+
+class ErrorLiquidacion(ValueError):
+    pass
+
+
+def leer_liquidacion(ruta, resumen=None):
+    """
+    Lee el CSV de liquidación en streaming y devuelve (id_orden, id_pago, centavos) por fila.
+    Al terminar deja la cantidad de filas leídas en resumen["cobros"].
+    """
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        filas = csv.reader(archivo)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        faltantes = [c for c in COLUMNAS_LIQUIDACION if c not in encabezado]
+        if faltantes:
+            raise ErrorLiquidacion(f"Faltan columnas en la liquidación: {', '.join(faltantes)}")
+        i_orden, i_pago, i_monto = (encabezado.index(c) for c in COLUMNAS_LIQUIDACION)
+
+        leidas = 0
+        for leidas, fila in enumerate(filas, start=1):
+            try:
+                monto = Decimal(fila[i_monto])
+                yield int(fila[i_orden]), fila[i_pago], int(monto * 100)
+            except (ValueError, IndexError, InvalidOperation):
+                raise ErrorLiquidacion(f"Fila {leidas + 1} inválida: {fila!r}")
+        if resumen is not None:
+            resumen["cobros"] = leidas
+
+
+def verificar_orden(cobros):
+    """
+    El merge-join necesita la liquidación ordenada por id_orden; se verifica al pasar.
+    """
+    anterior = None
+    for cobro in cobros:
+        if anterior is not None and cobro[0] < anterior:
+            raise ErrorLiquidacion(f"La liquidación no está ordenada por id_orden ({cobro[0]} después de "
+                                   f"{anterior}); use --ordenar")
+        anterior = cobro[0]
+        yield cobro
+
+
+def ordenar_externo(cobros, tamaño_bloque=1_000_000):
+    """
+    Ordena por id_orden sin cargar todo en memoria: bloques ordenados a archivos temporales
+    y después un heapq.merge de todos.
+    """
+    with tempfile.TemporaryDirectory(prefix="conciliacion-") as directorio:
+        bloques = []
+        while True:
+            bloque = sorted(itertools.islice(cobros, tamaño_bloque))
+            if not bloque:
+                break
+            ruta = os.path.join(directorio, f"bloque-{len(bloques)}.csv")
+            with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+                csv.writer(archivo).writerows(bloque)
+            bloques.append(ruta)
+
+        def leer_bloque(ruta):
+            with open(ruta, newline="", encoding="utf-8") as archivo:
+                for id_orden, id_pago, centavos in csv.reader(archivo):
+                    yield int(id_orden), id_pago, int(centavos)
+
+        yield from heapq.merge(*(leer_bloque(ruta) for ruta in bloques))
+
+
+def ordenes_desde(primer_id, fecha, tamaño_pagina=10000):
+    """
+    Órdenes con pk >= primer_id en orden de pk, como (pk, estado, total, pagada_ese_dia, forma_pago,
+    fue_pagada). Se paginan por clave (WHERE pk > último LIMIT n): memoria constante y sin cursores
+    abiertos mientras se aplican correcciones. Si la orden se pagó (en `fecha` o alguna vez) lo
+    calcula la base, así no hay que convertir un datetime por fila.
+    """
+    inicio = timezone.make_aware(datetime.datetime.combine(fecha, datetime.time()))
+    pagada_ese_dia = ExpressionWrapper(Q(pagada_en__gte=inicio, pagada_en__lt=inicio + datetime.timedelta(days=1)),
+                                       output_field=BooleanField())
+    fue_pagada = ExpressionWrapper(Q(pagada_en__isnull=False), output_field=BooleanField())
+    ultimo = primer_id - 1
+    while True:
+        pagina = list(
+            Orden.objects.filter(pk__gt=ultimo).order_by("pk")
+            .annotate(pagada_ese_dia=pagada_ese_dia, fue_pagada=fue_pagada)
+            .values_list("pk", "estado", "total", "pagada_ese_dia", "forma_pago", "fue_pagada")[:tamaño_pagina]
+        )
+        yield from pagina
+        if len(pagina) < tamaño_pagina:
+            return
+        ultimo = pagina[-1][0]
+
+
+def _discrepancia(tipo, id_orden, orden=None, cobros=(), aplicable=False):
+    return {
+        "tipo": tipo,
+        "id_orden": id_orden,
+        "estado_orden": orden[1] if orden else "",
+        "total_orden": orden[2] if orden else "",
+        "cobrado": desde_centavos(sum(centavos for _, centavos in cobros)),
+        "id_pagos": " ".join(id_pago for id_pago, _ in cobros),
+        "aplicable": aplicable,
+    }
+
+
+def conciliar(cobros, ordenes):
+    """
+    Merge-join de la liquidación (ordenada por id_orden) contra las órdenes (ordenadas por pk,
+    ver ordenes_desde). Genera una discrepancia por orden con problemas; usa memoria constante.
+    """
+    orden = next(ordenes, None)
+    for id_orden, grupo in itertools.groupby(cobros, key=operator.itemgetter(0)):
+        _, id_pago, centavos = next(grupo)
+        pagos = [(id_pago, centavos)]
+        repetidos = list(grupo)
+        if repetidos:
+            # La misma fila repetida en el archivo no es un doble cobro: se agrupa por id_pago
+            pagos = list(dict(pagos + [(id_pago, centavos) for _, id_pago, centavos in repetidos]).items())
+
+        while orden is not None and orden[0] < id_orden:
+            if _pagada_sin_cobro(orden):
+                yield _discrepancia(PAGADA_SIN_COBRO, orden[0], orden)
+            orden = next(ordenes, None)
+
+        if orden is None or orden[0] != id_orden:
+            yield _discrepancia(ORDEN_INEXISTENTE, id_orden, cobros=pagos)
+            continue
+
+        total_centavos = orden[2] * 100
+        if len(pagos) > 1:
+            yield _discrepancia(COBRO_DUPLICADO, id_orden, orden, pagos)
+        elif pagos[0][1] != total_centavos:
+            yield _discrepancia(MONTO_DISTINTO, id_orden, orden, pagos)
+        elif orden[1] == "PENDIENTE":
+            yield _discrepancia(SIN_WEBHOOK, id_orden, orden, pagos, aplicable=True)
+        elif orden[1] in COBROS_NO_PAGABLES and not orden[5]:
+            # Una orden pagada y después cancelada (cierre del parque) se reintegra con su cancelación
+            yield _discrepancia(COBROS_NO_PAGABLES[orden[1]], id_orden, orden, pagos)
+        orden = next(ordenes, None)
+
+    while orden is not None:
+        if _pagada_sin_cobro(orden):
+            yield _discrepancia(PAGADA_SIN_COBRO, orden[0], orden)
+        orden = next(ordenes, None)
+
+
+def _pagada_sin_cobro(orden):
+    _, estado, _, pagada_ese_dia, forma_pago, _ = orden
+    return pagada_ese_dia and estado == "PAGADA" and forma_pago == "TARJETA"
+
+
+def aplicar_pagos(orden_ids, momento, servicio_mail=None):
+    """
+    Marca PAGADAS en un solo UPDATE las órdenes cuyo cobro está en la liquidación pero cuya
+    notificación nunca llegó, y les manda la confirmación que no recibieron.
+    Devuelve cuántas se marcaron (las que otro proceso ya marcó no cuentan ni reciben mail).
+    """
+    marcadas = marcar_pagadas(orden_ids, momento)
+    # Los workers que tienen la orden en cache (ver cache_ordenes) la seguirían viendo PENDIENTE
+    if marcadas:
+        invalidar_ordenes(marcadas)
+    if marcadas and servicio_mail:
+        ordenes = [orden_a_dict(o, o.lineas.all()) for o in Orden.objects.filter(pk__in=marcadas).prefetch_related("lineas")]
+        if "enviar_confirmaciones" in servicio_mail:
+            servicio_mail["enviar_confirmaciones"](ordenes)
+        else:
+            for orden in ordenes:
+                servicio_mail["enviar_confirmacion"](orden)
+    return len(marcadas)
+
+
+def ejecutar_conciliacion(ruta, fecha, ruta_reporte, aplicar=False, lote=1000, ordenar=False,
+                          reloj=None, servicio_mail=None):
+    """
+    Concilia la liquidación `ruta` del día `fecha` y escribe las discrepancias en `ruta_reporte`.
+    Con aplicar=True marca pagadas (en lotes de `lote`) las órdenes sin webhook cuyo cobro coincide.
+    Devuelve un Counter con los cobros leídos, cada tipo de discrepancia y las órdenes aplicadas.
+    """
+    resumen = collections.Counter()
+    cobros = leer_liquidacion(ruta, resumen)
+    cobros = ordenar_externo(cobros) if ordenar else verificar_orden(cobros)
+    primero = next(cobros, None)
+    if primero is not None:
+        cobros = itertools.chain([primero], cobros)
+
+    # Las órdenes pagadas ese día pueden ser anteriores al primer cobro de la liquidación
+    pagadas_del_dia = Orden.objects.filter(pagada_en__date=fecha).order_by("pk").values_list("pk", flat=True).first()
+    candidatos = [i for i in (primero[0] if primero else None, pagadas_del_dia) if i is not None]
+    ordenes = ordenes_desde(min(candidatos), fecha) if candidatos else iter(())
+
+    pendientes = []
+    momento = reloj["ahora"]() if reloj else timezone.now()
+    with open(ruta_reporte, "w", newline="", encoding="utf-8") as archivo:
+        reporte = csv.writer(archivo)
+        reporte.writerow(COLUMNAS_REPORTE)
+        for discrepancia in conciliar(cobros, ordenes):
+            resumen[discrepancia["tipo"]] += 1
+            aplicada = aplicar and discrepancia["aplicable"]
+            reporte.writerow([discrepancia[c] for c in COLUMNAS_REPORTE[:-1]] + ["si" if aplicada else "no"])
+            if aplicada:
+                pendientes.append(discrepancia["id_orden"])
+                if len(pendientes) >= lote:
+                    resumen["aplicadas"] += aplicar_pagos(pendientes, momento, servicio_mail)
+                    pendientes = []
+        if pendientes:
+            resumen["aplicadas"] += aplicar_pagos(pendientes, momento, servicio_mail)
+
+    return resumen
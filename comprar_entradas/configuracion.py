@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import CierreFecha, Feriado, VersionConfiguracion
+
+# Configuración que cambia sin deploy (feriados, cierres de emergencia) y que cada worker tiene
+# armada en memoria. Cada parte tiene un sello de versión en VersionConfiguracion que se
+# incrementa con cada cambio (señales de los modelos); los workers lo consultan cada tanto
+# desde un hilo aparte, rearman el valor si cambió y lo publican reemplazando una sola
+# referencia. Los requests leen esa referencia sin locks y nunca esperan a que se rearme.
+# El registro de socios ya es recargable por su cuenta: la base se consulta en cada compra y
+# la instantánea (ver instantanea.py) se relee cuando se reemplaza el archivo.
+
+logger_configuracion = logging.getLogger("comprar_entradas.configuracion")
+
+# Cada cuánto un worker consulta el sello de versión (una consulta, fuera del request)
+REVISION = 5.0
+
+
+def publicar_cambio(clave):
+    """
+    Incrementa el sello de versión de `clave`: los workers rearman esa parte en la próxima revisión.
+    """
+    VersionConfiguracion.objects.bulk_create([VersionConfiguracion(clave=clave)], ignore_conflicts=True)
+    VersionConfiguracion.objects.filter(clave=clave).update(version=F("version") + 1, actualizada_en=timezone.now())
+
+
+def version_de(clave):
+    # La fecha va en el sello para que dos bases distintas con el mismo número no se confundan
+    return VersionConfiguracion.objects.filter(clave=clave).values_list("version", "actualizada_en").first()
+
+
+class Recargable:
+    """
+    Un valor armado a partir de una fuente con sello de versión. valor() devuelve siempre el
+    último publicado; si pasaron `intervalo` segundos lanza la revisión en un hilo aparte. Solo
+    la primera llamada arma el valor en el mismo hilo, porque todavía no hay nada que devolver.
+    """
+
+    def __init__(self, version, construir, intervalo=REVISION, reloj=time.monotonic):
+        self.version = version
+        self.construir = construir
+        self.intervalo = intervalo
+        self.reloj = reloj
+        self._actual = None  # (versión, valor): se reemplaza entera, nunca se modifica
+        self._revisar = 0.0
+        self._revisando = threading.Lock()
+
+    def valor(self):
+        actual = self._actual
+        if actual is None:
+            return self.recargar()
+        # acquire sin esperar: si otro hilo ya está revisando, se sigue con el valor actual
+        if self.reloj() >= self._revisar and self._revisando.acquire(blocking=False):
+            threading.Thread(target=self._revisar_aparte, daemon=True).start()
+        return actual[1]
+
+    def invalidar(self):
+        """
+        Descarta el valor publicado: la próxima llamada a valor() lo arma en el mismo hilo.
+        """
+        self._actual = None
+
+    def publicado(self):
+        """
+        El último valor publicado, sin revisar ni armar nada (None si todavía no se armó).
+        """
+        actual = self._actual
+        return actual[1] if actual else None
+
+    def recargar(self):
+        """
+        Consulta la versión ahora y, si cambió, rearma y publica el valor. Devuelve el vigente.
+        """
+        # La versión se lee antes de armar: un cambio que llega en el medio se vuelve a ver
+        version = self.version()
+        actual = self._actual
+        if actual is None or actual[0] != version:
+            actual = (version, self.construir())
+            self._actual = actual
+        self._revisar = self.reloj() + self.intervalo
+        return actual[1]
+
+    def _revisar_aparte(self):
+        try:
+            self.recargar()
+        except Exception:
+            # Se sigue con el valor anterior y se reintenta en la próxima revisión
+            self._revisar = self.reloj() + self.intervalo
+            logger_configuracion.exception("No se pudo recargar la configuración")
+        finally:
+            connections.close_all()
+            self._revisando.release()
+
+
+def construir_calendario():
+    """
+    Fechas en que el parque está cerrado: feriados más cierres de emergencia (cerrar_fecha).
+    """
+    return frozenset(Feriado.objects.values_list("fecha", flat=True)) | frozenset(
+        CierreFecha.objects.values_list("fecha", flat=True))
+
+
+calendario = Recargable(lambda: version_de("calendario"), construir_calendario)
+
+
+def calendario_vigente():
+    return calendario.valor()
+
+
+_regenerando = threading.Lock()
+_regenerar_otra_vez = threading.Event()
+
+
+def _regenerar_instantanea():
+    """
+    Regenera la instantánea en un hilo aparte. Los cambios que llegan mientras se arma la
+    disparan una sola vez más, en el mismo hilo, en vez de armar varias en paralelo.
+    """
+    from .instantanea import generar_instantanea
+
+    _regenerar_otra_vez.set()
+    while _regenerar_otra_vez.is_set() and _regenerando.acquire(blocking=False):
+        try:
+            while _regenerar_otra_vez.is_set():
+                _regenerar_otra_vez.clear()
+                generar_instantanea()
+        except Exception:
+            logger_configuracion.exception("No se pudo regenerar la instantánea del registro")
+        finally:
+            connections.close_all()
+            _regenerando.release()
+
+
+def _calendario_cambiado(sender, instance, **kwargs):
+    publicar_cambio("calendario")
+    # Con instantánea los validadores leen las fechas del archivo: hay que regenerarlo, tanto por
+    # un feriado como por un cierre cargado en el admin. Con el registro completo lleva segundos,
+    # así que se hace después del commit (antes no vería el cambio) y fuera del request.
+    if settings.INSTANTANEA_REGISTRO:
+        transaction.on_commit(
+            lambda: threading.Thread(target=_regenerar_instantanea, name="instantanea", daemon=True).start())
+
+
+def conectar_senales():
+    for modelo in (Feriado, CierreFecha):
+        post_save.connect(_calendario_cambiado, sender=modelo, dispatch_uid=f"calendario_{modelo.__name__}")
+        post_delete.connect(_calendario_cambiado, sender=modelo, dispatch_uid=f"calendario_{modelo.__name__}_baja")
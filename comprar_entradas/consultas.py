@@ -0,0 +1,185 @@
+import collections
+import contextlib
+import functools
+import json
+import logging
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Presupuesto de consultas SQL: cuántas consultas y cuánto tiempo de base lleva un request o una
+# llamada a realizar_compra/confirmar_pago, y qué consultas se repiten con la misma forma (el
+# síntoma de un N+1: una consulta por orden o por línea en vez de una para todas).
+#   - medir_consultas: mide un bloque (se pueden anidar: cada medición ve sus consultas)
+#   - PresupuestoConsultas: para tests, falla si el bloque o la función se pasa del presupuesto
+#   - vigilar_consultas / PresupuestoConsultasMiddleware: en producción miden una muestra y
+#     registran las violaciones en el logger comprar_entradas.consultas (una línea JSON cada una)
+
+logger_consultas = logging.getLogger("comprar_entradas.consultas")
+
+# Los IN con distinta cantidad de valores son la misma consulta
+_LISTA_VALORES = re.compile(r"IN \((?:%s, )*%s\)")
+# Las transacciones anidadas no son consultas de la aplicación
+_SAVEPOINTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class PresupuestoExcedido(AssertionError):
+    pass
+
+
+@functools.lru_cache(maxsize=1024)
+def forma_consulta(sql):
+    """
+    La consulta sin parámetros: dos consultas con la misma forma solo difieren en los valores.
+    Las formas se repiten mucho, así que se cachean por texto de la consulta.
+    """
+    return _LISTA_VALORES.sub("IN (...)", sql) if " IN (" in sql else sql
+
+
+class MedicionConsultas:
+    """
+    Consultas, segundos de base y formas repetidas de un bloque. Se engancha a la conexión con
+    execute_wrapper, así que no depende de DEBUG ni guarda el texto de cada consulta.
+    """
+
+    def __init__(self, nombre=""):
+        self.nombre = nombre
+        self.consultas = 0
+        self.segundos = 0.0
+        self.formas = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(_SAVEPOINTS):
+            return execute(sql, params, many, context)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+            self.formas[forma_consulta(sql)] += 1
+
+    def repetidas(self, umbral):
+        """
+        Formas que se ejecutaron `umbral` veces o más, de la más repetida a la menos.
+        """
+        return [(forma, veces) for forma, veces in self.formas.most_common() if veces >= umbral]
+
+    def violaciones(self, maximo=None, repetidas=None):
+        """
+        Lo que excede el presupuesto, en texto; lista vacía si lo cumple.
+        """
+        problemas = []
+        if maximo is not None and self.consultas > maximo:
+            problemas.append(f"{self.nombre or 'el bloque'} hizo {self.consultas} consultas (presupuesto {maximo})")
+        if repetidas is not None:
+            problemas.extend(f"consulta repetida {veces} veces (posible N+1): {forma}"
+                             for forma, veces in self.repetidas(repetidas))
+        return problemas
+
+
+@contextlib.contextmanager
+def medir_consultas(nombre="", alias="default"):
+    medicion = MedicionConsultas(nombre)
+    with connections[alias].execute_wrapper(medicion):
+        yield medicion
+
+
+class PresupuestoConsultas(contextlib.ContextDecorator):
+    """
+    Para tests: como context manager o decorador, levanta PresupuestoExcedido si el bloque hace
+    más de `maximo` consultas o repite una misma forma `repetidas` veces o más.
+
+        @PresupuestoConsultas(8, repetidas=3)
+        def test_...():
+    """
+
+    def __init__(self, maximo, repetidas=None, alias="default"):
+        self.maximo = maximo
+        self.repetidas = repetidas
+        self.alias = alias
+
+    def __enter__(self):
+        self._medir = medir_consultas(alias=self.alias)
+        self.medicion = self._medir.__enter__()
+        return self.medicion
+
+    def __exit__(self, *excepcion):
+        self._medir.__exit__(*excepcion)
+        if excepcion[0] is None:
+            problemas = self.medicion.violaciones(self.maximo, self.repetidas)
+            if problemas:
+                raise PresupuestoExcedido("\n".join(problemas))
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def presupuesto_configurado():
+    """
+    La configuración PRESUPUESTO_CONSULTAS de settings, o None si no se mide nada (muestreo 0).
+    """
+    configuracion = settings.PRESUPUESTO_CONSULTAS
+    return configuracion if configuracion["muestreo"] > 0 else None
+
+
+def registrar_violaciones(medicion, maximo, repetidas, **contexto):
+    problemas = medicion.violaciones(maximo, repetidas)
+    if problemas:
+        logger_consultas.warning(json.dumps({
+            "ts": round(time.time(), 3),
+            "nombre": medicion.nombre,
+            **contexto,
+            "consultas": medicion.consultas,
+            "db_ms": round(medicion.segundos * 1000, 2),
+            "presupuesto": maximo,
+            "problemas": problemas,
+        }, ensure_ascii=False))
+    return problemas
+
+
+def vigilar_consultas(nombre):
+    """
+    Mide una muestra de las llamadas a la función (PRESUPUESTO_CONSULTAS["muestreo"]) contra su
+    presupuesto en PRESUPUESTO_CONSULTAS["presupuestos"][nombre]. Fuera de la muestra solo cuesta
+    un random().
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            configuracion = presupuesto_configurado()
+            if configuracion is None or random.random() >= configuracion["muestreo"]:
+                return funcion(*args, **kwargs)
+            with medir_consultas(nombre) as medicion:
+                resultado = funcion(*args, **kwargs)
+            registrar_violaciones(medicion, configuracion["presupuestos"].get(nombre), configuracion["repetidas"])
+            return resultado
+        return envuelta
+    return decorador
+
+
+class PresupuestoConsultasMiddleware:
+    """
+    Mide una muestra de los requests contra el presupuesto "request" y registra los que lo
+    exceden o repiten consultas. Se desactiva con PRESUPUESTO_CONSULTAS["muestreo"] en 0.
+    """
+
+    def __init__(self, get_response):
+        self.configuracion = presupuesto_configurado()
+        if self.configuracion is None:
+            raise MiddlewareNotUsed("Presupuesto de consultas desactivado")
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= self.configuracion["muestreo"]:
+            return self.get_response(request)
+
+        with medir_consultas("request") as medicion:
+            respuesta = self.get_response(request)
+        registrar_violaciones(medicion, self.configuracion["presupuestos"].get("request"),
+                              self.configuracion["repetidas"], metodo=request.method, ruta=request.path_info,
+                              status=respuesta.status_code)
+        return respuesta
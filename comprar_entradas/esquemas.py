@@ -0,0 +1,179 @@
+import datetime
+import re
+
+# Mismo criterio que usa el formulario: algo@algo.algo
+PATRON_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class ErrorEsquema(ValueError):
+    """
+    Error de validación de un payload. Contiene la lista completa de errores encontrados.
+    """
+
+    def __init__(self, errores):
+        super().__init__("El payload no cumple el esquema")
+        self.errores = errores
+
+
+def _error(errores, ruta, codigo, mensaje):
+    errores.append({"campo": ruta or None, "codigo": codigo, "mensaje": mensaje})
+
+
+def _compilar_texto(esquema):
+    min_largo = esquema.get("min_largo", 1)
+    max_largo = esquema.get("max_largo")
+
+    def validar(valor, ruta, errores):
+        if not isinstance(valor, str):
+            _error(errores, ruta, "tipo", "Debe ser un texto")
+            return None
+        valor = valor.strip()
+        if len(valor) < min_largo:
+            _error(errores, ruta, "requerido", "No puede estar vacío")
+        elif max_largo is not None and len(valor) > max_largo:
+            _error(errores, ruta, "max_largo", f"No puede superar los {max_largo} caracteres")
+        return valor
+
+    return validar
+
+
+def _compilar_email(esquema):
+    def validar(valor, ruta, errores):
+        if not isinstance(valor, str) or not PATRON_EMAIL.match(valor.strip()):
+            _error(errores, ruta, "formato", "Debe ser un email válido")
+            return None
+        return valor.strip()
+
+    return validar
+
+
+def _compilar_entero(esquema):
+    minimo = esquema.get("min")
+    maximo = esquema.get("max")
+
+    def validar(valor, ruta, errores):
+        # bool es subclase de int, pero true/false no son edades válidas
+        if not isinstance(valor, int) or isinstance(valor, bool):
+            _error(errores, ruta, "tipo", "Debe ser un número entero")
+            return None
+        if minimo is not None and valor < minimo:
+            _error(errores, ruta, "min", f"Debe ser mayor o igual a {minimo}")
+        elif maximo is not None and valor > maximo:
+            _error(errores, ruta, "max", f"Debe ser menor o igual a {maximo}")
+        return valor
+
+    return validar
+
+
+def _compilar_fecha(esquema):
+    def validar(valor, ruta, errores):
+        try:
+            return datetime.date.fromisoformat(valor)
+        except (TypeError, ValueError):
+            _error(errores, ruta, "formato", "Debe ser una fecha con formato AAAA-MM-DD")
+            return None
+
+    return validar
+
+
+def _compilar_hora(esquema):
+    def validar(valor, ruta, errores):
+        try:
+            return datetime.time.fromisoformat(valor)
+        except (TypeError, ValueError):
+            _error(errores, ruta, "formato", "Debe ser una hora con formato HH:MM")
+            return None
+
+    return validar
+
+
+def _compilar_opcion(esquema):
+    opciones = frozenset(esquema["opciones"])
+    descripcion = ", ".join(esquema["opciones"])
+
+    def validar(valor, ruta, errores):
+        # Una lista o un dict no son hasheables: también son una opción inválida, no un 500
+        if not isinstance(valor, str) or valor not in opciones:
+            _error(errores, ruta, "opcion", f"Debe ser uno de: {descripcion}")
+            return None
+        return valor
+
+    return validar
+
+
+def _compilar_lista(esquema):
+    validar_item = compilar_campo(esquema["items"])
+    min_items = esquema.get("min_items", 0)
+    max_items = esquema.get("max_items")
+
+    def validar(valor, ruta, errores):
+        if not isinstance(valor, list):
+            _error(errores, ruta, "tipo", "Debe ser una lista")
+            return None
+        if len(valor) < min_items:
+            _error(errores, ruta, "min_items", f"Debe tener al menos {min_items} elemento(s)")
+        elif max_items is not None and len(valor) > max_items:
+            _error(errores, ruta, "max_items", f"No puede tener más de {max_items} elementos")
+            return None
+        return [validar_item(item, f"{ruta}[{i}]", errores) for i, item in enumerate(valor)]
+
+    return validar
+
+
+def _compilar_objeto(esquema):
+    # Se resuelven una sola vez los validadores de cada campo
+    campos = [
+        (nombre, compilar_campo(sub_esquema), sub_esquema.get("requerido", True), sub_esquema.get("defecto"))
+        for nombre, sub_esquema in esquema["campos"].items()
+    ]
+
+    def validar(valor, ruta, errores):
+        if not isinstance(valor, dict):
+            _error(errores, ruta, "tipo", "Debe ser un objeto")
+            return None
+        limpio = {}
+        for nombre, validar_campo, requerido, defecto in campos:
+            ruta_campo = f"{ruta}.{nombre}" if ruta else nombre
+            if nombre not in valor or valor[nombre] is None:
+                if requerido:
+                    _error(errores, ruta_campo, "requerido", "Este campo es obligatorio")
+                else:
+                    limpio[nombre] = defecto
+                continue
+            limpio[nombre] = validar_campo(valor[nombre], ruta_campo, errores)
+        return limpio
+
+    return validar
+
+
+COMPILADORES = {
+    "texto": _compilar_texto,
+    "email": _compilar_email,
+    "entero": _compilar_entero,
+    "fecha": _compilar_fecha,
+    "hora": _compilar_hora,
+    "opcion": _compilar_opcion,
+    "lista": _compilar_lista,
+    "objeto": _compilar_objeto,
+}
+
+
+def compilar_campo(esquema):
+    return COMPILADORES[esquema["tipo"]](esquema)
+
+
+def compilar_esquema(esquema):
+    """
+    Compila un esquema declarativo en una función validadora.
+    La función devuelve el payload limpio o lanza ErrorEsquema con todos los errores juntos.
+    """
+    validar_raiz = compilar_campo(esquema)
+
+    def validar(datos):
+        errores = []
+        limpio = validar_raiz(datos, "", errores)
+        if errores:
+            raise ErrorEsquema(errores)
+        return limpio
+
+    return validar
@@ -0,0 +1,27 @@
+# Máquina de estados de una orden. Toda transición se hace con un UPDATE condicional sobre la
+# columna version (compare-and-swap, ver repositorio.transicionar): no se bloquea la fila mientras
+# se llama al proveedor de pagos, y si dos procesos compiten (webhook repetido, vencimiento de la
+# reserva, cierre del parque) gana uno y el otro relee y reintenta o queda rechazado.
+#
+#   PENDIENTE ─┬─> PAGADA ──> CANCELADA
+#              ├─> EXPIRADA
+#              └─> CANCELADA
+
+TRANSICIONES = {
+    "PENDIENTE": frozenset({"PAGADA", "EXPIRADA", "CANCELADA"}),
+    "PAGADA": frozenset({"CANCELADA"}),  # cierre del parque: se cancela y se reintegra
+    "EXPIRADA": frozenset(),
+    "CANCELADA": frozenset(),
+}
+
+ESTADOS_FINALES = frozenset(estado for estado, destinos in TRANSICIONES.items() if not destinos)
+
+
+class ConflictoDeVersion(ValueError):
+    """
+    La orden cambió de versión en cada uno de los intentos: hay demasiada contención sobre ella.
+    """
+
+
+def puede_transicionar(origen, destino):
+    return destino in TRANSICIONES.get(origen, ())
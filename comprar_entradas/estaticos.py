@@ -0,0 +1,169 @@
+import gzip
+import json
+import mimetypes
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan las variantes .gz
+    brotli = None
+
+# Extensiones que vale la pena precomprimir (las imágenes rasterizadas ya vienen comprimidas)
+EXTENSIONES_COMPRIMIBLES = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map")
+
+# Los archivos con hash en el nombre nunca cambian: se cachean por un año
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_SIN_HASH = "public, max-age=60"
+
+
+def comprimir_archivo(ruta):
+    """
+    Genera las variantes .gz (y .br si brotli está instalado) de un archivo estático.
+    Solo se escriben si resultan más chicas que el original.
+    """
+    contenido = Path(ruta).read_bytes()
+    generados = []
+
+    comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+    if len(comprimido) < len(contenido):
+        Path(f"{ruta}.gz").write_bytes(comprimido)
+        generados.append(f"{ruta}.gz")
+
+    if brotli is not None:
+        comprimido = brotli.compress(contenido, quality=11)
+        if len(comprimido) < len(contenido):
+            Path(f"{ruta}.br").write_bytes(comprimido)
+            generados.append(f"{ruta}.br")
+
+    return generados
+
+
+def codificaciones_aceptadas(encabezado):
+    """
+    Parsea Accept-Encoding ("br;q=1.0, gzip;q=0.5, *;q=0") a {codificación: q}. Una codificación
+    con q=0 está explícitamente rechazada; un q mal formado cuenta como 0.
+    """
+    aceptadas = {}
+    for parte in encabezado.split(","):
+        codificacion, _, parametros = parte.partition(";")
+        codificacion = codificacion.strip().lower()
+        if not codificacion:
+            continue
+        q = 1.0
+        for parametro in parametros.split(";"):
+            nombre, _, valor = parametro.partition("=")
+            if nombre.strip().lower() == "q":
+                try:
+                    q = min(max(float(valor), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        aceptadas[codificacion] = q
+    return aceptadas
+
+
+def elegir_codificacion(variantes, encabezado):
+    """
+    La variante precomprimida con mayor q (ante empate, br antes que gzip), o None si el cliente
+    no acepta ninguna. "*" vale para las codificaciones que el encabezado no nombra.
+    """
+    aceptadas = codificaciones_aceptadas(encabezado)
+    comodin = aceptadas.get("*", 0.0)
+    elegida, mejor = None, 0.0
+    for codificacion in ("br", "gzip"):
+        q = aceptadas.get(codificacion, comodin)
+        if codificacion in variantes and q > mejor:
+            elegida, mejor = codificacion, q
+    return elegida
+
+
+class EstaticosComprimidosStorage(ManifestStaticFilesStorage):
+    """
+    Storage de collectstatic que agrega el hash del contenido al nombre de cada archivo
+    y además deja precomprimidas las variantes gzip/brotli junto a cada uno.
+    """
+
+    def stored_name(self, name):
+        # Sin collectstatic (desarrollo, tests) no hay manifiesto: se usan los nombres originales
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        procesados = set()
+        for original, procesado, hubo_cambios in super().post_process(paths, dry_run, **options):
+            procesados.add(procesado)
+            yield original, procesado, hubo_cambios
+
+        if dry_run:
+            return
+
+        for nombre in procesados:
+            if isinstance(nombre, str) and nombre.endswith(EXTENSIONES_COMPRIMIBLES):
+                comprimir_archivo(self.path(nombre))
+
+
+class EstaticosMiddleware:
+    """
+    Sirve los archivos de STATIC_ROOT desde la propia aplicación (gunicorn no sirve estáticos).
+    Elige la variante .br/.gz según Accept-Encoding y marca como inmutables los archivos con hash.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        raiz = Path(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        if raiz is None or not raiz.is_dir():
+            raise MiddlewareNotUsed("No hay STATIC_ROOT generado (falta correr collectstatic)")
+
+        self.prefijo = "/" + settings.STATIC_URL.lstrip("/")
+        self.archivos = self._indexar(raiz)
+
+    def _indexar(self, raiz):
+        # Se recorre STATIC_ROOT una sola vez al arrancar el worker
+        inmutables = set()
+        manifiesto = raiz / "staticfiles.json"
+        if manifiesto.exists():
+            inmutables = set(json.loads(manifiesto.read_text()).get("paths", {}).values())
+
+        archivos = {}
+        for directorio, _, nombres in os.walk(raiz):
+            for nombre in nombres:
+                if nombre.endswith((".gz", ".br")):
+                    continue
+                ruta = Path(directorio) / nombre
+                relativo = ruta.relative_to(raiz).as_posix()
+                tipo, _ = mimetypes.guess_type(nombre)
+                variantes = {
+                    codificacion: str(ruta) + extension
+                    for codificacion, extension in (("br", ".br"), ("gzip", ".gz"))
+                    if Path(str(ruta) + extension).exists()
+                }
+                archivos[self.prefijo + relativo] = {
+                    "ruta": str(ruta),
+                    "tipo": tipo or "application/octet-stream",
+                    "cache": CACHE_INMUTABLE if relativo in inmutables else CACHE_SIN_HASH,
+                    "variantes": variantes,
+                }
+        return archivos
+
+    def __call__(self, request):
+        archivo = self.archivos.get(request.path_info)
+        if archivo is None or request.method not in ("GET", "HEAD"):
+            return self.get_response(request)
+
+        ruta = archivo["ruta"]
+        codificacion = elegir_codificacion(archivo["variantes"], request.headers.get("Accept-Encoding", ""))
+        if codificacion:
+            ruta = archivo["variantes"][codificacion]
+
+        respuesta = FileResponse(open(ruta, "rb"), content_type=archivo["tipo"])
+        respuesta["Cache-Control"] = archivo["cache"]
+        respuesta["Vary"] = "Accept-Encoding"
+        if codificacion:
+            respuesta["Content-Encoding"] = codificacion
+        return respuesta
@@ -2,8 +2,8 @@ from django import forms
 from django.core.exceptions import ValidationError
 import datetime
 
-# Importar los feriados del nuevo archivo
-from .constants import FERIADOS
+# Feriados y cierres vigentes (instantánea compartida o constants.FERIADOS)
+from .instantanea import feriados_vigentes
 
 class ComprarEntradasForm(forms.Form):
     # Datos del usuario (simulado como campos del form)
@@ -39,11 +39,26 @@ class ComprarEntradasForm(forms.Form):
             raise ValidationError("El parque está cerrado los lunes.")
         
         # Validar que no sea feriado
-        if fecha in FERIADOS:
+        if fecha in feriados_vigentes():
             raise ValidationError("El parque está cerrado en feriados.")
         
         return fecha
     
+    # Franja de ingreso: las opciones las carga la página desde /api/v1/franjas según la fecha
+    hora_ingreso = forms.TimeField(
+        required=False,
+        label="Horario de ingreso",
+        widget=forms.Select(attrs={'class': 'form-control', 'id': 'hora_ingreso'})
+    )
+    
+    # Código de descuento de una campaña (ver descuentos.py); se canjea al guardar la orden
+    codigo_descuento = forms.CharField(
+        required=False,
+        max_length=30,
+        label="Código de descuento",
+        widget=forms.TextInput(attrs={'class': 'form-control', 'autocomplete': 'off'})
+    )
+    
     # Tipo de pase
     TIPO_PASE_CHOICES = [
         ('REGULAR', 'Pase Regular'),
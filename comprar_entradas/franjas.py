@@ -0,0 +1,125 @@
+import bisect
+import datetime
+import threading
+import time
+
+from django.utils import timezone
+
+from .configuracion import Recargable
+from .models import FranjaIngreso
+
+# Ingreso por horario: cada fecha puede tener franjas (por ejemplo de 15 minutos) con capacidad
+# propia. La asignación es un UPDATE condicional dentro de la transacción que guarda la orden
+# (ver repositorio.reservar_franja); este módulo responde las consultas de disponibilidad de la
+# página de compra con un índice en memoria de toda la temporada.
+
+MAX_GRUPO = 10  # máximo de entradas por orden (validar_cantidad_entradas)
+# El índice es una foto: las consultas de disponibilidad pueden ver hasta este atraso
+TTL_INDICE = 2
+
+
+class IndiceFranjas:
+    """
+    Lugares libres de todas las franjas de la temporada, numeradas en orden (fecha, inicio).
+    bits[k] es un bitset (un int de Python) con el bit i prendido si a la franja i le quedan al
+    menos k lugares: la primera franja con lugar para un grupo de k desde la posición p es el bit
+    más bajo de bits[k] >> p, que se calcula sobre el entero sin recorrer las franjas una a una.
+    """
+
+    def __init__(self, filas):
+        # filas: (fecha, inicio, capacidad, vendidas) ordenadas por fecha e inicio
+        self.franjas = []
+        self.libres = []
+        self.dias = {}
+        for i, (fecha, inicio, capacidad, vendidas) in enumerate(filas):
+            self.franjas.append((fecha, inicio))
+            self.libres.append(max(capacidad - vendidas, 0))
+            primera, _ = self.dias.get(fecha, (i, i))
+            self.dias[fecha] = (primera, i + 1)
+        self.posicion = {franja: i for i, franja in enumerate(self.franjas)}
+        # El bit i es el carácter i desde la derecha
+        self.bits = [0] + [
+            int("".join("1" if libres >= k else "0" for libres in reversed(self.libres)) or "0", 2)
+            for k in range(1, MAX_GRUPO + 1)
+        ]
+
+    def actualizar(self, i, libres):
+        anterior, self.libres[i] = self.libres[i], libres
+        bit = 1 << i
+        for k in range(min(anterior, libres) + 1, min(max(anterior, libres), MAX_GRUPO) + 1):
+            self.bits[k] ^= bit
+
+    def primera(self, desde, cantidad, hasta=None):
+        """
+        Posición de la primera franja >= desde (y < hasta) con lugar para `cantidad`, o None.
+        """
+        resto = self.bits[min(cantidad, MAX_GRUPO)] >> desde
+        if not resto:
+            return None
+        i = desde + (resto & -resto).bit_length() - 1
+        return i if hasta is None or i < hasta else None
+
+    def disponibilidad(self, fecha, cantidad=1, ahora=None):
+        """
+        Franjas de la fecha con sus lugares libres y, si ninguna tiene lugar para `cantidad`,
+        la siguiente franja de la temporada que sí (o None). Sin franjas: ingreso libre.
+        `ahora` es el momento local: si la fecha es hoy, las franjas que ya empezaron no se ofrecen.
+        """
+        primera, fin = self.dias.get(fecha, (None, None))
+        if primera is None:
+            return {"por_horario": False, "franjas": [], "siguiente": None}
+        if ahora is not None and fecha == ahora.date():
+            primera = bisect.bisect_left(self.franjas, (fecha, ahora.time().replace(tzinfo=None)), primera, fin)
+        franjas = [{"inicio": self.franjas[i][1], "libres": self.libres[i]} for i in range(primera, fin)]
+        siguiente = None
+        if self.primera(primera, cantidad, fin) is None:
+            i = self.primera(fin, cantidad)
+            if i is not None:
+                siguiente = {"fecha_visita": self.franjas[i][0], "inicio": self.franjas[i][1]}
+        return {"por_horario": True, "franjas": franjas, "siguiente": siguiente}
+
+
+def cargar_indice(desde):
+    filas = (
+        FranjaIngreso.objects.filter(fecha__gte=desde).order_by("fecha", "inicio")
+        .values_list("fecha", "inicio", "capacidad", "vendidas").iterator(chunk_size=5000)
+    )
+    return IndiceFranjas(filas)
+
+
+# Índice de la temporada (desde hoy) compartido por el proceso. No tiene sello de versión: es una
+# foto que se rearma cada TTL_INDICE segundos (la "versión" es el momento de la revisión), en un
+# hilo aparte como la configuración; los requests siguen con el índice anterior mientras tanto.
+indice = Recargable(time.monotonic, lambda: cargar_indice(timezone.localdate()), intervalo=TTL_INDICE)
+_lock = threading.Lock()
+
+
+def indice_vigente():
+    return indice.valor()
+
+
+def anotar_reserva(fecha, inicio, cantidad):
+    """
+    Descuenta una reserva recién hecha en el índice del proceso, así la disponibilidad que ve
+    este worker no espera al próximo TTL. Otros workers la ven al reconstruir.
+    """
+    with _lock:
+        vigente = indice.publicado()
+        i = vigente.posicion.get((fecha, inicio)) if vigente else None
+        if i is not None:
+            vigente.actualizar(i, max(vigente.libres[i] - cantidad, 0))
+
+
+def generar_franjas(desde, hasta, apertura, cierre, minutos, capacidad, cerrado=lambda fecha: False):
+    """
+    FranjaIngreso de `minutos` entre apertura y cierre para cada fecha abierta de [desde, hasta].
+    """
+    paso = datetime.timedelta(minutes=minutos)
+    fecha = desde
+    while fecha <= hasta:
+        if not cerrado(fecha):
+            inicio = datetime.datetime.combine(fecha, apertura)
+            while inicio.time() < cierre and inicio.date() == fecha:
+                yield FranjaIngreso(fecha=fecha, inicio=inicio.time(), capacidad=capacidad)
+                inicio += paso
+        fecha += datetime.timedelta(days=1)
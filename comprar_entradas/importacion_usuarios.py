@@ -0,0 +1,192 @@
+import collections
+import csv
+import gzip
+import heapq
+import io
+import itertools
+import json
+import os
+import tempfile
+import unicodedata
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ImportacionUsuarios, UsuarioRegistrado
+
+# Importación del export de socios del CRM (millones de filas) a UsuarioRegistrado.
+# El archivo se lee en streaming, se ordena por email con un ordenamiento externo (bloques
+# ordenados a disco y heapq.merge), así los duplicados quedan juntos y se descartan sin
+# guardar todos los emails en memoria. Después se hace upsert por lotes; cada lote se guarda
+# en la misma transacción que el checkpoint, así una corrida cortada retoma exacto.
+
+COLUMNAS_EMAIL = ("email", "mail")
+
+
+class ErrorImportacion(ValueError):
+    pass
+
+
+def normalizar_email(email):
+    """
+    Email en la forma en que se guarda y se busca: sin espacios, NFKC y en minúsculas.
+    Devuelve None si no parece un email.
+    """
+    email = unicodedata.normalize("NFKC", email or "").strip().lower()
+    usuario, arroba, dominio = email.rpartition("@")
+    if not arroba or not usuario or "." not in dominio or " " in email or len(email) > 254:
+        return None
+    return email
+
+
+def _abrir(ruta):
+    if ruta.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(ruta), encoding="utf-8", newline="")
+    return open(ruta, newline="", encoding="utf-8")
+
+
+def formato_de(ruta):
+    nombre = ruta[:-3] if ruta.endswith(".gz") else ruta
+    return "ndjson" if nombre.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def leer_filas(ruta, formato=None):
+    """
+    Filas del export como (email, nombre, registrado) sin normalizar, en streaming.
+    CSV con encabezado (email o mail, y opcionalmente nombre y registrado) o NDJSON con las mismas claves.
+    """
+    formato = formato or formato_de(ruta)
+    with _abrir(ruta) as archivo:
+        if formato == "ndjson":
+            for numero, linea in enumerate(archivo, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    raise ErrorImportacion(f"Línea {numero} no es JSON válido")
+                yield _campos(fila)
+            return
+
+        filas = csv.DictReader(archivo)
+        if filas.fieldnames is None:
+            return
+        if not any(c in filas.fieldnames for c in COLUMNAS_EMAIL):
+            raise ErrorImportacion("El CSV no tiene columna email")
+        for fila in filas:
+            yield _campos(fila)
+
+
+def _campos(fila):
+    email = next((fila[c] for c in COLUMNAS_EMAIL if fila.get(c)), "")
+    registrado = fila.get("registrado", True)
+    if isinstance(registrado, str):
+        registrado = registrado.strip().lower() not in ("0", "false", "no", "")
+    return str(email), str(fila.get("nombre") or "")[:100], bool(registrado)
+
+
+def ordenar_externo(filas, tamaño_bloque=200_000):
+    """
+    Ordena (email, n, nombre, registrado) por email y número de fila sin cargar todo en memoria:
+    bloques ordenados a archivos temporales y después un heapq.merge de todos.
+    """
+    with tempfile.TemporaryDirectory(prefix="usuarios-") as directorio:
+        bloques = []
+        while True:
+            bloque = sorted(itertools.islice(filas, tamaño_bloque))
+            if not bloque:
+                break
+            ruta = os.path.join(directorio, f"bloque-{len(bloques)}.csv")
+            with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+                csv.writer(archivo).writerows(bloque)
+            bloques.append(ruta)
+
+        def leer_bloque(ruta):
+            with open(ruta, newline="", encoding="utf-8") as archivo:
+                for email, numero, nombre, registrado in csv.reader(archivo):
+                    yield email, int(numero), nombre, registrado == "True"
+
+        yield from heapq.merge(*(leer_bloque(ruta) for ruta in bloques))
+
+
+def sin_duplicados(ordenadas, resumen):
+    """
+    De cada email se queda con la última fila del archivo (la más reciente del export).
+    """
+    for email, grupo in itertools.groupby(ordenadas, key=lambda fila: fila[0]):
+        ultima = collections.deque(grupo, maxlen=1)[0]
+        resumen["unicos"] += 1
+        yield ultima
+
+
+def firma_archivo(ruta):
+    estado = os.stat(ruta)
+    return f"{estado.st_size}-{int(estado.st_mtime)}"
+
+
+def guardar_lote(importacion, lote, ahora):
+    """
+    Upsert del lote y avance del checkpoint en una sola transacción.
+    """
+    with transaction.atomic():
+        UsuarioRegistrado.objects.bulk_create(
+            [UsuarioRegistrado(email=email, nombre=nombre, registrado=registrado, actualizado_en=ahora)
+             for email, _, nombre, registrado in lote],
+            update_conflicts=True,
+            unique_fields=["email"],
+            update_fields=["nombre", "registrado", "actualizado_en"],
+        )
+        importacion.ultimo_email = lote[-1][0]
+        importacion.importados += len(lote)
+        importacion.save(update_fields=["ultimo_email", "importados"])
+
+
+def importar_usuarios(ruta, formato=None, lote=5000, tamaño_bloque=200_000, reiniciar=False, progreso=None,
+                      reloj=None):
+    """
+    Importa el export `ruta` a UsuarioRegistrado. Si una corrida anterior sobre el mismo archivo
+    se cortó, retoma después del último email guardado (el ordenamiento se repite, los upserts no);
+    con reiniciar=True empieza de cero. progreso(resumen) se llama después de cada lote.
+    Devuelve un Counter con filas leídas, inválidas, emails únicos, importados y salteados.
+    """
+    ahora = reloj["ahora"]() if reloj else timezone.now()
+    importacion, _ = ImportacionUsuarios.objects.get_or_create(
+        archivo=os.path.abspath(ruta), firma=firma_archivo(ruta), defaults={"iniciada_en": ahora})
+    if reiniciar:
+        importacion.ultimo_email, importacion.importados, importacion.terminada_en = "", 0, None
+        importacion.save()
+
+    resumen = collections.Counter()
+    if importacion.terminada_en is not None:
+        resumen["ya_importado"] = importacion.importados
+        return resumen
+
+    def normalizadas():
+        for numero, (email, nombre, registrado) in enumerate(leer_filas(ruta, formato), start=1):
+            resumen["filas"] = numero
+            normalizado = normalizar_email(email)
+            if normalizado is None:
+                resumen["invalidas"] += 1
+                continue
+            yield normalizado, numero, nombre, registrado
+
+    pendientes = []
+    for fila in sin_duplicados(ordenar_externo(normalizadas(), tamaño_bloque), resumen):
+        if fila[0] <= importacion.ultimo_email:
+            resumen["salteados"] += 1
+            continue
+        pendientes.append(fila)
+        if len(pendientes) >= lote:
+            guardar_lote(importacion, pendientes, ahora)
+            resumen["importados"] += len(pendientes)
+            pendientes = []
+            if progreso:
+                progreso(resumen)
+    if pendientes:
+        guardar_lote(importacion, pendientes, ahora)
+        resumen["importados"] += len(pendientes)
+        if progreso:
+            progreso(resumen)
+
+    ImportacionUsuarios.objects.filter(pk=importacion.pk).update(terminada_en=reloj["ahora"]() if reloj else timezone.now())
+    return resumen
@@ -0,0 +1,230 @@
+import array
+import bisect
+import datetime
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .configuracion import calendario_vigente
+from .constants import USUARIOS_REGISTRADOS
+from .importacion_usuarios import normalizar_email
+from .models import CierreFecha, Feriado, UsuarioRegistrado
+
+# Instantánea de solo lectura del registro de socios y del calendario de cierres, para que los
+# workers no tengan cada uno su copia en memoria: el archivo se abre con mmap y todos comparten
+# las mismas páginas del page cache. Formato:
+#
+#   cabecera | directorio | hashes de email (8 bytes c/u) | fechas cerradas (ordinal, 4 bytes c/u)
+#
+# Los dos arreglos están ordenados y en big-endian, así que comparar los bytes es comparar los
+# números y se busca por bisección directamente sobre el mapa. El directorio dice, para cada
+# valor de los primeros `bits` bits del hash, dónde empiezan sus hashes: como los hashes son
+# uniformes cada cubeta tiene unos pocos y la bisección es de 3 o 4 pasos en vez de 20.
+#
+# Se regenera entera (ver generar_instantanea) y se publica con un rename atómico: los workers
+# ven la nueva al revisar el archivo y los que estaban leyendo la anterior terminan sobre el
+# mapa viejo.
+
+MAGIA = b"REGI"
+FORMATO = 1
+CABECERA = struct.Struct("<4sHHQII")  # magia, formato, bits del directorio, generada (unix), emails, fechas
+CUBETA = struct.Struct("<II")  # entradas consecutivas del directorio: inicio y fin de una cubeta
+ANCHO_EMAIL = 8
+ANCHO_FECHA = 4
+MAX_BITS = 16  # directorio de 256 KB como máximo
+# Cada cuánto un worker mira si el archivo cambió (un stat)
+REVISION = 1.0
+
+
+def hash_email(email):
+    """
+    Hash de 8 bytes del email normalizado. Con un millón de socios la probabilidad de que un
+    email no registrado choque con alguno es del orden de 1e-13.
+    """
+    return hashlib.blake2b(email.encode(), digest_size=ANCHO_EMAIL).digest()
+
+
+def _ordenado_big_endian(valores, tipo):
+    arreglo = array.array(tipo, sorted(set(valores)))
+    if sys.byteorder == "little":
+        arreglo.byteswap()
+    return arreglo
+
+
+def bits_directorio(emails):
+    # Unas 16 entradas por cubeta
+    return max(0, min(MAX_BITS, emails.bit_length() - 4))
+
+
+def _directorio(hashes, bits):
+    ordenados = sorted(set(hashes))
+    directorio = array.array("I", (bisect.bisect_left(ordenados, prefijo << (64 - bits))
+                                   for prefijo in range(2 ** bits)))
+    directorio.append(len(ordenados))
+    if sys.byteorder == "big":
+        directorio.byteswap()
+    return ordenados, directorio
+
+
+def escribir_instantanea(ruta, emails, fechas_cerradas, generada=None):
+    """
+    Escribe la instantánea con los emails (ya normalizados) y las fechas cerradas, y la publica
+    en `ruta` con un rename atómico. Devuelve cuántos emails y fechas quedaron.
+    """
+    enteros = {int.from_bytes(hash_email(e), "big") for e in emails}
+    bits = bits_directorio(len(enteros))
+    ordenados, directorio = _directorio(enteros, bits)
+    hashes = _ordenado_big_endian(ordenados, "Q")
+    fechas = _ordenado_big_endian((f.toordinal() for f in fechas_cerradas), "I")
+    cabecera = CABECERA.pack(MAGIA, FORMATO, bits, int(generada if generada is not None else time.time()),
+                             len(hashes), len(fechas))
+
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix=".instantanea-")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(cabecera)
+            directorio.tofile(archivo)
+            hashes.tofile(archivo)
+            fechas.tofile(archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    return len(hashes), len(fechas)
+
+
+def generar_instantanea(ruta=None):
+    """
+    Regenera la instantánea desde la base: socios importados del CRM con registrado=True, los de
+    constants.USUARIOS_REGISTRADOS, los feriados y las fechas cerradas con cerrar_fecha.
+    """
+    ruta = ruta or settings.INSTANTANEA_REGISTRO
+    emails = (
+        UsuarioRegistrado.objects.filter(registrado=True).values_list("email", flat=True).iterator(chunk_size=10000)
+    )
+    locales = (normalizar_email(u.get("mail")) for u in USUARIOS_REGISTRADOS if u.get("registrado"))
+    fechas = list(Feriado.objects.values_list("fecha", flat=True)) + list(
+        CierreFecha.objects.values_list("fecha", flat=True))
+    return escribir_instantanea(ruta, _encadenar(emails, (e for e in locales if e)), fechas)
+
+
+def _encadenar(*iterables):
+    for iterable in iterables:
+        yield from iterable
+
+
+def _bisecar(mapa, inicio, cantidad, ancho, clave, bajo=0):
+    alto = cantidad
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        posicion = inicio + medio * ancho
+        if mapa[posicion:posicion + ancho] < clave:
+            bajo = medio + 1
+        else:
+            alto = medio
+    posicion = inicio + bajo * ancho
+    return bajo < cantidad and mapa[posicion:posicion + ancho] == clave
+
+
+class FechasCerradas:
+    """
+    Las fechas cerradas de la instantánea, usable donde se esperaba la lista FERIADOS (`in`, iterar).
+    """
+
+    def __init__(self, mapa, inicio, cantidad):
+        self.mapa = mapa
+        self.inicio = inicio
+        self.cantidad = cantidad
+
+    def __contains__(self, fecha):
+        if not isinstance(fecha, datetime.date):
+            return False
+        return _bisecar(self.mapa, self.inicio, self.cantidad, ANCHO_FECHA, fecha.toordinal().to_bytes(ANCHO_FECHA, "big"))
+
+    def __iter__(self):
+        for i in range(self.cantidad):
+            posicion = self.inicio + i * ANCHO_FECHA
+            yield datetime.date.fromordinal(int.from_bytes(self.mapa[posicion:posicion + ANCHO_FECHA], "big"))
+
+    def __len__(self):
+        return self.cantidad
+
+
+class Instantanea:
+    def __init__(self, ruta):
+        with open(ruta, "rb") as archivo:
+            estado = os.fstat(archivo.fileno())
+            if estado.st_size < CABECERA.size:
+                raise ValueError(f"{ruta} no es una instantánea del registro")
+            self.mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identidad = (estado.st_ino, estado.st_mtime_ns)
+        magia, formato, self.bits, self.generada, self.emails, fechas = CABECERA.unpack_from(self.mapa)
+        self.inicio_hashes = CABECERA.size + (2 ** self.bits + 1) * 4
+        inicio_fechas = self.inicio_hashes + self.emails * ANCHO_EMAIL
+        if magia != MAGIA or formato != FORMATO or len(self.mapa) != inicio_fechas + fechas * ANCHO_FECHA:
+            raise ValueError(f"{ruta} no es una instantánea del registro")
+        self.fechas_cerradas = FechasCerradas(self.mapa, inicio_fechas, fechas)
+
+    def contiene_email(self, email):
+        """
+        Si el email (ya normalizado) está entre los socios registrados.
+        """
+        clave = hash_email(email)
+        prefijo = int.from_bytes(clave[:2], "big") >> (MAX_BITS - self.bits)
+        bajo, alto = CUBETA.unpack_from(self.mapa, CABECERA.size + prefijo * 4)
+        return _bisecar(self.mapa, self.inicio_hashes, alto, ANCHO_EMAIL, clave, bajo)
+
+
+_vigente = {"valor": None, "ruta": None, "revisar": 0.0}
+_lock = threading.Lock()
+
+
+def instantanea_vigente(reloj=time.monotonic):
+    """
+    La instantánea configurada en settings.INSTANTANEA_REGISTRO, o None si no hay (entonces se
+    consulta la base). Cada REVISION segundos se compara el inodo del archivo y, si lo
+    reemplazaron, se abre el nuevo; entre revisiones la lectura no toma ningún lock.
+    """
+    ruta = settings.INSTANTANEA_REGISTRO
+    if not ruta:
+        return None
+    misma_ruta = _vigente["ruta"] == ruta
+    if misma_ruta and reloj() < _vigente["revisar"]:
+        return _vigente["valor"]
+    # Solo un hilo revisa el archivo; los demás siguen con la instantánea que ya tienen
+    if not _lock.acquire(blocking=not misma_ruta):
+        return _vigente["valor"]
+    try:
+        actual = _vigente["valor"] if _vigente["ruta"] == ruta else None
+        try:
+            estado = os.stat(ruta)
+            if actual is None or actual.identidad != (estado.st_ino, estado.st_mtime_ns):
+                actual = Instantanea(ruta)
+        except (OSError, ValueError):
+            actual = None
+        # El mapa anterior se cierra solo cuando nadie lo usa más
+        _vigente.update(valor=actual, ruta=ruta, revisar=reloj() + REVISION)
+        return actual
+    finally:
+        _lock.release()
+
+
+def feriados_vigentes():
+    """
+    Fechas en que el parque está cerrado para los validadores de fecha (feriados más cierres):
+    las de la instantánea o, sin instantánea, el calendario recargable de la base.
+    """
+    instantanea = instantanea_vigente()
+    return instantanea.fechas_cerradas if instantanea is not None else calendario_vigente()
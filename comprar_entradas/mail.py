@@ -0,0 +1,538 @@
+import atexit
+import concurrent.futures
+import contextlib
+import email.policy
+import functools
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import queue
+import re
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+
+try:
+    import qrcode
+except ImportError:  # qrcode es opcional: sin él el mail lleva solo el código de cada entrada
+    qrcode = None
+
+try:
+    from reportlab.graphics import renderPDF
+    from reportlab.graphics.barcode.qr import QrCodeWidget
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib.pagesizes import A6
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+except ImportError:  # reportlab es opcional: sin él no se adjunta el PDF de las entradas
+    canvas = None
+
+logger_mail = logging.getLogger("comprar_entradas.mail")
+
+# Las entradas renderizadas se guardan por hash del contenido de la orden
+PREFIJO_CACHE = "mail:confirmacion:"
+TTL_CACHE = 60 * 60
+
+
+def codigo_entrada(orden_id, indice):
+    """
+    Código de una entrada, firmado con SECRET_KEY para que no se pueda adivinar el de otra orden.
+    """
+    firma = hmac.new(settings.SECRET_KEY.encode(), f"{orden_id}:{indice}".encode(), hashlib.sha256)
+    return firma.hexdigest()[:16].upper()
+
+
+def hash_contenido(orden):
+    """
+    Hash de todo lo que se ve en el mail: si la orden no cambió, el mail renderizado tampoco.
+    """
+    contenido = json.dumps(orden, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def png_qr(codigo):
+    imagen = qrcode.make(codigo, box_size=4, border=2)
+    salida = io.BytesIO()
+    imagen.save(salida)
+    return salida.getvalue()
+
+
+def pdf_entradas(orden, entradas):
+    """
+    Un PDF con una página A6 por entrada: datos del visitante y el QR con su código.
+    """
+    salida = io.BytesIO()
+    lienzo = canvas.Canvas(salida, pagesize=A6)
+    ancho, alto = A6
+    for entrada in entradas:
+        lienzo.setFont("Helvetica-Bold", 14)
+        lienzo.drawString(20, alto - 40, "Parque de Diversiones")
+        lienzo.setFont("Helvetica", 10)
+        lienzo.drawString(20, alto - 60, f"Orden N° {orden['id']} - {orden['tipo_pase']}")
+        lienzo.drawString(20, alto - 75, f"{entrada['nombre']} ({entrada['edad']} años)")
+        lienzo.drawString(20, alto - 90, f"Fecha de visita: {entrada['fecha_visita']}")
+        lienzo.drawString(20, alto - 105, f"Código: {entrada['codigo']}")
+
+        lado = ancho - 80
+        if entrada["qr"] is not None:
+            # Reutilizar el PNG del mail es mucho más barato que dibujar el QR módulo por módulo
+            lienzo.drawImage(ImageReader(io.BytesIO(entrada["qr"])), 40, 30, lado, lado)
+        else:
+            dibujo = Drawing(lado, lado)
+            dibujo.add(QrCodeWidget(entrada["codigo"], barWidth=lado, barHeight=lado))
+            renderPDF.draw(dibujo, lienzo, 40, 30)
+        lienzo.showPage()
+    lienzo.save()
+    return salida.getvalue()
+
+
+def renderizar_confirmacion(orden, remitente):
+    """
+    Arma el mail de confirmación completo (texto, HTML con los QR embebidos y PDF adjunto)
+    y lo devuelve serializado, listo para mandar por SMTP. Corre en los procesos del pool.
+    """
+    entradas = []
+    for indice, linea in enumerate(orden["lineas"]):
+        codigo = codigo_entrada(orden["id"], indice)
+        entradas.append({
+            "nombre": linea["nombre"],
+            "edad": linea["edad"],
+            "fecha_visita": linea.get("fecha_visita") or orden["fecha_visita"],
+            "codigo": codigo,
+            "cid": f"qr-{codigo.lower()}@parque" if qrcode is not None else None,
+            "qr": png_qr(codigo) if qrcode is not None else None,
+        })
+
+    mensaje = EmailMessage()
+    mensaje["Subject"] = f"Tus entradas - Orden N° {orden['id']}"
+    mensaje["From"] = remitente
+    mensaje["To"] = orden["usuario"]["email"]
+    mensaje.set_content("\n".join(
+        [f"Hola {orden['usuario']['nombre']}, tu pago de la orden N° {orden['id']} está confirmado.", ""]
+        + [f"- {e['nombre']} ({e['fecha_visita']}): {e['codigo']}" for e in entradas]
+    ))
+    mensaje.add_alternative(render_to_string("mail_confirmacion.html", {"orden": orden, "entradas": entradas}),
+                            subtype="html")
+
+    if qrcode is not None:
+        html = mensaje.get_payload()[1]
+        for entrada in entradas:
+            html.add_related(entrada["qr"], "image", "png", cid=f"<{entrada['cid']}>")
+    if canvas is not None:
+        mensaje.add_attachment(pdf_entradas(orden, entradas), "application", "pdf",
+                               filename=f"entradas-orden-{orden['id']}.pdf")
+
+    return mensaje.as_bytes(policy=email.policy.SMTP)
+
+
+def renderizar_cancelacion(orden, motivo, remitente):
+    """
+    Mail de aviso de cancelación. orden["reembolso"] es el estado del reintegro
+    (ver cancelacion.CancelacionOrden); si no viene, la orden no había sido pagada.
+    """
+    fechas = ", ".join(f"{fecha:%d/%m/%Y}" for fecha in orden["fechas_visita"])
+    reembolso = orden.get("reembolso")
+    if reembolso == "REALIZADO":
+        detalle = f"Ya te reintegramos ${orden['total']} con el mismo medio de pago."
+    elif reembolso:
+        detalle = f"El reintegro de ${orden['total']} está en proceso; te llegará con el mismo medio de pago."
+    else:
+        detalle = "La orden no estaba pagada, así que no se te cobró nada."
+
+    mensaje = EmailMessage()
+    mensaje["Subject"] = f"Orden N° {orden['id']} cancelada - el parque cierra"
+    mensaje["From"] = remitente
+    mensaje["To"] = orden["usuario"]["email"]
+    mensaje.set_content(
+        f"Hola {orden['usuario']['nombre']}, lamentamos avisarte que el parque no abrirá ({motivo}) y "
+        f"cancelamos tu orden N° {orden['id']} para el {fechas}.\n\n{detalle}\n"
+    )
+    return mensaje.as_bytes(policy=email.policy.SMTP)
+
+
+def _inicializar_worker():
+    # Con el método "spawn" los procesos del pool arrancan sin Django configurado
+    import django
+    django.setup()
+
+
+def _datos_smtp(mensaje):
+    # Mismo tratamiento que smtplib.SMTP.data(): puntos al inicio de línea duplicados y terminador
+    datos = re.sub(rb"(?m)^\.", b"..", mensaje)
+    if not datos.endswith(b"\r\n"):
+        datos += b"\r\n"
+    return datos + b".\r\n"
+
+
+def enviar_con_pipelining(conexion, remitente, mensajes):
+    """
+    Manda varios mensajes por una conexión usando ESMTP PIPELINING (RFC 2920): MAIL FROM, RCPT TO
+    y DATA van juntos en un solo envío, y el contenido de cada mensaje viaja junto con los
+    comandos del siguiente. Así cada mensaje cuesta un ida y vuelta en vez de cuatro.
+
+    `mensajes` es una lista de (destinatario, bytes). Devuelve (enviados, errores), con errores
+    como lista de (destinatario, código, respuesta, índice del mensaje en `mensajes`): un mismo
+    destinatario puede tener varios mensajes en el lote y cada uno tiene su propio resultado.
+    """
+    enviados = 0
+    errores = []
+    pendiente = None  # (índice, destinatario, datos) cuyo contenido todavía no se mandó
+
+    for indice, (destinatario, datos) in enumerate([*mensajes, (None, None)]):
+        comandos = b""
+        if pendiente is not None:
+            comandos += _datos_smtp(pendiente[2])
+        if destinatario is not None:
+            comandos += f"MAIL FROM:<{remitente}>\r\nRCPT TO:<{destinatario}>\r\nDATA\r\n".encode()
+        if not comandos:
+            break
+        conexion.send(comandos)
+
+        if pendiente is not None:
+            codigo, respuesta = conexion.getreply()
+            if codigo == 250:
+                enviados += 1
+            else:
+                errores.append((pendiente[1], codigo, respuesta, pendiente[0]))
+            pendiente = None
+        if destinatario is None:
+            break
+
+        codigo_mail, respuesta_mail = conexion.getreply()
+        codigo_rcpt, respuesta_rcpt = conexion.getreply()
+        codigo_data, respuesta_data = conexion.getreply()
+        if codigo_data == 354:
+            pendiente = (indice, destinatario, datos)
+            continue
+
+        if codigo_mail != 250:
+            errores.append((destinatario, codigo_mail, respuesta_mail, indice))
+        elif codigo_rcpt not in (250, 251):
+            errores.append((destinatario, codigo_rcpt, respuesta_rcpt, indice))
+        else:
+            errores.append((destinatario, codigo_data, respuesta_data, indice))
+        conexion.rset()
+
+    return enviados, errores
+
+
+def enviar_sin_pipelining(conexion, remitente, mensajes):
+    enviados = 0
+    errores = []
+    for indice, (destinatario, datos) in enumerate(mensajes):
+        try:
+            conexion.sendmail(remitente, [destinatario], datos)
+            enviados += 1
+        except smtplib.SMTPRecipientsRefused as e:
+            codigo, respuesta = e.recipients[destinatario]
+            errores.append((destinatario, codigo, respuesta, indice))
+        except smtplib.SMTPResponseException as e:
+            errores.append((destinatario, e.smtp_code, e.smtp_error, indice))
+            conexion.rset()
+    return enviados, errores
+
+
+class PoolSMTP:
+    """
+    Pool chico de conexiones SMTP persistentes. Las conexiones se abren a demanda (como mucho
+    `tamaño`), se reutilizan entre envíos y se descartan si fallan. Una conexión que estuvo
+    ociosa más de `max_inactividad` segundos se prueba con NOOP antes de usarla, porque los
+    servidores cierran las conexiones ociosas.
+    """
+
+    def __init__(self, host, port=25, tamaño=4, usuario="", password="", usar_tls=False, timeout=30,
+                 max_inactividad=10, reloj=time.monotonic):
+        self.host = host
+        self.port = port
+        self.tamaño = tamaño
+        self.usuario = usuario
+        self.password = password
+        self.usar_tls = usar_tls
+        self.timeout = timeout
+        self.max_inactividad = max_inactividad
+        self.reloj = reloj
+        self.libres = queue.LifoQueue()
+        self.cupos = threading.BoundedSemaphore(tamaño)
+
+    def conectar(self):
+        conexion = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        conexion.ehlo()
+        if self.usar_tls:
+            conexion.starttls()
+            conexion.ehlo()
+        if self.usuario:
+            conexion.login(self.usuario, self.password)
+        return conexion
+
+    def _tomar(self):
+        while True:
+            try:
+                conexion, ultimo_uso = self.libres.get_nowait()
+            except queue.Empty:
+                return self.conectar()
+            if self.reloj() - ultimo_uso < self.max_inactividad:
+                return conexion
+            try:
+                if conexion.noop()[0] == 250:
+                    return conexion
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.descartar(conexion)
+
+    @contextlib.contextmanager
+    def conexion(self):
+        with self.cupos:
+            conexion = self._tomar()
+            try:
+                yield conexion
+            except BaseException:
+                # Tras un error a mitad de un diálogo la conexión queda en un estado desconocido
+                self.descartar(conexion)
+                raise
+            self.libres.put((conexion, self.reloj()))
+
+    def descartar(self, conexion):
+        with contextlib.suppress(smtplib.SMTPException, OSError):
+            conexion.close()
+
+    def enviar(self, remitente, mensajes):
+        """
+        Manda un lote de (destinatario, bytes) por una sola conexión del pool.
+        """
+        with self.conexion() as conexion:
+            if conexion.has_extn("pipelining"):
+                return enviar_con_pipelining(conexion, remitente, mensajes)
+            return enviar_sin_pipelining(conexion, remitente, mensajes)
+
+    def cerrar(self):
+        while True:
+            try:
+                conexion, _ = self.libres.get_nowait()
+            except queue.Empty:
+                return
+            with contextlib.suppress(smtplib.SMTPException, OSError):
+                conexion.quit()
+
+
+class ServicioMail:
+    """
+    Servicio de mail real: renderiza las confirmaciones en un pool de procesos (QR, PDF y HTML
+    son CPU puro y no deben frenar el request), las cachea por hash de contenido y las manda
+    por el PoolSMTP repartiendo los lotes entre sus conexiones.
+
+    Con procesos=0 se renderiza en el mismo proceso (tests, scripts).
+
+    Las confirmaciones encoladas que fallan (error de conexión o rechazo temporal 4xx) se
+    reintentan hasta `reintentos` veces, esperando `espera_reintento` segundos y el doble en cada
+    intento; cada falla queda en el logger comprar_entradas.mail.
+    """
+
+    def __init__(self, pool, remitente, procesos=2, cache=None, ttl_cache=TTL_CACHE, max_lote=500, reintentos=3,
+                 espera_reintento=5.0):
+        self.pool = pool
+        self.remitente = remitente
+        self.procesos = procesos
+        self.cache = cache if cache is not None else caches["default"]
+        self.ttl_cache = ttl_cache
+        self.max_lote = max_lote
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self.renderizador = None
+        self.hilos = concurrent.futures.ThreadPoolExecutor(max_workers=pool.tamaño,
+                                                           thread_name_prefix="servicio-mail")
+        self.pendientes = queue.Queue()
+        self.despachador = None
+        self.lock = threading.Lock()
+
+    def _renderizar(self, ordenes):
+        renderizar = functools.partial(renderizar_confirmacion, remitente=self.remitente)
+        if not self.procesos:
+            return [renderizar(orden) for orden in ordenes]
+        with self.lock:
+            if self.renderizador is None:
+                # spawn y no fork: este proceso ya tiene hilos (despachador, pool SMTP) y un fork
+                # copiaría sus locks tomados
+                self.renderizador = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.procesos, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_inicializar_worker)
+        chunksize = max(1, len(ordenes) // (self.procesos * 4))
+        return list(self.renderizador.map(renderizar, ordenes, chunksize=chunksize))
+
+    def mensajes(self, ordenes):
+        """
+        Mensajes serializados de cada orden: los ya renderizados salen del cache, el resto se
+        renderiza en un solo map sobre el pool de procesos.
+        """
+        claves = [PREFIJO_CACHE + hash_contenido(orden) for orden in ordenes]
+        en_cache = self.cache.get_many(claves)
+        faltantes = {clave: orden for clave, orden in zip(claves, ordenes) if clave not in en_cache}
+        if faltantes:
+            nuevos = dict(zip(faltantes, self._renderizar(list(faltantes.values()))))
+            self.cache.set_many(nuevos, timeout=self.ttl_cache)
+            en_cache.update(nuevos)
+        return [en_cache[clave] for clave in claves]
+
+    def enviar_confirmaciones(self, ordenes):
+        """
+        Envía las confirmaciones de un lote de órdenes (por ejemplo, la ráfaga tras abrir una venta).
+        Devuelve {"enviados": n, "errores": [(email, código, respuesta, índice), ...]}, con el
+        índice de la orden en `ordenes`.
+        """
+        ordenes = list(ordenes)
+        return self._enviar([(orden["usuario"]["email"], datos) for orden, datos in zip(ordenes, self.mensajes(ordenes))])
+
+    def enviar_cancelaciones(self, ordenes, motivo):
+        """
+        Avisa a cada orden que se canceló por el cierre del parque. El mail es solo texto, así
+        que se arma acá mismo, sin pasar por el pool de procesos ni el cache.
+        """
+        return self._enviar([(orden["usuario"]["email"], renderizar_cancelacion(orden, motivo, self.remitente))
+                             for orden in ordenes])
+
+    def _enviar(self, mensajes):
+        # Un lote por conexión, todos en paralelo: la conexión i lleva los mensajes i, i + tamaño, ...
+        tamaño = self.pool.tamaño
+        lotes = [(i, mensajes[i::tamaño]) for i in range(tamaño) if mensajes[i::tamaño]]
+        enviados = 0
+        errores = []
+        for (primero, _), (enviados_lote, errores_lote) in zip(lotes, self.hilos.map(
+                lambda lote: self.pool.enviar(self.remitente, lote[1]), lotes)):
+            enviados += enviados_lote
+            errores.extend((destinatario, codigo, respuesta, primero + indice * tamaño)
+                           for destinatario, codigo, respuesta, indice in errores_lote)
+        return {"enviados": enviados, "errores": errores}
+
+    def enviar_confirmacion(self, orden):
+        """
+        Encola la confirmación de una orden y vuelve enseguida: el render y el envío corren
+        fuera del request. Las confirmaciones que se acumulan mientras se envía un lote salen
+        juntas en el siguiente. Devuelve un Future que resuelve a True si el servidor la aceptó
+        (después de los reintentos, si hicieron falta).
+        """
+        futuro = concurrent.futures.Future()
+        with self.lock:
+            if self.despachador is None:
+                self.despachador = threading.Thread(target=self._despachar, name="servicio-mail-cola", daemon=True)
+                self.despachador.start()
+        self.pendientes.put((orden, futuro, 0))
+        return futuro
+
+    def _despachar(self):
+        terminar = False
+        reintentos = []  # heap de (cuándo, secuencia, (orden, futuro, intento))
+        secuencia = itertools.count()
+        while not terminar:
+            lote = []
+            espera = max(0.0, reintentos[0][0] - time.monotonic()) if reintentos else None
+            with contextlib.suppress(queue.Empty):
+                lote.append(self.pendientes.get(timeout=espera))
+            while len(lote) < self.max_lote:
+                try:
+                    lote.append(self.pendientes.get_nowait())
+                except queue.Empty:
+                    break
+            if None in lote:
+                terminar = True
+                lote = [item for item in lote if item is not None]
+            # Los reintentos vencidos salen con el lote; al cerrar se intentan todos una última vez
+            while reintentos and (terminar or reintentos[0][0] <= time.monotonic()):
+                lote.append(heapq.heappop(reintentos)[2])
+            if not lote:
+                continue
+
+            for (orden, futuro, intento), error, temporal in self._enviar_lote(lote):
+                destinatario = orden["usuario"]["email"]
+                if temporal and intento < self.reintentos and not terminar:
+                    logger_mail.warning("No se pudo enviar la confirmación de la orden %s a %s (intento %s): %s",
+                                        orden["id"], destinatario, intento + 1, error)
+                    cuando = time.monotonic() + self.espera_reintento * 2 ** intento
+                    heapq.heappush(reintentos, (cuando, next(secuencia), (orden, futuro, intento + 1)))
+                    continue
+                logger_mail.error("Se descartó la confirmación de la orden %s a %s en el intento %s: %s",
+                                  orden["id"], destinatario, intento + 1, error)
+                if isinstance(error, Exception):
+                    futuro.set_exception(error)
+                else:
+                    futuro.set_result(False)
+
+    def _enviar_lote(self, lote):
+        """
+        Manda un lote de la cola y resuelve los futures de los que salieron. Devuelve los que
+        fallaron como (item, error, temporal): los errores de conexión y los 4xx son temporales.
+        """
+        try:
+            resultado = self.enviar_confirmaciones([orden for orden, _, _ in lote])
+        except Exception as e:
+            return [(item, e, True) for item in lote]
+        # Por índice y no por email: un comprador puede tener varias órdenes en el mismo lote
+        rechazos = {indice: (codigo, respuesta) for _, codigo, respuesta, indice in resultado["errores"]}
+        fallidos = []
+        for indice, item in enumerate(lote):
+            rechazo = rechazos.get(indice)
+            if rechazo is None:
+                item[1].set_result(True)
+            else:
+                fallidos.append((item, rechazo, 400 <= rechazo[0] < 500))
+        return fallidos
+
+    def cerrar(self):
+        """
+        Espera a que salgan las confirmaciones encoladas y cierra los pools.
+        """
+        with self.lock:
+            despachador, self.despachador = self.despachador, None
+        if despachador is not None:
+            self.pendientes.put(None)
+            despachador.join()
+        self.hilos.shutdown(wait=True)
+        if self.renderizador is not None:
+            self.renderizador.shutdown(wait=True)
+        self.pool.cerrar()
+
+
+def servicio_mail_smtp(servicio):
+    """
+    Adapta un ServicioMail a la interfaz de dict que usa confirmar_pago.
+    """
+    return {
+        "enviar_confirmacion": servicio.enviar_confirmacion,
+        "enviar_confirmaciones": servicio.enviar_confirmaciones,
+        "enviar_cancelaciones": servicio.enviar_cancelaciones,
+        "cerrar": servicio.cerrar,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def servicio_mail_configurado():
+    """
+    Servicio de mail del proceso armado con la configuración EMAIL_* de settings.
+    Sin EMAIL_HOST no hay SMTP configurado y se usa el simulador.
+    """
+    if not settings.EMAIL_HOST:
+        from .views import servicio_mail_simple
+        return servicio_mail_simple()
+
+    pool = PoolSMTP(
+        settings.EMAIL_HOST,
+        settings.EMAIL_PORT,
+        tamaño=settings.MAIL_CONFIRMACIONES["conexiones"],
+        usuario=settings.EMAIL_HOST_USER,
+        password=settings.EMAIL_HOST_PASSWORD,
+        usar_tls=settings.EMAIL_USE_TLS,
+        timeout=settings.EMAIL_TIMEOUT or 30,
+    )
+    servicio = ServicioMail(pool, settings.DEFAULT_FROM_EMAIL, procesos=settings.MAIL_CONFIRMACIONES["procesos"],
+                            reintentos=settings.MAIL_CONFIRMACIONES["reintentos"])
+    # Al terminar el worker salen las confirmaciones que quedaron en la cola
+    atexit.register(servicio.cerrar)
+    return servicio_mail_smtp(servicio)
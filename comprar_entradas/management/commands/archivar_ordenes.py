@@ -0,0 +1,34 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.archivo import archivar_meses, directorio_archivo
+
+
+class Command(BaseCommand):
+    help = ("Mueve las órdenes de meses ya cerrados (todas sus fechas de visita pasaron) a archivos "
+            ".jsonl.gz por mes y las borra de las tablas calientes. Se puede correr todos los días.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hoy", help="fecha de referencia YYYY-MM-DD (por defecto, hoy): se archivan "
+                                          "los meses anteriores al de esta fecha")
+        parser.add_argument("--lote", type=int, default=500, help="órdenes por consulta y por borrado")
+
+    def handle(self, *args, **options):
+        hoy = None
+        if options["hoy"]:
+            try:
+                hoy = datetime.date.fromisoformat(options["hoy"])
+            except ValueError:
+                raise CommandError("--hoy debe tener formato YYYY-MM-DD")
+        if options["lote"] < 1:
+            raise CommandError("--lote debe ser positivo")
+
+        resultado = archivar_meses(hoy, lote=options["lote"])
+        if not resultado:
+            self.stdout.write("No hay meses cerrados para archivar")
+            return
+
+        for mes, archivadas, borradas in resultado:
+            self.stdout.write(f"{mes:%Y-%m}: {archivadas} órdenes archivadas, {borradas} borradas de las tablas calientes")
+        self.stdout.write(self.style.SUCCESS(f"Archivo en {directorio_archivo()}"))
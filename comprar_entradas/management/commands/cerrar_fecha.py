@@ -0,0 +1,53 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.cancelacion import cerrar_fecha
+from comprar_entradas.servicios import servicios_configurados
+
+
+class Command(BaseCommand):
+    help = ("Cierra el parque en una fecha ya vendida: cancela todas sus órdenes, reintegra las pagadas "
+            "y avisa por mail. Si se corta, volver a correrlo retoma donde quedó.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("fecha", help="fecha de visita a cerrar, YYYY-MM-DD")
+        parser.add_argument("--motivo", required=True, help="motivo del cierre, se incluye en el mail")
+        parser.add_argument("--lote", type=int, default=1000, help="órdenes por transacción")
+        parser.add_argument("--concurrencia", type=int, default=8,
+                            help="pedidos de reintegro y mails en paralelo")
+        parser.add_argument("--reembolsos-por-segundo", type=float, default=50,
+                            help="límite de pedidos de reintegro al proveedor de pagos")
+        parser.add_argument("--mails-por-segundo", type=float, default=100, help="límite de mails enviados")
+
+    def handle(self, *args, **options):
+        try:
+            fecha = datetime.date.fromisoformat(options["fecha"])
+        except ValueError:
+            raise CommandError("La fecha debe tener formato YYYY-MM-DD")
+        if options["lote"] < 1 or options["concurrencia"] < 1:
+            raise CommandError("--lote y --concurrencia deben ser positivos")
+
+        servicios = servicios_configurados()
+        resumen = cerrar_fecha(
+            fecha,
+            options["motivo"],
+            servicios["enrutador_pagos"],
+            servicio_mail=servicios["servicio_mail"],
+            lote=options["lote"],
+            concurrencia=options["concurrencia"],
+            reembolsos_por_segundo=options["reembolsos_por_segundo"],
+            mails_por_segundo=options["mails_por_segundo"],
+        )
+
+        self.stdout.write(f"Órdenes canceladas: {resumen['canceladas']}")
+        self.stdout.write(f"Reintegros realizados: {resumen['reembolsos_realizados']}")
+        self.stdout.write(f"Mails enviados: {resumen['mails']}")
+        if resumen["mails_fallidos"]:
+            self.stdout.write(self.style.WARNING(
+                f"Mails fallidos: {resumen['mails_fallidos']} (volver a correr para reintentarlos)"))
+        if resumen["reembolsos_fallidos"]:
+            self.stdout.write(self.style.WARNING(
+                f"Reintegros fallidos: {resumen['reembolsos_fallidos']} (volver a correr para reintentarlos)"))
+        if not resumen["mails_fallidos"] and not resumen["reembolsos_fallidos"]:
+            self.stdout.write(self.style.SUCCESS(f"Cierre del {fecha} completo"))
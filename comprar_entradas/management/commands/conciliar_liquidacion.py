@@ -0,0 +1,49 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.conciliacion import ErrorLiquidacion, ejecutar_conciliacion
+from comprar_entradas.mail import servicio_mail_configurado
+
+
+class Command(BaseCommand):
+    help = ("Concilia la liquidación diaria del proveedor de pagos (CSV con id_orden, id_pago, monto) "
+            "contra las órdenes y escribe un reporte CSV con las discrepancias.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("liquidacion", help="CSV de liquidación, ordenado por id_orden")
+        parser.add_argument("--fecha", required=True, help="día liquidado, YYYY-MM-DD")
+        parser.add_argument("--reporte", required=True, help="CSV de salida con las discrepancias")
+        parser.add_argument("--aplicar", action="store_true",
+                            help="marcar pagadas (y avisar por mail) las órdenes cobradas sin notificación")
+        parser.add_argument("--lote", type=int, default=1000, help="órdenes por UPDATE al aplicar")
+        parser.add_argument("--ordenar", action="store_true",
+                            help="ordenar la liquidación antes de conciliar (ordenamiento externo)")
+
+    def handle(self, *args, **options):
+        try:
+            fecha = datetime.date.fromisoformat(options["fecha"])
+        except ValueError:
+            raise CommandError("--fecha debe tener formato YYYY-MM-DD")
+        if options["lote"] < 1:
+            raise CommandError("--lote debe ser positivo")
+
+        try:
+            resumen = ejecutar_conciliacion(
+                options["liquidacion"],
+                fecha,
+                options["reporte"],
+                aplicar=options["aplicar"],
+                lote=options["lote"],
+                ordenar=options["ordenar"],
+                servicio_mail=servicio_mail_configurado(),
+            )
+        except (ErrorLiquidacion, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Cobros leídos: {resumen.pop('cobros', 0)}")
+        aplicadas = resumen.pop("aplicadas", 0)
+        for tipo, cantidad in sorted(resumen.items()):
+            self.stdout.write(f"{tipo}: {cantidad}")
+        if options["aplicar"]:
+            self.stdout.write(self.style.SUCCESS(f"Órdenes marcadas pagadas: {aplicadas}"))
@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.franjas import generar_franjas
+from comprar_entradas.instantanea import feriados_vigentes
+from comprar_entradas.models import FranjaIngreso
+from comprar_entradas.views import proveedor_horarios_simple
+
+
+class Command(BaseCommand):
+    help = ("Crea las franjas de ingreso por horario de un rango de fechas (por ejemplo una temporada), "
+            "salvo los días que el parque está cerrado. Las franjas que ya existen no se tocan.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", required=True, help="primera fecha, YYYY-MM-DD")
+        parser.add_argument("--hasta", required=True, help="última fecha, YYYY-MM-DD")
+        parser.add_argument("--apertura", default="09:00", help="inicio de la primera franja, HH:MM")
+        parser.add_argument("--cierre", default="18:00", help="no se crean franjas que empiecen a esta hora o después")
+        parser.add_argument("--minutos", type=int, default=15, help="duración de cada franja")
+        parser.add_argument("--capacidad", type=int, required=True, help="entradas por franja")
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.date.fromisoformat(options["desde"])
+            hasta = datetime.date.fromisoformat(options["hasta"])
+            apertura = datetime.time.fromisoformat(options["apertura"])
+            cierre = datetime.time.fromisoformat(options["cierre"])
+        except ValueError:
+            raise CommandError("Fechas con formato YYYY-MM-DD y horas con formato HH:MM")
+        if desde > hasta or apertura >= cierre:
+            raise CommandError("El rango de fechas o de horas está invertido")
+        if options["minutos"] < 1 or options["capacidad"] < 1:
+            raise CommandError("--minutos y --capacidad deben ser positivos")
+
+        feriados = feriados_vigentes()
+
+        def cerrado(fecha):
+            return fecha in feriados or not proveedor_horarios_simple(fecha)
+
+        franjas = list(generar_franjas(desde, hasta, apertura, cierre, options["minutos"], options["capacidad"],
+                                       cerrado))
+        FranjaIngreso.objects.bulk_create(franjas, ignore_conflicts=True, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Franjas generadas: {len(franjas)} "
+                                             f"({len({f.fecha for f in franjas})} días abiertos)"))
@@ -0,0 +1,24 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from comprar_entradas.repositorio import expirar_pendientes
+
+
+class Command(BaseCommand):
+    help = ("Pasa a EXPIRADA las reservas con tarjeta que no se pagaron a tiempo y devuelve su cupo. "
+            "Pensado para correr periódicamente (cron); puede convivir con los webhooks de pago.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutos", type=int, default=30,
+                            help="minutos que se guarda una reserva con tarjeta sin pagar")
+        parser.add_argument("--lote", type=int, default=500, help="órdenes por transacción")
+
+    def handle(self, *args, **options):
+        if options["minutos"] < 1 or options["lote"] < 1:
+            raise CommandError("--minutos y --lote deben ser positivos")
+
+        limite = timezone.now() - datetime.timedelta(minutes=options["minutos"])
+        expiradas = expirar_pendientes(limite, lote=options["lote"])
+        self.stdout.write(self.style.SUCCESS(f"Reservas expiradas: {expiradas}"))
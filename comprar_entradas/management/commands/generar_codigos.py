@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.descuentos import generar_codigos
+from comprar_entradas.models import Campania
+
+
+class Command(BaseCommand):
+    help = ("Genera códigos de descuento para una campaña: guarda sus hashes y escribe los códigos en un "
+            "archivo, que es la única copia legible (la base no permite recuperarlos).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("campania", help="nombre de la campaña (ver admin)")
+        parser.add_argument("cantidad", type=int)
+        parser.add_argument("--salida", required=True, help="archivo donde escribir los códigos, uno por línea")
+        parser.add_argument("--usos", type=int, default=1, help="usos por código; 0 = sin límite")
+
+    def handle(self, *args, **options):
+        if options["cantidad"] < 1 or options["usos"] < 0:
+            raise CommandError("cantidad debe ser positiva y --usos no negativo")
+        try:
+            campania = Campania.objects.get(nombre=options["campania"])
+        except Campania.DoesNotExist:
+            raise CommandError(f"No existe la campaña {options['campania']}")
+
+        inicio = time.perf_counter()
+        try:
+            with open(options["salida"], "x", encoding="utf-8") as destino:
+                generados = generar_codigos(campania, options["cantidad"], destino, options["usos"] or None)
+        except FileExistsError:
+            raise CommandError(f"{options['salida']} ya existe; no se sobrescriben códigos emitidos")
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Códigos generados: {generados} en {duracion:.1f}s ({generados / max(duracion, 1e-9):,.0f}/s)"))
@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.instantanea import generar_instantanea
+
+
+class Command(BaseCommand):
+    help = ("Regenera la instantánea del registro de socios y del calendario de cierres que los workers "
+            "leen por mmap, y la publica con un rename atómico (los workers la toman sin reiniciar).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ruta", help="por defecto settings.INSTANTANEA_REGISTRO")
+
+    def handle(self, *args, **options):
+        ruta = options["ruta"] or settings.INSTANTANEA_REGISTRO
+        if not ruta:
+            raise CommandError("Indique --ruta o configure INSTANTANEA_REGISTRO")
+
+        inicio = time.perf_counter()
+        try:
+            emails, fechas = generar_instantanea(ruta)
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Instantánea {ruta}: {emails} socios, {fechas} fechas cerradas ({time.perf_counter() - inicio:.1f}s)"))
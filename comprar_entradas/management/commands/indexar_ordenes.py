@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from comprar_entradas.busqueda import indexar_ordenes
+from comprar_entradas.models import Orden
+
+
+class Command(BaseCommand):
+    help = ("Agrega al índice de búsqueda las órdenes que no lo tienen (las guardadas antes de que "
+            "existiera). Las nuevas se indexan solas al guardarse; se puede volver a correr.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=2000, help="órdenes por transacción")
+
+    def handle(self, *args, **options):
+        if options["lote"] < 1:
+            raise CommandError("--lote debe ser positivo")
+
+        indexadas = 0
+        ultimo = 0
+        while True:
+            ordenes = list(
+                Orden.objects.filter(pk__gt=ultimo, indice__isnull=True).order_by("pk")
+                .prefetch_related("lineas")[:options["lote"]]
+            )
+            if not ordenes:
+                break
+            ultimo = ordenes[-1].pk
+            with transaction.atomic():
+                indexadas += indexar_ordenes(ordenes)
+        self.stdout.write(self.style.SUCCESS(f"Órdenes indexadas: {indexadas}"))
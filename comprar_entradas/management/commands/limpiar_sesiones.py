@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+# Motores que guardan las sesiones en la tabla django_session
+MOTORES_EN_BASE = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+class Command(BaseCommand):
+    help = ("Borra las sesiones vencidas de la base en lotes chicos, para no retener el lock de "
+            "escritura. Pensado para correr periódicamente (cron) cuando SESIONES=db.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="sesiones borradas por transacción")
+
+    def handle(self, *args, **options):
+        if options["lote"] < 1:
+            raise CommandError("--lote debe ser positivo")
+        if settings.SESSION_ENGINE not in MOTORES_EN_BASE:
+            # Las cookies firmadas vencen solas y el cache expira sus claves
+            self.stdout.write(f"Las sesiones no están en la base ({settings.SESSION_ENGINE}); nada para limpiar")
+            return
+
+        ahora = timezone.now()
+        borradas = 0
+        while True:
+            claves = list(
+                Session.objects.filter(expire_date__lt=ahora).values_list("session_key", flat=True)[:options["lote"]]
+            )
+            if not claves:
+                break
+            with transaction.atomic():
+                Session.objects.filter(session_key__in=claves).delete()
+            borradas += len(claves)
+        self.stdout.write(self.style.SUCCESS(f"Sesiones vencidas borradas: {borradas}"))
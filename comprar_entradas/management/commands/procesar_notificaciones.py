@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.servicios import servicios_configurados
+from comprar_entradas.webhooks import procesar_notificaciones
+
+
+class Command(BaseCommand):
+    help = ("Aplica en lotes las notificaciones de pago encoladas por /api/v1/notificaciones-pago: "
+            "marca pagadas las órdenes y manda las confirmaciones. Sin --esperar vacía la cola y termina.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=500, help="notificaciones por transacción")
+        parser.add_argument("--esperar", type=float, default=0,
+                            help="segundos entre revisiones de la cola vacía; si se indica, no termina nunca")
+
+    def handle(self, *args, **options):
+        if options["lote"] < 1 or options["esperar"] < 0:
+            raise CommandError("--lote debe ser positivo y --esperar no puede ser negativo")
+
+        # Los mismos servicios que los requests: el pool SMTP queda abierto entre lotes
+        servicios = servicios_configurados()
+        while True:
+            resultados = procesar_notificaciones(lote=options["lote"], reloj=servicios["reloj"],
+                                                 servicio_mail=servicios["servicio_mail"])
+            if resultados:
+                resumen = ", ".join(f"{resultado}: {cantidad}" for resultado, cantidad in sorted(resultados.items()))
+                self.stdout.write(self.style.SUCCESS(f"Notificaciones procesadas ({resumen})"))
+            if not options["esperar"]:
+                return
+            if not resultados:
+                time.sleep(options["esperar"])
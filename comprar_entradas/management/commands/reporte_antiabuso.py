@@ -0,0 +1,27 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from comprar_entradas.antiabuso import reporte_compartido
+
+
+class Command(BaseCommand):
+    help = ("Muestra los emails, IPs y compras repetidas que el anti-abuso marcó o frenó en la ventana "
+            "actual, sumando lo publicado por todos los workers en el cache compartido.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=50, help="cantidad máxima de filas")
+        parser.add_argument("--solo-frenadas", action="store_true", help="omitir las claves solo marcadas")
+
+    def handle(self, *args, **options):
+        filas = reporte_compartido()
+        if options["solo_frenadas"]:
+            filas = [fila for fila in filas if fila["decision"] == "frenar"]
+        if not filas:
+            self.stdout.write("Sin claves marcadas ni frenadas en la ventana actual")
+            return
+
+        for fila in filas[:options["limite"]]:
+            ultimo = datetime.datetime.fromtimestamp(fila["ultimo"]).strftime("%H:%M:%S")
+            self.stdout.write(f"{fila['decision']:<7} {fila['dimension']:<7} {fila['clave']}  "
+                              f"intentos≈{fila['estimado']} veces={fila['veces']} último={ultimo}")
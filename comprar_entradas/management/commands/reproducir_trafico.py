@@ -0,0 +1,196 @@
+import collections
+import datetime
+import heapq
+import http.cookiejar
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.captura import HEADER_REPRODUCCION
+
+
+def leer_registros(rutas):
+    """
+    Lee uno o más NDJSON de captura (incluidos los rotados) y los devuelve en orden de tiempo.
+    Cada archivo ya está ordenado, así que se mezclan en streaming sin cargarlos en memoria.
+    """
+    def registros(ruta):
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                if linea.strip():
+                    yield json.loads(linea)
+
+    return heapq.merge(*(registros(ruta) for ruta in rutas), key=lambda registro: registro["ts"])
+
+
+def preparar_body(registro, email=None, desplazamiento=None):
+    """
+    Adapta el body capturado para reproducirlo: reemplaza los seudónimos por un email registrado
+    y mueve las fechas de visita para que no queden en el pasado.
+    """
+    body = registro.get("body") or ""
+    if not body:
+        return b""
+
+    def ajustar(nombre, valor):
+        if email and nombre.endswith("email"):
+            return email
+        if desplazamiento and nombre == "fecha_visita":
+            try:
+                return (datetime.date.fromisoformat(valor) + desplazamiento).isoformat()
+            except ValueError:
+                return valor
+        return valor
+
+    if registro["content_type"].startswith("application/json"):
+        def recorrer(datos):
+            if isinstance(datos, dict):
+                return {n: recorrer(v) if isinstance(v, (dict, list)) else ajustar(n, v) for n, v in datos.items()}
+            if isinstance(datos, list):
+                return [recorrer(item) for item in datos]
+            return datos
+        return json.dumps(recorrer(json.loads(body))).encode()
+
+    campos = parse_qsl(body, keep_blank_values=True)
+    return urlencode([(n, ajustar(n, v)) for n, v in campos]).encode()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class Cliente(threading.local):
+    """
+    Un opener con cookies por hilo: cada hilo simula un navegador con su propio token CSRF.
+    """
+
+    def __init__(self):
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def token_csrf(self, url, timeout):
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken":
+                return cookie.value
+        request = urllib.request.Request(url, headers={HEADER_REPRODUCCION: "1"})
+        self.opener.open(request, timeout=timeout).read()
+        return next((cookie.value for cookie in self.cookies if cookie.name == "csrftoken"), "")
+
+
+class Command(BaseCommand):
+    help = "Reproduce tráfico capturado por CapturaTraficoMiddleware contra un servidor y reporta latencias"
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivos", nargs="+", help="NDJSON de captura (pueden ser los rotados)")
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="servidor destino")
+        parser.add_argument("--velocidad", default="1", help="factor de tiempo: 1, 10, ... o 'max'")
+        parser.add_argument("--concurrencia", type=int, default=8, help="requests en vuelo como máximo")
+        parser.add_argument("--email", help="email registrado que reemplaza a los seudónimos capturados")
+        parser.add_argument("--desplazar-fechas", action="store_true",
+                            help="mover las fechas de visita tantos días como pasaron desde la captura")
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        if options["velocidad"] == "max":
+            velocidad = None
+        else:
+            try:
+                velocidad = float(options["velocidad"])
+            except ValueError:
+                raise CommandError("--velocidad debe ser un número o 'max'")
+            if velocidad <= 0:
+                raise CommandError("--velocidad debe ser positiva")
+
+        self.url = options["url"].rstrip("/")
+        self.timeout = options["timeout"]
+        self.cliente = Cliente()
+        self.latencias = []
+        self.retrasos = []
+        self.estados = collections.Counter()
+        self.lock = threading.Lock()
+
+        en_vuelo = threading.BoundedSemaphore(options["concurrencia"])
+        registros = leer_registros(options["archivos"])
+        primero = next(registros, None)
+        if primero is None:
+            raise CommandError("No hay registros para reproducir")
+
+        desplazamiento = None
+        if options["desplazar_fechas"]:
+            desplazamiento = datetime.date.today() - datetime.date.fromtimestamp(primero["ts"])
+
+        inicio_captura = primero["ts"]
+        inicio = time.perf_counter()
+        total = 0
+
+        with ThreadPoolExecutor(max_workers=options["concurrencia"]) as pool:
+            for registro in _encadenar(primero, registros):
+                programado = inicio
+                if velocidad is not None:
+                    programado += (registro["ts"] - inicio_captura) / velocidad
+                    espera = programado - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+
+                body = preparar_body(registro, options["email"], desplazamiento)
+                en_vuelo.acquire()
+                pool.submit(self.enviar, registro, body, programado, en_vuelo)
+                total += 1
+
+        self.reportar(total, time.perf_counter() - inicio)
+
+    def enviar(self, registro, body, programado, en_vuelo):
+        try:
+            url = self.url + registro["ruta"] + (f"?{registro['query']}" if registro.get("query") else "")
+            headers = {HEADER_REPRODUCCION: "1"}
+            if body:
+                headers["Content-Type"] = registro["content_type"]
+            if registro["metodo"] == "POST" and registro["content_type"].startswith("application/x-www-form"):
+                token = self.cliente.token_csrf(self.url + registro["ruta"], self.timeout)
+                body += f"&csrfmiddlewaretoken={token}".encode()
+                headers["X-CSRFToken"] = token
+
+            request = urllib.request.Request(url, data=body or None, method=registro["metodo"], headers=headers)
+            despacho = time.perf_counter()
+            try:
+                with self.cliente.opener.open(request, timeout=self.timeout) as respuesta:
+                    respuesta.read()
+                    estado = respuesta.status
+            except urllib.error.HTTPError as e:
+                estado = e.code
+            except (urllib.error.URLError, OSError):
+                estado = "error_conexion"
+
+            with self.lock:
+                self.latencias.append(time.perf_counter() - despacho)
+                self.retrasos.append(max(0.0, despacho - programado))
+                self.estados[estado] += 1
+        finally:
+            en_vuelo.release()
+
+    def reportar(self, total, duracion):
+        errores = sum(c for estado, c in self.estados.items() if not isinstance(estado, int) or estado >= 500)
+        rechazos = sum(c for estado, c in self.estados.items() if isinstance(estado, int) and 400 <= estado < 500)
+        ms = lambda p: percentil(self.latencias, p) * 1000
+
+        self.stdout.write(f"Requests: {total} en {duracion:.1f}s ({total / duracion:.1f} req/s)")
+        self.stdout.write(f"Latencia ms: p50={ms(.5):.1f} p90={ms(.9):.1f} p99={ms(.99):.1f} "
+                          f"max={max(self.latencias, default=0) * 1000:.1f}")
+        self.stdout.write(f"Retraso de despacho p99: {percentil(self.retrasos, .99) * 1000:.1f} ms "
+                          f"(si crece, falta --concurrencia)")
+        self.stdout.write(f"Errores (5xx/conexión): {errores} ({errores / total:.2%}), 4xx: {rechazos} ({rechazos / total:.2%})")
+        self.stdout.write("Estados: " + ", ".join(f"{estado}={c}" for estado, c in sorted(self.estados.items(), key=str)))
+
+
+def _encadenar(primero, resto):
+    yield primero
+    yield from resto
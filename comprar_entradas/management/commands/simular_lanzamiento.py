@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from comprar_entradas.simulacion import Escenario, curva_lanzamiento, dimensionar, simular
+
+
+class Command(BaseCommand):
+    help = ("Simula el día de lanzamiento de entradas (eventos discretos, reloj virtual) y reporta espera, "
+            "throughput y abandonos; con --dimensionar busca la mínima cantidad de workers que cumple el objetivo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pico", type=float, default=150, help="clientes/s en el pico de la apertura")
+        parser.add_argument("--base", type=float, default=1.0, help="clientes/s fuera del pico")
+        parser.add_argument("--decaimiento", type=float, default=600, help="segundos en que el pico baja a ~37%%")
+        parser.add_argument("--horas", type=float, default=24, help="duración simulada")
+        parser.add_argument("--capacidad", type=int, default=30000, help="entradas a la venta")
+        parser.add_argument("--workers", type=int, default=8, help="procesos atendiendo pedidos")
+        parser.add_argument("--dimensionar", action="store_true", help="buscar la mínima cantidad de workers")
+        parser.add_argument("--objetivo-espera", type=float, default=2.0, help="p95 de espera en cola (segundos)")
+        parser.add_argument("--max-abandono", type=float, default=0.01, help="fracción de clientes que abandona")
+        parser.add_argument("--semilla", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if min(options["pico"], options["horas"], options["decaimiento"]) <= 0 or options["base"] < 0:
+            raise CommandError("--pico, --horas y --decaimiento deben ser positivos y --base no negativa")
+        if options["capacidad"] < 1 or options["workers"] < 1:
+            raise CommandError("--capacidad y --workers deben ser positivos")
+
+        duracion = options["horas"] * 3600
+        escenario = Escenario(
+            curva=curva_lanzamiento(options["pico"], options["base"], decaimiento=options["decaimiento"], duracion=duracion),
+            duracion=duracion, capacidad=options["capacidad"], semilla=options["semilla"],
+        )
+        if options["dimensionar"]:
+            try:
+                resultado = dimensionar(escenario, options["objetivo_espera"], options["max_abandono"])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"Workers necesarios: {resultado['workers']} (p95 de espera <= {options['objetivo_espera']}s, "
+                f"abandono <= {options['max_abandono']:.1%})"))
+        else:
+            resultado = simular(escenario, options["workers"])
+        self.reportar(resultado)
+
+    def reportar(self, r):
+        agotado = f"{r['agotado_en'] / 60:.1f} min" if r["agotado_en"] is not None else "no se agotó"
+        self.stdout.write(f"Workers: {r['workers']}  (simulado en {r['duracion_real']:.1f}s)")
+        self.stdout.write(f"Llegadas: {r['llegadas']}  compras: {r['compras']}  pagadas: {r['pagadas']}  "
+                          f"expiradas: {r['expiradas']}  sin cupo: {r['sin_cupo']}")
+        self.stdout.write(f"Entradas vendidas: {r['vendidas']}  agotado: {agotado}")
+        self.stdout.write(f"Abandonos: {r['abandonos']} ({r['abandonos'] / max(r['llegadas'], 1):.2%})  "
+                          f"reintentos: {r['reintentos']}  errores de pago: {r['errores_pago']}")
+        self.stdout.write(f"Espera en cola s: p50={r['espera_p50']:.2f} p95={r['espera_p95']:.2f} "
+                          f"p99={r['espera_p99']:.2f}  respuesta p95={r['respuesta_p95']:.2f}  cola máx: {r['cola_max']}")
+        self.stdout.write(f"Throughput pedidos/s: pico {r['throughput_pico']:.1f}, medio {r['throughput_medio']:.2f}  "
+                          f"ocupación media {r['ocupacion']:.1%}")
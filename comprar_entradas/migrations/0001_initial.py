@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CupoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('capacidad', models.PositiveIntegerField()),
+                ('vendidas', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Orden',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usuario_nombre', models.CharField(max_length=100)),
+                ('usuario_email', models.EmailField(max_length=254)),
+                ('fecha_visita', models.DateField(db_index=True)),
+                ('tipo_pase', models.CharField(max_length=20)),
+                ('forma_pago', models.CharField(max_length=20)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PAGADA', 'Pagada')], default='PENDIENTE', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('creada_en', models.DateTimeField(null=True)),
+                ('pagada_en', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LineaOrden',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('edad', models.PositiveSmallIntegerField()),
+                ('monto', models.PositiveIntegerField()),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lineas', to='comprar_entradas.orden')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lineaorden',
+            name='fecha_visita',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0002_lineaorden_fecha_visita'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(unique=True)),
+                ('archivo', models.CharField(max_length=100)),
+                ('ordenes', models.PositiveIntegerField()),
+                ('lineas', models.PositiveIntegerField()),
+                ('id_min', models.BigIntegerField()),
+                ('id_max', models.BigIntegerField()),
+                ('fecha_min', models.DateField()),
+                ('fecha_max', models.DateField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
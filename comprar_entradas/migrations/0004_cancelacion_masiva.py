@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0003_archivomensual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreFecha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('motivo', models.CharField(max_length=200)),
+                ('creado_en', models.DateTimeField()),
+                ('ultima_orden', models.BigIntegerField(default=0)),
+                ('terminado_en', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='lineaorden',
+            name='fecha_visita',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='orden',
+            name='estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PAGADA', 'Pagada'), ('CANCELADA', 'Cancelada')], default='PENDIENTE', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='CancelacionOrden',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reembolso_estado', models.CharField(choices=[('NO_CORRESPONDE', 'No corresponde'), ('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('REALIZADO', 'Realizado'), ('FALLIDO', 'Fallido')], default='NO_CORRESPONDE', max_length=20)),
+                ('reembolso_id', models.CharField(blank=True, max_length=100)),
+                ('reembolso_intentos', models.PositiveSmallIntegerField(default=0)),
+                ('reembolso_error', models.CharField(blank=True, max_length=200)),
+                ('reclamo', models.CharField(blank=True, max_length=32)),
+                ('reclamado_en', models.DateTimeField(null=True)),
+                ('reembolsado_en', models.DateTimeField(null=True)),
+                ('mail_enviado', models.BooleanField(default=False)),
+                ('orden', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cancelacion', to='comprar_entradas.orden')),
+                ('cierre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cancelaciones', to='comprar_entradas.cierrefecha')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cierre', 'reembolso_estado'], name='comprar_ent_cierre__61d4e9_idx')],
+            },
+        ),
+    ]
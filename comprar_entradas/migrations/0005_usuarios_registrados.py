@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0004_cancelacion_masiva'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsuarioRegistrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(max_length=254, unique=True)),
+                ('nombre', models.CharField(blank=True, max_length=100)),
+                ('registrado', models.BooleanField(default=True)),
+                ('actualizado_en', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportacionUsuarios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.CharField(max_length=500)),
+                ('firma', models.CharField(max_length=100)),
+                ('ultimo_email', models.CharField(blank=True, max_length=254)),
+                ('importados', models.PositiveIntegerField(default=0)),
+                ('iniciada_en', models.DateTimeField()),
+                ('terminada_en', models.DateTimeField(null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('archivo', 'firma'), name='importacion_por_archivo')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0005_usuarios_registrados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orden',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='orden',
+            name='estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PAGADA', 'Pagada'), ('EXPIRADA', 'Expirada'), ('CANCELADA', 'Cancelada')], default='PENDIENTE', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['estado', 'creada_en'], name='comprar_ent_estado_a48e6a_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0006_version_orden'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orden',
+            name='hora_ingreso',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FranjaIngreso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('inicio', models.TimeField()),
+                ('capacidad', models.PositiveIntegerField()),
+                ('vendidas', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'inicio'), name='franja_por_fecha')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0007_franjas_ingreso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campania',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('tipo', models.CharField(choices=[('PORCENTAJE', 'Porcentaje por entrada'), ('MONTO', 'Monto fijo por orden')], max_length=20)),
+                ('valor', models.PositiveIntegerField()),
+                ('tipo_pase', models.CharField(blank=True, max_length=20)),
+                ('edad_maxima', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('minimo_entradas', models.PositiveSmallIntegerField(default=1)),
+                ('visita_desde', models.DateField(blank=True, null=True)),
+                ('visita_hasta', models.DateField(blank=True, null=True)),
+                ('vence_en', models.DateTimeField(blank=True, null=True)),
+                ('activa', models.BooleanField(default=True)),
+                ('actualizada_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lineaorden',
+            name='descuento',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orden',
+            name='descuento',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CodigoDescuento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=32, unique=True)),
+                ('usos', models.PositiveIntegerField(default=0)),
+                ('usos_maximos', models.PositiveIntegerField(blank=True, default=1, null=True)),
+                ('campania', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='codigos', to='comprar_entradas.campania')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orden',
+            name='codigo_descuento',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ordenes', to='comprar_entradas.codigodescuento'),
+        ),
+    ]
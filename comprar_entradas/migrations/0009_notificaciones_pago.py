@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0008_descuentos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionPago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden_id', models.BigIntegerField()),
+                ('estado', models.CharField(max_length=20)),
+                ('recibida_en', models.DateTimeField()),
+                ('procesada_en', models.DateTimeField(null=True)),
+                ('resultado', models.CharField(blank=True, choices=[('PAGADA', 'Marcó la orden pagada'), ('SIN_CAMBIOS', 'La orden ya no estaba pendiente'), ('INEXISTENTE', 'La orden no existe')], max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['procesada_en', 'id'], name='comprar_ent_procesa_740ed0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:09
+
+from django.db import migrations, models
+
+
+def cargar_feriados(apps, schema_editor):
+    # Los feriados que hasta ahora vivían solo en constants.FERIADOS
+    from comprar_entradas.constants import FERIADOS
+    Feriado = apps.get_model('comprar_entradas', 'Feriado')
+    Feriado.objects.bulk_create([Feriado(fecha=fecha) for fecha in FERIADOS], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0009_notificaciones_pago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('nombre', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VersionConfiguracion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('actualizada_en', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.RunPython(cargar_feriados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Índices FTS5 sobre comprar_entradas_indiceorden (tablas de contenido externo: no duplican el
+# texto) y los triggers que los mantienen. Solo en SQLite; en otras bases se busca con LIKE.
+TABLAS = {
+    'busqueda_prefijos': "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'",
+    'busqueda_trigramas': "tokenize = 'trigram'",
+}
+
+
+def crear_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabla, opciones in TABLAS.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {tabla} USING fts5(texto, fechas, content = 'comprar_entradas_indiceorden', "
+            f"content_rowid = 'orden_id', {opciones})")
+        insertar = f"INSERT INTO {tabla} (rowid, texto, fechas) VALUES (new.orden_id, new.texto, new.fechas);"
+        borrar = (f"INSERT INTO {tabla} ({tabla}, rowid, texto, fechas) "
+                  f"VALUES ('delete', old.orden_id, old.texto, old.fechas);")
+        schema_editor.execute(f"CREATE TRIGGER {tabla}_ai AFTER INSERT ON comprar_entradas_indiceorden "
+                              f"BEGIN {insertar} END")
+        schema_editor.execute(f"CREATE TRIGGER {tabla}_ad AFTER DELETE ON comprar_entradas_indiceorden "
+                              f"BEGIN {borrar} END")
+        schema_editor.execute(f"CREATE TRIGGER {tabla}_au AFTER UPDATE ON comprar_entradas_indiceorden "
+                              f"BEGIN {borrar} {insertar} END")
+
+
+def borrar_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabla in TABLAS:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {tabla}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0010_configuracion_recargable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceOrden',
+            fields=[
+                ('orden', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='indice', serialize=False, to='comprar_entradas.orden')),
+                ('texto', models.TextField()),
+                ('fechas', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(crear_fts, borrar_fts),
+    ]
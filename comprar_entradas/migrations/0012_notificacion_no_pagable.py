@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0011_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacionpago',
+            name='resultado',
+            field=models.CharField(blank=True, choices=[('PAGADA', 'Marcó la orden pagada'), ('SIN_CAMBIOS', 'La orden ya no estaba pendiente'), ('INEXISTENTE', 'La orden no existe'), ('NO_PAGABLE', 'La orden expiró o se canceló sin pagarse: hay que reintegrar el cobro')], max_length=20),
+        ),
+    ]
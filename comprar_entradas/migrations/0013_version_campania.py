@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprar_entradas', '0012_notificacion_no_pagable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campania',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
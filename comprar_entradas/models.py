@@ -0,0 +1,300 @@
+from django.db import models
+from django.db.models import F
+
+
+class CupoDiario(models.Model):
+    """
+    Capacidad de entradas vendibles para una fecha de visita.
+    """
+    fecha = models.DateField(unique=True)
+    capacidad = models.PositiveIntegerField()
+    vendidas = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.fecha}: {self.vendidas}/{self.capacidad}"
+
+
+class Orden(models.Model):
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PAGADA', 'Pagada'),
+        ('EXPIRADA', 'Expirada'),  # reserva con tarjeta que no se pagó a tiempo
+        ('CANCELADA', 'Cancelada'),
+    ]
+
+    usuario_nombre = models.CharField(max_length=100)
+    usuario_email = models.EmailField()
+    fecha_visita = models.DateField(db_index=True)
+    tipo_pase = models.CharField(max_length=20)
+    forma_pago = models.CharField(max_length=20)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    total = models.PositiveIntegerField(default=0)
+    creada_en = models.DateTimeField(null=True)
+    pagada_en = models.DateTimeField(null=True)
+    # Franja de ingreso asignada, si la fecha tiene ingreso por horario (ver FranjaIngreso)
+    hora_ingreso = models.TimeField(null=True, blank=True)
+    # Se incrementa en cada cambio de estado (ver comprar_entradas.estados)
+    version = models.PositiveIntegerField(default=0)
+    # Código canjeado y descuento total (ya restado de total), ver comprar_entradas.descuentos
+    codigo_descuento = models.ForeignKey('CodigoDescuento', null=True, blank=True, related_name='ordenes',
+                                         on_delete=models.PROTECT)
+    descuento = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Para encontrar las reservas vencidas sin recorrer todas las órdenes
+        indexes = [models.Index(fields=['estado', 'creada_en'])]
+
+    def __str__(self):
+        return f"Orden {self.pk} ({self.estado})"
+
+
+class FranjaIngreso(models.Model):
+    """
+    Ventana de ingreso de una fecha (por ejemplo de 15 minutos) con su propia capacidad, para
+    repartir la llegada en los molinetes. Las fechas sin franjas son de ingreso libre todo el día.
+    """
+    fecha = models.DateField()
+    inicio = models.TimeField()
+    capacidad = models.PositiveIntegerField()
+    vendidas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['fecha', 'inicio'], name='franja_por_fecha')]
+
+    def __str__(self):
+        return f"{self.fecha} {self.inicio:%H:%M}: {self.vendidas}/{self.capacidad}"
+
+
+class LineaOrden(models.Model):
+    orden = models.ForeignKey(Orden, related_name='lineas', on_delete=models.CASCADE)
+    nombre = models.CharField(max_length=100)
+    edad = models.PositiveSmallIntegerField()
+    monto = models.PositiveIntegerField()  # lo que se cobra, ya con el descuento
+    descuento = models.PositiveIntegerField(default=0)
+    # Solo en órdenes de varias fechas; si es null la entrada es para orden.fecha_visita
+    fecha_visita = models.DateField(null=True, blank=True, db_index=True)
+
+
+class ArchivoMensual(models.Model):
+    """
+    Un mes de órdenes ya cerradas que se movió de las tablas calientes a un .jsonl.gz
+    (ver comprar_entradas.archivo). Los rangos sirven para saber qué archivos leer.
+    """
+    mes = models.DateField(unique=True)  # primer día del mes
+    archivo = models.CharField(max_length=100)  # relativo a settings.ARCHIVO_ORDENES_DIR
+    ordenes = models.PositiveIntegerField()
+    lineas = models.PositiveIntegerField()
+    id_min = models.BigIntegerField()
+    id_max = models.BigIntegerField()
+    fecha_min = models.DateField()
+    fecha_max = models.DateField()
+    sha256 = models.CharField(max_length=64)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m}: {self.ordenes} órdenes"
+
+
+class CierreFecha(models.Model):
+    """
+    Cierre del parque en una fecha ya vendida (ver comprar_entradas.cancelacion).
+    Es el checkpoint del proceso: se puede volver a correr y retoma donde quedó.
+    """
+    fecha = models.DateField(unique=True)
+    motivo = models.CharField(max_length=200)
+    creado_en = models.DateTimeField()
+    ultima_orden = models.BigIntegerField(default=0)  # última orden cancelada, en orden de pk
+    terminado_en = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"Cierre {self.fecha} ({self.motivo})"
+
+
+class CancelacionOrden(models.Model):
+    """
+    Una orden cancelada por un cierre, con el estado de su reintegro y de su aviso por mail.
+    La fila es única por orden: un reintegro se reclama con un UPDATE condicional antes de
+    pedirlo, y se pide con una clave de idempotencia fija, así nunca se reintegra dos veces.
+    """
+    REEMBOLSO_CHOICES = [
+        ('NO_CORRESPONDE', 'No corresponde'),  # la orden no estaba pagada
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('REALIZADO', 'Realizado'),
+        ('FALLIDO', 'Fallido'),
+    ]
+
+    orden = models.OneToOneField(Orden, related_name='cancelacion', on_delete=models.CASCADE)
+    cierre = models.ForeignKey(CierreFecha, related_name='cancelaciones', on_delete=models.CASCADE)
+    reembolso_estado = models.CharField(max_length=20, choices=REEMBOLSO_CHOICES, default='NO_CORRESPONDE')
+    reembolso_id = models.CharField(max_length=100, blank=True)
+    reembolso_intentos = models.PositiveSmallIntegerField(default=0)
+    reembolso_error = models.CharField(max_length=200, blank=True)
+    reclamo = models.CharField(max_length=32, blank=True)
+    reclamado_en = models.DateTimeField(null=True)
+    reembolsado_en = models.DateTimeField(null=True)
+    mail_enviado = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['cierre', 'reembolso_estado'])]
+
+
+class UsuarioRegistrado(models.Model):
+    """
+    Socio importado del CRM (ver comprar_entradas.importacion_usuarios). El email se guarda
+    normalizado, así que se busca con el mismo normalizar_email.
+    """
+    email = models.CharField(max_length=254, unique=True)
+    nombre = models.CharField(max_length=100, blank=True)
+    registrado = models.BooleanField(default=True)
+    actualizado_en = models.DateTimeField()
+
+    def __str__(self):
+        return self.email
+
+
+class ImportacionUsuarios(models.Model):
+    """
+    Checkpoint de una importación: el archivo se recorre ordenado por email, así que alcanza
+    con el último email guardado para retomar. Se identifica por ruta, tamaño y fecha del archivo.
+    """
+    archivo = models.CharField(max_length=500)
+    firma = models.CharField(max_length=100)
+    ultimo_email = models.CharField(max_length=254, blank=True)
+    importados = models.PositiveIntegerField(default=0)
+    iniciada_en = models.DateTimeField()
+    terminada_en = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['archivo', 'firma'], name='importacion_por_archivo')]
+
+    def __str__(self):
+        return f"{self.archivo} ({self.importados} importados)"
+
+
+class CampaniaQuerySet(models.QuerySet):
+    def update(self, **cambios):
+        # También las escrituras masivas (acciones del admin, shell) tienen que subir la versión
+        cambios.setdefault("version", F("version") + 1)
+        return super().update(**cambios)
+
+
+class Campania(models.Model):
+    """
+    Campaña de descuento: las reglas que comparten todos sus códigos. Se compila una vez por
+    proceso y por versión, ver comprar_entradas.descuentos. La versión sube en cada escritura,
+    sea save() o queryset.update(); actualizada_en no alcanza porque update() no la toca.
+    """
+    TIPO_CHOICES = [
+        ('PORCENTAJE', 'Porcentaje por entrada'),
+        ('MONTO', 'Monto fijo por orden'),
+    ]
+
+    nombre = models.CharField(max_length=100, unique=True)
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    valor = models.PositiveIntegerField()  # porcentaje, o pesos de descuento por orden
+    tipo_pase = models.CharField(max_length=20, blank=True)  # vacío: cualquier pase
+    edad_maxima = models.PositiveSmallIntegerField(null=True, blank=True)  # solo entradas hasta esta edad
+    minimo_entradas = models.PositiveSmallIntegerField(default=1)
+    visita_desde = models.DateField(null=True, blank=True)
+    visita_hasta = models.DateField(null=True, blank=True)
+    vence_en = models.DateTimeField(null=True, blank=True)
+    activa = models.BooleanField(default=True)
+    actualizada_en = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=0)
+
+    objects = CampaniaQuerySet.as_manager()
+
+    def __str__(self):
+        return self.nombre
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        # Con F dos ediciones concurrentes no pueden dejar la misma versión
+        self.version = F("version") + 1
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=["version"])
+
+
+class CodigoDescuento(models.Model):
+    """
+    Un código canjeable de una campaña. Solo se guarda su hash: una copia de la base no
+    alcanza para usar los códigos. El canje es un UPDATE condicional sobre usos (ver
+    repositorio.canjear_codigo), así dos compras no pueden usar a la vez un código de un uso.
+    """
+    hash = models.CharField(max_length=32, unique=True)
+    campania = models.ForeignKey(Campania, related_name='codigos', on_delete=models.CASCADE)
+    usos = models.PositiveIntegerField(default=0)
+    usos_maximos = models.PositiveIntegerField(null=True, blank=True, default=1)  # None: sin límite
+
+    def __str__(self):
+        return f"{self.campania} ({self.usos}/{self.usos_maximos or '∞'})"
+
+
+class NotificacionPago(models.Model):
+    """
+    Notificación del proveedor de pagos, encolada tal como llegó (ver comprar_entradas.webhooks).
+    El webhook solo la inserta y responde 202; procesar_notificaciones las aplica en lotes.
+    """
+    RESULTADO_CHOICES = [
+        ('PAGADA', 'Marcó la orden pagada'),
+        ('SIN_CAMBIOS', 'La orden ya no estaba pendiente'),
+        ('INEXISTENTE', 'La orden no existe'),
+        ('NO_PAGABLE', 'La orden expiró o se canceló sin pagarse: hay que reintegrar el cobro'),
+    ]
+
+    orden_id = models.BigIntegerField()  # sin FK: puede llegar la de una orden archivada o inexistente
+    estado = models.CharField(max_length=20)
+    recibida_en = models.DateTimeField()
+    procesada_en = models.DateTimeField(null=True)
+    resultado = models.CharField(max_length=20, choices=RESULTADO_CHOICES, blank=True)
+
+    class Meta:
+        # El consumidor toma las pendientes en orden de llegada
+        indexes = [models.Index(fields=['procesada_en', 'id'])]
+
+    def __str__(self):
+        return f"Notificación {self.pk} de la orden {self.orden_id}"
+
+
+class Feriado(models.Model):
+    """
+    Día en que el parque no abre. Se editan en el admin y los workers los toman sin reiniciar
+    (ver comprar_entradas.configuracion); la migración inicial carga constants.FERIADOS.
+    """
+    fecha = models.DateField(unique=True)
+    nombre = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"{self.fecha} {self.nombre}".strip()
+
+
+class VersionConfiguracion(models.Model):
+    """
+    Sello de versión de una parte de la configuración recargable (por ejemplo "calendario"):
+    se incrementa con cada cambio y los workers lo consultan para saber si tienen que rearmarla.
+    """
+    clave = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    actualizada_en = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.clave} v{self.version}"
+
+
+class IndiceOrden(models.Model):
+    """
+    Texto de búsqueda de una orden (ver comprar_entradas.busqueda): nombres de los visitantes,
+    comprador, email y códigos de entrada, en minúsculas y sin acentos, y sus fechas de visita.
+    Se escribe junto con la orden. En SQLite dos tablas FTS5 lo indexan por prefijo y por
+    trigramas, y se mantienen solas con triggers sobre esta tabla.
+    """
+    orden = models.OneToOneField(Orden, primary_key=True, related_name='indice', on_delete=models.CASCADE)
+    texto = models.TextField()
+    fechas = models.TextField()  # AAAAMMDD separadas por espacios
+
+    def __str__(self):
+        return f"Índice de la orden {self.orden_id}"
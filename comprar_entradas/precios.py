@@ -0,0 +1,45 @@
+import bisect
+import functools
+
+from .tipos import Precio, desde_centavos
+from .views import motor_precios_simple
+
+# Tabla de precios para cotizar en vivo mientras el usuario arma la lista de visitantes.
+# El precio depende solo de (clase de fecha, tipo de pase, franja de edad): el motor se
+# consulta una vez por combinación con una edad representativa de la franja y después todo
+# sale de la tabla memoizada. Cambiar VERSION_TABLA invalida los ETag ya emitidos.
+VERSION_TABLA = 1
+
+# (edad desde, nombre de la franja); la franja va hasta la edad anterior a la siguiente
+FRANJAS_EDAD = ((0, "BEBE"), (3, "MENOR"), (13, "ADULTO"), (65, "MAYOR"))
+_DESDE_FRANJA = [desde for desde, _ in FRANJAS_EDAD]
+EDAD_MAXIMA = 120
+
+
+def clase_fecha(fecha):
+    return "FIN_DE_SEMANA" if fecha.weekday() >= 5 else "SEMANA"
+
+
+def franja_edad(edad):
+    return FRANJAS_EDAD[bisect.bisect_right(_DESDE_FRANJA, edad) - 1]
+
+
+@functools.lru_cache(maxsize=None)
+def precio_tabla(clase, tipo_pase, franja, motor_precios=motor_precios_simple):
+    """
+    Precio de una combinación; franja es una tupla de FRANJAS_EDAD. Se calcula una sola vez por proceso.
+    """
+    desde, _ = franja
+    return Precio.desde(motor_precios({"edad": desde, "clase_fecha": clase}, tipo_pase))
+
+
+def cotizar(fecha, tipo_pase, edades, motor_precios=motor_precios_simple):
+    """
+    Precio de cada edad y total, sin construir el borrador de la orden.
+    """
+    clase = clase_fecha(fecha)
+    precios = [precio_tabla(clase, tipo_pase, franja_edad(edad), motor_precios) for edad in edades]
+    return {
+        "lineas": [{"edad": edad, "precio": precio.monto} for edad, precio in zip(edades, precios)],
+        "total": desde_centavos(sum(precio.centavos for precio in precios)),
+    }
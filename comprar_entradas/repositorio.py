@@ -0,0 +1,313 @@
+import collections
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .busqueda import indice_de
+from .cache_ordenes import invalidar_ordenes
+from .descuentos import buscar_descuento
+from .estados import ConflictoDeVersion, puede_transicionar
+from .importacion_usuarios import normalizar_email
+from .franjas import anotar_reserva
+from .instantanea import instantanea_vigente
+from .models import CodigoDescuento, CupoDiario, FranjaIngreso, Orden, LineaOrden, UsuarioRegistrado
+
+
+def orden_a_dict(orden, lineas):
+    """
+    Convierte una Orden del ORM al formato dict que usan realizar_compra y confirmar_pago.
+    """
+    lineas_dict = []
+    fechas = {orden.fecha_visita}
+    for linea in lineas:
+        linea_dict = {"nombre": linea.nombre, "edad": linea.edad, "precio": {"monto": linea.monto}}
+        if linea.descuento:
+            linea_dict["descuento"] = {"monto": linea.descuento}
+        if linea.fecha_visita is not None:
+            linea_dict["fecha_visita"] = linea.fecha_visita
+            fechas.add(linea.fecha_visita)
+        lineas_dict.append(linea_dict)
+
+    return {
+        "id": orden.pk,
+        "estado": orden.estado,
+        "usuario": {"nombre": orden.usuario_nombre, "email": orden.usuario_email},
+        "fecha_visita": orden.fecha_visita,
+        "fechas_visita": sorted(fechas),
+        "tipo_pase": orden.tipo_pase,
+        "forma_pago": orden.forma_pago,
+        "total": orden.total,
+        "descuento": orden.descuento,
+        "hora_ingreso": orden.hora_ingreso,
+        "pagada_en": orden.pagada_en,
+        "lineas": lineas_dict,
+    }
+
+
+def entradas_por_fecha(borrador):
+    por_fecha = collections.Counter()
+    for linea in borrador["lineas"]:
+        por_fecha[linea.get("fecha_visita") or borrador["fecha_visita"]] += 1
+    return por_fecha
+
+
+def reservar_cupos(por_fecha):
+    """
+    Descuenta el cupo de una o varias fechas con UPDATEs condicionales, así dos compras
+    concurrentes nunca pueden sobrevender. Las fechas que piden la misma cantidad se reservan
+    con un único UPDATE ... WHERE fecha IN (...). Debe llamarse dentro de una transacción:
+    si alguna fecha no tiene cupo se lanza ValueError y la transacción deshace todas.
+    """
+    CupoDiario.objects.bulk_create(
+        [CupoDiario(fecha=fecha, capacidad=settings.CAPACIDAD_DIARIA) for fecha in sorted(por_fecha)],
+        ignore_conflicts=True,
+    )
+
+    fechas_por_cantidad = collections.defaultdict(list)
+    for fecha, cantidad in por_fecha.items():
+        fechas_por_cantidad[cantidad].append(fecha)
+
+    for cantidad, fechas in sorted(fechas_por_cantidad.items()):
+        actualizadas = CupoDiario.objects.filter(
+            fecha__in=fechas, vendidas__lte=F("capacidad") - cantidad
+        ).update(vendidas=F("vendidas") + cantidad)
+
+        if actualizadas != len(fechas):
+            sin_cupo = CupoDiario.objects.filter(
+                fecha__in=fechas, vendidas__gt=F("capacidad") - cantidad
+            ).values_list("fecha", flat=True)
+            detalle = ", ".join(fecha.isoformat() for fecha in sorted(sin_cupo))
+            raise ValueError(f"No hay cupo disponible para la fecha seleccionada ({detalle})")
+
+
+def liberar_cupos(por_fecha):
+    """
+    Inversa de reservar_cupos: devuelve al cupo las entradas de órdenes canceladas,
+    con un UPDATE por cada cantidad distinta.
+    """
+    fechas_por_cantidad = collections.defaultdict(list)
+    for fecha, cantidad in por_fecha.items():
+        fechas_por_cantidad[cantidad].append(fecha)
+
+    for cantidad, fechas in sorted(fechas_por_cantidad.items()):
+        CupoDiario.objects.filter(fecha__in=fechas).update(vendidas=Greatest(F("vendidas") - cantidad, 0))
+
+
+def reservar_franja(fecha, cantidad, preferida=None, intentos=5, ahora=None):
+    """
+    Asigna la primera franja de ingreso de `fecha` desde `preferida` con lugar para `cantidad`
+    y la descuenta con un UPDATE condicional (si otro la llenó en el medio, se busca la siguiente).
+    Si `fecha` es hoy (en hora local de `ahora`), no asigna franjas que ya empezaron.
+    Devuelve la hora de inicio, o None si la fecha no tiene ingreso por horario.
+    """
+    ahora = ahora or timezone.now()
+    if timezone.is_aware(ahora):
+        ahora = timezone.localtime(ahora)
+    franjas = FranjaIngreso.objects.filter(fecha=fecha)
+    con_lugar = franjas.filter(vendidas__lte=F("capacidad") - cantidad)
+    if fecha == ahora.date():
+        hora = ahora.time().replace(tzinfo=None)
+        preferida = max(preferida, hora) if preferida is not None else hora
+    if preferida is not None:
+        con_lugar = con_lugar.filter(inicio__gte=preferida)
+    for _ in range(intentos):
+        inicio = con_lugar.order_by("inicio").values_list("inicio", flat=True).first()
+        if inicio is None:
+            if not franjas.exists():
+                return None
+            desde = f" desde las {preferida:%H:%M}" if preferida is not None else ""
+            raise ValueError(f"No quedan horarios de ingreso{desde} con lugar para {cantidad} personas")
+        if con_lugar.filter(inicio=inicio).update(vendidas=F("vendidas") + cantidad):
+            return inicio
+    raise ValueError("No se pudo asignar un horario de ingreso, intente nuevamente")
+
+
+def liberar_franjas(orden_ids):
+    """
+    Devuelve a sus franjas los lugares de órdenes canceladas o expiradas.
+    """
+    por_franja = (
+        Orden.objects.filter(pk__in=orden_ids, hora_ingreso__isnull=False)
+        .values("fecha_visita", "hora_ingreso").annotate(cantidad=Count("lineas"))
+    )
+    for fila in por_franja:
+        FranjaIngreso.objects.filter(fecha=fila["fecha_visita"], inicio=fila["hora_ingreso"]).update(
+            vendidas=Greatest(F("vendidas") - fila["cantidad"], 0))
+
+
+def canjear_codigo(codigo_id):
+    """
+    Suma un uso al código con un UPDATE condicional: si dos compras canjean a la vez el último
+    uso de un código, una sola lo consigue. Debe llamarse dentro de la transacción de la orden.
+    """
+    canjeado = CodigoDescuento.objects.filter(
+        Q(usos_maximos__isnull=True) | Q(usos__lt=F("usos_maximos")), pk=codigo_id
+    ).update(usos=F("usos") + 1)
+    if not canjeado:
+        raise ValueError("El código de descuento ya fue usado")
+
+
+def liberar_codigos(orden_ids):
+    """
+    Devuelve el uso de los códigos canjeados por órdenes que expiraron o se cancelaron.
+    """
+    por_codigo = (
+        Orden.objects.filter(pk__in=orden_ids, codigo_descuento__isnull=False)
+        .values("codigo_descuento").annotate(cantidad=Count("pk"))
+    )
+    for fila in por_codigo:
+        CodigoDescuento.objects.filter(pk=fila["codigo_descuento"]).update(
+            usos=Greatest(F("usos") - fila["cantidad"], 0))
+
+
+def guardar_pendiente(borrador, reloj=None):
+    with transaction.atomic():
+        por_fecha = entradas_por_fecha(borrador)
+        reservar_cupos(por_fecha)
+        if borrador.get("codigo_descuento"):
+            canjear_codigo(borrador["codigo_descuento"])
+        # El ingreso por horario es para órdenes de una fecha; los pases de varias fechas entran todo el día
+        hora_ingreso = None
+        if len(por_fecha) == 1:
+            hora_ingreso = reservar_franja(borrador["fecha_visita"], len(borrador["lineas"]),
+                                           borrador.get("hora_ingreso"), ahora=reloj["ahora"]() if reloj else None)
+
+        usuario = borrador["usuario"] or {}
+        orden = Orden.objects.create(
+            usuario_nombre=usuario.get("nombre", ""),
+            usuario_email=usuario.get("email", ""),
+            fecha_visita=borrador["fecha_visita"],
+            tipo_pase=borrador["tipo_pase"],
+            forma_pago=borrador["forma_pago"],
+            total=borrador["total"],
+            descuento=borrador.get("descuento", 0),
+            codigo_descuento_id=borrador.get("codigo_descuento"),
+            hora_ingreso=hora_ingreso,
+            creada_en=reloj["ahora"]() if reloj else None,
+        )
+        LineaOrden.objects.bulk_create([
+            LineaOrden(orden=orden, nombre=linea["nombre"], edad=linea["edad"], monto=linea["precio"]["monto"],
+                       descuento=linea["descuento"]["monto"] if "descuento" in linea else 0,
+                       fecha_visita=linea.get("fecha_visita"))
+            for linea in borrador["lineas"]
+        ])
+        # Para buscar la orden por nombre, email o código de entrada (ver busqueda.py)
+        indice_de(orden.pk, usuario, borrador["lineas"], por_fecha).save(force_insert=True)
+
+    if hora_ingreso is not None:
+        anotar_reserva(borrador["fecha_visita"], hora_ingreso, len(borrador["lineas"]))
+    return {"id": orden.pk, "estado": orden.estado, "hora_ingreso": hora_ingreso}
+
+
+def buscar(orden_id):
+    orden = Orden.objects.filter(pk=orden_id).first()
+    if orden is None:
+        # Las órdenes de meses cerrados ya no están en las tablas calientes (ver archivo.py)
+        from .archivo import buscar_archivada
+        return buscar_archivada(orden_id)
+    return orden_a_dict(orden, orden.lineas.all())
+
+
+def transicionar(orden_id, destino, campos=None, intentos=5):
+    """
+    Cambia el estado de la orden con compare-and-swap: lee (estado, version) y actualiza solo si
+    la versión sigue siendo la leída. Si otro proceso la cambió en el medio se relee y se vuelve a
+    validar la transición; no se bloquea la fila. Devuelve False si la transición no es válida
+    desde el estado actual (o la orden no existe) y levanta ConflictoDeVersion si se agotan los intentos.
+    """
+    for _ in range(intentos):
+        fila = Orden.objects.filter(pk=orden_id).values_list("estado", "version").first()
+        if fila is None or not puede_transicionar(fila[0], destino):
+            return False
+        estado, version = fila
+        if Orden.objects.filter(pk=orden_id, version=version).update(estado=destino, version=version + 1,
+                                                                      **(campos or {})):
+            return True
+    raise ConflictoDeVersion(f"La orden {orden_id} cambió {intentos} veces mientras se la pasaba a {destino}")
+
+
+def marcar_pagada(orden_id, momento):
+    """
+    Pasa la orden a PAGADA solo si seguía PENDIENTE.
+    Devuelve False si otra notificación ya la había marcado (no hay que volver a mandar el mail)
+    o si la reserva ya había expirado o se canceló.
+    """
+    return transicionar(orden_id, "PAGADA", {"pagada_en": momento})
+
+
+def marcar_pagadas(orden_ids, momento):
+    """
+    Versión en lote de marcar_pagada. Devuelve los ids que efectivamente pasaron a PAGADA:
+    las que otra notificación ya había marcado no se incluyen.
+    """
+    with transaction.atomic():
+        # select_for_update bloquea las filas en PostgreSQL; en SQLite la transacción IMMEDIATE ya serializa
+        pendientes = list(
+            Orden.objects.select_for_update().filter(pk__in=orden_ids, estado="PENDIENTE").values_list("pk", flat=True)
+        )
+        Orden.objects.filter(pk__in=pendientes).update(estado="PAGADA", pagada_en=momento, version=F("version") + 1)
+    return pendientes
+
+
+def expirar_pendientes(limite, lote=500):
+    """
+    Pasa a EXPIRADA las reservas con tarjeta creadas antes de `limite` que siguen PENDIENTES y
+    devuelve su cupo. Cada orden se expira con compare-and-swap, así un webhook de pago que llega
+    a la vez gana o pierde entero: nunca queda pagada una orden cuyo cupo se liberó.
+    Las de efectivo no expiran: se pagan en la boletería. Devuelve cuántas expiraron.
+    """
+    expiradas = 0
+    ultimo = 0
+    while True:
+        candidatas = list(
+            Orden.objects.filter(estado="PENDIENTE", forma_pago="TARJETA", creada_en__lt=limite, pk__gt=ultimo)
+            .order_by("pk").values_list("pk", "version")[:lote]
+        )
+        if not candidatas:
+            return expiradas
+        ultimo = candidatas[-1][0]
+
+        with transaction.atomic():
+            ids = [pk for pk, version in candidatas
+                   if Orden.objects.filter(pk=pk, version=version).update(estado="EXPIRADA", version=version + 1)]
+            por_fecha = collections.Counter()
+            for linea_fecha, orden_fecha in LineaOrden.objects.filter(orden_id__in=ids).values_list(
+                    "fecha_visita", "orden__fecha_visita"):
+                por_fecha[linea_fecha or orden_fecha] += 1
+            liberar_cupos(por_fecha)
+            liberar_franjas(ids)
+            liberar_codigos(ids)
+        invalidar_ordenes(ids)
+        expiradas += len(ids)
+
+
+def usuario_registrado(email):
+    """
+    Si el email está entre los socios importados del CRM (ver importacion_usuarios).
+    """
+    normalizado = normalizar_email(email)
+    if normalizado is None:
+        return False
+    instantanea = instantanea_vigente()
+    if instantanea is not None:
+        return instantanea.contiene_email(normalizado)
+    return UsuarioRegistrado.objects.filter(email=normalizado, registrado=True).exists()
+
+
+def repositorio_db(reloj=None):
+    """
+    Repositorio de órdenes persistido con el ORM de Django.
+    Expone la misma interfaz de dict que los repositorios fake de los tests.
+    """
+    return {
+        "guardar_pendiente": lambda borrador: guardar_pendiente(borrador, reloj),
+        "buscar": buscar,
+        "marcar_pagada": marcar_pagada,
+        "marcar_pagadas": marcar_pagadas,
+        "transicionar": transicionar,
+        "usuario_registrado": usuario_registrado,
+        "buscar_descuento": buscar_descuento,
+    }
@@ -0,0 +1,70 @@
+import functools
+
+from django.utils import timezone
+
+from .antiabuso import clave_compra, detector_configurado
+from .cache_ordenes import repositorio_con_cache
+from .instantanea import feriados_vigentes
+from .mail import servicio_mail_configurado
+from .repositorio import repositorio_db
+from .views import (
+    enrutador_pagos_simple,
+    motor_precios_simple,
+    proveedor_horarios_simple,
+    realizar_compra,
+    realizar_compra_multifecha,
+    validar_fecha_visita,
+)
+
+# Colaboradores de la compra armados una sola vez por proceso: el formulario HTML, la API y los
+# comandos que procesan pagos en segundo plano usan las mismas instancias, con el pool SMTP del
+# servicio de mail y el cache de órdenes vivos entre requests, en vez de armar dicts de lambdas
+# nuevos (repositorio_simple(), enrutador_pagos_simple(), ...) en cada llamada.
+
+
+@functools.lru_cache(maxsize=None)
+def servicios_configurados():
+    """
+    Repositorio de órdenes (ORM con cache de lectura), enrutador de pagos, servicio de mail, motor
+    de precios, proveedor de horarios y reloj del proceso, con los nombres de argumento de
+    realizar_compra y confirmar_pago.
+    """
+    # Con USE_TZ las fechas que se guardan (creada_en, pagada_en) tienen que tener zona horaria
+    reloj = {"ahora": timezone.now}
+    return {
+        "proveedor_horarios": proveedor_horarios_simple,
+        "motor_precios": motor_precios_simple,
+        "repositorio": repositorio_con_cache(repositorio_db(reloj)),
+        "enrutador_pagos": enrutador_pagos_simple(),
+        "servicio_mail": servicio_mail_configurado(),
+        "reloj": reloj,
+    }
+
+
+def comprar(usuario, visitantes, tipo_pase, forma_pago, fecha_visita=None, fechas_visita=None, hora_ingreso=None,
+            codigo_descuento=None, ip=None, servicios=None):
+    """
+    La compra del formulario y de la API: frena bots y compras repetidas (ver antiabuso), valida
+    la fecha contra los feriados vigentes, guarda la orden y arranca el cobro con realizar_compra
+    o, si se indican fechas_visita, con realizar_compra_multifecha. Devuelve lo mismo que ellas y
+    lanza ValueError (CompraFrenada incluida) si la compra no se puede hacer.
+    """
+    servicios = servicios or servicios_configurados()
+    detector = detector_configurado()
+    if detector is not None:
+        detector.verificar(usuario["email"], ip,
+                           clave_compra(usuario["email"], fechas_visita or [fecha_visita], visitantes))
+
+    compra = {
+        "usuario": usuario,
+        "cantidad_entradas": len(visitantes),
+        "visitantes": visitantes,
+        "tipo_pase": tipo_pase,
+        "forma_pago": forma_pago,
+        "codigo_descuento": codigo_descuento,
+        **servicios,
+    }
+    if fechas_visita is not None:
+        return realizar_compra_multifecha(fechas_visita=fechas_visita, feriados=feriados_vigentes(), **compra)
+    validar_fecha_visita(fecha_visita, feriados_vigentes())
+    return realizar_compra(fecha_visita=fecha_visita, hora_ingreso=hora_ingreso, **compra)
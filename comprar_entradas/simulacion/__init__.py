@@ -0,0 +1,6 @@
+# Simulación de eventos discretos del día de lanzamiento de entradas. Corre realizar_compra y
+# confirmar_pago de verdad, con un reloj virtual y colaboradores en memoria que modelan la
+# latencia del proveedor de pagos y del mail, para estimar cuántos workers hacen falta.
+from .escenario import Escenario
+from .llegadas import Curva, curva_lanzamiento
+from .motor import dimensionar, simular
@@ -0,0 +1,99 @@
+import collections
+import itertools
+import math
+
+from ..estados import puede_transicionar
+
+
+class ErrorProveedor(Exception):
+    """
+    El proveedor de pagos no respondió: el cliente puede reintentar.
+    """
+
+
+class Medidor:
+    """
+    Acumula el tiempo que el pedido en curso pasó esperando a servicios externos; el motor lo
+    suma a la CPU del pedido para saber cuánto ocupa al worker.
+    """
+
+    def __init__(self, azar):
+        self.azar = azar
+        self.espera = 0.0
+
+    def esperar(self, latencia):
+        mediana, sigma = latencia
+        self.espera += self.azar.lognormvariate(math.log(mediana), sigma)
+
+
+def repositorio_memoria(capacidad_por_fecha, reloj):
+    """
+    Repositorio de órdenes en dicts con las mismas reglas que repositorio_db: cupo por fecha al
+    guardar, transiciones de la máquina de estados y cupo devuelto al expirar o cancelar.
+    """
+    ordenes = {}
+    vendidas = collections.Counter()
+    ids = itertools.count(1)
+    # Reservas con tarjeta en orden de creación, para expirarlas sin recorrer todas las órdenes
+    reservas = collections.deque()
+
+    def guardar_pendiente(borrador):
+        por_fecha = collections.Counter(linea.get("fecha_visita") or borrador["fecha_visita"]
+                                        for linea in borrador["lineas"])
+        sin_cupo = [f for f, n in por_fecha.items() if vendidas[f] + n > capacidad_por_fecha.get(f, 0)]
+        if sin_cupo:
+            detalle = ", ".join(fecha.isoformat() for fecha in sorted(sin_cupo))
+            raise ValueError(f"No hay cupo disponible para la fecha seleccionada ({detalle})")
+        vendidas.update(por_fecha)
+        orden = {"id": next(ids), "estado": "PENDIENTE", "fecha_visita": borrador["fecha_visita"],
+                 "forma_pago": borrador["forma_pago"], "lineas": borrador["lineas"], "por_fecha": por_fecha,
+                 "creada_en": reloj["ahora"](), "pagada_en": None}
+        ordenes[orden["id"]] = orden
+        if orden["forma_pago"] == "TARJETA":
+            reservas.append(orden)
+        return {"id": orden["id"], "estado": "PENDIENTE"}
+
+    def transicionar(orden_id, destino, campos=None):
+        orden = ordenes.get(orden_id)
+        if orden is None or not puede_transicionar(orden["estado"], destino):
+            return False
+        orden["estado"] = destino
+        orden.update(campos or {})
+        if destino in ("EXPIRADA", "CANCELADA"):
+            vendidas.subtract(orden["por_fecha"])
+        return True
+
+    def expirar_pendientes(limite):
+        expiradas = 0
+        while reservas and reservas[0]["creada_en"] < limite:
+            expiradas += transicionar(reservas.popleft()["id"], "EXPIRADA")
+        return expiradas
+
+    return {
+        "guardar_pendiente": guardar_pendiente,
+        "buscar": ordenes.get,
+        "marcar_pagada": lambda orden_id, momento: transicionar(orden_id, "PAGADA", {"pagada_en": momento}),
+        "transicionar": transicionar,
+        "expirar_pendientes": expirar_pendientes,
+        "usuario_registrado": lambda email: True,
+        "vendidas": vendidas,
+        "estados": lambda: collections.Counter(orden["estado"] for orden in ordenes.values()),
+    }
+
+
+def enrutador_pagos_simulado(escenario, medidor):
+    def iniciar_flujo_tarjeta(orden):
+        medidor.esperar(escenario.latencia_pago)
+        if medidor.azar.random() < escenario.prob_falla_pago:
+            raise ErrorProveedor("El proveedor de pagos no respondió")
+        return f"https://mercadopago.test/checkout/{orden['id']}"
+
+    return {"iniciar_flujo_tarjeta": iniciar_flujo_tarjeta}
+
+
+def servicio_mail_simulado(escenario, medidor):
+    def enviar_confirmacion(orden):
+        medidor.esperar(escenario.latencia_mail)
+        return True
+
+    return {"enviar_confirmacion": enviar_confirmacion}
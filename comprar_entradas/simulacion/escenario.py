@@ -0,0 +1,36 @@
+import datetime
+from dataclasses import dataclass, field
+
+from .llegadas import Curva, curva_lanzamiento
+
+
+@dataclass
+class Escenario:
+    """
+    Parámetros de un día de lanzamiento. Los tiempos van en segundos.
+    """
+    curva: Curva = field(default_factory=lambda: curva_lanzamiento(pico=150))
+    duracion: float = 86400
+    capacidad: int = 30000  # entradas a la venta para fecha_visita
+    inicio: datetime.datetime = datetime.datetime(2030, 1, 1, 10, 0, tzinfo=datetime.timezone.utc)
+    fecha_visita: datetime.date = datetime.date(2030, 2, 2)
+    # Entradas por orden: cantidad -> peso
+    visitantes: dict = field(default_factory=lambda: {1: 20, 2: 35, 3: 20, 4: 20, 5: 5})
+    prob_tarjeta: float = 0.8
+    # CPU de cada pedido en el worker, sin contar las esperas a los servicios externos
+    cpu_compra: float = 0.015
+    cpu_pago: float = 0.005
+    # Latencia lognormal (mediana, sigma) del proveedor de pagos al iniciar el flujo, y del mail
+    latencia_pago: tuple = (0.25, 0.5)
+    latencia_mail: tuple = (0.1, 0.5)
+    prob_falla_pago: float = 0.01
+    # Clientes: cuánto esperan en la cola antes de abandonar (exponencial) y si reintentan
+    paciencia_media: float = 20
+    prob_reintento: float = 0.5
+    max_reintentos: int = 3
+    espera_reintento: float = 30
+    # Después de crear la orden con tarjeta: cuánto tardan en pagar y cuántos pagan
+    demora_pago_media: float = 90
+    prob_paga: float = 0.9
+    vencimiento_reserva: float = 1800
+    semilla: int = 1
@@ -0,0 +1,62 @@
+import bisect
+import math
+
+
+class Curva:
+    """
+    Tasa de llegadas (clientes por segundo) lineal por tramos entre los puntos (segundo, tasa).
+    Antes del primer punto y después del último la tasa es la del extremo.
+    """
+
+    def __init__(self, puntos):
+        self.puntos = sorted(puntos)
+        self.tiempos = [t for t, _ in self.puntos]
+
+    def tasa(self, t):
+        i = bisect.bisect_right(self.tiempos, t)
+        if i == 0:
+            return self.puntos[0][1]
+        if i == len(self.puntos):
+            return self.puntos[-1][1]
+        (t0, tasa0), (t1, tasa1) = self.puntos[i - 1], self.puntos[i]
+        return tasa0 + (tasa1 - tasa0) * (t - t0) / (t1 - t0)
+
+    def llegadas(self, duracion, azar):
+        """
+        Instantes de llegada de un proceso de Poisson no homogéneo en [0, duracion), por thinning
+        tramo a tramo: en cada tramo se generan candidatos a la tasa máxima del tramo (la de uno
+        de sus extremos, porque es lineal) y se acepta cada uno con probabilidad tasa(t) / máxima.
+        """
+        cortes = [0.0] + [t for t in self.tiempos if 0 < t < duracion] + [duracion]
+        for inicio, fin in zip(cortes, cortes[1:]):
+            maxima = max(self.tasa(inicio), self.tasa(fin))
+            if maxima <= 0:
+                continue
+            t = inicio
+            while True:
+                t += azar.expovariate(maxima)
+                if t >= fin:
+                    break
+                if azar.random() * maxima <= self.tasa(t):
+                    yield t
+
+    def total_esperado(self, duracion):
+        cortes = [0.0] + [t for t in self.tiempos if 0 < t < duracion] + [duracion]
+        return sum((fin - inicio) * (self.tasa(inicio) + self.tasa(fin)) / 2 for inicio, fin in zip(cortes, cortes[1:]))
+
+
+def curva_lanzamiento(pico, base=1.0, rampa=30, decaimiento=600, duracion=86400, paso=60):
+    """
+    Llegadas del día de lanzamiento: `base` clientes/s, que suben a `pico` en los primeros `rampa`
+    segundos después de abrir la venta y bajan exponencialmente (constante `decaimiento` segundos)
+    hasta volver a la base.
+    """
+    puntos = [(0, base), (rampa, pico)]
+    t = rampa
+    while t < duracion:
+        t = min(t + paso, duracion)
+        tasa = base + (pico - base) * math.exp(-(t - rampa) / decaimiento)
+        puntos.append((t, tasa))
+        if tasa - base < 0.01 * base:
+            break
+    return Curva(puntos)
@@ -0,0 +1,274 @@
+import collections
+import datetime
+import heapq
+import random
+import time
+
+from ..views import confirmar_pago, motor_precios_simple, proveedor_horarios_simple, realizar_compra
+from .colaboradores import (
+    ErrorProveedor, Medidor, enrutador_pagos_simulado, repositorio_memoria, servicio_mail_simulado,
+)
+
+# Cada cuánto corre expirar_reservas (cron) en el día simulado
+PERIODO_EXPIRACION = 60
+
+
+class Pedido:
+    """
+    Un pedido HTTP: una compra (POST de la página o de la API) o el webhook de pago de una orden.
+    """
+    __slots__ = ("tipo", "llegada", "intento", "cantidad", "forma_pago", "orden_id", "en_cola")
+
+    def __init__(self, tipo, llegada, intento=0, cantidad=0, forma_pago=None, orden_id=None):
+        self.tipo = tipo
+        self.llegada = llegada
+        self.intento = intento
+        self.cantidad = cantidad
+        self.forma_pago = forma_pago
+        self.orden_id = orden_id
+        self.en_cola = False
+
+
+class Simulacion:
+    """
+    Simulación de eventos discretos: los eventos (instante, secuencia, acción, pedido) salen de
+    un heap en orden de tiempo. Hay `workers` procesos atendiendo una cola FIFO; el tiempo de
+    cada pedido es su CPU más las esperas a los servicios externos que acumuló el Medidor al
+    correr realizar_compra o confirmar_pago con el reloj virtual.
+    """
+
+    def __init__(self, escenario, workers):
+        self.escenario = escenario
+        self.workers = workers
+        self.ahora = 0.0
+        self.eventos = []
+        self.secuencia = 0
+        # Las llegadas usan su propio generador: con la misma semilla, todas las cantidades de
+        # workers ven exactamente los mismos clientes (comparación con números aleatorios comunes)
+        self.llegadas = escenario.curva.llegadas(escenario.duracion, random.Random(escenario.semilla))
+        self.azar = random.Random(escenario.semilla + 1)
+        self.medidor = Medidor(self.azar)
+        self.reloj = {"ahora": lambda: escenario.inicio + datetime.timedelta(seconds=self.ahora)}
+        self.repositorio = repositorio_memoria({escenario.fecha_visita: escenario.capacidad}, self.reloj)
+        self.enrutador_pagos = enrutador_pagos_simulado(escenario, self.medidor)
+        self.servicio_mail = servicio_mail_simulado(escenario, self.medidor)
+        self.cantidades = list(escenario.visitantes)
+        self.pesos = list(escenario.visitantes.values())
+
+        self.libres = workers
+        self.cola = collections.deque()
+        self.en_cola = 0
+        self.ocupado = 0.0
+        self.ultima_orden = 0.0
+        self.esperas = []
+        self.respuestas = []
+        self.atendidos_por_minuto = collections.Counter()
+        self.cuenta = collections.Counter()
+        self.agotado_en = None
+        self.cola_max = 0
+
+    def programar(self, instante, accion, pedido=None):
+        self.secuencia += 1
+        heapq.heappush(self.eventos, (instante, self.secuencia, accion, pedido))
+
+    def correr(self):
+        self.siguiente_llegada()
+        self.programar(PERIODO_EXPIRACION, self.expirar)
+        while self.eventos:
+            self.ahora, _, accion, pedido = heapq.heappop(self.eventos)
+            accion(pedido)
+
+    # Clientes
+
+    def siguiente_llegada(self, _=None):
+        instante = next(self.llegadas, None)
+        if instante is not None:
+            self.programar(instante, self.nueva_llegada)
+
+    def nueva_llegada(self, _):
+        self.cuenta["llegadas"] += 1
+        cantidad = self.azar.choices(self.cantidades, self.pesos)[0]
+        forma_pago = "TARJETA" if self.azar.random() < self.escenario.prob_tarjeta else "EFECTIVO"
+        self.llegar(Pedido("compra", self.ahora, cantidad=cantidad, forma_pago=forma_pago))
+        self.siguiente_llegada()
+
+    def reintentar(self, pedido):
+        escenario = self.escenario
+        if pedido.intento < escenario.max_reintentos and self.azar.random() < escenario.prob_reintento:
+            self.cuenta["reintentos"] += 1
+            demora = self.azar.expovariate(1 / escenario.espera_reintento)
+            self.programar(self.ahora + demora, self.llegar,
+                           Pedido("compra", self.ahora + demora, pedido.intento + 1, pedido.cantidad, pedido.forma_pago))
+
+    def abandonar(self, pedido):
+        if not pedido.en_cola:  # ya lo atendieron
+            return
+        # Se deja en la cola y se saltea al sacarlo (borrado perezoso)
+        pedido.en_cola = False
+        self.en_cola -= 1
+        self.cuenta["abandonos"] += 1
+        self.reintentar(pedido)
+
+    # Workers
+
+    def llegar(self, pedido):
+        if self.libres:
+            self.atender(pedido)
+            return
+        pedido.en_cola = True
+        self.cola.append(pedido)
+        self.en_cola += 1
+        self.cola_max = max(self.cola_max, self.en_cola)
+        # El webhook del proveedor de pagos no abandona: reintenta hasta que le contestan
+        if pedido.tipo == "compra":
+            self.programar(self.ahora + self.azar.expovariate(1 / self.escenario.paciencia_media),
+                           self.abandonar, pedido)
+
+    def atender(self, pedido):
+        escenario = self.escenario
+        self.libres -= 1
+        self.esperas.append(self.ahora - pedido.llegada)
+        self.medidor.espera = 0.0
+        resultado = None
+        if pedido.tipo == "compra":
+            cpu = escenario.cpu_compra
+            try:
+                resultado = self.comprar(pedido)
+            except ErrorProveedor:
+                resultado = "falla"
+            except ValueError:
+                resultado = "sin_cupo"
+        else:
+            cpu = escenario.cpu_pago
+            confirmar_pago({"id_orden": pedido.orden_id}, self.repositorio, self.servicio_mail, self.reloj)
+        duracion = cpu + self.medidor.espera
+        self.ocupado += duracion
+        pedido.orden_id = resultado if isinstance(resultado, int) else pedido.orden_id
+        self.programar(self.ahora + duracion, self.terminar, (pedido, resultado))
+
+    def comprar(self, pedido):
+        numero = self.cuenta["llegadas"]
+        usuario = {"id": numero, "nombre": "Cliente", "email": f"cliente{numero}@example.com"}
+        visitantes = [{"nombre": "Visitante", "edad": 30}] * pedido.cantidad
+        respuesta = realizar_compra(usuario, self.escenario.fecha_visita, pedido.cantidad, visitantes, "REGULAR",
+                                    pedido.forma_pago, proveedor_horarios_simple, motor_precios_simple,
+                                    self.repositorio, self.enrutador_pagos, self.servicio_mail, self.reloj)
+        return respuesta["orden_id"]
+
+    def terminar(self, argumentos):
+        pedido, resultado = argumentos
+        self.libres += 1
+        self.respuestas.append(self.ahora - pedido.llegada)
+        self.atendidos_por_minuto[int(self.ahora // 60)] += 1
+
+        if pedido.tipo == "pago":
+            self.cuenta["pagos"] += 1
+        elif resultado == "falla":
+            self.cuenta["errores_pago"] += 1
+            self.reintentar(pedido)
+        elif resultado == "sin_cupo":
+            self.cuenta["sin_cupo"] += 1
+            if self.agotado_en is None:
+                self.agotado_en = self.ahora
+        else:
+            self.cuenta["compras"] += 1
+            self.ultima_orden = self.ahora
+            if pedido.forma_pago == "TARJETA" and self.azar.random() < self.escenario.prob_paga:
+                demora = self.azar.expovariate(1 / self.escenario.demora_pago_media)
+                self.programar(self.ahora + demora, self.llegar,
+                               Pedido("pago", self.ahora + demora, orden_id=pedido.orden_id))
+
+        while self.cola and self.libres:
+            siguiente = self.cola.popleft()
+            if siguiente.en_cola:
+                siguiente.en_cola = False
+                self.en_cola -= 1
+                self.atender(siguiente)
+
+    def expirar(self, _):
+        limite = self.reloj["ahora"]() - datetime.timedelta(seconds=self.escenario.vencimiento_reserva)
+        self.repositorio["expirar_pendientes"](limite)
+        if self.eventos or self.ahora <= self.ultima_orden + self.escenario.vencimiento_reserva:
+            self.programar(self.ahora + PERIODO_EXPIRACION, self.expirar)
+
+    def resultado(self):
+        esperas = sorted(self.esperas)
+        respuestas = sorted(self.respuestas)
+        atendidos = sum(self.atendidos_por_minuto.values())
+        estados = self.repositorio["estados"]()
+        return {
+            "workers": self.workers,
+            "llegadas": self.cuenta["llegadas"],
+            "compras": self.cuenta["compras"],
+            "pagadas": estados["PAGADA"],
+            "expiradas": estados["EXPIRADA"],
+            "sin_cupo": self.cuenta["sin_cupo"],
+            "abandonos": self.cuenta["abandonos"],
+            "reintentos": self.cuenta["reintentos"],
+            "errores_pago": self.cuenta["errores_pago"],
+            "vendidas": self.repositorio["vendidas"][self.escenario.fecha_visita],
+            "agotado_en": self.agotado_en,
+            "espera_p50": percentil(esperas, 0.50),
+            "espera_p95": percentil(esperas, 0.95),
+            "espera_p99": percentil(esperas, 0.99),
+            "respuesta_p95": percentil(respuestas, 0.95),
+            "throughput_pico": max(self.atendidos_por_minuto.values(), default=0) / 60,
+            "throughput_medio": atendidos / self.ahora if self.ahora else 0.0,
+            "ocupacion": self.ocupado / (self.workers * self.ahora) if self.ahora else 0.0,
+            "cola_max": self.cola_max,
+        }
+
+
+def percentil(ordenados, fraccion):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(int(fraccion * len(ordenados)), len(ordenados) - 1)]
+
+
+def simular(escenario, workers):
+    """
+    Corre un día de lanzamiento con `workers` procesos y devuelve sus métricas: llegadas,
+    compras, abandonos, percentiles de espera en cola y de respuesta (segundos), throughput
+    (pedidos/s) y cuándo se agotó el cupo (segundos desde la apertura, o None).
+    """
+    if workers < 1:
+        raise ValueError("Debe haber al menos un worker")
+    inicio = time.perf_counter()
+    simulacion = Simulacion(escenario, workers)
+    simulacion.correr()
+    resultado = simulacion.resultado()
+    resultado["duracion_real"] = time.perf_counter() - inicio
+    return resultado
+
+
+def cumple(resultado, objetivo_espera, max_abandono):
+    abandono = resultado["abandonos"] / resultado["llegadas"] if resultado["llegadas"] else 0.0
+    return resultado["espera_p95"] <= objetivo_espera and abandono <= max_abandono
+
+
+def dimensionar(escenario, objetivo_espera=2.0, max_abandono=0.01, max_workers=256):
+    """
+    Mínima cantidad de workers con la que el p95 de espera en cola no pasa de `objetivo_espera`
+    segundos y abandona como mucho `max_abandono` de los clientes. Duplica hasta cumplir y
+    después busca por bisección entre la última cantidad que no cumplió y la primera que sí.
+    Devuelve el resultado de simular con esa cantidad.
+    """
+    resultados = {}
+
+    def probar(workers):
+        resultados[workers] = simular(escenario, workers)
+        return cumple(resultados[workers], objetivo_espera, max_abandono)
+
+    alto = 1
+    while not probar(alto):
+        if alto >= max_workers:
+            raise ValueError(f"Ni con {max_workers} workers se cumple el objetivo")
+        alto = min(alto * 2, max_workers)
+    bajo = alto // 2  # no cumple (o es 0)
+    while alto - bajo > 1:
+        medio = (bajo + alto) // 2
+        if probar(medio):
+            alto = medio
+        else:
+            bajo = medio
+    return resultados[alto]
@@ -0,0 +1,295 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const cantidadInput = document.getElementById('cantidad_visitantes');
+    const visitantesContainer = document.getElementById('visitantes-container');
+    const resumenPedido = document.getElementById('resumen-pedido');
+    const fechaInput = document.querySelector('[name="fecha_visita"]');
+    const nombreInput = document.querySelector('[name="usuario_nombre"]');
+    const emailInput = document.querySelector('[name="usuario_email"]');
+    const nombreSugerencias = document.getElementById('nombre-sugerencias');
+    const emailValidacion = document.getElementById('email-validacion');
+    const form = document.getElementById('comprarForm');
+
+    // Usuarios registrados y feriados desde el backend (ver json_script en el template)
+    const usuariosRegistrados = JSON.parse(document.getElementById('usuarios-registrados').textContent);
+    const feriados = JSON.parse(document.getElementById('feriados').textContent);
+
+    // Función para validar usuario registrado
+    function validarUsuarioRegistrado(email) {
+        return usuariosRegistrados.find(u => u.mail === email && u.registrado);
+    }
+
+    // Función para buscar usuarios por nombre
+    function buscarUsuariosPorNombre(nombre) {
+        if (!nombre || nombre.length < 2) return [];
+        const nombreLower = nombre.toLowerCase();
+        return usuariosRegistrados.filter(u => 
+            u.nombre.toLowerCase().includes(nombreLower) && u.registrado
+        );
+    }
+
+    // Función para validar fecha
+    function validarFecha(fecha) {
+        const fechaObj = new Date(fecha + 'T00:00:00');
+        const fechaStr = fecha;
+
+        // Validar lunes (0 = domingo, 1 = lunes, etc.)
+        if (fechaObj.getDay() === 1) {
+            return "El parque está cerrado los lunes";
+        }
+
+        // Validar feriados
+        if (feriados.includes(fechaStr)) {
+            return "El parque está cerrado en feriados";
+        }
+
+        return null;
+    }
+
+    // Event listener para nombre (autocompletado)
+    if (nombreInput) {
+        nombreInput.addEventListener('input', function() {
+            const nombre = this.value;
+            const usuarios = buscarUsuariosPorNombre(nombre);
+
+            if (usuarios.length > 0 && nombre.length >= 2) {
+                nombreSugerencias.innerHTML = '';
+                usuarios.forEach(usuario => {
+                    const item = document.createElement('button');
+                    item.type = 'button';
+                    item.className = 'list-group-item list-group-item-action';
+                    item.textContent = usuario.nombre;
+                    item.onclick = function() {
+                        nombreInput.value = usuario.nombre;
+                        emailInput.value = usuario.mail;
+                        nombreSugerencias.style.display = 'none';
+                        validarEmailEnTiempoReal();
+                    };
+                    nombreSugerencias.appendChild(item);
+                });
+                nombreSugerencias.style.display = 'block';
+            } else {
+                nombreSugerencias.style.display = 'none';
+            }
+        });
+
+        // Cerrar sugerencias al hacer clic fuera
+        document.addEventListener('click', function(e) {
+            if (e.target !== nombreInput) {
+                nombreSugerencias.style.display = 'none';
+            }
+        });
+    }
+
+    // Función para validar email en tiempo real
+    function validarEmailEnTiempoReal() {
+        const email = emailInput.value;
+        if (email) {
+            const usuario = validarUsuarioRegistrado(email);
+            if (usuario) {
+                emailValidacion.innerHTML = '<small class="text-success"><i class="fas fa-check-circle"></i> Usuario registrado: ' + usuario.nombre + '</small>';
+                emailInput.style.borderColor = '#28a745';
+            } else {
+                // Los socios importados del CRM no vienen en la lista: los valida el servidor al enviar
+                emailValidacion.innerHTML = '<small class="text-muted"><i class="fas fa-info-circle"></i> El registro se verificará al confirmar la compra</small>';
+                emailInput.style.borderColor = '';
+            }
+        }
+    }
+
+    // Event listener para email
+    if (emailInput) {
+        emailInput.addEventListener('blur', validarEmailEnTiempoReal);
+        emailInput.addEventListener('input', function() {
+            if (this.value.includes('@')) {
+                validarEmailEnTiempoReal();
+            }
+        });
+    }
+
+    // Event listener para fecha
+    if (fechaInput) {
+        fechaInput.addEventListener('change', function() {
+            const fecha = this.value;
+            if (fecha) {
+                const error = validarFecha(fecha);
+
+                // Remover alertas previas
+                const alertaPrevia = document.getElementById('alerta-fecha');
+                if (alertaPrevia) {
+                    alertaPrevia.remove();
+                }
+
+                if (error) {
+                    // Mostrar error
+                    const alerta = document.createElement('div');
+                    alerta.id = 'alerta-fecha';
+                    alerta.className = 'alert alert-danger mt-2';
+                    alerta.textContent = error;
+                    this.parentNode.appendChild(alerta);
+                    this.style.borderColor = '#dc3545';
+                } else {
+                    // Fecha válida
+                    this.style.borderColor = '#28a745';
+                }
+            }
+        });
+    }
+
+    // Validación antes de enviar el formulario
+    form.addEventListener('submit', function(e) {
+        if (!emailInput.value) {
+            e.preventDefault();
+            alert('Ingrese el email con el que está registrado.');
+            emailInput.focus();
+            return false;
+        }
+        // Si el email no está en la lista local, el servidor lo busca entre los socios importados
+    });
+
+    // Función para generar campos de visitantes
+    function generarCamposVisitantes(cantidad) {
+        visitantesContainer.innerHTML = '';
+
+        for (let i = 0; i < cantidad; i++) {
+            const div = document.createElement('div');
+            div.className = 'row mb-3';
+            div.innerHTML = `
+                <div class="col-12">
+                    <h6>Visitante ${i + 1}</h6>
+                </div>
+                <div class="col-md-6">
+                    <label class="form-label">Nombre</label>
+                    <input type="text" name="visitante_${i}_nombre" class="form-control" required>
+                </div>
+                <div class="col-md-6">
+                    <label class="form-label">Edad</label>
+                    <input type="number" name="visitante_${i}_edad" class="form-control" min="0" max="120" required>
+                </div>
+            `;
+            visitantesContainer.appendChild(div);
+        }
+
+        if (cantidad > 0) {
+            generarResumen();
+        }
+    }
+
+    // Función para generar resumen: el total lo cotiza el backend (GET a la API, cacheable)
+    let cotizacionEnCurso = null;
+    let esperaCotizacion = null;
+
+    function generarResumen() {
+        clearTimeout(esperaCotizacion);
+        esperaCotizacion = setTimeout(cotizar, 150);
+    }
+
+    function cotizar() {
+        const tipoPase = document.querySelector('[name="tipo_pase"]').value;
+        const cantidad = parseInt(cantidadInput.value) || 0;
+        const edades = Array.from(visitantesContainer.querySelectorAll('input[name$="_edad"]'), input => input.value);
+
+        if (cantidad <= 0) {
+            resumenPedido.style.display = 'none';
+            return;
+        }
+        document.getElementById('resumen-content').innerHTML = `
+            <p><strong>Tipo de pase:</strong> ${tipoPase}</p>
+            <p><strong>Cantidad de visitantes:</strong> ${cantidad}</p>
+        `;
+        resumenPedido.style.display = 'block';
+        if (edades.some(edad => edad === '')) {
+            document.getElementById('total-amount').textContent = '-';
+            return;
+        }
+
+        const params = new URLSearchParams({
+            fecha_visita: fechaInput.value || new Date().toISOString().slice(0, 10),
+            tipo_pase: tipoPase,
+            edades: edades.join(','),
+        });
+        if (cotizacionEnCurso) {
+            cotizacionEnCurso.abort();
+        }
+        cotizacionEnCurso = new AbortController();
+        fetch(`${form.dataset.urlCotizar}?${params}`, {signal: cotizacionEnCurso.signal})
+            .then(respuesta => respuesta.ok ? respuesta.json() : null)
+            .then(cotizacion => {
+                if (!cotizacion) return;
+                const precios = cotizacion.lineas.map((linea, i) => `Visitante ${i + 1}: $${linea.precio}`);
+                document.getElementById('resumen-content').innerHTML += `<p>${precios.join('<br>')}</p>`;
+                document.getElementById('total-amount').textContent = cotizacion.total;
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') throw error;
+            });
+    }
+
+    // Franjas de ingreso de la fecha elegida, con lugar para el grupo (GET a la API)
+    const franjasIngreso = document.getElementById('franjas-ingreso');
+    const horaIngreso = document.getElementById('hora_ingreso');
+    let franjasEnCurso = null;
+
+    function consultarFranjas() {
+        const cantidad = parseInt(cantidadInput.value) || 1;
+        if (!fechaInput || !fechaInput.value) {
+            franjasIngreso.style.display = 'none';
+            return;
+        }
+        const params = new URLSearchParams({fecha_visita: fechaInput.value, cantidad: Math.min(cantidad, 10)});
+        if (franjasEnCurso) {
+            franjasEnCurso.abort();
+        }
+        franjasEnCurso = new AbortController();
+        fetch(`${form.dataset.urlFranjas}?${params}`, {signal: franjasEnCurso.signal})
+            .then(respuesta => respuesta.ok ? respuesta.json() : null)
+            .then(disponibilidad => {
+                if (!disponibilidad || !disponibilidad.por_horario) {
+                    // Fecha con ingreso libre todo el día
+                    horaIngreso.innerHTML = '';
+                    franjasIngreso.style.display = 'none';
+                    return;
+                }
+                const elegida = horaIngreso.value;
+                horaIngreso.innerHTML = '';
+                disponibilidad.franjas.forEach(franja => {
+                    const opcion = document.createElement('option');
+                    opcion.value = franja.inicio;
+                    opcion.textContent = `${franja.inicio} (${franja.libres} lugares)`;
+                    opcion.disabled = franja.libres < cantidad;
+                    opcion.selected = franja.inicio === elegida && !opcion.disabled;
+                    horaIngreso.appendChild(opcion);
+                });
+                const siguiente = disponibilidad.siguiente;
+                document.getElementById('franjas-aviso').innerHTML = siguiente
+                    ? `<small class="text-danger">No quedan horarios para ${cantidad} personas. Próximo lugar: ${siguiente.fecha_visita} ${siguiente.inicio}</small>`
+                    : '';
+                franjasIngreso.style.display = 'block';
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') throw error;
+            });
+    }
+
+    // Event listeners
+    cantidadInput.addEventListener('input', consultarFranjas);
+    cantidadInput.addEventListener('input', function() {
+        const cantidad = parseInt(this.value) || 0;
+        if (cantidad >= 1 && cantidad <= 10) {
+            generarCamposVisitantes(cantidad);
+        } else {
+            visitantesContainer.innerHTML = '';
+            resumenPedido.style.display = 'none';
+        }
+    });
+
+    document.querySelector('[name="tipo_pase"]').addEventListener('change', generarResumen);
+    visitantesContainer.addEventListener('input', function(e) {
+        if (e.target.name && e.target.name.endsWith('_edad')) {
+            generarResumen();
+        }
+    });
+    if (fechaInput) {
+        fechaInput.addEventListener('change', generarResumen);
+        fechaInput.addEventListener('change', consultarFranjas);
+    }
+});
@@ -0,0 +1,51 @@
+function simularPago() {
+    if (confirm('Esta es una simulación. ¿Deseas confirmar el pago simulado?')) {
+        // Crear un overlay de carga
+        const overlay = document.createElement('div');
+        overlay.style.cssText = `
+            position: fixed;
+            top: 0;
+            left: 0;
+            width: 100%;
+            height: 100%;
+            background: rgba(0, 0, 0, 0.8);
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            z-index: 9999;
+            flex-direction: column;
+            color: white;
+        `;
+
+        overlay.innerHTML = `
+            <div style="font-size: 48px; margin-bottom: 20px;">✓</div>
+            <h2 style="margin-bottom: 10px;">¡Pago exitoso!</h2>
+            <p style="font-size: 18px; margin-bottom: 30px;">Tu compra ha sido procesada correctamente</p>
+            <div style="background: white; color: #333; padding: 30px; border-radius: 8px; max-width: 400px; text-align: left;">
+                <h3 style="color: #00a650; margin-bottom: 15px;">Detalles de la compra</h3>
+                <p><strong>Total pagado:</strong> $${document.querySelector('.total-value').textContent}</p>
+                <p><strong>Fecha:</strong> ${new Date().toLocaleDateString('es-AR')}</p>
+                <p><strong>Método:</strong> Mercado Pago</p>
+                <p style="margin-top: 20px; font-size: 14px; color: #666;">
+                    Recibirás un email de confirmación en breve.
+                </p>
+                <button onclick="window.location.href='/comprar-entradas/'" 
+                        style="width: 100%; background: #009ee3; color: white; border: none; 
+                               padding: 12px; border-radius: 6px; margin-top: 20px; cursor: pointer; 
+                               font-size: 16px; font-weight: 600;">
+                    Volver al inicio
+                </button>
+            </div>
+        `;
+
+        document.body.appendChild(overlay);
+    }
+}
+
+// Animación de los métodos de pago
+document.querySelectorAll('.payment-method').forEach(method => {
+    method.addEventListener('click', function() {
+        document.querySelectorAll('.payment-method').forEach(m => m.classList.remove('selected'));
+        this.classList.add('selected');
+    });
+});
@@ -0,0 +1,16 @@
+# tests/unit/conftest.py
+import pytest
+
+from comprar_entradas import franjas
+from comprar_entradas.configuracion import calendario
+
+
+@pytest.fixture(autouse=True)
+def configuracion_limpia():
+    # El calendario y el índice de franjas viven lo que el proceso y se revisan cada tantos
+    # segundos: sin esto, un Feriado o una franja de un test se seguiría viendo en el siguiente
+    calendario.invalidar()
+    franjas.indice.invalidar()
+    yield
+    calendario.invalidar()
+    franjas.indice.invalidar()
@@ -0,0 +1,136 @@
+# tests/unit/test_antiabuso.py
+import io
+import json
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+
+from comprar_entradas.antiabuso import (
+    FRENAR, MARCAR, OK, CompraFrenada, CountMinSketch, DetectorAbuso, VentanaDeslizante, clave_compra,
+    detector_configurado,
+)
+
+UMBRALES = {"email": {"marcar": 3, "frenar": 5}, "ip": {"marcar": 10, "frenar": 20}}
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture(autouse=True)
+def cache_limpio():
+    caches["default"].clear()
+    detector_configurado.cache_clear()
+    yield
+    detector_configurado.cache_clear()
+
+
+def test_sketch_nunca_subestima():
+    # Arrange
+    ventana = VentanaDeslizante(60, 6, 64, 4)
+    reales = {f"cliente{i}@example.com": i % 7 + 1 for i in range(500)}  # muchas más claves que columnas
+
+    # Act
+    for clave, veces in reales.items():
+        for _ in range(veces):
+            ventana.agregar(ventana.total.posiciones(clave), 5)
+
+    # Assert
+    total = ventana.total
+    estimados = {clave: min(total.contadores[p] for p in total.posiciones(clave)) for clave in reales}
+    assert all(estimados[clave] >= reales[clave] for clave in reales)
+    copia = CountMinSketch.desde_bytes(total.a_bytes(), 64, 4)
+    assert copia.contadores == total.contadores
+    ventana.avanzar(1000)
+    assert not any(total.contadores), "Al vencer todas las subventanas el total vuelve a cero"
+
+
+def test_marca_y_frena_por_email_y_olvida_al_pasar_la_ventana():
+    # Arrange
+    reloj = Reloj()
+    detector = DetectorAbuso(UMBRALES, ventana=60, subventanas=6, ancho=256, reloj=reloj)
+
+    # Act
+    decisiones = []
+    for i in range(5):
+        decisiones.append(detector.registrar({"email": "bot@example.com", "ip": f"10.0.0.{i}"})[0])
+        reloj.ahora += 5
+    otro = detector.registrar({"email": "ana@example.com", "ip": "10.0.0.9"})[0]
+    reloj.ahora += 60
+    despues = detector.registrar({"email": "bot@example.com", "ip": "10.0.0.1"})[0]
+
+    # Assert
+    assert decisiones == [OK, OK, MARCAR, MARCAR, FRENAR]
+    assert otro == OK, "Las demás claves no se ven afectadas"
+    assert despues == OK, "Pasada la ventana los intentos viejos dejan de contar"
+    assert [(fila["dimension"], fila["clave"], fila["decision"], fila["veces"]) for fila in detector.reporte()] == [
+        ("email", "bot@example.com", FRENAR, 3)]
+
+
+def test_verificar_lanza_compra_frenada_por_compra_repetida():
+    # Arrange
+    detector = DetectorAbuso({"compra": {"marcar": 2, "frenar": 3}}, reloj=Reloj())
+    compra = clave_compra("Marco@example.com", [date(2030, 1, 8)], [{"nombre": "Ana", "edad": 30}])
+
+    # Act
+    detector.verificar("marco@example.com", "10.0.0.1", compra)
+    marcada = detector.verificar("marco@example.com", "10.0.0.1", compra)
+
+    # Assert
+    assert marcada == MARCAR
+    with pytest.raises(CompraFrenada) as excinfo:
+        detector.verificar("marco@example.com", "10.0.0.1", compra)
+    assert excinfo.value.dimension == "compra"
+
+
+def test_los_workers_suman_sus_conteos_por_el_cache():
+    # Arrange
+    reloj = Reloj()
+    cache = caches["default"]
+    worker_a = DetectorAbuso(UMBRALES, cache=cache, sincronizar_cada=1, trabajador="a", reloj=reloj)
+    worker_b = DetectorAbuso(UMBRALES, cache=cache, sincronizar_cada=1, trabajador="b", reloj=reloj)
+
+    # Act: el bot reparte sus intentos entre los dos workers
+    for _ in range(2):
+        worker_a.registrar({"email": "bot@example.com"})
+        worker_b.registrar({"email": "bot@example.com"})
+    reloj.ahora += 2
+    worker_b.sincronizar()  # b publica
+    worker_a.sincronizar()  # a publica y suma lo de b
+    decision = worker_a.registrar({"email": "bot@example.com"})[0]
+    worker_a.sincronizar()
+
+    # Assert
+    assert decision == FRENAR, "2 + 2 intentos en otros workers + este llegan al umbral de 5"
+    salida = io.StringIO()
+    call_command("reporte_antiabuso", stdout=salida)
+    assert "bot@example.com" in salida.getvalue()
+
+
+@pytest.mark.django_db
+def test_api_contesta_429_al_frenar(client, settings):
+    # Arrange
+    settings.ANTIABUSO = {**settings.ANTIABUSO, "activo": True,
+                          "umbrales": {"ip": {"marcar": 1, "frenar": 2}}}
+    fecha = date.today() + timedelta(days=1)
+    while fecha.weekday() == 0:
+        fecha += timedelta(days=1)
+    payload = json.dumps({"usuario": {"nombre": "Marco", "email": "marco.figueroa@example.com"},
+                          "fecha_visita": fecha.isoformat(), "tipo_pase": "VIP", "forma_pago": "EFECTIVO",
+                          "visitantes": [{"nombre": "Ana", "edad": 30}]})
+
+    # Act
+    primera = client.post("/comprar-entradas/api/v1/compras", payload, content_type="application/json")
+    segunda = client.post("/comprar-entradas/api/v1/compras", payload, content_type="application/json")
+
+    # Assert
+    assert primera.status_code == 201
+    assert segunda.status_code == 429
+    assert segunda.json()["errores"][0]["codigo"] == "demasiados_intentos"
+    assert int(segunda["Retry-After"]) > 0
@@ -0,0 +1,194 @@
+# tests/unit/test_api.py
+import io
+import json
+import pytest
+from datetime import date, timedelta
+
+from django.core.cache import caches
+
+from comprar_entradas.descuentos import generar_codigos
+from comprar_entradas.esquemas import ErrorEsquema
+from comprar_entradas.api import validar_compra
+from comprar_entradas.models import Campania, Orden
+from comprar_entradas.servicios import servicios_configurados
+
+
+def proxima_fecha_abierta():
+    fecha = date.today() + timedelta(days=1)
+    while fecha.weekday() == 0:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+def payload_compra(**cambios):
+    payload = {
+        "usuario": {"nombre": "Marco Figueroa", "email": "marco.figueroa@example.com"},
+        "fecha_visita": proxima_fecha_abierta().isoformat(),
+        "tipo_pase": "VIP",
+        "forma_pago": "TARJETA",
+        "visitantes": [{"nombre": "Ana", "edad": 25}, {"nombre": "Luis", "edad": 30}],
+    }
+    payload.update(cambios)
+    return payload
+
+
+def test_esquema_compra_reporta_todos_los_visitantes_invalidos():
+    # Arrange: un visitante sin edad y otro con edad negativa
+    payload = payload_compra(visitantes=[{"nombre": "Ana"}, {"nombre": "Luis", "edad": -1}])
+
+    # Act & Assert
+    with pytest.raises(ErrorEsquema) as excinfo:
+        validar_compra(payload)
+
+    campos = [error["campo"] for error in excinfo.value.errores]
+    assert campos == ["visitantes[0].edad", "visitantes[1].edad"], \
+        "Cada visitante inválido debe reportarse con su ruta en vez de descartarse"
+
+
+def test_esquema_rechaza_opciones_que_no_son_texto(client, settings):
+    # Arrange
+    settings.API_PAGOS_TOKEN = "secreto"
+
+    # Act
+    with pytest.raises(ErrorEsquema) as excinfo:
+        validar_compra(payload_compra(tipo_pase=["VIP"], forma_pago={"tipo": "TARJETA"}))
+    notificacion = client.post("/comprar-entradas/api/v1/notificaciones-pago",
+                               json.dumps({"id_orden": 1, "estado": ["aprobado"]}), content_type="application/json",
+                               HTTP_AUTHORIZATION="Bearer secreto")
+
+    # Assert
+    errores = [(error["campo"], error["codigo"]) for error in excinfo.value.errores]
+    assert errores == [("tipo_pase", "opcion"), ("forma_pago", "opcion")], \
+        "Una lista o un dict en un campo de opciones es un error de validación, no un 500"
+    assert notificacion.status_code == 400
+    assert notificacion.json()["errores"][0]["codigo"] == "opcion"
+
+
+def test_esquema_compra_convierte_la_fecha():
+    # Act
+    datos = validar_compra(payload_compra())
+
+    # Assert
+    assert datos["fecha_visita"] == proxima_fecha_abierta()
+
+
+def test_api_cotizacion_devuelve_total(client):
+    # Arrange
+    payload = {"fecha_visita": proxima_fecha_abierta().isoformat(), "tipo_pase": "VIP",
+               "visitantes": [{"nombre": "Ana", "edad": 25}, {"nombre": "Luis", "edad": 30}]}
+
+    # Act
+    respuesta = client.post("/comprar-entradas/api/v1/cotizaciones", json.dumps(payload),
+                            content_type="application/json")
+
+    # Assert
+    assert respuesta.status_code == 200
+    assert respuesta.json()["total"] == 10000
+
+
+def test_api_cotizacion_rapida_por_get_es_cacheable(client):
+    # Arrange
+    url = f"/comprar-entradas/api/v1/cotizaciones?fecha_visita={proxima_fecha_abierta()}&tipo_pase=VIP&edades=25,8"
+
+    # Act
+    primera = client.get(url)
+    repetida = client.get(url, HTTP_IF_NONE_MATCH=primera["ETag"])
+    otra = client.get(url.replace("25,8", "25,8,40"))
+
+    # Assert
+    assert primera.status_code == 200
+    assert primera.json() == {"lineas": [{"edad": 25, "precio": 5000}, {"edad": 8, "precio": 5000}], "total": 10000}
+    assert "max-age" in primera["Cache-Control"]
+    assert repetida.status_code == 304, "La misma consulta con su ETag no se recalcula"
+    assert otra["ETag"] != primera["ETag"]
+
+
+def test_api_cotizacion_rapida_valida_la_consulta(client):
+    # Act
+    respuesta = client.get("/comprar-entradas/api/v1/cotizaciones?fecha_visita=mañana&tipo_pase=VIP&edades=25,x")
+
+    # Assert
+    assert respuesta.status_code == 400
+    assert [error["campo"] for error in respuesta.json()["errores"]] == ["fecha_visita", "edades[1]"]
+    assert "ETag" not in respuesta
+
+
+@pytest.mark.django_db
+def test_api_compra_tarjeta_devuelve_redirect(client):
+    # Act
+    respuesta = client.post("/comprar-entradas/api/v1/compras", json.dumps(payload_compra()),
+                            content_type="application/json")
+
+    # Assert
+    assert respuesta.status_code == 201
+    assert respuesta.json()["redirect_url"].startswith("https://mercadopago")
+    assert Orden.objects.get(pk=respuesta.json()["orden_id"]).estado == "PENDIENTE", "La orden debe quedar guardada"
+
+
+def test_api_compra_con_json_invalido_devuelve_error_estructurado(client):
+    # Act
+    respuesta = client.post("/comprar-entradas/api/v1/compras", "{no es json",
+                            content_type="application/json")
+
+    # Assert
+    assert respuesta.status_code == 400
+    assert respuesta.json()["errores"][0]["codigo"] == "json"
+
+
+@pytest.mark.django_db
+def test_api_compra_usuario_no_registrado_devuelve_422(client):
+    # Arrange
+    payload = payload_compra(usuario={"nombre": "Nadie", "email": "nadie@example.com"})
+
+    # Act
+    respuesta = client.post("/comprar-entradas/api/v1/compras", json.dumps(payload),
+                            content_type="application/json")
+
+    # Assert
+    assert respuesta.status_code == 422
+    assert respuesta.json()["errores"][0]["codigo"] == "regla_negocio"
+
+
+@pytest.mark.django_db
+def test_api_compra_canjea_codigo_de_descuento(client):
+    # Arrange
+    codigos = io.StringIO()
+    generar_codigos(Campania.objects.create(nombre="Prensa", tipo="PORCENTAJE", valor=10), 1, codigos)
+
+    # Act
+    respuesta = client.post("/comprar-entradas/api/v1/compras",
+                            json.dumps(payload_compra(codigo_descuento=codigos.getvalue().strip())),
+                            content_type="application/json")
+    repetida = client.post("/comprar-entradas/api/v1/compras",
+                           json.dumps(payload_compra(codigo_descuento=codigos.getvalue().strip())),
+                           content_type="application/json")
+
+    # Assert
+    assert respuesta.status_code == 201
+    orden = Orden.objects.get(pk=respuesta.json()["orden_id"])
+    assert (orden.total, orden.descuento) == (9000, 1000), "La orden debe guardar el descuento del código"
+    assert repetida.status_code == 422, "Un código de un uso no se puede canjear dos veces"
+
+
+@pytest.mark.django_db
+def test_api_pago_requiere_token(client, settings):
+    # Arrange: el cache de órdenes del proceso no debe tener órdenes de otros tests
+    settings.API_PAGOS_TOKEN = "secreto"
+    caches["default"].clear()
+    servicios_configurados.cache_clear()
+    orden_id = client.post("/comprar-entradas/api/v1/compras", json.dumps(payload_compra()),
+                           content_type="application/json").json()["orden_id"]
+    url = f"/comprar-entradas/api/v1/ordenes/{orden_id}/pago"
+
+    # Act
+    sin_token = client.post(url, json.dumps({"estado": "aprobado"}), content_type="application/json")
+    con_token = client.post(url, json.dumps({"estado": "aprobado"}), content_type="application/json",
+                            HTTP_AUTHORIZATION="Bearer secreto")
+    inexistente = client.post("/comprar-entradas/api/v1/ordenes/999999/pago", json.dumps({"estado": "aprobado"}),
+                              content_type="application/json", HTTP_AUTHORIZATION="Bearer secreto")
+
+    # Assert
+    assert sin_token.status_code == 401
+    assert con_token.status_code == 200
+    assert client.get(f"/comprar-entradas/api/v1/ordenes/{orden_id}").json()["estado"] == "PAGADA"
+    assert inexistente.status_code == 404
@@ -0,0 +1,164 @@
+# tests/unit/test_archivo.py
+import gzip
+import io
+from datetime import date, datetime, timezone
+
+import pytest
+from django.core.management import call_command
+
+from comprar_entradas.archivo import archivar_meses, buscar_archivada, ordenes_para_auditoria
+from comprar_entradas.models import ArchivoMensual, CancelacionOrden, CierreFecha, LineaOrden, Orden
+from comprar_entradas.repositorio import repositorio_db
+
+HOY = date(2025, 3, 10)
+
+
+@pytest.fixture(autouse=True)
+def directorio(settings, tmp_path):
+    settings.ARCHIVO_ORDENES_DIR = str(tmp_path)
+    settings.CAPACIDAD_DIARIA = 1000
+    return tmp_path
+
+
+def guardar(fechas, nombre="Ana"):
+    fechas = sorted(fechas)
+    lineas = [{"nombre": nombre, "edad": 30, "precio": {"monto": 5000},
+               **({"fecha_visita": fecha} if len(fechas) > 1 else {})} for fecha in fechas]
+    borrador = {
+        "usuario": {"id": 1, "nombre": "Marco", "email": "marco.figueroa@example.com"},
+        "fecha_visita": fechas[0],
+        "tipo_pase": "REGULAR",
+        "forma_pago": "TARJETA",
+        "lineas": lineas,
+        "total": 5000 * len(lineas),
+    }
+    return repositorio_db()["guardar_pendiente"](borrador)["id"]
+
+
+@pytest.mark.django_db
+def test_archivar_mueve_los_meses_cerrados_y_buscar_los_sigue_encontrando(directorio):
+    # Arrange
+    enero = guardar([date(2025, 1, 14)])
+    febrero = guardar([date(2025, 2, 4)], nombre="Luis")
+    marzo = guardar([date(2025, 3, 4)])
+    antes = repositorio_db()["buscar"](febrero)
+
+    # Act
+    resultado = archivar_meses(HOY)
+
+    # Assert
+    assert [(mes, archivadas) for mes, archivadas, _ in resultado] == [(date(2025, 1, 1), 1), (date(2025, 2, 1), 1)]
+    assert list(Orden.objects.values_list("pk", flat=True)) == [marzo], "Solo el mes en curso queda en la tabla"
+    assert LineaOrden.objects.filter(orden_id__in=[enero, febrero]).count() == 0
+    assert sorted(p.name for p in directorio.iterdir()) == ["ordenes-2025-01.jsonl.gz", "ordenes-2025-02.jsonl.gz"]
+
+    despues = repositorio_db()["buscar"](febrero)
+    assert despues.pop("archivada") is True
+    assert despues == {**antes, "creada_en": None, "cancelacion": None}, "La orden archivada se lee igual que antes de archivarla"
+
+
+@pytest.mark.django_db
+def test_orden_de_varias_fechas_se_archiva_recien_cuando_pasa_la_ultima():
+    # Arrange
+    orden_id = guardar([date(2025, 2, 25), date(2025, 3, 11)])
+
+    # Act
+    archivar_meses(HOY)
+
+    # Assert
+    assert Orden.objects.filter(pk=orden_id).exists(), "Todavía tiene una fecha por visitar"
+
+    # Act
+    archivar_meses(date(2025, 4, 1))
+
+    # Assert
+    assert not Orden.objects.filter(pk=orden_id).exists()
+    assert ArchivoMensual.objects.get().mes == date(2025, 3, 1), "Se archiva en el mes de su última fecha"
+
+
+@pytest.mark.django_db
+def test_archivar_es_repetible_y_retoma_un_borrado_cortado(directorio):
+    # Arrange
+    ids = [guardar([date(2025, 1, 14)]) for _ in range(5)]
+    archivar_meses(HOY, lote=2)
+    contenido = (directorio / "ordenes-2025-01.jsonl.gz").read_bytes()
+    # Simula un corte: una orden del mes archivado quedó sin borrar
+    ArchivoMensual.objects.update(id_max=max(ids))
+    Orden.objects.create(pk=ids[0], usuario_nombre="Marco", usuario_email="m@example.com",
+                         fecha_visita=date(2025, 1, 14), tipo_pase="REGULAR", forma_pago="TARJETA")
+
+    # Act
+    resultado = archivar_meses(HOY)
+
+    # Assert
+    assert resultado == [(date(2025, 1, 1), 5, 1)]
+    assert not Orden.objects.exists()
+    assert ArchivoMensual.objects.count() == 1
+    assert (directorio / "ordenes-2025-01.jsonl.gz").read_bytes() == contenido, "El archivo no se reescribe"
+    assert len(gzip.decompress(contenido).splitlines()) == 5
+
+
+@pytest.mark.django_db
+def test_orden_con_reintegro_en_curso_se_archiva_cuando_termina(directorio):
+    # Arrange
+    comun = guardar([date(2025, 1, 14)])
+    cancelada = guardar([date(2025, 1, 14)], nombre="Luis")
+    Orden.objects.filter(pk=cancelada).update(estado="CANCELADA")
+    cierre = CierreFecha.objects.create(fecha=date(2025, 1, 14), motivo="Tormenta",
+                                        creado_en=datetime(2025, 1, 13, tzinfo=timezone.utc))
+    CancelacionOrden.objects.create(orden_id=cancelada, cierre=cierre, reembolso_estado="FALLIDO", reembolso_intentos=3)
+
+    # Act
+    archivar_meses(HOY)
+
+    # Assert
+    assert list(Orden.objects.values_list("pk", flat=True)) == [cancelada], "El reintegro fallido todavía se reintenta"
+    assert CancelacionOrden.objects.filter(orden_id=cancelada).exists()
+
+    # Arrange
+    reembolsado_en = datetime(2025, 3, 12, tzinfo=timezone.utc)
+    CancelacionOrden.objects.update(reembolso_estado="REALIZADO", reembolso_id="r-1", reembolsado_en=reembolsado_en)
+
+    # Act
+    resultado = archivar_meses(date(2025, 3, 15))
+
+    # Assert
+    assert resultado == [(date(2025, 1, 1), 2, 1)]
+    assert not Orden.objects.exists() and not CancelacionOrden.objects.exists()
+    assert buscar_archivada(comun)["cancelacion"] is None
+    assert buscar_archivada(cancelada)["cancelacion"] == {
+        "fecha_cierre": date(2025, 1, 14), "motivo": "Tormenta", "reembolso_estado": "REALIZADO",
+        "reembolso_id": "r-1", "reembolso_intentos": 3, "reembolso_error": "", "reembolsado_en": reembolsado_en,
+        "mail_enviado": False,
+    }, "El archivo conserva el reintegro de la orden cancelada"
+    assert len(gzip.decompress((directorio / "ordenes-2025-01.jsonl.gz").read_bytes()).splitlines()) == 2
+
+
+@pytest.mark.django_db
+def test_auditoria_combina_tablas_calientes_y_archivo():
+    # Arrange
+    archivada = guardar([date(2025, 2, 4)])
+    archivar_meses(HOY)
+    caliente = guardar([date(2025, 2, 26), date(2025, 3, 12)])
+    guardar([date(2025, 1, 7)])
+
+    # Act
+    ordenes = list(ordenes_para_auditoria(date(2025, 2, 1), date(2025, 2, 28)))
+
+    # Assert
+    assert [orden["id"] for orden in ordenes] == [caliente, archivada]
+
+
+@pytest.mark.django_db
+def test_comando_archivar_ordenes():
+    # Arrange
+    guardar([date(2025, 1, 14)])
+    salida = io.StringIO()
+
+    # Act
+    call_command("archivar_ordenes", "--hoy", "2025-03-10", stdout=salida)
+    call_command("archivar_ordenes", "--hoy", "2025-03-10", stdout=salida)
+
+    # Assert
+    assert "2025-01: 1 órdenes archivadas, 1 borradas" in salida.getvalue()
+    assert "No hay meses cerrados para archivar" in salida.getvalue()
@@ -0,0 +1,80 @@
+# tests/unit/test_busqueda.py
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+
+from comprar_entradas.busqueda import buscar_ordenes, plegar
+from comprar_entradas.mail import codigo_entrada
+from comprar_entradas.models import IndiceOrden, Orden
+from comprar_entradas.repositorio import repositorio_db
+
+SABADO = date(2030, 1, 5)
+DOMINGO = date(2030, 1, 6)
+
+
+def guardar(usuario, visitantes, fecha=SABADO):
+    lineas = [{"nombre": nombre, "edad": 30, "precio": {"monto": 3000}} for nombre in visitantes]
+    borrador = {"usuario": usuario, "fecha_visita": fecha, "tipo_pase": "REGULAR", "forma_pago": "EFECTIVO",
+                "total": 3000 * len(lineas), "lineas": lineas}
+    return repositorio_db()["guardar_pendiente"](borrador)["id"]
+
+
+def ids(resultados):
+    return [orden["id"] for orden in resultados]
+
+
+@pytest.mark.django_db
+def test_busca_por_visitante_comprador_email_y_codigo_filtrando_por_fecha():
+    # Arrange
+    garcia = guardar({"nombre": "Marco Figueroa", "email": "marco.figueroa@example.com"},
+                     ["Lucía García", "Ñandú Pérez"])
+    otra_fecha = guardar({"nombre": "Ana Garcés", "email": "ana@example.com"}, ["Pedro García"], fecha=DOMINGO)
+    otro = guardar({"nombre": "Tomas Vergara", "email": "tomas.vergara@example.com"}, ["Luis Gómez"])
+
+    # Act / Assert
+    assert plegar("  Lucía GARCÍA-Ñandú ") == "lucia garcia nandu"
+    assert sorted(ids(buscar_ordenes("garcia"))) == [garcia, otra_fecha]
+    assert ids(buscar_ordenes("García", SABADO)) == [garcia], "Debe filtrar por la fecha de visita"
+    assert ids(buscar_ordenes("luc garc", SABADO)) == [garcia], "Varias palabras, cada una por su comienzo"
+    assert ids(buscar_ordenes("nandu")) == [garcia], "Sin acentos ni eñes"
+    assert ids(buscar_ordenes("arci", SABADO)) == [garcia], "Una parte de la palabra se busca por trigramas"
+    assert ids(buscar_ordenes("tomas.verg")) == [otro], "Por el email del comprador"
+    assert ids(buscar_ordenes(codigo_entrada(garcia, 1))) == [garcia], "Por el código de una entrada"
+    assert ids(buscar_ordenes(str(otro))) == [otro], "Por número de orden"
+    assert buscar_ordenes("garcia", date(2030, 1, 7)) == [] and buscar_ordenes("  ") == []
+
+    # Al borrar la orden (por ejemplo al archivarla) sale del índice
+    Orden.objects.filter(pk=garcia).delete()
+    assert ids(buscar_ordenes("garcia")) == [otra_fecha]
+
+
+@pytest.mark.django_db
+def test_indexar_ordenes_agrega_las_guardadas_antes_del_indice():
+    # Arrange
+    orden_id = guardar({"nombre": "Marco", "email": "marco.figueroa@example.com"}, ["Lucía García"])
+    IndiceOrden.objects.all().delete()
+
+    # Act
+    antes = buscar_ordenes("lucia")
+    call_command("indexar_ordenes", lote=1)
+
+    # Assert
+    assert antes == [] and ids(buscar_ordenes("lucia", SABADO)) == [orden_id]
+
+
+@pytest.mark.django_db
+def test_api_busqueda_solo_para_el_personal(client, admin_client):
+    # Arrange
+    orden_id = guardar({"nombre": "Marco", "email": "marco.figueroa@example.com"}, ["Lucía García"])
+    url = "/comprar-entradas/api/v1/ordenes/buscar"
+
+    # Act
+    anonimo = client.get(url, {"q": "garcia"})
+    personal = admin_client.get(url, {"q": "garcia", "fecha_visita": "2030-01-05"})
+    sin_texto = admin_client.get(url)
+
+    # Assert
+    assert anonimo.status_code == 403
+    assert personal.status_code == 200 and ids(personal.json()["ordenes"]) == [orden_id]
+    assert sin_texto.status_code == 400
@@ -0,0 +1,70 @@
+# tests/unit/test_cache_ordenes.py
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from comprar_entradas.cache_ordenes import CacheOrdenes, repositorio_con_cache
+from comprar_entradas.views import confirmar_pago
+
+
+def repositorio_contador(store):
+    lecturas = {"buscar": 0}
+
+    def buscar(orden_id):
+        lecturas["buscar"] += 1
+        orden = store.get(orden_id)
+        return dict(orden) if orden else None
+
+    def marcar_pagada(orden_id, momento):
+        store[orden_id]["estado"] = "PAGADA"
+        return True
+
+    return {"buscar": buscar, "marcar_pagada": marcar_pagada}, lecturas
+
+
+@pytest.fixture
+def compartido():
+    return LocMemCache("test-cache-ordenes", {})
+
+
+def test_lecturas_repetidas_van_una_sola_vez_al_repositorio(compartido):
+    # Arrange
+    repositorio, lecturas = repositorio_contador({1: {"id": 1, "estado": "PENDIENTE", "lineas": []}})
+    con_cache = repositorio_con_cache(repositorio, cache=CacheOrdenes(compartido))
+
+    # Act
+    for _ in range(5):
+        orden = con_cache["buscar"](1)
+
+    # Assert
+    assert orden["estado"] == "PENDIENTE"
+    assert lecturas["buscar"] == 1, "Solo la primera lectura debería llegar al repositorio"
+
+
+def test_otro_worker_no_sirve_pendiente_despues_de_marcar_pagada(compartido):
+    # Arrange: dos workers, cada uno con su LRU local, comparten el cache de versiones
+    store = {1: {"id": 1, "estado": "PENDIENTE", "lineas": [], "fecha_visita": "2025-10-20"}}
+    repositorio, _ = repositorio_contador(store)
+    worker_a = repositorio_con_cache(repositorio, cache=CacheOrdenes(compartido))
+    worker_b = repositorio_con_cache(repositorio, cache=CacheOrdenes(compartido))
+    assert worker_b["buscar"](1)["estado"] == "PENDIENTE"
+
+    # Act: el worker A recibe el webhook
+    confirmar_pago({"id_orden": 1, "estado": "aprobado"}, worker_a,
+                   {"enviar_confirmacion": lambda orden: None}, {"ahora": lambda: "2025-10-13T10:00:00Z"})
+
+    # Assert
+    assert worker_b["buscar"](1)["estado"] == "PAGADA", "El worker B no debe servir su copia PENDIENTE"
+
+
+def test_lru_respeta_el_maximo_y_el_ttl(compartido):
+    # Arrange
+    ahora = {"t": 0}
+    cache = CacheOrdenes(compartido, max_entradas=2, ttl=10, reloj=lambda: ahora["t"])
+    for orden_id in (1, 2, 3):
+        cache.guardar(orden_id, cache.version(orden_id), {"id": orden_id})
+
+    # Act & Assert
+    assert cache.obtener(1, cache.version(1)) is None, "La entrada menos usada debe desalojarse"
+    assert cache.obtener(3, cache.version(3)) == {"id": 3}
+    ahora["t"] = 11
+    assert cache.obtener(3, cache.version(3)) is None, "La entrada vencida no debe servirse"
@@ -0,0 +1,200 @@
+# tests/unit/test_cancelacion.py
+import io
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from django.core.management import call_command
+
+from comprar_entradas.cancelacion import LimiteTasa, cerrar_fecha, clave_idempotencia
+from comprar_entradas.models import CancelacionOrden, CierreFecha, CupoDiario, Orden
+from comprar_entradas.repositorio import repositorio_db
+
+CIERRE = date(2030, 1, 8)
+MOMENTO = datetime(2030, 1, 8, 6, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def capacidad(settings):
+    settings.CAPACIDAD_DIARIA = 1000
+
+
+def guardar(fechas, pagada=False):
+    fechas = sorted(fechas)
+    lineas = [{"nombre": "Ana", "edad": 30, "precio": {"monto": 5000},
+               **({"fecha_visita": fecha} if len(fechas) > 1 else {})} for fecha in fechas]
+    borrador = {
+        "usuario": {"id": 1, "nombre": "Marco", "email": "marco.figueroa@example.com"},
+        "fecha_visita": fechas[0],
+        "tipo_pase": "REGULAR",
+        "forma_pago": "TARJETA",
+        "lineas": lineas,
+        "total": 5000 * len(lineas),
+    }
+    orden_id = repositorio_db()["guardar_pendiente"](borrador)["id"]
+    if pagada:
+        repositorio_db()["marcar_pagada"](orden_id, MOMENTO)
+    return orden_id
+
+
+class EnrutadorFake:
+    """
+    Proveedor de pagos que registra cada pedido de reintegro y puede fallar para algunas órdenes.
+    """
+
+    def __init__(self, fallar=()):
+        self.pedidos = []
+        self.fallar = set(fallar)
+
+    def reembolsar(self, orden, clave_idempotencia):
+        self.pedidos.append((orden["id"], clave_idempotencia))
+        if orden["id"] in self.fallar:
+            raise ConnectionError("timeout del proveedor")
+        return f"R-{orden['id']}"
+
+    def como_dict(self):
+        return {"reembolsar": self.reembolsar}
+
+
+def reloj_fijo(momento=MOMENTO):
+    return {"ahora": lambda: momento}
+
+
+def sin_limite(**kwargs):
+    return {"reembolsos_por_segundo": 0, "mails_por_segundo": 0, **kwargs}
+
+
+@pytest.mark.django_db
+def test_cerrar_fecha_cancela_reintegra_libera_cupo_y_avisa():
+    # Arrange
+    pagada = guardar([CIERRE], pagada=True)
+    pendiente = guardar([CIERRE])
+    varias_fechas = guardar([date(2030, 1, 7), CIERRE, date(2030, 1, 9)], pagada=True)
+    otra_fecha = guardar([date(2030, 1, 9)], pagada=True)
+    enrutador = EnrutadorFake()
+    avisos = []
+    servicio_mail = {"enviar_cancelacion": lambda orden, motivo: avisos.append((orden["id"], orden.get("reembolso"), motivo))}
+
+    # Act
+    resumen = cerrar_fecha(CIERRE, "tormenta", enrutador.como_dict(), servicio_mail, reloj_fijo(), lote=2,
+                           **sin_limite())
+
+    # Assert
+    assert resumen == {"canceladas": 3, "reembolsos_realizados": 2, "mails": 3, "mails_fallidos": 0}
+    estados = dict(Orden.objects.values_list("pk", "estado"))
+    assert estados == {pagada: "CANCELADA", pendiente: "CANCELADA", varias_fechas: "CANCELADA", otra_fecha: "PAGADA"}
+    assert sorted(enrutador.pedidos) == [(pagada, clave_idempotencia(pagada)),
+                                         (varias_fechas, clave_idempotencia(varias_fechas))], "La pendiente no se reintegra"
+    assert sorted(avisos) == [(pagada, "REALIZADO", "tormenta"), (pendiente, None, "tormenta"),
+                              (varias_fechas, "REALIZADO", "tormenta")]
+
+    cupos = dict(CupoDiario.objects.values_list("fecha", "vendidas"))
+    assert cupos == {date(2030, 1, 7): 0, CIERRE: 0, date(2030, 1, 9): 1}, "Se libera el cupo de todas las fechas"
+    assert CupoDiario.objects.get(fecha=CIERRE).capacidad == 0, "La fecha cerrada no vende más"
+    assert CierreFecha.objects.get().terminado_en == MOMENTO
+
+
+@pytest.mark.django_db
+def test_volver_a_correr_reintenta_los_fallidos_y_nunca_reintegra_dos_veces():
+    # Arrange
+    ok = guardar([CIERRE], pagada=True)
+    falla = guardar([CIERRE], pagada=True)
+    enrutador = EnrutadorFake(fallar=[falla])
+
+    # Act
+    primera = cerrar_fecha(CIERRE, "tormenta", enrutador.como_dict(), reloj=reloj_fijo(), **sin_limite())
+    enrutador.fallar.clear()
+    segunda = cerrar_fecha(CIERRE, "tormenta", enrutador.como_dict(), reloj=reloj_fijo(), **sin_limite())
+    tercera = cerrar_fecha(CIERRE, "tormenta", enrutador.como_dict(), reloj=reloj_fijo(), **sin_limite())
+
+    # Assert
+    assert primera == {"canceladas": 2, "reembolsos_realizados": 1, "reembolsos_fallidos": 1}
+    assert segunda == {"reembolsos_realizados": 1}
+    assert tercera == {}
+    assert [orden_id for orden_id, _ in enrutador.pedidos] == [ok, falla, falla]
+    fila = CancelacionOrden.objects.get(orden_id=falla)
+    assert (fila.reembolso_estado, fila.reembolso_id, fila.reembolso_intentos) == ("REALIZADO", f"R-{falla}", 2)
+
+
+@pytest.mark.django_db
+def test_solo_se_marcan_los_avisos_que_salieron_y_los_rechazados_se_reintentan():
+    # Arrange
+    rechazada = guardar([CIERRE])
+    aceptada = guardar([CIERRE])
+    lotes = []
+
+    def enviar_cancelaciones(ordenes, motivo):
+        lotes.append([orden["id"] for orden in ordenes])
+        errores = [(orden["usuario"]["email"], 550, "buzón inexistente", i)
+                   for i, orden in enumerate(ordenes) if orden["id"] == rechazada and len(lotes) == 1]
+        return {"enviados": len(ordenes) - len(errores), "errores": errores}
+
+    servicio_mail = {"enviar_cancelaciones": enviar_cancelaciones}
+
+    # Act
+    primera = cerrar_fecha(CIERRE, "tormenta", EnrutadorFake().como_dict(), servicio_mail, reloj_fijo(), **sin_limite())
+    marcadas = dict(CancelacionOrden.objects.values_list("orden_id", "mail_enviado"))
+    segunda = cerrar_fecha(CIERRE, "tormenta", EnrutadorFake().como_dict(), servicio_mail, reloj_fijo(), **sin_limite())
+
+    # Assert
+    assert primera["mails"] == 1 and primera["mails_fallidos"] == 1, "El rechazo se cuenta como fallido"
+    assert marcadas == {rechazada: False, aceptada: True}, "Solo se marca el aviso que salió"
+    assert CierreFecha.objects.get().terminado_en == MOMENTO
+    assert lotes == [[rechazada, aceptada], [rechazada]], "La segunda corrida solo reintenta el rechazado"
+    assert segunda["mails"] == 1 and segunda["mails_fallidos"] == 0
+
+
+@pytest.mark.django_db
+def test_reintegro_abandonado_se_retoma_con_la_misma_clave():
+    # Arrange
+    orden_id = guardar([CIERRE], pagada=True)
+    enrutador = EnrutadorFake()
+    cerrar_fecha(CIERRE, "tormenta", {"reembolsar": lambda orden, clave: 1 / 0}, reloj=reloj_fijo(), **sin_limite())
+    # Simula un proceso que reclamó el reintegro y murió antes de registrarlo
+    CancelacionOrden.objects.update(reembolso_estado="PROCESANDO", reclamo="otro", reclamado_en=MOMENTO)
+
+    # Act
+    recien = cerrar_fecha(CIERRE, "tormenta", enrutador.como_dict(), reloj=reloj_fijo(MOMENTO + timedelta(minutes=1)),
+                          **sin_limite())
+    vencido = cerrar_fecha(CIERRE, "tormenta", enrutador.como_dict(), reloj=reloj_fijo(MOMENTO + timedelta(hours=1)),
+                           **sin_limite())
+
+    # Assert
+    assert recien == {}, "Un reclamo reciente puede seguir en curso en otro proceso"
+    assert vencido == {"reembolsos_realizados": 1}
+    assert enrutador.pedidos == [(orden_id, clave_idempotencia(orden_id))]
+
+
+def test_limite_tasa_espacia_las_operaciones():
+    # Arrange
+    ahora = [0.0]
+    esperas = []
+
+    def dormir(segundos):
+        esperas.append(segundos)
+        ahora[0] += segundos
+
+    limite = LimiteTasa(10, reloj=lambda: ahora[0], dormir=dormir)
+
+    # Act
+    for _ in range(5):
+        limite.esperar()
+
+    # Assert
+    assert esperas == pytest.approx([0.1] * 4), "Después de la primera, una cada 100 ms"
+    assert ahora[0] == pytest.approx(0.4)
+
+
+@pytest.mark.django_db
+def test_comando_cerrar_fecha():
+    # Arrange
+    guardar([CIERRE], pagada=True)
+    salida = io.StringIO()
+
+    # Act
+    call_command("cerrar_fecha", "2030-01-08", "--motivo", "tormenta", "--reembolsos-por-segundo", "0",
+                 "--mails-por-segundo", "0", stdout=salida)
+
+    # Assert
+    assert "Órdenes canceladas: 1" in salida.getvalue()
+    assert "Reintegros realizados: 1" in salida.getvalue()
+    assert "Cierre del 2030-01-08 completo" in salida.getvalue()
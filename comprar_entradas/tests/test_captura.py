@@ -0,0 +1,88 @@
+# tests/unit/test_captura.py
+import json
+import os
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from comprar_entradas.captura import CapturaTraficoMiddleware, logger_captura, sanitizar_body, seudonimo_email
+from comprar_entradas.management.commands.reproducir_trafico import preparar_body
+
+
+@pytest.fixture
+def captura(tmp_path, settings):
+    ruta = tmp_path / "captura.ndjson"
+    settings.CAPTURA_TRAFICO = {"ruta": str(ruta), "prefijos": ["/comprar-entradas/"]}
+    yield ruta
+    for handler in list(logger_captura.handlers):
+        handler.close()
+        logger_captura.removeHandler(handler)
+
+
+def test_sanitizar_body_formulario_oculta_datos_personales():
+    # Arrange
+    body = (b"csrfmiddlewaretoken=abc&usuario_email=ana%40example.com&visitante_0_nombre=Ana&visitante_0_edad=25"
+            b"&codigo_descuento=7KQM-2XWA-9PLD")
+
+    # Act
+    sanitizado = sanitizar_body("application/x-www-form-urlencoded", body)
+
+    # Assert
+    assert "csrfmiddlewaretoken" not in sanitizado, "El token CSRF no debe grabarse"
+    assert "codigo_descuento" not in sanitizado and "7KQM" not in sanitizado, "El código de descuento no debe grabarse"
+    assert "ana" not in sanitizado.lower().replace(seudonimo_email("ana@example.com"), "")
+    assert "visitante_0_edad=25" in sanitizado, "Los datos no personales se conservan"
+
+
+def test_middleware_graba_una_linea_ndjson_por_request(captura, tmp_path):
+    # Arrange
+    middleware = CapturaTraficoMiddleware(lambda request: HttpResponse(status=201))
+    payload = {"usuario": {"nombre": "Ana", "email": "ana@example.com"}, "visitantes": [{"nombre": "Luis", "edad": 3}],
+               "codigo_descuento": "7KQM-2XWA-9PLD"}
+    request = RequestFactory().post("/comprar-entradas/api/v1/compras", json.dumps(payload),
+                                    content_type="application/json")
+
+    # Act
+    middleware(request)
+    middleware(RequestFactory().get("/admin/"))  # fuera de los prefijos: no se graba
+
+    # Assert
+    assert not captura.exists(), "Cada proceso escribe su propio archivo"
+    registros = [json.loads(linea) for linea in (tmp_path / f"captura.{os.getpid()}.ndjson").read_text().splitlines()]
+    assert len(registros) == 1
+    assert registros[0]["status"] == 201
+    body = json.loads(registros[0]["body"])
+    assert body["usuario"]["email"] == seudonimo_email("ana@example.com")
+    assert body["visitantes"][0] == {"nombre": "XXXX", "edad": 3}
+    assert "codigo_descuento" not in body, "El código de descuento no debe grabarse"
+
+
+def test_middleware_sanitiza_el_query_string(captura, tmp_path):
+    # Arrange
+    middleware = CapturaTraficoMiddleware(lambda request: HttpResponse())
+    request = RequestFactory().get("/comprar-entradas/api/v1/ordenes",
+                                   {"q": "Ana García", "usuario_email": "ana@example.com", "limite": "5"})
+
+    # Act
+    middleware(request)
+
+    # Assert
+    registro = json.loads((tmp_path / f"captura.{os.getpid()}.ndjson").read_text())
+    seudonimo = seudonimo_email("ana@example.com").replace("@", "%40")
+    assert registro["query"] == f"q=XXXXXXXXXX&usuario_email={seudonimo}&limite=5", \
+        "El query string no debe grabar nombres ni emails"
+
+
+def test_preparar_body_reemplaza_seudonimos_por_email_registrado():
+    # Arrange
+    registro = {
+        "content_type": "application/json",
+        "body": json.dumps({"usuario": {"email": seudonimo_email("ana@example.com")}, "fecha_visita": "2025-10-20"}),
+    }
+
+    # Act
+    body = json.loads(preparar_body(registro, email="marco.figueroa@example.com"))
+
+    # Assert
+    assert body["usuario"]["email"] == "marco.figueroa@example.com"
+    assert body["fecha_visita"] == "2025-10-20"
@@ -0,0 +1,156 @@
+# tests/unit/test_conciliacion.py
+import csv
+import io
+from datetime import date, datetime, timezone
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from comprar_entradas.cache_ordenes import repositorio_con_cache
+from comprar_entradas.conciliacion import conciliar, ejecutar_conciliacion, ordenar_externo
+from comprar_entradas.models import Orden
+from comprar_entradas.repositorio import repositorio_db
+
+FECHA = date(2025, 10, 13)
+MOMENTO = datetime(2025, 10, 13, 15, 0, tzinfo=timezone.utc)
+
+
+def crear_orden(estado="PENDIENTE", total=10000, pagada_en=None, forma_pago="TARJETA"):
+    return Orden.objects.create(usuario_nombre="Marco", usuario_email="marco.figueroa@example.com",
+                                fecha_visita=date(2030, 1, 8), tipo_pase="REGULAR", forma_pago=forma_pago,
+                                estado=estado, total=total, pagada_en=pagada_en).pk
+
+
+def escribir_liquidacion(ruta, filas):
+    with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["fecha", "id_orden", "id_pago", "monto"])
+        escritor.writerows([["2025-10-13", *fila] for fila in filas])
+
+
+def leer_reporte(ruta):
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        return {(fila["tipo"], int(fila["id_orden"])): fila for fila in csv.DictReader(archivo)}
+
+
+def test_conciliar_detecta_cada_tipo_de_discrepancia():
+    # Arrange
+    # (pk, estado, total, pagada_ese_dia, forma_pago, fue_pagada)
+    ordenes = iter([
+        (1, "PAGADA", 100, True, "TARJETA", True),  # ok
+        (2, "PENDIENTE", 100, False, "TARJETA", False),  # cobrada sin webhook
+        (3, "PAGADA", 100, True, "TARJETA", True),  # cobrada de menos
+        (4, "PAGADA", 100, True, "TARJETA", True),  # cobrada dos veces
+        (5, "PAGADA", 100, True, "TARJETA", True),  # pagada sin cobro
+        (6, "PAGADA", 100, True, "EFECTIVO", True),  # efectivo: no pasa por el proveedor
+        (7, "PAGADA", 100, False, "TARJETA", True),  # pagada otro día: va en otra liquidación
+        (10, "EXPIRADA", 100, False, "TARJETA", False),  # cobrada después de vencer
+        (11, "CANCELADA", 100, False, "TARJETA", False),  # cobrada después de cancelarse
+        (12, "CANCELADA", 100, True, "TARJETA", True),  # pagada y cancelada: se reintegra con la cancelación
+    ])
+    cobros = iter([
+        (1, "p1", 10000), (2, "p2", 10000), (3, "p3", 9000), (4, "p4a", 10000), (4, "p4b", 10000),
+        (4, "p4b", 10000), (9, "p9", 10000), (10, "p10", 10000), (11, "p11", 10000), (12, "p12", 10000),
+    ])
+
+    # Act
+    discrepancias = [(d["tipo"], d["id_orden"]) for d in conciliar(cobros, ordenes)]
+
+    # Assert
+    assert discrepancias == [
+        ("sin_webhook", 2), ("monto_distinto", 3), ("cobro_duplicado", 4), ("pagada_sin_cobro", 5),
+        ("orden_inexistente", 9), ("cobro_orden_expirada", 10), ("cobro_orden_cancelada", 11),
+    ], "Todo cobro de una orden que no se puede pagar tiene que reintegrarse"
+
+
+def test_ordenar_externo_mezcla_varios_bloques():
+    # Arrange
+    cobros = [(i * 7 % 10, f"p{i}", i * 100) for i in range(10)]
+
+    # Act
+    ordenados = list(ordenar_externo(iter(cobros), tamaño_bloque=3))
+
+    # Assert
+    assert ordenados == sorted(cobros)
+
+
+@pytest.mark.django_db
+def test_ejecutar_conciliacion_aplica_los_pagos_sin_webhook_en_lotes(tmp_path):
+    # Arrange
+    sin_webhook = [crear_orden() for _ in range(5)]
+    monto_distinto = crear_orden()
+    escribir_liquidacion(tmp_path / "liq.csv", [[i, f"p{i}", "10000.00"] for i in sin_webhook]
+                         + [[monto_distinto, "px", "99.50"]])
+    enviados = []
+    servicio_mail = {"enviar_confirmacion": lambda orden: enviados.append(orden["id"])}
+    # Un worker que ya leyó la orden la tiene en cache como PENDIENTE
+    en_cache = repositorio_con_cache(repositorio_db())
+    en_cache["buscar"](sin_webhook[0])
+
+    # Act
+    resumen = ejecutar_conciliacion(tmp_path / "liq.csv", FECHA, tmp_path / "reporte.csv", aplicar=True, lote=2,
+                                    reloj={"ahora": lambda: MOMENTO}, servicio_mail=servicio_mail)
+
+    # Assert
+    assert resumen["cobros"] == 6
+    assert resumen["sin_webhook"] == 5 and resumen["aplicadas"] == 5
+    assert set(Orden.objects.filter(estado="PAGADA").values_list("pk", flat=True)) == set(sin_webhook)
+    assert Orden.objects.get(pk=monto_distinto).estado == "PENDIENTE", "Un monto distinto no se aplica solo"
+    assert sorted(enviados) == sin_webhook, "Cada orden marcada debe recibir su confirmación"
+    assert en_cache["buscar"](sin_webhook[0])["estado"] == "PAGADA", "Las órdenes aplicadas se invalidan en el cache"
+    reporte = leer_reporte(tmp_path / "reporte.csv")
+    assert reporte[("monto_distinto", monto_distinto)]["cobrado"] == "99.5"
+    assert reporte[("sin_webhook", sin_webhook[0])]["aplicada"] == "si"
+
+
+@pytest.mark.django_db
+def test_ejecutar_conciliacion_no_reaplica_ordenes_ya_pagadas(tmp_path):
+    # Arrange
+    orden_id = crear_orden()
+    escribir_liquidacion(tmp_path / "liq.csv", [[orden_id, "p1", "10000"]])
+    enviados = []
+    servicio_mail = {"enviar_confirmacion": lambda orden: enviados.append(orden["id"])}
+
+    # Act
+    ejecutar_conciliacion(tmp_path / "liq.csv", FECHA, tmp_path / "r1.csv", aplicar=True,
+                          reloj={"ahora": lambda: MOMENTO}, servicio_mail=servicio_mail)
+    resumen = ejecutar_conciliacion(tmp_path / "liq.csv", FECHA, tmp_path / "r2.csv", aplicar=True,
+                                    reloj={"ahora": lambda: MOMENTO}, servicio_mail=servicio_mail)
+
+    # Assert
+    assert enviados == [orden_id], "La segunda corrida no debe volver a mandar el mail"
+    assert resumen["aplicadas"] == 0 and resumen["sin_webhook"] == 0
+
+
+@pytest.mark.django_db
+def test_ejecutar_conciliacion_marca_las_pagadas_ese_dia_sin_cobro(tmp_path):
+    # Arrange
+    ayer = datetime(2025, 10, 12, 23, 59, tzinfo=timezone.utc)
+    sin_cobro = crear_orden(estado="PAGADA", pagada_en=MOMENTO)
+    crear_orden(estado="PAGADA", pagada_en=ayer)
+    cobrada = crear_orden(estado="PAGADA", pagada_en=MOMENTO)
+    escribir_liquidacion(tmp_path / "liq.csv", [[cobrada, "p1", "10000"]])
+
+    # Act
+    ejecutar_conciliacion(tmp_path / "liq.csv", FECHA, tmp_path / "reporte.csv")
+
+    # Assert
+    assert list(leer_reporte(tmp_path / "reporte.csv")) == [("pagada_sin_cobro", sin_cobro)]
+
+
+@pytest.mark.django_db
+def test_liquidacion_desordenada_requiere_ordenar(tmp_path):
+    # Arrange
+    primera, segunda = crear_orden(), crear_orden()
+    escribir_liquidacion(tmp_path / "liq.csv", [[segunda, "p2", "10000"], [primera, "p1", "10000"]])
+
+    # Act / Assert
+    with pytest.raises(CommandError, match="--ordenar"):
+        call_command("conciliar_liquidacion", str(tmp_path / "liq.csv"), "--fecha", "2025-10-13",
+                     "--reporte", str(tmp_path / "r.csv"))
+
+    salida = io.StringIO()
+    call_command("conciliar_liquidacion", str(tmp_path / "liq.csv"), "--fecha", "2025-10-13",
+                 "--reporte", str(tmp_path / "r.csv"), "--ordenar", stdout=salida)
+    assert "sin_webhook: 2" in salida.getvalue()
@@ -0,0 +1,113 @@
+# tests/unit/test_configuracion.py
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from comprar_entradas import instantanea
+from comprar_entradas.configuracion import Recargable, calendario, calendario_vigente
+from comprar_entradas.instantanea import feriados_vigentes
+from comprar_entradas.models import CierreFecha, Feriado
+from comprar_entradas.views import validar_fecha_visita
+
+EMERGENCIA = date(2030, 1, 9)
+
+
+def test_recargable_rearma_aparte_sin_frenar_las_lecturas():
+    # Arrange
+    version = [1]
+    armando = threading.Event()
+    seguir = threading.Event()
+
+    def construir():
+        if version[0] > 1:
+            armando.set()
+            seguir.wait(5)
+        return {"version": version[0]}
+
+    ahora = [0.0]
+    recargable = Recargable(lambda: version[0], construir, intervalo=5, reloj=lambda: ahora[0])
+    inicial = recargable.valor()
+
+    # Act: cambia la versión y pasa el intervalo; el rearmado queda trabado a propósito
+    version[0] = 2
+    sin_revisar = recargable.valor()
+    ahora[0] = 6
+    durante = recargable.valor()
+    assert armando.wait(5), "Debe lanzar la revisión en otro hilo"
+    mientras_arma = recargable.valor()
+    seguir.set()
+    limite = time.monotonic() + 5
+    while recargable.valor() is inicial and time.monotonic() < limite:
+        time.sleep(0.01)
+
+    # Assert
+    assert sin_revisar is inicial, "Entre revisiones no debe consultar la versión"
+    assert durante is inicial and mientras_arma is inicial, "Las lecturas no esperan al rearmado"
+    assert recargable.valor() == {"version": 2}, "Al terminar debe publicar el valor nuevo"
+
+
+@pytest.mark.django_db
+def test_un_feriado_o_cierre_nuevo_llega_a_los_validadores_sin_reiniciar(settings):
+    # Arrange
+    settings.INSTANTANEA_REGISTRO = ""
+    calendario.recargar()
+    validar_fecha_visita(EMERGENCIA, feriados_vigentes())
+
+    # Act
+    Feriado.objects.create(fecha=EMERGENCIA, nombre="Asueto")
+    con_feriado = calendario.recargar()
+    Feriado.objects.filter(fecha=EMERGENCIA).delete()
+    CierreFecha.objects.create(fecha=date(2030, 1, 10), motivo="Tormenta", creado_en="2030-01-09T10:00Z")
+    calendario.recargar()
+
+    # Assert
+    assert EMERGENCIA in con_feriado and date(2025, 12, 25) in con_feriado, \
+        "El calendario debe tener los feriados cargados y el nuevo"
+    assert EMERGENCIA not in feriados_vigentes(), "Borrar el feriado también debe publicarse"
+    with pytest.raises(ValueError):
+        validar_fecha_visita(date(2030, 1, 10), feriados_vigentes())
+
+
+@pytest.mark.django_db
+def test_invalidar_rearma_el_calendario_en_la_proxima_lectura(settings):
+    # Arrange
+    settings.INSTANTANEA_REGISTRO = ""
+    calendario_vigente()
+    Feriado.objects.create(fecha=EMERGENCIA, nombre="Asueto")
+    sin_revisar = calendario_vigente()
+
+    # Act
+    calendario.invalidar()
+
+    # Assert
+    assert EMERGENCIA not in sin_revisar, "Entre revisiones se sigue leyendo el calendario publicado"
+    assert EMERGENCIA in calendario_vigente(), "Invalidado, la próxima lectura lo rearma con la base"
+
+
+@pytest.mark.django_db
+def test_feriados_y_cierres_regeneran_la_instantanea_despues_del_commit_y_aparte(
+        settings, monkeypatch, django_capture_on_commit_callbacks):
+    # Arrange
+    settings.INSTANTANEA_REGISTRO = "registro.bin"
+    hilos = []
+    regenerada = threading.Event()
+
+    def generar_instantanea():
+        hilos.append(threading.current_thread())
+        regenerada.set()
+
+    monkeypatch.setattr(instantanea, "generar_instantanea", generar_instantanea)
+
+    # Act
+    with django_capture_on_commit_callbacks(execute=True) as al_confirmar:
+        Feriado.objects.create(fecha=EMERGENCIA, nombre="Asueto")
+        CierreFecha.objects.create(fecha=date(2030, 1, 10), motivo="Tormenta", creado_en="2030-01-09T10:00Z")
+        durante_la_transaccion = list(hilos)
+
+    # Assert
+    assert regenerada.wait(5), "Confirmado el cambio, la instantánea se debe regenerar"
+    assert durante_la_transaccion == [], "No se regenera dentro de la transacción del admin"
+    assert len(al_confirmar) == 2, "Un cierre cargado a mano también regenera la instantánea"
+    assert threading.current_thread() not in hilos, "La regeneración no corre en el hilo del request"
@@ -192,4 +192,21 @@ def test_confirmar_pago_falla_si_orden_no_existe():
             repositorio=repositorio_fake,
             servicio_mail=servicio_mail_fake,
             reloj=reloj_fake,
-        )
\ No newline at end of file
+        )
+
+def test_confirmar_pago_de_orden_cancelada_no_la_paga_y_registra_la_anomalia(caplog):
+    from comprar_entradas.views import confirmar_pago
+
+    # Arrange
+    orden = {"id": 1, "estado": "CANCELADA", "pagada_en": None, "lineas": [{}], "fecha_visita": "2025-10-20"}
+    marcadas, mails = [], []
+    repositorio_fake = {"buscar": lambda id_orden: orden, "marcar_pagada": lambda *args: marcadas.append(args)}
+
+    # Act
+    with caplog.at_level("WARNING", logger="comprar_entradas.pagos"):
+        confirmar_pago({"id_orden": 1, "estado": "aprobado"}, repositorio_fake,
+                       {"enviar_confirmacion": mails.append}, {"ahora": lambda: "2025-10-13T10:00:00Z"})
+
+    # Assert
+    assert not marcadas and not mails, "Una orden cancelada no se paga ni recibe confirmación"
+    assert "hay que reintegrarlo" in caplog.text, "El cobro de una orden cancelada debe quedar registrado"
@@ -0,0 +1,74 @@
+# tests/unit/test_consultas.py
+import json
+import logging
+from datetime import date, datetime, timezone
+
+import pytest
+
+from comprar_entradas.consultas import PresupuestoConsultas, PresupuestoExcedido, presupuesto_configurado
+from comprar_entradas.models import Orden
+from comprar_entradas.repositorio import orden_a_dict, repositorio_db
+from comprar_entradas.views import (
+    confirmar_pago, enrutador_pagos_simple, motor_precios_simple, proveedor_horarios_simple, realizar_compra,
+    reloj_controlable, servicio_mail_simple,
+)
+
+FECHA = date(2030, 1, 5)
+RELOJ = reloj_controlable(datetime(2029, 12, 1, 10, 0, tzinfo=timezone.utc))
+
+
+def comprar(forma_pago="EFECTIVO"):
+    return realizar_compra({"id": 1, "nombre": "Tomas", "email": "tomas.vergara@example.com"}, FECHA, 4,
+                           [{"nombre": "Ana", "edad": 30}] * 4, "REGULAR", forma_pago, proveedor_horarios_simple,
+                           motor_precios_simple, repositorio_db(RELOJ), enrutador_pagos_simple(),
+                           servicio_mail_simple(), RELOJ)
+
+
+@pytest.mark.django_db
+@PresupuestoConsultas(12, repetidas=2)
+def test_realizar_compra_con_repositorio_db_respeta_su_presupuesto():
+    # Act
+    resultado = comprar()
+
+    # Assert
+    assert resultado["orden_id"] is not None
+
+
+@pytest.mark.django_db
+def test_el_presupuesto_detecta_consultas_repetidas_por_orden():
+    # Arrange
+    ids = [comprar()["orden_id"] for _ in range(3)]
+
+    # Act: una consulta de líneas por orden (N+1) contra una sola para todas
+    with pytest.raises(PresupuestoExcedido, match="repetida 3 veces") as error:
+        with PresupuestoConsultas(10, repetidas=3):
+            [orden_a_dict(orden, orden.lineas.all()) for orden in Orden.objects.filter(pk__in=ids)]
+    with PresupuestoConsultas(2, repetidas=2) as medicion:
+        [orden_a_dict(orden, orden.lineas.all()) for orden in Orden.objects.filter(pk__in=ids).prefetch_related("lineas")]
+
+    # Assert
+    assert "comprar_entradas_lineaorden" in str(error.value), "El error debe mostrar la consulta repetida"
+    assert medicion.consultas == 2 and medicion.segundos > 0
+
+
+@pytest.mark.django_db
+def test_en_produccion_se_registran_las_llamadas_que_exceden_el_presupuesto(settings, caplog):
+    # Arrange
+    settings.PRESUPUESTO_CONSULTAS = {"muestreo": 1.0, "repetidas": 5,
+                                      "presupuestos": {"realizar_compra": 12, "confirmar_pago": 1}}
+    presupuesto_configurado.cache_clear()
+    orden_id = comprar("TARJETA")["orden_id"]
+
+    # Act
+    try:
+        with caplog.at_level(logging.WARNING, logger="comprar_entradas.consultas"):
+            confirmar_pago({"id_orden": orden_id, "estado": "aprobado"}, repositorio_db(), servicio_mail_simple(), RELOJ)
+    finally:
+        presupuesto_configurado.cache_clear()
+
+    # Assert
+    registros = [json.loads(registro.getMessage()) for registro in caplog.records]
+    assert [registro["nombre"] for registro in registros] == ["confirmar_pago"], \
+        "Solo confirmar_pago se pasó de su presupuesto"
+    assert registros[0]["consultas"] > 1 and registros[0]["presupuesto"] == 1
+    assert Orden.objects.get(pk=orden_id).estado == "PAGADA", "Medir no debe cambiar el resultado"
@@ -0,0 +1,130 @@
+# tests/unit/test_descuentos.py
+import io
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from comprar_entradas.descuentos import Descuento, Regla, buscar_descuento, generar_codigos
+from comprar_entradas.models import Campania, CodigoDescuento, CupoDiario, LineaOrden, Orden
+from comprar_entradas.repositorio import expirar_pendientes, repositorio_db
+from comprar_entradas.views import (
+    calcular_total, construir_borrador_orden, enrutador_pagos_simple, motor_precios_simple, proveedor_horarios_simple,
+    realizar_compra, reloj_controlable, servicio_mail_simple,
+)
+
+FECHA = date(2030, 1, 5)
+AHORA = datetime(2029, 12, 1, 10, 0, tzinfo=timezone.utc)
+VISITANTES = [{"nombre": "Ana", "edad": 40}, {"nombre": "Luz", "edad": 8}, {"nombre": "Teo", "edad": 5}]
+
+
+def regla(**cambios):
+    valores = {"campania_id": 1, "tipo": "PORCENTAJE", "valor": 50, "tipo_pase": "", "edad_maxima": None,
+               "minimo_entradas": 1, "visita_desde": None, "visita_hasta": None, "vence_en": None, "activa": True}
+    valores.update(cambios)
+    return Descuento(7, Regla(**valores))
+
+
+def comprar(codigo, reloj, forma_pago="TARJETA"):
+    return realizar_compra({"id": 1, "nombre": "Marco", "email": "marco.figueroa@example.com"}, FECHA,
+                           len(VISITANTES), VISITANTES, "REGULAR", forma_pago, proveedor_horarios_simple,
+                           motor_precios_simple, repositorio_db(reloj), enrutador_pagos_simple(),
+                           servicio_mail_simple(), reloj, codigo_descuento=codigo)
+
+
+def test_el_descuento_queda_desglosado_en_las_lineas_del_borrador():
+    # Arrange
+    menores_a_mitad = regla(edad_maxima=12)
+    dos_mil_por_orden = regla(tipo="MONTO", valor=4000)
+
+    # Act
+    borrador = construir_borrador_orden({"id": 1}, FECHA, VISITANTES, "REGULAR", "TARJETA", motor_precios_simple,
+                                        menores_a_mitad)
+    con_monto = construir_borrador_orden({"id": 1}, FECHA, VISITANTES, "REGULAR", "TARJETA", motor_precios_simple,
+                                         dos_mil_por_orden)
+
+    # Assert
+    assert [linea["precio"]["monto"] for linea in borrador["lineas"]] == [3000, 1500, 1500], \
+        "Solo las entradas de menores deben tener el descuento"
+    assert "descuento" not in borrador["lineas"][0] and borrador["lineas"][1]["descuento"]["monto"] == 1500, \
+        "Cada línea debe informar cuánto se le descontó"
+    assert borrador["lineas"][1]["precio"] is borrador["lineas"][2]["precio"], "Las líneas iguales comparten el precio"
+    assert borrador["total"] == 6000 and borrador["descuento"] == 3000 and borrador["codigo_descuento"] == 7
+    assert calcular_total(borrador, motor_precios_simple) == borrador["total"], "El total debe ser el ya descontado"
+    assert [linea["precio"]["monto"] for linea in con_monto["lineas"]] == [0, 2000, 3000], \
+        "El monto fijo se reparte en orden entre las entradas"
+    with pytest.raises(ValueError, match="pase VIP"):
+        construir_borrador_orden({"id": 1}, FECHA, VISITANTES, "VIP", "TARJETA", motor_precios_simple,
+                                 regla(tipo_pase="REGULAR"))
+
+
+@pytest.mark.django_db
+def test_un_codigo_de_un_uso_se_canjea_una_sola_vez_y_vuelve_si_la_reserva_expira():
+    # Arrange
+    campania = Campania.objects.create(nombre="Vacaciones", tipo="PORCENTAJE", valor=10,
+                                       vence_en=AHORA + timedelta(days=30))
+    codigos = io.StringIO()
+    generar_codigos(campania, 50, codigos, lote=20)
+    codigo = codigos.getvalue().split()[17]
+    reloj = reloj_controlable(AHORA)
+
+    # Act
+    resultado = comprar(codigo.lower().replace("-", " "), reloj)
+
+    # Assert
+    orden = Orden.objects.get(pk=resultado["orden_id"])
+    assert (orden.total, orden.descuento) == (8100, 900), "La orden debe guardar el total descontado y el descuento"
+    assert list(LineaOrden.objects.filter(orden=orden).values_list("monto", "descuento")) == [(2700, 300)] * 3
+    assert CodigoDescuento.objects.count() == 50 and not CodigoDescuento.objects.filter(hash__contains="-").exists()
+    with pytest.raises(ValueError, match="ya fue usado"):
+        comprar(codigo, reloj)
+
+    # La reserva no se paga: al expirar el código se puede volver a usar
+    expirar_pendientes(AHORA + timedelta(minutes=1))
+    assert buscar_descuento(codigo).codigo_id == orden.codigo_descuento_id, "El código debe volver a estar disponible"
+    reloj["avanzar"](timedelta(days=31))
+    with pytest.raises(ValueError, match="vencido"):
+        comprar(codigo, reloj)
+
+
+@pytest.mark.django_db
+def test_canje_concurrente_del_ultimo_uso_no_consume_cupo():
+    # Arrange
+    campania = Campania.objects.create(nombre="Prensa", tipo="MONTO", valor=1000)
+    codigo = CodigoDescuento.objects.create(hash="x" * 32, campania=campania, usos_maximos=1)
+    CupoDiario.objects.create(fecha=FECHA, capacidad=100)
+    borrador = construir_borrador_orden({"id": 1, "nombre": "Ana", "email": "ana@example.com"}, FECHA, VISITANTES,
+                                        "REGULAR", "EFECTIVO", motor_precios_simple, Descuento(codigo.pk, regla().regla))
+    repositorio = repositorio_db()
+
+    # Act: dos compras armaron el borrador con el código libre; la segunda llega a guardar después
+    repositorio["guardar_pendiente"](dict(borrador))
+    with pytest.raises(ValueError, match="ya fue usado"):
+        repositorio["guardar_pendiente"](dict(borrador))
+
+    # Assert
+    assert CodigoDescuento.objects.get(pk=codigo.pk).usos == 1, "El código de un uso se canjea una sola vez"
+    assert CupoDiario.objects.get(fecha=FECHA).vendidas == 3, "La compra rechazada no debe consumir cupo"
+    assert Orden.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_la_regla_se_recompila_con_cualquier_escritura_de_la_campania():
+    # Arrange
+    campania = Campania.objects.create(nombre="Invierno", tipo="PORCENTAJE", valor=10)
+    codigos = io.StringIO()
+    generar_codigos(campania, 1, codigos, usos_maximos=None)
+    codigo = codigos.getvalue().strip()
+    inicial = buscar_descuento(codigo).regla
+
+    # Act
+    Campania.objects.filter(pk=campania.pk).update(valor=20)
+    masiva = buscar_descuento(codigo).regla
+    campania.refresh_from_db()
+    campania.activa = False
+    campania.save(update_fields=["activa"])
+    editada = buscar_descuento(codigo).regla
+
+    # Assert
+    assert inicial.valor == 10
+    assert masiva.valor == 20, "Un queryset.update() también debe invalidar la regla compilada"
+    assert not editada.activa and campania.version == 2, "Cada escritura sube la versión de la campaña"
@@ -0,0 +1,79 @@
+# tests/unit/test_estados.py
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+from comprar_entradas.estados import ConflictoDeVersion, puede_transicionar
+from comprar_entradas.models import CupoDiario, Orden
+from comprar_entradas.repositorio import expirar_pendientes, repositorio_db, transicionar
+from comprar_entradas.views import confirmar_pago, reloj_controlable
+
+FECHA = date(2030, 1, 5)
+CREADA = datetime(2025, 10, 13, 10, 0, tzinfo=timezone.utc)
+
+
+def borrador(forma_pago="TARJETA"):
+    return {
+        "usuario": {"id": 1, "nombre": "Marco", "email": "marco.figueroa@example.com"},
+        "fecha_visita": FECHA,
+        "tipo_pase": "REGULAR",
+        "forma_pago": forma_pago,
+        "lineas": [{"nombre": "Ana", "edad": 30, "precio": {"monto": 3000}},
+                   {"nombre": "Luis", "edad": 30, "precio": {"monto": 3000}}],
+        "total": 6000,
+    }
+
+
+def test_transiciones_validas():
+    # Arrange / Act / Assert
+    assert puede_transicionar("PENDIENTE", "PAGADA"), "Una orden pendiente se puede pagar"
+    assert puede_transicionar("PAGADA", "CANCELADA"), "Una orden pagada se puede cancelar (cierre del parque)"
+    assert not puede_transicionar("EXPIRADA", "PAGADA"), "Una reserva expirada no se puede pagar"
+    assert not puede_transicionar("PAGADA", "EXPIRADA"), "Una orden pagada no expira"
+
+
+@pytest.mark.django_db
+def test_transicionar_reintenta_si_cambio_la_version_y_rechaza_si_ya_no_es_valida(monkeypatch):
+    # Arrange
+    orden = repositorio_db()["guardar_pendiente"](borrador())
+    original = Orden.objects.filter
+
+    def filtrar_y_pagar_antes(*args, **kwargs):
+        # Otro proceso paga la orden entre que esta transición lee la versión y la actualiza
+        if "version" in kwargs and Orden.objects.get(pk=orden["id"]).version == 0:
+            monkeypatch.setattr(Orden.objects, "filter", original)
+            Orden.objects.filter(pk=orden["id"]).update(estado="PAGADA", version=1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(Orden.objects, "filter", filtrar_y_pagar_antes)
+
+    # Act
+    expirada = transicionar(orden["id"], "EXPIRADA")
+
+    # Assert
+    assert expirada is False, "Al releer, la orden ya está pagada: la expiración debe rechazarse"
+    assert Orden.objects.get(pk=orden["id"]).estado == "PAGADA", "No debe pisar el pago del otro proceso"
+    with pytest.raises(ConflictoDeVersion):
+        transicionar(orden["id"], "CANCELADA", intentos=0)
+
+
+@pytest.mark.django_db
+def test_expirar_pendientes_libera_el_cupo_y_el_pago_tardio_no_la_revive():
+    # Arrange
+    CupoDiario.objects.create(fecha=FECHA, capacidad=10)
+    reloj = reloj_controlable(CREADA)
+    repositorio = repositorio_db(reloj)
+    tarjeta = repositorio["guardar_pendiente"](borrador())
+    efectivo = repositorio["guardar_pendiente"](borrador("EFECTIVO"))
+    mails = []
+
+    # Act
+    expiradas = expirar_pendientes(CREADA + timedelta(minutes=30))
+    confirmar_pago({"id_orden": tarjeta["id"], "estado": "aprobado"}, repositorio,
+                   {"enviar_confirmacion": mails.append}, reloj)
+
+    # Assert
+    assert expiradas == 1, "Solo expiran las reservas con tarjeta"
+    assert Orden.objects.get(pk=tarjeta["id"]).estado == "EXPIRADA", "La reserva vencida debe quedar EXPIRADA"
+    assert Orden.objects.get(pk=efectivo["id"]).estado == "PENDIENTE", "La de efectivo sigue pendiente"
+    assert CupoDiario.objects.get(fecha=FECHA).vendidas == 2, "Debe devolverse el cupo de la reserva expirada"
+    assert mails == [], "Un pago tardío no debe confirmar una reserva expirada"
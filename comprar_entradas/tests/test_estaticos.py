@@ -0,0 +1,102 @@
+# tests/unit/test_estaticos.py
+import gzip
+import json
+import pytest
+from django.test import RequestFactory
+from django.http import HttpResponse
+
+from comprar_entradas.estaticos import EstaticosMiddleware, comprimir_archivo, elegir_codificacion, CACHE_INMUTABLE
+
+
+@pytest.fixture
+def static_root(tmp_path, settings):
+    # Arrange: un STATIC_ROOT como el que deja collectstatic
+    (tmp_path / "css").mkdir()
+    contenido = b"body { background-color: #f8f9fa; }\n" * 50
+    (tmp_path / "css" / "app.abc123.css").write_bytes(contenido)
+    (tmp_path / "css" / "app.css").write_bytes(contenido)
+    (tmp_path / "staticfiles.json").write_text(json.dumps({"paths": {"css/app.css": "css/app.abc123.css"}}))
+    comprimir_archivo(tmp_path / "css" / "app.abc123.css")
+
+    settings.STATIC_ROOT = tmp_path
+    settings.STATIC_URL = "static/"
+    return tmp_path
+
+
+def test_comprimir_archivo_genera_variante_gzip(tmp_path):
+    # Arrange
+    ruta = tmp_path / "app.js"
+    ruta.write_bytes(b"console.log('hola');\n" * 100)
+
+    # Act
+    generados = comprimir_archivo(ruta)
+
+    # Assert
+    assert str(ruta) + ".gz" in generados, "Debería generarse la variante .gz"
+    assert gzip.decompress((tmp_path / "app.js.gz").read_bytes()) == ruta.read_bytes()
+
+
+def test_middleware_sirve_variante_gzip_con_cache_inmutable(static_root):
+    # Arrange
+    middleware = EstaticosMiddleware(lambda request: HttpResponse(status=404))
+    request = RequestFactory().get("/static/css/app.abc123.css", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+    # Act
+    respuesta = middleware(request)
+
+    # Assert
+    assert respuesta.status_code == 200
+    assert respuesta["Content-Encoding"] == "gzip"
+    assert respuesta["Cache-Control"] == CACHE_INMUTABLE, "Los archivos con hash deben ser inmutables"
+    assert respuesta["Content-Type"].startswith("text/css")
+
+
+def test_middleware_respeta_los_q_de_accept_encoding(static_root):
+    # Arrange
+    middleware = EstaticosMiddleware(lambda request: HttpResponse(status=404))
+    request = RequestFactory().get("/static/css/app.abc123.css", HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+
+    # Act
+    respuesta = middleware(request)
+
+    # Assert
+    assert "Content-Encoding" not in respuesta, "gzip;q=0 significa que el cliente no acepta gzip"
+
+
+def test_elegir_codificacion_prefiere_el_mayor_q():
+    # Arrange
+    variantes = {"br": "app.css.br", "gzip": "app.css.gz"}
+
+    # Act / Assert
+    assert elegir_codificacion(variantes, "gzip, br") == "br", "Ante empate se prefiere brotli"
+    assert elegir_codificacion(variantes, "br;q=0.5, gzip;q=0.8") == "gzip"
+    assert elegir_codificacion(variantes, "br;q=0, *") == "gzip", "El comodín vale para las no nombradas"
+    assert elegir_codificacion(variantes, "*;q=0") is None
+    assert elegir_codificacion({"gzip": "app.css.gz"}, "br, gzip;q=0.1") == "gzip"
+    assert elegir_codificacion(variantes, "GZIP; Q=0.9, br;q=abc") == "gzip", "Un q inválido rechaza la codificación"
+
+
+def test_middleware_no_marca_inmutables_los_archivos_sin_hash(static_root):
+    # Arrange
+    middleware = EstaticosMiddleware(lambda request: HttpResponse(status=404))
+    request = RequestFactory().get("/static/css/app.css")
+
+    # Act
+    respuesta = middleware(request)
+
+    # Assert
+    assert respuesta.status_code == 200
+    assert "Content-Encoding" not in respuesta, "Sin Accept-Encoding se sirve el archivo original"
+    assert "immutable" not in respuesta["Cache-Control"]
+
+
+def test_middleware_deja_pasar_rutas_que_no_son_estaticos(static_root):
+    # Arrange
+    middleware = EstaticosMiddleware(lambda request: HttpResponse("vista"))
+    request = RequestFactory().get("/comprar-entradas/")
+
+    # Act
+    respuesta = middleware(request)
+
+    # Assert
+    assert respuesta.content == b"vista"
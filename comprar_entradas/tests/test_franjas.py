@@ -0,0 +1,156 @@
+# tests/unit/test_franjas.py
+import random
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic, sleep
+
+import pytest
+
+from comprar_entradas import franjas
+from comprar_entradas.franjas import IndiceFranjas, generar_franjas
+from comprar_entradas.models import CupoDiario, FranjaIngreso, Orden
+from comprar_entradas.repositorio import expirar_pendientes, repositorio_db
+
+FECHA = date(2030, 1, 5)
+
+
+def borrador(cantidad, hora_ingreso=None, fecha=FECHA):
+    return {
+        "usuario": {"id": 1, "nombre": "Marco", "email": "marco.figueroa@example.com"},
+        "fecha_visita": fecha,
+        "tipo_pase": "REGULAR",
+        "forma_pago": "TARJETA",
+        "lineas": [{"nombre": f"V{i}", "edad": 30, "precio": {"monto": 3000}} for i in range(cantidad)],
+        "total": 3000 * cantidad,
+        "hora_ingreso": hora_ingreso,
+    }
+
+
+def crear_franjas(fecha, capacidad, apertura=time(9, 0), cierre=time(10, 0)):
+    FranjaIngreso.objects.bulk_create(generar_franjas(fecha, fecha, apertura, cierre, 15, capacidad))
+
+
+def test_indice_encuentra_la_primera_franja_con_lugar_como_la_busqueda_lineal():
+    # Arrange
+    azar = random.Random(3)
+    filas = [(date(2030, 1, 1) + timedelta(days=i // 40), time(9 + (i % 40) // 4, 15 * (i % 4)), 12,
+              azar.randrange(13)) for i in range(4000)]
+    indice = IndiceFranjas(filas)
+
+    # Act
+    for _ in range(300):
+        i = azar.randrange(len(filas))
+        indice.actualizar(i, azar.randrange(13))
+        desde, cantidad = azar.randrange(len(filas)), azar.randrange(1, 11)
+
+        # Assert
+        esperada = next((j for j in range(desde, len(filas)) if indice.libres[j] >= cantidad), None)
+        assert indice.primera(desde, cantidad) == esperada, "El bitset debe coincidir con la búsqueda lineal"
+
+
+def test_el_indice_vencido_se_rearma_aparte_sin_frenar_la_consulta(monkeypatch):
+    # Arrange
+    ahora = [0.0]
+    armando = threading.Event()
+    seguir = threading.Event()
+    nuevo = IndiceFranjas([(FECHA, time(9, 0), 10, 0)])
+
+    def construir():
+        armando.set()
+        seguir.wait(5)
+        return nuevo
+
+    monkeypatch.setattr(franjas.indice, "reloj", lambda: ahora[0])
+    monkeypatch.setattr(franjas.indice, "construir", lambda: IndiceFranjas([]))
+    anterior = franjas.indice.recargar()
+    monkeypatch.setattr(franjas.indice, "construir", construir)
+
+    # Act
+    ahora[0] = franjas.TTL_INDICE + 1
+    durante = franjas.indice_vigente()
+    assert armando.wait(5), "Debe rearmar el índice en otro hilo"
+    mientras_arma = franjas.indice_vigente()
+    seguir.set()
+    limite = monotonic() + 5
+    while franjas.indice_vigente() is anterior and monotonic() < limite:
+        sleep(0.01)
+
+    # Assert
+    assert durante is anterior and mientras_arma is anterior, "La consulta no espera al rearmado del índice"
+    assert franjas.indice_vigente() is nuevo, "Al terminar debe publicar el índice nuevo"
+
+
+@pytest.mark.django_db
+def test_guardar_pendiente_asigna_la_franja_pedida_o_la_siguiente_con_lugar():
+    # Arrange
+    CupoDiario.objects.create(fecha=FECHA, capacidad=100)
+    crear_franjas(FECHA, capacidad=4)
+    repositorio = repositorio_db()
+
+    # Act
+    primera = repositorio["guardar_pendiente"](borrador(3, time(9, 15)))
+    segunda = repositorio["guardar_pendiente"](borrador(2, time(9, 15)))
+    sin_preferencia = repositorio["guardar_pendiente"](borrador(1))
+    ultima = repositorio["guardar_pendiente"](borrador(4, time(9, 30)))
+
+    # Assert
+    assert primera["hora_ingreso"] == time(9, 15), "Debe asignar la franja pedida"
+    assert segunda["hora_ingreso"] == time(9, 30), "Si la pedida no alcanza, debe asignar la siguiente"
+    assert sin_preferencia["hora_ingreso"] == time(9, 0), "Sin preferencia, la primera con lugar"
+    assert ultima["hora_ingreso"] == time(9, 45), "Debe saltear las franjas sin lugar para todo el grupo"
+    with pytest.raises(ValueError) as excinfo:
+        repositorio["guardar_pendiente"](borrador(3, time(9, 30)))
+    assert "horarios de ingreso" in str(excinfo.value), "Debe rechazar si no queda franja con lugar"
+    assert CupoDiario.objects.get(fecha=FECHA).vendidas == 10, "La compra rechazada no debe consumir el cupo diario"
+    assert repositorio["guardar_pendiente"](borrador(2, fecha=date(2030, 1, 6)))["hora_ingreso"] is None, \
+        "Una fecha sin franjas es de ingreso libre"
+
+
+@pytest.mark.django_db
+def test_expirar_devuelve_la_franja_y_la_api_muestra_la_disponibilidad(client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(franjas.timezone, "localdate", lambda: FECHA)
+    creada = datetime(2025, 10, 13, 10, 0, tzinfo=timezone.utc)
+    crear_franjas(FECHA, capacidad=2, cierre=time(9, 30))
+    crear_franjas(FECHA + timedelta(days=1), capacidad=5)
+    repositorio = repositorio_db({"ahora": lambda: creada})
+    repositorio["guardar_pendiente"](borrador(2))
+    vencida = repositorio["guardar_pendiente"](borrador(2))
+    Orden.objects.filter(pk=vencida["id"]).update(creada_en=creada - timedelta(hours=1))
+
+    # Act
+    llena = client.get("/comprar-entradas/api/v1/franjas", {"fecha_visita": FECHA.isoformat(), "cantidad": 2})
+    expirar_pendientes(creada - timedelta(minutes=30))
+    franjas.indice.recargar()
+    liberada = client.get("/comprar-entradas/api/v1/franjas", {"fecha_visita": FECHA.isoformat(), "cantidad": 2})
+
+    # Assert
+    assert llena.json()["franjas"] == [{"inicio": "09:00", "libres": 0}, {"inicio": "09:15", "libres": 0}], \
+        "Debe mostrar las franjas de la fecha con sus lugares libres"
+    assert llena.json()["siguiente"] == {"fecha_visita": "2030-01-06", "inicio": "09:00"}, \
+        "Si no hay lugar, debe sugerir la siguiente franja de la temporada"
+    assert liberada.json()["franjas"][1] == {"inicio": "09:15", "libres": 2}, "La reserva expirada libera su franja"
+    assert liberada.json()["siguiente"] is None
+    assert "max-age" in llena["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_el_mismo_dia_no_se_ofrecen_ni_asignan_franjas_que_ya_empezaron(client, monkeypatch):
+    # Arrange: el reloj quieto a las 9:20 del día de la visita
+    mediodia = datetime(2030, 1, 5, 9, 20, tzinfo=timezone.utc)
+    monkeypatch.setattr(franjas.timezone, "localdate", lambda: FECHA)
+    monkeypatch.setattr(franjas.timezone, "localtime", lambda momento=None: mediodia)
+    crear_franjas(FECHA, capacidad=5)
+    repositorio = repositorio_db({"ahora": lambda: mediodia})
+
+    # Act
+    sin_preferencia = repositorio["guardar_pendiente"](borrador(2))
+    pasada = repositorio["guardar_pendiente"](borrador(2, time(9, 0)))
+    respuesta = client.get("/comprar-entradas/api/v1/franjas", {"fecha_visita": FECHA.isoformat(), "cantidad": 2})
+
+    # Assert
+    assert sin_preferencia["hora_ingreso"] == time(9, 30), "No debe asignar una franja que ya empezó"
+    assert pasada["hora_ingreso"] == time(9, 30), "Una hora de ingreso pasada se corre a la próxima franja"
+    assert [f["inicio"] for f in respuesta.json()["franjas"]] == ["09:30", "09:45"], \
+        "La disponibilidad de hoy solo lista las franjas que no pasaron"
+    assert FranjaIngreso.objects.get(fecha=FECHA, inicio=time(9, 0)).vendidas == 0
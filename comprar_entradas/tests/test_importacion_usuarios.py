@@ -0,0 +1,77 @@
+# tests/unit/test_importacion_usuarios.py
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from comprar_entradas.importacion_usuarios import importar_usuarios, normalizar_email
+from comprar_entradas.models import ImportacionUsuarios, UsuarioRegistrado
+from comprar_entradas.views import validar_usuario_registrado
+from comprar_entradas.repositorio import usuario_registrado
+
+
+def escribir_csv(ruta, filas):
+    ruta.write_text("email,nombre,registrado\n" + "".join(f"{e},{n},{r}\n" for e, n, r in filas), encoding="utf-8")
+    return str(ruta)
+
+
+def test_normalizar_email():
+    # Arrange / Act / Assert
+    assert normalizar_email("  Ana.Perez@Example.COM ") == "ana.perez@example.com", "Debe recortar y pasar a minúsculas"
+    assert normalizar_email("ａｎａ@example.com") == "ana@example.com", "Debe normalizar caracteres de ancho completo"
+    assert normalizar_email("sin-arroba.com") is None, "Un email sin arroba es inválido"
+    assert normalizar_email("ana@localhost") is None, "El dominio debe tener un punto"
+
+
+@pytest.mark.django_db
+def test_importar_usuarios_deduplica_y_hace_upsert(tmp_path):
+    # Arrange
+    UsuarioRegistrado.objects.create(email="viejo@example.com", nombre="Viejo", actualizado_en="2025-01-01T00:00Z")
+    ruta = escribir_csv(tmp_path / "socios.csv", [
+        ("Ana@Example.com", "Ana", "1"),
+        ("basura", "X", "1"),
+        ("viejo@example.com", "Viejo Actualizado", "1"),
+        ("ana@example.com ", "Ana Pérez", "1"),  # repetido: gana la última fila
+        ("baja@example.com", "Baja", "0"),
+    ])
+
+    # Act
+    resumen = importar_usuarios(ruta, lote=2, tamaño_bloque=2)
+
+    # Assert
+    assert resumen["filas"] == 5 and resumen["invalidas"] == 1, "Debe contar filas leídas e inválidas"
+    assert resumen["unicos"] == 3 and resumen["importados"] == 3, "Debe deduplicar los emails"
+    usuarios = dict(UsuarioRegistrado.objects.values_list("email", "nombre"))
+    assert usuarios == {"ana@example.com": "Ana Pérez", "viejo@example.com": "Viejo Actualizado",
+                        "baja@example.com": "Baja"}, "Debe actualizar los existentes y quedarse con la última fila"
+    assert usuario_registrado("  ANA@example.com"), "El socio importado debe quedar registrado"
+    assert not usuario_registrado("baja@example.com"), "Un socio dado de baja no está registrado"
+    validar_usuario_registrado({"id": 1, "email": "ana@example.com"}, usuario_registrado)
+
+
+@pytest.mark.django_db
+def test_importar_usuarios_retoma_despues_de_un_corte(tmp_path):
+    # Arrange
+    ruta = tmp_path / "socios.ndjson"
+    ruta.write_text("".join(json.dumps({"mail": f"socio{i:02d}@example.com", "nombre": f"Socio {i}"}) + "\n"
+                            for i in range(10)), encoding="utf-8")
+
+    def cortar(resumen):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        importar_usuarios(str(ruta), lote=4, progreso=cortar)
+    assert UsuarioRegistrado.objects.count() == 4, "El primer lote debe quedar guardado"
+
+    # Act
+    salida = io.StringIO()
+    call_command("importar_usuarios", str(ruta), "--lote", "4", stdout=salida)
+
+    # Assert
+    assert UsuarioRegistrado.objects.count() == 10, "Debe importar el resto"
+    assert "ya importados en una corrida anterior: 4" in salida.getvalue(), "Debe saltear el lote ya guardado"
+    assert "4 importados de 10 filas" in salida.getvalue(), "Debe mostrar el avance sin pedir más verbosidad"
+    assert ImportacionUsuarios.objects.get().terminada_en is not None, "La importación debe quedar terminada"
+    call_command("importar_usuarios", str(ruta), stdout=salida)
+    assert "ya se importó" in salida.getvalue(), "Volver a correrlo no debe reimportar"
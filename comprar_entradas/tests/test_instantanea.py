@@ -0,0 +1,74 @@
+# tests/unit/test_instantanea.py
+from datetime import date
+
+import pytest
+
+from comprar_entradas.instantanea import (
+    REVISION, Instantanea, escribir_instantanea, feriados_vigentes, generar_instantanea, instantanea_vigente,
+)
+from comprar_entradas.models import CierreFecha, UsuarioRegistrado
+from comprar_entradas.repositorio import usuario_registrado
+from comprar_entradas.views import validar_fecha_visita
+
+CERRADA = date(2030, 1, 5)
+
+
+def test_instantanea_busca_emails_y_fechas_cerradas(tmp_path):
+    # Arrange
+    ruta = str(tmp_path / "registro.bin")
+    emails = [f"socio{i}@example.com" for i in range(1000)]
+
+    # Act
+    cantidades = escribir_instantanea(ruta, emails + ["socio1@example.com"], [CERRADA, date(2030, 1, 1)])
+    instantanea = Instantanea(ruta)
+
+    # Assert
+    assert cantidades == (1000, 2), "Debe guardar cada email y fecha una sola vez"
+    assert all(instantanea.contiene_email(e) for e in emails), "Debe encontrar todos los socios"
+    assert not instantanea.contiene_email("intruso@example.com"), "Un email no registrado no debe aparecer"
+    assert CERRADA in instantanea.fechas_cerradas and date(2030, 1, 6) not in instantanea.fechas_cerradas, \
+        "Debe responder por las fechas cerradas"
+    assert list(instantanea.fechas_cerradas) == [date(2030, 1, 1), CERRADA], "Las fechas deben quedar ordenadas"
+    with pytest.raises(ValueError, match="feriados"):
+        validar_fecha_visita(CERRADA, instantanea.fechas_cerradas)
+
+
+def test_instantanea_vigente_toma_el_archivo_reemplazado(tmp_path, settings):
+    # Arrange
+    ruta = str(tmp_path / "registro.bin")
+    settings.INSTANTANEA_REGISTRO = ruta
+    escribir_instantanea(ruta, ["ana@example.com"], [])
+    ahora = [0.0]
+    anterior = instantanea_vigente(reloj=lambda: ahora[0])
+
+    # Act
+    escribir_instantanea(ruta, ["luis@example.com"], [CERRADA])
+    sin_revisar = instantanea_vigente(reloj=lambda: ahora[0])
+    ahora[0] += REVISION + 0.1
+    nueva = instantanea_vigente(reloj=lambda: ahora[0])
+
+    # Assert
+    assert sin_revisar is anterior, "Entre revisiones no debe mirar el archivo"
+    assert nueva is not anterior and nueva.contiene_email("luis@example.com"), "Debe abrir la instantánea nueva"
+    assert anterior.contiene_email("ana@example.com"), "Quien seguía leyendo la anterior no debe romperse"
+    assert CERRADA in feriados_vigentes(), "Los validadores de fecha deben ver los cierres nuevos"
+
+
+@pytest.mark.django_db
+def test_generar_instantanea_desde_la_base(tmp_path, settings):
+    # Arrange
+    settings.INSTANTANEA_REGISTRO = str(tmp_path / "registro.bin")
+    UsuarioRegistrado.objects.create(email="socia@example.com", actualizado_en="2025-01-01T00:00Z")
+    UsuarioRegistrado.objects.create(email="baja@example.com", registrado=False, actualizado_en="2025-01-01T00:00Z")
+    CierreFecha.objects.create(fecha=CERRADA, motivo="Tormenta", creado_en="2030-01-04T10:00Z")
+
+    # Act
+    generar_instantanea()
+    UsuarioRegistrado.objects.all().delete()
+
+    # Assert
+    assert usuario_registrado("Socia@Example.com"), "Debe responder desde la instantánea, sin consultar la base"
+    assert not usuario_registrado("baja@example.com"), "Los dados de baja no van a la instantánea"
+    assert usuario_registrado("marco.figueroa@example.com"), "Debe incluir los usuarios de constants"
+    assert CERRADA in feriados_vigentes() and date(2025, 12, 25) in feriados_vigentes(), \
+        "Debe incluir los cierres y los feriados"
@@ -0,0 +1,231 @@
+# tests/unit/test_mail.py
+import concurrent.futures
+import email
+import email.policy
+import socketserver
+import threading
+from datetime import date
+
+import pytest
+from django.core.cache import caches
+
+from comprar_entradas import mail
+from comprar_entradas.mail import PoolSMTP, ServicioMail, codigo_entrada, renderizar_confirmacion, servicio_mail_smtp
+from comprar_entradas.views import confirmar_pago
+
+REMITENTE = "entradas@parque.example"
+
+
+class ManejadorSumidero(socketserver.StreamRequestHandler):
+    """
+    Servidor SMTP mínimo que acepta todo salvo los destinatarios de `rechazados`.
+    """
+
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        sumidero = self.server
+        sumidero.conexiones += 1
+        self.wfile.write(b"220 sumidero\r\n")
+        destinatarios = []
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea[:4].upper()
+            if comando == b"EHLO":
+                extensiones = b"250-PIPELINING\r\n" if sumidero.pipelining else b""
+                self.wfile.write(b"250-sumidero\r\n" + extensiones + b"250 8BITMIME\r\n")
+            elif comando == b"MAIL":
+                destinatarios = []
+                self.wfile.write(b"250 OK\r\n")
+            elif comando == b"RCPT":
+                direccion = linea.decode().split("<", 1)[1].split(">", 1)[0]
+                if direccion in sumidero.rechazados:
+                    self.wfile.write(b"550 No existe\r\n")
+                elif sumidero.temporales.get(direccion):
+                    sumidero.temporales[direccion] -= 1
+                    self.wfile.write(b"451 Intente mas tarde\r\n")
+                else:
+                    destinatarios.append(direccion)
+                    self.wfile.write(b"250 OK\r\n")
+            elif comando == b"DATA":
+                if not destinatarios:
+                    self.wfile.write(b"554 Sin destinatarios\r\n")
+                    continue
+                self.wfile.write(b"354 Adelante\r\n")
+                partes = []
+                for linea_datos in iter(self.rfile.readline, b".\r\n"):
+                    partes.append(linea_datos)
+                sumidero.recibidos.append((destinatarios, b"".join(partes)))
+                self.wfile.write(b"250 OK\r\n")
+            elif comando in (b"RSET", b"NOOP", b"HELO"):
+                self.wfile.write(b"250 OK\r\n")
+            elif comando == b"QUIT":
+                self.wfile.write(b"221 Chau\r\n")
+                return
+            else:
+                self.wfile.write(b"500 ?\r\n")
+
+
+@pytest.fixture
+def sumidero():
+    servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), ManejadorSumidero)
+    servidor.daemon_threads = True
+    servidor.conexiones = 0
+    servidor.pipelining = True
+    servidor.rechazados = set()
+    servidor.temporales = {}  # destinatario -> cuántas veces más rechazarlo con 451
+    servidor.recibidos = []
+    threading.Thread(target=servidor.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def servicio(sumidero):
+    caches["default"].clear()
+    pool = PoolSMTP("127.0.0.1", sumidero.server_address[1], tamaño=2)
+    servicio = ServicioMail(pool, REMITENTE, procesos=0)
+    yield servicio
+    servicio.cerrar()
+
+
+def orden(orden_id, email_usuario="marco.figueroa@example.com"):
+    return {
+        "id": orden_id,
+        "usuario": {"nombre": "Marco Figueroa", "email": email_usuario},
+        "fecha_visita": date(2030, 1, 8),
+        "tipo_pase": "REGULAR",
+        "total": 8000,
+        "lineas": [
+            {"nombre": "Ana", "edad": 25, "precio": {"monto": 5000}},
+            {"nombre": "Luis", "edad": 8, "precio": {"monto": 3000}},
+        ],
+    }
+
+
+def test_renderizar_confirmacion_incluye_el_codigo_de_cada_entrada():
+    # Act
+    mensaje = email.message_from_bytes(renderizar_confirmacion(orden(7), REMITENTE), policy=email.policy.default)
+
+    # Assert
+    html = next(parte for parte in mensaje.walk() if parte.get_content_type() == "text/html").get_content()
+    assert mensaje["To"] == "marco.figueroa@example.com"
+    assert codigo_entrada(7, 0) in html and codigo_entrada(7, 1) in html, "Cada entrada debe tener su código"
+    assert codigo_entrada(7, 0) != codigo_entrada(7, 1) != codigo_entrada(8, 0)
+    assert "08/01/2030" in html
+
+
+def test_mensajes_se_renderizan_una_sola_vez_por_contenido(servicio, monkeypatch):
+    # Arrange
+    renderizadas = []
+    original = mail.renderizar_confirmacion
+    monkeypatch.setattr(mail, "renderizar_confirmacion",
+                        lambda orden, remitente: renderizadas.append(orden["id"]) or original(orden, remitente))
+
+    # Act
+    primero = servicio.mensajes([orden(1), orden(2)])
+    segundo = servicio.mensajes([orden(1), orden(2), orden(3)])
+    cambiada = servicio.mensajes([orden(1, email_usuario="otro@example.com")])
+
+    # Assert
+    assert renderizadas == [1, 2, 3, 1], "Solo se renderizan las órdenes nuevas o cuyo contenido cambió"
+    assert segundo[:2] == primero
+    assert b"otro@example.com" in cambiada[0]
+
+
+def test_rafaga_reutiliza_las_conexiones_y_reporta_los_rechazos(servicio, sumidero):
+    # Arrange
+    sumidero.rechazados.add("rebota@example.com")
+    ordenes = [orden(i, f"cliente{i}@example.com") for i in range(30)] + [orden(99, "rebota@example.com")]
+
+    # Act
+    resultado = servicio.enviar_confirmaciones(ordenes)
+
+    # Assert
+    assert resultado["enviados"] == 30
+    assert [error[:2] for error in resultado["errores"]] == [("rebota@example.com", 550)]
+    assert len(sumidero.recibidos) == 30
+    assert sumidero.conexiones <= 2, "Los 31 mensajes deben viajar por las 2 conexiones del pool"
+
+
+def test_servidor_sin_pipelining_usa_el_envio_clasico(servicio, sumidero):
+    # Arrange
+    sumidero.pipelining = False
+    sumidero.rechazados.add("rebota@example.com")
+
+    # Act
+    resultado = servicio.enviar_confirmaciones([orden(1), orden(2, "rebota@example.com"), orden(3, "x@example.com")])
+
+    # Assert
+    assert resultado["enviados"] == 2
+    assert len(resultado["errores"]) == 1
+    assert sorted(destinatarios[0] for destinatarios, _ in sumidero.recibidos) == [
+        "marco.figueroa@example.com", "x@example.com"]
+
+
+def test_enviar_cancelaciones_avisa_el_estado_del_reintegro(servicio, sumidero):
+    # Arrange
+    pagada = {**orden(1), "fechas_visita": [date(2030, 1, 8)], "reembolso": "REALIZADO"}
+    pendiente = {**orden(2, "x@example.com"), "fechas_visita": [date(2030, 1, 8)]}
+
+    # Act
+    resultado = servicio.enviar_cancelaciones([pagada, pendiente], "tormenta")
+
+    # Assert
+    assert resultado["enviados"] == 2
+    textos = {destinatarios[0]: email.message_from_bytes(datos, policy=email.policy.default).get_content()
+              for destinatarios, datos in sumidero.recibidos}
+    assert "tormenta" in textos["marco.figueroa@example.com"] and "08/01/2030" in textos["x@example.com"]
+    assert "Ya te reintegramos $8000" in textos["marco.figueroa@example.com"]
+    assert "no se te cobró nada" in textos["x@example.com"]
+
+
+def test_confirmar_pago_encola_el_mail_sin_esperar_el_envio(servicio, sumidero):
+    # Arrange
+    repositorio = {"buscar": lambda orden_id: orden(orden_id), "marcar_pagada": lambda orden_id, momento: True}
+
+    # Act
+    confirmar_pago({"id_orden": 5}, repositorio, servicio_mail_smtp(servicio), {"ahora": lambda: None})
+    servicio.cerrar()
+
+    # Assert
+    assert len(sumidero.recibidos) == 1
+    assert codigo_entrada(5, 0).encode() in sumidero.recibidos[0][1]
+
+
+def test_confirmacion_encolada_se_reintenta_y_las_fallas_quedan_registradas(servicio, sumidero, caplog):
+    # Arrange
+    servicio.espera_reintento = 0.01
+    sumidero.temporales["lento@example.com"] = 2
+    sumidero.rechazados.add("rebota@example.com")
+
+    # Act
+    demorada = servicio.enviar_confirmacion(orden(1, "lento@example.com"))
+    rechazada = servicio.enviar_confirmacion(orden(2, "rebota@example.com"))
+
+    # Assert
+    assert demorada.result(timeout=5) is True, "Un rechazo temporal (4xx) se reintenta hasta que sale"
+    assert rechazada.result(timeout=5) is False, "Un rechazo permanente (5xx) no se reintenta"
+    assert [destinatarios for destinatarios, _ in sumidero.recibidos] == [["lento@example.com"]]
+    avisos = [registro.levelname for registro in caplog.records if registro.name == "comprar_entradas.mail"]
+    assert avisos.count("WARNING") == 2 and avisos.count("ERROR") == 1
+
+
+def test_cada_orden_del_mismo_comprador_tiene_su_propio_resultado(servicio, sumidero):
+    # Arrange: dos órdenes al mismo email en un lote; el servidor rechaza solo el primer RCPT
+    sumidero.temporales["marco.figueroa@example.com"] = 1
+    lote = [(orden(1), concurrent.futures.Future(), 0), (orden(2), concurrent.futures.Future(), 0)]
+
+    # Act
+    fallidos = servicio._enviar_lote(lote)
+
+    # Assert
+    assert [(rechazo[0], temporal) for _, rechazo, temporal in fallidos] == [(451, True)], \
+        "Solo la orden rechazada debe quedar para reintentar"
+    aceptada = next(item for item in lote if item is not fallidos[0][0])
+    assert aceptada[1].result(timeout=0) is True, "La orden aceptada no debe reenviarse"
+    assert not fallidos[0][0][1].done()
+    assert len(sumidero.recibidos) == 1
@@ -0,0 +1,144 @@
+# tests/unit/test_multifecha.py
+import pytest
+from datetime import date, timedelta
+
+from comprar_entradas.models import CupoDiario, LineaOrden
+from comprar_entradas.repositorio import repositorio_db
+from comprar_entradas.views import (
+    construir_borrador_multifecha,
+    fechas_temporada,
+    realizar_compra_multifecha,
+    validar_fechas_visita,
+)
+
+USUARIO = {"id": 1, "nombre": "Marco Figueroa", "email": "marco.figueroa@example.com"}
+VISITANTES = [{"nombre": "Ana", "edad": 25}, {"nombre": "Luis", "edad": 8}]
+# Martes, miércoles y jueves de una semana futura
+FECHAS = [date(2030, 1, 8), date(2030, 1, 9), date(2030, 1, 10)]
+
+
+def comprar(fechas, repositorio, motor_precios=lambda visitante, tipo_pase: {"monto": 5000}):
+    return realizar_compra_multifecha(
+        usuario=USUARIO,
+        fechas_visita=fechas,
+        cantidad_entradas=len(VISITANTES),
+        visitantes=VISITANTES,
+        tipo_pase="REGULAR",
+        forma_pago="TARJETA",
+        proveedor_horarios=lambda fecha: True,
+        motor_precios=motor_precios,
+        repositorio=repositorio,
+        enrutador_pagos={"iniciar_flujo_tarjeta": lambda orden: "https://mercadopago.test/checkout/abc123"},
+        servicio_mail={},
+        reloj={"ahora": lambda: "2025-10-13T10:00:00Z"},
+    )
+
+
+def test_validar_fechas_visita_reporta_todas_las_fechas_cerradas_juntas():
+    # Arrange
+    lunes_1, lunes_2 = date(2030, 1, 7), date(2030, 1, 14)
+    feriado = date(2030, 1, 9)
+
+    # Act
+    with pytest.raises(ValueError) as excinfo:
+        validar_fechas_visita([lunes_1, date(2030, 1, 8), feriado, lunes_2], feriados={feriado})
+
+    # Assert
+    mensaje = str(excinfo.value)
+    assert "2030-01-07" in mensaje and "2030-01-14" in mensaje, "Debe listar todos los lunes, no solo el primero"
+    assert "2030-01-09" in mensaje, "Debe listar también el feriado en el mismo error"
+    assert "2030-01-08" not in mensaje, "No debe listar las fechas válidas"
+
+
+def test_construir_borrador_multifecha_consulta_el_motor_una_vez_por_visitante():
+    # Arrange
+    llamadas = []
+
+    def motor_precios(visitante, tipo_pase):
+        llamadas.append(visitante["nombre"])
+        return {"monto": 3000 if visitante["edad"] < 12 else 5000}
+
+    # Act
+    borrador = construir_borrador_multifecha(USUARIO, list(reversed(FECHAS)), VISITANTES, "REGULAR", "TARJETA",
+                                             motor_precios)
+
+    # Assert
+    assert llamadas == ["Ana", "Luis"], "El motor de precios debe consultarse una vez por visitante, no por fecha"
+    assert len(borrador["lineas"]) == 6, "Debe haber una línea por visitante y por fecha"
+    assert [linea["fecha_visita"] for linea in borrador["lineas"][::2]] == FECHAS
+    assert borrador["fecha_visita"] == FECHAS[0], "La fecha principal de la orden es la primera"
+    assert borrador["total"] == (5000 + 3000) * 3
+
+
+def test_fechas_temporada_excluye_lunes_y_feriados():
+    # Arrange
+    desde, hasta = date(2030, 1, 6), date(2030, 1, 19)
+    feriado = date(2030, 1, 10)
+
+    # Act
+    fechas = fechas_temporada(desde, hasta, feriados={feriado})
+
+    # Assert
+    assert len(fechas) == 11, "Dos semanas menos dos lunes y un feriado"
+    assert all(fecha.weekday() != 0 for fecha in fechas)
+    assert feriado not in fechas
+    assert fechas[0] == desde and fechas[-1] == hasta
+
+
+@pytest.mark.django_db
+def test_compra_multifecha_guarda_una_orden_con_una_linea_por_fecha():
+    # Act
+    resultado = comprar(FECHAS, repositorio_db())
+
+    # Assert
+    orden = repositorio_db()["buscar"](resultado["orden_id"])
+    assert orden["fechas_visita"] == FECHAS
+    assert len(orden["lineas"]) == 6
+    assert orden["total"] == 5000 * 6
+    for fecha in FECHAS:
+        assert CupoDiario.objects.get(fecha=fecha).vendidas == 2, "Cada fecha debe descontar las entradas de su día"
+
+
+@pytest.mark.django_db
+def test_compra_multifecha_sin_cupo_en_una_fecha_no_reserva_ninguna():
+    # Arrange
+    CupoDiario.objects.create(fecha=FECHAS[1], capacidad=1)
+
+    # Act
+    with pytest.raises(ValueError) as excinfo:
+        comprar(FECHAS, repositorio_db())
+
+    # Assert
+    assert FECHAS[1].isoformat() in str(excinfo.value), "El error debe indicar qué fecha no tiene cupo"
+    assert not CupoDiario.objects.filter(vendidas__gt=0).exists(), "Ninguna fecha debe quedar reservada"
+    assert LineaOrden.objects.count() == 0
+
+
+def test_compra_multifecha_sin_fechas_falla():
+    # Act / Assert
+    with pytest.raises(ValueError):
+        comprar([], {})
+
+
+@pytest.mark.django_db
+def test_api_compra_con_varias_fechas(client):
+    # Arrange
+    hoy = date.today()
+    fechas = fechas_temporada(hoy + timedelta(days=400), hoy + timedelta(days=410))[:3]
+    payload = {
+        "usuario": {"nombre": "Marco Figueroa", "email": "marco.figueroa@example.com"},
+        "fechas_visita": [fecha.isoformat() for fecha in fechas],
+        "tipo_pase": "REGULAR",
+        "forma_pago": "EFECTIVO",
+        "visitantes": [{"nombre": "Ana", "edad": 25}],
+    }
+
+    # Act
+    respuesta = client.post("/comprar-entradas/api/v1/compras", payload, content_type="application/json")
+    ambas = client.post("/comprar-entradas/api/v1/compras", {**payload, "fecha_visita": payload["fechas_visita"][0]},
+                        content_type="application/json")
+
+    # Assert
+    assert respuesta.status_code == 201
+    assert "instrucciones" in respuesta.json()
+    assert ambas.status_code == 400, "No se puede mandar fecha_visita y fechas_visita a la vez"
@@ -0,0 +1,35 @@
+# tests/unit/test_precios.py
+from datetime import date
+
+from comprar_entradas.precios import clase_fecha, cotizar, franja_edad, precio_tabla
+
+
+def test_cotizar_consulta_el_motor_una_vez_por_combinacion():
+    # Arrange
+    consultas = []
+
+    def motor(visitante, tipo_pase):
+        consultas.append((visitante["clase_fecha"], tipo_pase, visitante["edad"]))
+        return {"monto": 1000 if visitante["edad"] < 13 else 2500.5}
+
+    sabado = date(2030, 1, 12)
+    precio_tabla.cache_clear()
+
+    # Act
+    primera = cotizar(sabado, "REGULAR", [30, 8, 40, 5], motor)
+    segunda = cotizar(sabado, "REGULAR", [64, 3], motor)
+
+    # Assert
+    assert primera["total"] == 7001
+    assert [linea["precio"] for linea in segunda["lineas"]] == [2500.5, 1000]
+    assert consultas == [("FIN_DE_SEMANA", "REGULAR", 13), ("FIN_DE_SEMANA", "REGULAR", 3)], \
+        "Las edades de una misma franja comparten el precio calculado"
+    precio_tabla.cache_clear()
+
+
+def test_franjas_y_clases():
+    # Assert
+    assert [franja_edad(edad)[1] for edad in (0, 2, 3, 12, 13, 64, 65, 120)] == [
+        "BEBE", "BEBE", "MENOR", "MENOR", "ADULTO", "ADULTO", "MAYOR", "MAYOR"]
+    assert clase_fecha(date(2030, 1, 9)) == "SEMANA"
+    assert clase_fecha(date(2030, 1, 13)) == "FIN_DE_SEMANA"
@@ -0,0 +1,74 @@
+# tests/unit/test_repositorio.py
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+from comprar_entradas.models import CupoDiario
+from comprar_entradas.repositorio import repositorio_db
+from comprar_entradas.views import confirmar_pago, reloj_controlable
+
+FECHA = date(2030, 1, 5)
+
+
+def borrador(cantidad):
+    lineas = [{"nombre": f"V{i}", "edad": 30, "precio": {"monto": 3000}} for i in range(cantidad)]
+    return {
+        "usuario": {"id": 1, "nombre": "Marco", "email": "marco.figueroa@example.com"},
+        "fecha_visita": FECHA,
+        "tipo_pase": "REGULAR",
+        "forma_pago": "TARJETA",
+        "lineas": lineas,
+        "total": 3000 * cantidad,
+    }
+
+
+@pytest.mark.django_db
+def test_guardar_pendiente_no_sobrevende_el_cupo():
+    # Arrange
+    CupoDiario.objects.create(fecha=FECHA, capacidad=5)
+    repositorio = repositorio_db()
+
+    # Act
+    repositorio["guardar_pendiente"](borrador(3))
+    with pytest.raises(ValueError) as excinfo:
+        repositorio["guardar_pendiente"](borrador(3))
+
+    # Assert
+    assert "cupo" in str(excinfo.value).lower()
+    assert CupoDiario.objects.get(fecha=FECHA).vendidas == 3, "La compra rechazada no debe consumir cupo"
+
+
+@pytest.mark.django_db
+def test_buscar_devuelve_la_orden_guardada():
+    # Arrange
+    repositorio = repositorio_db()
+    orden = repositorio["guardar_pendiente"](borrador(2))
+
+    # Act
+    encontrada = repositorio["buscar"](orden["id"])
+
+    # Assert
+    assert encontrada["estado"] == "PENDIENTE"
+    assert encontrada["fecha_visita"] == FECHA
+    assert [linea["precio"]["monto"] for linea in encontrada["lineas"]] == [3000, 3000]
+    assert repositorio["buscar"](999) is None
+
+
+@pytest.mark.django_db
+def test_confirmar_pago_duplicado_envia_un_solo_mail():
+    # Arrange
+    reloj = reloj_controlable(datetime(2025, 10, 13, 10, 0, tzinfo=timezone.utc))
+    repositorio = repositorio_db(reloj)
+    orden = repositorio["guardar_pendiente"](borrador(1))
+    mails = []
+    servicio_mail = {"enviar_confirmacion": lambda orden: mails.append(orden["id"])}
+    notificacion = {"id_orden": orden["id"], "estado": "aprobado"}
+
+    # Act
+    confirmar_pago(notificacion, repositorio, servicio_mail, reloj)
+    reloj["avanzar"](timedelta(minutes=1))
+    confirmar_pago(notificacion, repositorio, servicio_mail, reloj)
+
+    # Assert
+    assert mails == [orden["id"]], "La notificación repetida no debe reenviar el mail"
+    assert repositorio["buscar"](orden["id"])["pagada_en"] == datetime(2025, 10, 13, 10, 0, tzinfo=timezone.utc), \
+        "Debe conservarse el timestamp del primer pago"
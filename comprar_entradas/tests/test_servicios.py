@@ -0,0 +1,80 @@
+# tests/unit/test_servicios.py
+import io
+from datetime import date, timedelta
+
+import pytest
+from django.core.cache import caches
+
+from comprar_entradas.descuentos import generar_codigos
+from comprar_entradas.models import Campania, LineaOrden, Orden
+from comprar_entradas.servicios import servicios_configurados
+
+
+@pytest.fixture(autouse=True)
+def servicios_limpios():
+    # El cache de órdenes vive lo que el proceso: no debe tener órdenes de otros tests
+    caches["default"].clear()
+    servicios_configurados.cache_clear()
+    yield
+    servicios_configurados.cache_clear()
+
+
+def formulario(forma_pago, **cambios):
+    fecha = date.today() + timedelta(days=1)
+    while fecha.weekday() == 0:
+        fecha += timedelta(days=1)
+    datos = {
+        "usuario_nombre": "Marco Figueroa",
+        "usuario_email": "marco.figueroa@example.com",
+        "fecha_visita": fecha.isoformat(),
+        "tipo_pase": "VIP",
+        "forma_pago": forma_pago,
+        "cantidad_visitantes": 2,
+        "visitante_0_nombre": "Ana", "visitante_0_edad": "25",
+        "visitante_1_nombre": "Luis", "visitante_1_edad": "30",
+    }
+    datos.update(cambios)
+    return datos
+
+
+@pytest.mark.django_db
+def test_formulario_guarda_la_orden_con_los_servicios_del_proceso(client):
+    # Act
+    efectivo = client.post("/comprar-entradas/", formulario("EFECTIVO"))
+    tarjeta = client.post("/comprar-entradas/", formulario("TARJETA"))
+
+    # Assert
+    reserva, checkout = Orden.objects.order_by("pk")
+    assert efectivo.templates[0].name == "comprobante_reserva.html"
+    assert efectivo.context["numero_reserva"] == f"RES{reserva.pk:06d}", "El comprobante lleva el número de la orden"
+    assert checkout.forma_pago == "TARJETA" and checkout.estado == "PENDIENTE"
+    assert tarjeta.context["redirect_url"].startswith("https://mercadopago"), "Debe arrancar el cobro"
+    assert tarjeta.context["total"] == checkout.total == 10000
+    assert LineaOrden.objects.filter(orden=checkout).count() == 2
+    assert servicios_configurados() is servicios_configurados(), "Los servicios se arman una vez por proceso"
+
+
+@pytest.mark.django_db
+def test_formulario_con_datos_de_visitante_incompletos_no_guarda_nada(client):
+    # Act
+    respuesta = client.post("/comprar-entradas/", formulario("EFECTIVO", visitante_1_edad="treinta"))
+
+    # Assert
+    assert respuesta.templates[0].name == "comprar_entradas.html"
+    assert "Faltan datos del visitante" in [str(m) for m in respuesta.context["messages"]]
+    assert not Orden.objects.exists()
+
+
+@pytest.mark.django_db
+def test_formulario_canjea_codigo_de_descuento(client):
+    # Arrange
+    codigos = io.StringIO()
+    generar_codigos(Campania.objects.create(nombre="Prensa", tipo="MONTO", valor=2000), 1, codigos)
+
+    # Act
+    respuesta = client.post("/comprar-entradas/", formulario("EFECTIVO", codigo_descuento=codigos.getvalue().strip()))
+
+    # Assert
+    orden = Orden.objects.get()
+    assert (orden.total, orden.descuento) == (8000, 2000), "La orden debe guardar el descuento del código"
+    assert respuesta.context["total"] == 8000
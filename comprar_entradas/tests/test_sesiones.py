@@ -0,0 +1,57 @@
+# tests/unit/test_sesiones.py
+import io
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+def test_limpiar_sesiones_borra_solo_las_vencidas_en_lotes():
+    # Arrange
+    ahora = timezone.now()
+    Session.objects.bulk_create(
+        [Session(session_key=f"vencida{i}", session_data="", expire_date=ahora - timedelta(days=1)) for i in range(5)]
+        + [Session(session_key="vigente", session_data="", expire_date=ahora + timedelta(days=1))]
+    )
+    salida = io.StringIO()
+
+    # Act
+    call_command("limpiar_sesiones", "--lote", "2", stdout=salida)
+
+    # Assert
+    assert list(Session.objects.values_list("session_key", flat=True)) == ["vigente"]
+    assert "Sesiones vencidas borradas: 5" in salida.getvalue()
+
+
+@pytest.mark.django_db
+def test_limpiar_sesiones_sin_sesiones_en_la_base(settings):
+    # Arrange
+    settings.SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+    salida = io.StringIO()
+
+    # Act
+    call_command("limpiar_sesiones", stdout=salida)
+
+    # Assert
+    assert "nada para limpiar" in salida.getvalue()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("motor", ["signed_cookies", "cache"])
+def test_modo_sin_estado_no_escribe_sesiones_en_la_base(client, settings, motor):
+    # Arrange
+    settings.SESSION_ENGINE = f"django.contrib.sessions.backends.{motor}"
+    settings.MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+    usuario = User.objects.create_superuser("admin", "admin@example.com", "clave-segura-123")
+
+    # Act
+    client.force_login(usuario)
+    respuesta = client.get("/admin/")
+
+    # Assert
+    assert respuesta.status_code == 200, "El login del admin debe seguir funcionando"
+    assert Session.objects.count() == 0, "La sesión no debe guardarse en django_session"
@@ -0,0 +1,53 @@
+# tests/unit/test_simulacion.py
+from comprar_entradas.simulacion import Escenario, curva_lanzamiento, dimensionar, simular
+
+
+def escenario_corto(**cambios):
+    # 10 minutos con un pico de 20 clientes/s: corre en una fracción de segundo
+    valores = {"curva": curva_lanzamiento(pico=20, base=0.5, decaimiento=60, duracion=600),
+               "duracion": 600, "capacidad": 2000, "vencimiento_reserva": 120}
+    valores.update(cambios)
+    return Escenario(**valores)
+
+
+def test_simulacion_no_sobrevende_y_las_cuentas_cierran():
+    # Arrange
+    escenario = escenario_corto()
+
+    # Act
+    resultado = simular(escenario, workers=4)
+
+    # Assert
+    assert resultado["agotado_en"] is not None, "Con más demanda que cupo la venta se debería agotar"
+    assert resultado["vendidas"] <= escenario.capacidad, "No se deben vender más entradas que el cupo"
+    assert resultado["pagadas"] + resultado["expiradas"] <= resultado["compras"] + resultado["errores_pago"], \
+        "Solo se pagan o expiran órdenes que se crearon"
+    assert resultado["abandonos"] > 0, "Con pocos workers en el pico algunos clientes deberían abandonar"
+
+
+def test_mas_workers_reduce_la_espera():
+    # Arrange
+    escenario = escenario_corto()
+
+    # Act
+    pocos = simular(escenario, workers=2)
+    muchos = simular(escenario, workers=16)
+
+    # Assert
+    assert muchos["llegadas"] == pocos["llegadas"], "Las dos corridas deberían ver los mismos clientes"
+    assert muchos["espera_p95"] < pocos["espera_p95"], "Con más workers la espera en cola debería bajar"
+    assert muchos["abandonos"] <= pocos["abandonos"], "Con más workers no deberían abandonar más clientes"
+
+
+def test_dimensionar_devuelve_la_minima_cantidad_de_workers():
+    # Arrange
+    escenario = escenario_corto()
+
+    # Act
+    resultado = dimensionar(escenario, objetivo_espera=1.0, max_abandono=0.01)
+    uno_menos = simular(escenario, resultado["workers"] - 1)
+
+    # Assert
+    assert resultado["espera_p95"] <= 1.0, "La cantidad elegida debería cumplir el objetivo de espera"
+    assert (uno_menos["espera_p95"] > 1.0
+            or uno_menos["abandonos"] > 0.01 * uno_menos["llegadas"]), "Con un worker menos no se debería cumplir"
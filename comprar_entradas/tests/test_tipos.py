@@ -0,0 +1,59 @@
+# tests/unit/test_tipos.py
+from datetime import date
+
+from comprar_entradas.tipos import LineaOrden, Precio, a_centavos
+from comprar_entradas.views import construir_borrador_orden, calcular_total
+
+
+def test_precio_guarda_centavos_y_se_lee_como_dict():
+    # Act
+    precio = Precio.desde({"monto": 10.1, "moneda": "ARS"})
+
+    # Assert
+    assert precio.centavos == 1010
+    assert precio["monto"] == 10.1
+    assert precio == {"monto": 10.1, "moneda": "ARS"}, "Debe compararse igual que el dict del motor"
+
+
+def test_linea_orden_no_tiene_dict_por_instancia():
+    # Arrange
+    linea = LineaOrden.desde_visitante({"nombre": "Ana", "edad": 25}, Precio(300000))
+
+    # Assert
+    assert not hasattr(linea, "__dict__"), "LineaOrden debe usar __slots__"
+    assert dict(linea) == {"nombre": "Ana", "edad": 25, "precio": {"monto": 3000}}
+
+
+def test_linea_orden_conserva_datos_extra_del_visitante():
+    # Act
+    linea = LineaOrden.desde_visitante({"nombre": "Ana", "edad": 25, "dni": "123"}, Precio(300000, "ARS"))
+
+    # Assert
+    assert linea["dni"] == "123"
+    assert linea.a_dict() == {"nombre": "Ana", "edad": 25, "dni": "123", "precio": {"monto": 3000, "moneda": "ARS"}}
+
+
+def test_borrador_comparte_precios_iguales_entre_lineas():
+    # Arrange
+    visitantes = [{"nombre": f"V{i}", "edad": 30} for i in range(3)]
+
+    # Act
+    borrador = construir_borrador_orden({"id": 1}, date.today(), visitantes, "VIP", "TARJETA",
+                                        lambda visitante, tipo_pase: {"monto": 5000})
+
+    # Assert
+    precios = {id(linea["precio"]) for linea in borrador["lineas"]}
+    assert len(precios) == 1, "Las líneas con el mismo precio deben compartir la instancia"
+    assert borrador["total"] == 15000
+
+
+def test_calcular_total_suma_en_centavos_sin_error_de_redondeo():
+    # Arrange: 0.1 + 0.2 en float da 0.30000000000000004
+    borrador = {"lineas": [{"precio": {"monto": 0.1}}, {"precio": {"monto": 0.2}}]}
+
+    # Act
+    total = calcular_total(borrador, None)
+
+    # Assert
+    assert a_centavos(total) == 30
+    assert total == 0.3
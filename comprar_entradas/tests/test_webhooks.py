@@ -0,0 +1,86 @@
+# tests/unit/test_webhooks.py
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from comprar_entradas.models import NotificacionPago, Orden
+from comprar_entradas.webhooks import encolar_notificacion, procesar_lote, procesar_notificaciones
+
+MOMENTO = datetime(2025, 10, 13, 15, 0, tzinfo=timezone.utc)
+
+
+def crear_orden(estado="PENDIENTE", pagada_en=None):
+    return Orden.objects.create(usuario_nombre="Marco", usuario_email="marco.figueroa@example.com",
+                                fecha_visita=date(2030, 1, 8), tipo_pase="REGULAR", forma_pago="TARJETA",
+                                estado=estado, total=10000, pagada_en=pagada_en).pk
+
+
+@pytest.mark.django_db
+def test_el_webhook_encola_y_responde_202_sin_tocar_la_orden(client, settings):
+    # Arrange
+    settings.API_PAGOS_TOKEN = "secreto"
+    orden_id = crear_orden()
+    payload = json.dumps({"id_orden": orden_id, "estado": "aprobado"})
+
+    # Act
+    sin_token = client.post("/comprar-entradas/api/v1/notificaciones-pago", payload, content_type="application/json")
+    respuesta = client.post("/comprar-entradas/api/v1/notificaciones-pago", payload, content_type="application/json",
+                            HTTP_AUTHORIZATION="Bearer secreto")
+
+    # Assert
+    assert sin_token.status_code == 401
+    assert respuesta.status_code == 202
+    notificacion = NotificacionPago.objects.get(pk=respuesta.json()["id"])
+    assert (notificacion.orden_id, notificacion.procesada_en) == (orden_id, None), "La notificación queda pendiente"
+    assert Orden.objects.get(pk=orden_id).estado == "PENDIENTE", "El webhook no debe procesar la notificación"
+
+
+@pytest.mark.django_db
+def test_el_consumidor_procesa_el_lote_con_consultas_fijas_y_un_mail_por_orden():
+    # Arrange
+    pendientes = [crear_orden() for _ in range(20)]
+    expirada = crear_orden("EXPIRADA")
+    for orden_id in pendientes + [pendientes[0], expirada, 999_999]:
+        encolar_notificacion(orden_id, "aprobado", MOMENTO)
+    mails = []
+    servicio_mail = {"enviar_confirmacion": mails.append}
+
+    # Act
+    with CaptureQueriesContext(connection) as consultas:
+        resultados = procesar_lote(500, MOMENTO, servicio_mail)
+
+    # Assert
+    assert resultados == {"PAGADA": 20, "SIN_CAMBIOS": 1, "NO_PAGABLE": 1, "INEXISTENTE": 1}
+    assert Orden.objects.filter(pk__in=pendientes, estado="PAGADA", pagada_en=MOMENTO).count() == 20
+    assert sorted(orden["id"] for orden in mails) == pendientes, "Cada orden pagada recibe un solo mail"
+    assert all(orden["estado"] == "PAGADA" for orden in mails)
+    # notificaciones, órdenes, líneas, marcar_pagadas (SELECT + UPDATE), un UPDATE por resultado
+    sql = [consulta["sql"] for consulta in consultas if not consulta["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+    assert len(sql) == 9, "El lote no debe hacer consultas por notificación"
+    assert not NotificacionPago.objects.filter(procesada_en__isnull=True).exists()
+    assert procesar_notificaciones(reloj={"ahora": lambda: MOMENTO}) == {}, "La cola debe quedar vacía"
+
+
+@pytest.mark.django_db
+def test_el_pago_de_una_orden_expirada_o_cancelada_queda_como_anomalia(caplog):
+    # Arrange
+    expirada = crear_orden("EXPIRADA")
+    cancelada = crear_orden("CANCELADA")
+    pagada_y_cancelada = crear_orden("CANCELADA", pagada_en=MOMENTO)
+    for orden_id in (expirada, cancelada, pagada_y_cancelada):
+        encolar_notificacion(orden_id, "aprobado", MOMENTO)
+    mails = []
+
+    # Act
+    with caplog.at_level("WARNING", logger="comprar_entradas.pagos"):
+        resultados = procesar_lote(500, MOMENTO, {"enviar_confirmacion": mails.append})
+
+    # Assert
+    assert resultados == {"NO_PAGABLE": 2, "SIN_CAMBIOS": 1}, "La pagada y cancelada se reintegra con la cancelación"
+    no_pagables = NotificacionPago.objects.filter(resultado="NO_PAGABLE").values_list("orden_id", flat=True)
+    assert set(no_pagables) == {expirada, cancelada}
+    assert [r.args[0] for r in caplog.records] == [expirada, cancelada], "Cada cobro a reintegrar debe quedar registrado"
+    assert Orden.objects.get(pk=cancelada).estado == "CANCELADA" and not mails
@@ -0,0 +1,119 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+
+def a_centavos(monto):
+    """
+    Convierte un monto en pesos (int o float) a centavos enteros, sin errores de redondeo binario.
+    """
+    return int(round(monto * 100))
+
+
+def desde_centavos(centavos):
+    """
+    Inversa de a_centavos: devuelve int si el monto es entero, para no cambiar lo que ven los callers.
+    """
+    pesos, resto = divmod(centavos, 100)
+    return pesos if resto == 0 else centavos / 100
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Precio(Mapping):
+    """
+    Precio de una entrada en centavos enteros. Se comporta como el dict {"monto", "moneda"}
+    que devuelven los motores de precios, así `linea["precio"]["monto"]` sigue funcionando.
+    Es inmutable, así que todas las líneas con el mismo precio comparten la misma instancia.
+    """
+    centavos: int
+    moneda: str = None
+
+    @classmethod
+    def desde(cls, precio):
+        if isinstance(precio, Precio):
+            return precio
+        return cls(a_centavos(precio["monto"]), precio.get("moneda"))
+
+    @property
+    def monto(self):
+        return desde_centavos(self.centavos)
+
+    def __getitem__(self, clave):
+        if clave == "monto":
+            return self.monto
+        if clave == "moneda" and self.moneda is not None:
+            return self.moneda
+        raise KeyError(clave)
+
+    def __iter__(self):
+        yield "monto"
+        if self.moneda is not None:
+            yield "moneda"
+
+    def __len__(self):
+        return 1 if self.moneda is None else 2
+
+
+@dataclass(slots=True, eq=False)
+class LineaOrden(Mapping):
+    """
+    Una entrada del borrador: los datos del visitante más su precio.
+    Vista de solo lectura compatible con el dict `{**visitante, "precio": {...}}` que se usaba antes.
+    No es frozen porque eso duplica el costo de construirla; igual se trata como inmutable.
+    """
+    nombre: str
+    edad: int
+    precio: Precio
+    # Datos adicionales del visitante (poco frecuentes): None en vez de un dict vacío por línea
+    extras: dict = None
+    # Solo en órdenes de varias fechas: a qué fecha corresponde la entrada
+    fecha_visita: object = None
+    # Solo si se aplicó un código: cuánto se descontó (precio ya es el precio a cobrar)
+    descuento: Precio = None
+
+    @classmethod
+    def desde_visitante(cls, visitante, precio, fecha_visita=None):
+        extras = None
+        if len(visitante) > 2 or "nombre" not in visitante or "edad" not in visitante:
+            extras = {k: v for k, v in visitante.items() if k not in ("nombre", "edad")} or None
+        return cls(visitante.get("nombre"), visitante.get("edad"), precio, extras, fecha_visita)
+
+    def __getitem__(self, clave):
+        if clave == "nombre" and self.nombre is not None:
+            return self.nombre
+        if clave == "edad" and self.edad is not None:
+            return self.edad
+        if clave == "precio":
+            return self.precio
+        if clave == "fecha_visita" and self.fecha_visita is not None:
+            return self.fecha_visita
+        if clave == "descuento" and self.descuento is not None:
+            return self.descuento
+        if self.extras and clave in self.extras:
+            return self.extras[clave]
+        raise KeyError(clave)
+
+    def __iter__(self):
+        if self.nombre is not None:
+            yield "nombre"
+        if self.edad is not None:
+            yield "edad"
+        if self.extras:
+            yield from self.extras
+        if self.fecha_visita is not None:
+            yield "fecha_visita"
+        yield "precio"
+        if self.descuento is not None:
+            yield "descuento"
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def a_dict(self):
+        """
+        Copia como dicts planos (para serializar a JSON o guardar).
+        """
+        datos = {clave: self[clave] for clave in self if clave not in ("precio", "descuento")}
+        datos["precio"] = dict(self.precio)
+        if self.descuento is not None:
+            datos["descuento"] = dict(self.descuento)
+        return datos
@@ -1,6 +1,15 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('', views.comprar_entradas_view, name='comprar_entradas'),
-]
\ No newline at end of file
+
+    # API JSON versionada para kioscos y la app móvil
+    path('api/v1/cotizaciones', api.cotizar_view, name='api_cotizar'),
+    path('api/v1/compras', api.comprar_view, name='api_comprar'),
+    path('api/v1/franjas', api.franjas_view, name='api_franjas'),
+    path('api/v1/ordenes/buscar', api.buscar_ordenes_view, name='api_buscar_ordenes'),
+    path('api/v1/ordenes/<int:orden_id>', api.orden_view, name='api_orden'),
+    path('api/v1/ordenes/<int:orden_id>/pago', api.pago_view, name='api_pago'),
+    path('api/v1/notificaciones-pago', api.notificaciones_pago_view, name='api_notificaciones_pago'),
+]
@@ -3,16 +3,24 @@ from django.http import JsonResponse
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from .forms import ComprarEntradasForm
+import dataclasses
 import datetime
-import json
-import random
+import logging
 
 # Importar los feriados y usuarios registrados del archivo constants
-from .constants import FERIADOS, USUARIOS_REGISTRADOS
+from .constants import USUARIOS_REGISTRADOS
+from .consultas import vigilar_consultas
+from .estados import ESTADOS_FINALES
+from .antiabuso import ip_cliente
+from .instantanea import feriados_vigentes
+from .tipos import LineaOrden, Precio, a_centavos, desde_centavos
 
 # Create your views here.
 
-def validar_usuario_registrado(usuario):
+# Cobros que no se pueden aplicar (órdenes expiradas o canceladas): los mismos que marca webhooks
+logger_pagos = logging.getLogger("comprar_entradas.pagos")
+
+def validar_usuario_registrado(usuario, buscar_registrado=None):
     if not usuario or not usuario.get("id"):
         raise ValueError("El usuario no está registrado.")
     
@@ -25,6 +33,10 @@ def validar_usuario_registrado(usuario):
             usuario_encontrado = True
             break
     
+    # Los socios importados del CRM están en la base (ver importacion_usuarios)
+    if not usuario_encontrado and buscar_registrado is not None:
+        usuario_encontrado = buscar_registrado(email_usuario)
+    
     if not usuario_encontrado:
         raise ValueError("El usuario no está en la lista de usuarios registrados.")
 
@@ -56,6 +68,46 @@ def validar_fecha_visita(fecha, feriados=None):
     # Si pasa todas las validaciones, la fecha es válida
     return True
 
+def validar_fechas_visita(fechas, feriados=None):
+    """
+    Valida varias fechas de visita en una sola pasada y reporta todas las fechas cerradas juntas.
+    """
+    feriados = frozenset(feriados or ())
+    hoy = datetime.date.today()
+    
+    pasadas = [f for f in fechas if f < hoy]
+    lunes = [f for f in fechas if f.weekday() == 0]
+    en_feriado = [f for f in fechas if f in feriados]
+    
+    errores = []
+    if pasadas:
+        errores.append("No se pueden comprar entradas para fechas pasadas: " + _listar_fechas(pasadas))
+    if lunes:
+        errores.append("El parque está cerrado los lunes: " + _listar_fechas(lunes))
+    if en_feriado:
+        errores.append("El parque está cerrado en feriados: " + _listar_fechas(en_feriado))
+    if len(set(fechas)) != len(fechas):
+        errores.append("Hay fechas de visita repetidas")
+    if errores:
+        raise ValueError(". ".join(errores))
+    
+    return True
+
+def _listar_fechas(fechas):
+    return ", ".join(f.isoformat() for f in sorted(fechas))
+
+def fechas_temporada(desde, hasta, feriados=None):
+    """
+    Fechas abiertas de una temporada (para el pase de temporada): todos los días entre
+    `desde` y `hasta` inclusive, salvo lunes y feriados.
+    """
+    feriados = frozenset(feriados or ())
+    cantidad = (hasta - desde).days + 1
+    return [
+        fecha for fecha in (desde + datetime.timedelta(days=i) for i in range(cantidad))
+        if fecha.weekday() != 0 and fecha not in feriados
+    ]
+
 def validar_forma_pago(forma_pago):
     # Definir las formas de pago válidas
     formas_validas = ["EFECTIVO", "TARJETA"]
@@ -85,39 +137,109 @@ def validar_datos_visitantes(visitantes):
             raise ValueError("Faltan datos del visitante")
     return True
 
-def construir_borrador_orden(usuario, fecha_visita, visitantes, tipo_pase, forma_pago, motor_precios):
-    # Lógica mínima para hacer pasar el test
+def construir_borrador_orden(usuario, fecha_visita, visitantes, tipo_pase, forma_pago, motor_precios, descuento=None):
+    # Las líneas son LineaOrden con __slots__ y precios en centavos enteros: se leen igual
+    # que los dicts de antes (linea["precio"]["monto"]) pero ocupan mucha menos memoria
     lineas = []
-    total = 0
+    total_centavos = 0
+    # Los precios son inmutables: las líneas con el mismo precio comparten la instancia
+    precios = {}
     
     for visitante in visitantes:
-        precio = motor_precios(visitante, tipo_pase)
-        linea = visitante.copy()  # Copiar datos del visitante
-        linea["precio"] = precio  # Agregar precio
-        lineas.append(linea)
-        total += precio["monto"]  # Sumar al total
+        precio_motor = motor_precios(visitante, tipo_pase)
+        clave = (precio_motor["monto"], precio_motor.get("moneda"))
+        precio = precios.get(clave)
+        if precio is None:
+            precio = precios[clave] = Precio.desde(precio_motor)
+        lineas.append(LineaOrden.desde_visitante(visitante, precio))
+        total_centavos += precio.centavos  # Sumar al total
     
-    return {
+    borrador = {
         "usuario": usuario,
         "fecha_visita": fecha_visita,
         "forma_pago": forma_pago,
         "tipo_pase": tipo_pase,
         "lineas": lineas,
-        "total": total
+        "total": desde_centavos(total_centavos)
+    }
+    return aplicar_descuento(borrador, descuento) if descuento is not None else borrador
+
+def construir_borrador_multifecha(usuario, fechas_visita, visitantes, tipo_pase, forma_pago, motor_precios,
+                                  descuento=None):
+    """
+    Borrador de una orden que cubre varias fechas: una línea por visitante y por fecha.
+    El motor de precios se consulta una sola vez por visitante y el precio se reutiliza en cada fecha.
+    """
+    fechas_visita = sorted(fechas_visita)
+    precios = {}
+    precios_visitantes = []
+    
+    for visitante in visitantes:
+        precio_motor = motor_precios(visitante, tipo_pase)
+        clave = (precio_motor["monto"], precio_motor.get("moneda"))
+        precio = precios.get(clave)
+        if precio is None:
+            precio = precios[clave] = Precio.desde(precio_motor)
+        precios_visitantes.append(precio)
+    
+    lineas = [
+        LineaOrden.desde_visitante(visitante, precio, fecha)
+        for fecha in fechas_visita
+        for visitante, precio in zip(visitantes, precios_visitantes)
+    ]
+    total_centavos = sum(precio.centavos for precio in precios_visitantes) * len(fechas_visita)
+    
+    borrador = {
+        "usuario": usuario,
+        "fecha_visita": fechas_visita[0],
+        "fechas_visita": fechas_visita,
+        "forma_pago": forma_pago,
+        "tipo_pase": tipo_pase,
+        "lineas": lineas,
+        "total": desde_centavos(total_centavos)
     }
+    return aplicar_descuento(borrador, descuento) if descuento is not None else borrador
+
+def aplicar_descuento(borrador, descuento):
+    """
+    Aplica un código de descuento (ver descuentos.Descuento) al borrador: cada línea queda con
+    el precio a cobrar y lo que se le descontó (precio de lista = precio + descuento), y el
+    total y el descuento de la orden quedan ya calculados.
+    """
+    fechas = borrador.get("fechas_visita") or [borrador["fecha_visita"]]
+    rebajas = descuento.aplicar(fechas, borrador["tipo_pase"], borrador["lineas"])
+    # Como en construir_borrador_orden, las líneas con el mismo precio y rebaja comparten instancias
+    precios = {}
+    lineas = []
+    total_centavos = 0
+    for linea, rebaja in zip(borrador["lineas"], rebajas):
+        if rebaja:
+            clave = (linea.precio.centavos, linea.precio.moneda, rebaja)
+            if clave not in precios:
+                precios[clave] = (Precio(linea.precio.centavos - rebaja, linea.precio.moneda),
+                                  Precio(rebaja, linea.precio.moneda))
+            precio, descontado = precios[clave]
+            linea = dataclasses.replace(linea, precio=precio, descuento=descontado)
+        lineas.append(linea)
+        total_centavos += linea.precio.centavos
+    
+    borrador["lineas"] = lineas
+    borrador["total"] = desde_centavos(total_centavos)
+    borrador["descuento"] = desde_centavos(sum(rebajas))
+    borrador["codigo_descuento"] = descuento.codigo_id
+    return borrador
 
 def calcular_total(borrador, motor_precios):
-    # Lógica mínima para hacer pasar el test
-    total = 0
+    # Las líneas ya tienen el precio a cobrar (con el descuento aplicado, si hay uno)
+    # Se suma en centavos enteros para no acumular errores de redondeo
+    total_centavos = 0
     for linea in borrador["lineas"]:
-        total += linea["precio"]["monto"]
-    return total
+        total_centavos += a_centavos(linea["precio"]["monto"])
+    return desde_centavos(total_centavos)
 
-def realizar_compra(usuario, fecha_visita, cantidad_entradas, visitantes, tipo_pase, forma_pago, 
-                   proveedor_horarios, motor_precios, repositorio, enrutador_pagos, servicio_mail, reloj):
-    # Lógica mínima para hacer pasar el test
+def _validar_compra(usuario, cantidad_entradas, forma_pago, visitantes, repositorio=None):
     # Validar usuario registrado
-    validar_usuario_registrado(usuario)
+    validar_usuario_registrado(usuario, (repositorio or {}).get("usuario_registrado"))
     
     # Validar cantidad de entradas
     validar_cantidad_entradas(cantidad_entradas)
@@ -127,15 +249,20 @@ def realizar_compra(usuario, fecha_visita, cantidad_entradas, visitantes, tipo_p
     
     # Validar datos de visitantes
     validar_datos_visitantes(visitantes)
-    
-    # Validar que el parque esté abierto en la fecha de visita
-    if not proveedor_horarios(fecha_visita):
-        raise ValueError("El parque está cerrado en la fecha seleccionada")
-    
+
+def _buscar_descuento(codigo_descuento, repositorio, reloj):
+    if not codigo_descuento:
+        return None
+    if "buscar_descuento" not in repositorio:
+        raise ValueError("No se aceptan códigos de descuento")
+    descuento = repositorio["buscar_descuento"](codigo_descuento)
+    if not descuento.vigente(reloj["ahora"]()):
+        raise ValueError("El código de descuento está vencido")
+    return descuento
+
+def _registrar_y_cobrar(borrador, forma_pago, repositorio, enrutador_pagos):
     # Para forma_pago = "TARJETA", usar el enrutador de pagos
     if forma_pago == "TARJETA":
-        # Crear un borrador usando el motor_precios
-        borrador = construir_borrador_orden(usuario, fecha_visita, visitantes, tipo_pase, forma_pago, motor_precios)
         # Guardar en repositorio si tiene método guardar_pendiente
         if "guardar_pendiente" in repositorio:
             orden = repositorio["guardar_pendiente"](borrador)
@@ -143,23 +270,66 @@ def realizar_compra(usuario, fecha_visita, cantidad_entradas, visitantes, tipo_p
             orden = {"id": 1, "estado": "PENDIENTE"}
         
         redirect_url = enrutador_pagos["iniciar_flujo_tarjeta"](orden)
-        return {"redirect_url": redirect_url}
+        return {"redirect_url": redirect_url, "orden_id": orden.get("id")}
 
     # Para forma_pago = "EFECTIVO", devolver instrucciones
     elif forma_pago == "EFECTIVO":
-        # Crear borrador y guardarlo si es necesario
-        borrador = construir_borrador_orden(usuario, fecha_visita, visitantes, tipo_pase, forma_pago, motor_precios)
+        orden = None
         if "guardar_pendiente" in repositorio:
             orden = repositorio["guardar_pendiente"](borrador)
         
         return {
             "instrucciones": "Dirigirse a la boletería del parque para completar el pago en efectivo",
-            "redirect_url": None
+            "redirect_url": None,
+            "orden_id": orden.get("id") if orden else None
         }
     
     # Para otros casos, retornar algo básico
     return {"redirect_url": "https://mercadopago.test/default"}
 
+@vigilar_consultas("realizar_compra")
+def realizar_compra(usuario, fecha_visita, cantidad_entradas, visitantes, tipo_pase, forma_pago, 
+                   proveedor_horarios, motor_precios, repositorio, enrutador_pagos, servicio_mail, reloj,
+                   hora_ingreso=None, codigo_descuento=None):
+    _validar_compra(usuario, cantidad_entradas, forma_pago, visitantes, repositorio)
+    
+    # Validar que el parque esté abierto en la fecha de visita
+    if not proveedor_horarios(fecha_visita):
+        raise ValueError("El parque está cerrado en la fecha seleccionada")
+    
+    # Crear un borrador usando el motor_precios; el código se canjea al guardar la orden
+    descuento = _buscar_descuento(codigo_descuento, repositorio, reloj)
+    borrador = construir_borrador_orden(usuario, fecha_visita, visitantes, tipo_pase, forma_pago, motor_precios,
+                                        descuento)
+    # Franja de ingreso preferida; el repositorio asigna esa o la siguiente con lugar
+    borrador["hora_ingreso"] = hora_ingreso
+    return _registrar_y_cobrar(borrador, forma_pago, repositorio, enrutador_pagos)
+
+@vigilar_consultas("realizar_compra_multifecha")
+def realizar_compra_multifecha(usuario, fechas_visita, cantidad_entradas, visitantes, tipo_pase, forma_pago,
+                               proveedor_horarios, motor_precios, repositorio, enrutador_pagos, servicio_mail, reloj,
+                               feriados=None, codigo_descuento=None):
+    """
+    Una sola compra para varias fechas (o un pase de temporada, ver fechas_temporada).
+    Las validaciones y el precio se calculan una vez; el repositorio reserva el cupo de todas
+    las fechas en una única transacción: o se reservan todas o ninguna.
+    """
+    if not fechas_visita:
+        raise ValueError("Debe elegir al menos una fecha de visita")
+    
+    _validar_compra(usuario, cantidad_entradas, forma_pago, visitantes, repositorio)
+    validar_fechas_visita(fechas_visita, feriados)
+    
+    cerradas = [fecha for fecha in fechas_visita if not proveedor_horarios(fecha)]
+    if cerradas:
+        raise ValueError("El parque está cerrado en: " + _listar_fechas(cerradas))
+    
+    descuento = _buscar_descuento(codigo_descuento, repositorio, reloj)
+    borrador = construir_borrador_multifecha(usuario, fechas_visita, visitantes, tipo_pase, forma_pago, motor_precios,
+                                             descuento)
+    return _registrar_y_cobrar(borrador, forma_pago, repositorio, enrutador_pagos)
+
+@vigilar_consultas("confirmar_pago")
 def confirmar_pago(notificacion_pago, repositorio, servicio_mail, reloj):
     # Lógica mínima para hacer pasar el test
     # Obtener el ID de la orden desde la notificación
@@ -172,12 +342,20 @@ def confirmar_pago(notificacion_pago, repositorio, servicio_mail, reloj):
     if orden is None:
         raise ValueError("La orden no existe")
     
-    # Marcar la orden como pagada
-    momento = reloj["ahora"]()
-    repositorio["marcar_pagada"](orden_id, momento)
+    # Una reserva expirada o cancelada ya no se puede pagar (el cobro queda para reintegrar,
+    # ver conciliacion); si el estado cambia justo ahora, lo resuelve el compare-and-swap de marcar_pagada
+    marcada = False
+    if orden.get("estado") in ESTADOS_FINALES:
+        if orden.get("pagada_en") is None:
+            logger_pagos.warning("Pago de la orden %s, que está %s: hay que reintegrarlo", orden_id, orden["estado"])
+    else:
+        momento = reloj["ahora"]()
+        marcada = repositorio["marcar_pagada"](orden_id, momento)
     
-    # Enviar confirmación por email
-    servicio_mail["enviar_confirmacion"](orden)
+    # Enviar confirmación por email, salvo que otra notificación ya la hubiera marcado
+    # (los repositorios que no informan el resultado devuelven None)
+    if marcada is not False:
+        servicio_mail["enviar_confirmacion"](orden)
     
     # Retornar información de la orden
     return {
@@ -213,7 +391,9 @@ def enrutador_pagos_simple():
     Simulador de enrutador de pagos.
     """
     return {
-        "iniciar_flujo_tarjeta": lambda borrador: "https://mercadopago.test/checkout/123"
+        "iniciar_flujo_tarjeta": lambda borrador: "https://mercadopago.test/checkout/123",
+        # La clave de idempotencia hace que repetir el pedido devuelva el mismo reintegro
+        "reembolsar": lambda orden, clave_idempotencia: f"reembolso-{clave_idempotencia}",
     }
 
 def repositorio_simple():
@@ -230,7 +410,8 @@ def servicio_mail_simple():
     Simulador de servicio de email.
     """
     return {
-        "enviar_confirmacion": lambda orden: True
+        "enviar_confirmacion": lambda orden: True,
+        "enviar_cancelacion": lambda orden, motivo: True,
     }
 
 def reloj_simple():
@@ -241,6 +422,21 @@ def reloj_simple():
         "ahora": lambda: datetime.datetime.now()
     }
 
+def reloj_controlable(inicio):
+    """
+    Reloj que solo avanza cuando se le pide. Útil para pruebas de estrés y simulaciones.
+    """
+    estado = {"ahora": inicio}
+    
+    def avanzar(delta):
+        estado["ahora"] = estado["ahora"] + delta
+        return estado["ahora"]
+    
+    return {
+        "ahora": lambda: estado["ahora"],
+        "avanzar": avanzar
+    }
+
 def comprar_entradas_view(request):
     """
     Vista principal para el formulario de compra de entradas.
@@ -257,17 +453,11 @@ def comprar_entradas_view(request):
                     "email": form.cleaned_data['usuario_email']
                 }
                 
-                # VALIDAR USUARIO REGISTRADO
-                validar_usuario_registrado(usuario)
-                
                 fecha_visita = form.cleaned_data['fecha_visita']
                 tipo_pase = form.cleaned_data['tipo_pase']
                 forma_pago = form.cleaned_data['forma_pago']
                 cantidad_visitantes = form.cleaned_data['cantidad_visitantes']
                 
-                # VALIDAR FECHA DE VISITA CON FERIADOS
-                validar_fecha_visita(fecha_visita, FERIADOS)
-                
                 # Extraer datos de visitantes del POST
                 visitantes = []
                 for i in range(cantidad_visitantes):
@@ -279,51 +469,45 @@ def comprar_entradas_view(request):
                             'nombre': nombre,
                             'edad': int(edad_str)
                         })
+                if len(visitantes) != cantidad_visitantes:
+                    raise ValueError("Faltan datos del visitante")
                 
-                # Construir borrador con precios calculados
-                borrador = construir_borrador_orden(
-                    usuario=usuario,
-                    fecha_visita=fecha_visita,
-                    visitantes=visitantes,
-                    tipo_pase=tipo_pase,
-                    forma_pago=forma_pago,
-                    motor_precios=motor_precios_simple
-                )
+                # La misma compra que la API: valida, guarda la orden y arranca el cobro
+                # (import local porque servicios importa este módulo)
+                from .servicios import comprar, servicios_configurados
+                servicios = servicios_configurados()
+                resultado = comprar(usuario, visitantes, tipo_pase, forma_pago, fecha_visita=fecha_visita,
+                                    hora_ingreso=form.cleaned_data.get('hora_ingreso'),
+                                    codigo_descuento=form.cleaned_data.get('codigo_descuento') or None,
+                                    ip=ip_cliente(request), servicios=servicios)
+                
+                # Se muestra la orden tal como quedó guardada (precios, total, número)
+                orden = servicios["repositorio"]["buscar"](resultado["orden_id"])
+                contexto = {
+                    'fecha_visita': fecha_visita,
+                    'tipo_pase': tipo_pase,
+                    'cantidad_entradas': len(orden['lineas']),
+                    'visitantes': [
+                        {'nombre': linea['nombre'], 'edad': linea['edad'], 'precio': linea['precio']['monto']}
+                        for linea in orden['lineas']
+                    ],
+                    'total': orden['total'],
+                    'usuario': usuario
+                }
                 
                 # SI ES TARJETA, REDIRIGIR A MERCADO PAGO
                 if forma_pago == "TARJETA":
-                    # Preparar datos para la template de Mercado Pago
-                    visitantes_con_precio = []
-                    for linea in borrador['lineas']:
-                        visitantes_con_precio.append({
-                            'nombre': linea['nombre'],
-                            'edad': linea['edad'],
-                            'precio': linea['precio']['monto']
-                        })
-                    
                     return render(request, 'mercadopago_checkout.html', {
-                        'fecha_visita': fecha_visita,
-                        'tipo_pase': tipo_pase,
-                        'cantidad_entradas': cantidad_visitantes,
-                        'visitantes': visitantes_con_precio,
-                        'total': borrador['total'],
-                        'usuario': usuario
+                        **contexto,
+                        'orden_id': orden['id'],
+                        'redirect_url': resultado['redirect_url']
                     })
                 
-                # Para EFECTIVO, REDIRIGIR A COMPROBANTE DE RESERVA
-                elif forma_pago == "EFECTIVO":
-                    # Generar número de reserva único
-                    numero_reserva = f"RES{random.randint(100000, 999999)}"
-                    
-                    return render(request, 'comprobante_reserva.html', {
-                        'numero_reserva': numero_reserva,
-                        'fecha_visita': fecha_visita,
-                        'tipo_pase': tipo_pase,
-                        'cantidad_entradas': cantidad_visitantes,
-                        'visitantes': visitantes,
-                        'total': borrador['total'],
-                        'usuario': usuario
-                    })
+                # Para EFECTIVO, el comprobante lleva el número de la orden para pagar en la boletería
+                return render(request, 'comprobante_reserva.html', {
+                    **contexto,
+                    'numero_reserva': f"RES{orden['id']:06d}"
+                })
                 
             except ValueError as e:
                 messages.error(request, str(e))
@@ -333,14 +517,12 @@ def comprar_entradas_view(request):
     else:
         form = ComprarEntradasForm()
     
-    # Pasar feriados al template para validación en JavaScript
-    feriados_json = json.dumps([f.strftime('%Y-%m-%d') for f in FERIADOS])
-    
-    # Pasar usuarios registrados al template
-    usuarios_registrados_json = json.dumps(USUARIOS_REGISTRADOS)
+    # Pasar feriados y usuarios registrados al template; se serializan con json_script
+    # para que el JavaScript de la página pueda servirse como archivo estático
+    feriados = [f.strftime('%Y-%m-%d') for f in feriados_vigentes()]
     
     return render(request, 'comprar_entradas.html', {
         'form': form,
-        'feriados_json': feriados_json,
-        'usuarios_registrados_json': usuarios_registrados_json
+        'feriados': feriados,
+        'usuarios_registrados': USUARIOS_REGISTRADOS
     })
\ No newline at end of file
@@ -0,0 +1,94 @@
+import collections
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache_ordenes import invalidar_ordenes
+from .estados import ESTADOS_FINALES
+from .models import NotificacionPago, Orden
+from .repositorio import marcar_pagadas, orden_a_dict
+
+# Notificaciones de pago en dos tiempos: el webhook verifica el token, inserta la notificación y
+# responde 202 sin tocar la orden; procesar_notificaciones las aplica en lotes. Con las ráfagas
+# de la liquidación el proveedor deja de reintentar por respuestas lentas, y cada lote resuelve
+# con un puñado de consultas lo que confirmar_pago hace con varias por notificación.
+
+logger_pagos = logging.getLogger("comprar_entradas.pagos")
+
+
+def encolar_notificacion(orden_id, estado, momento):
+    """
+    Guarda la notificación para procesarla después. Es un único INSERT: cuando devuelve, la
+    notificación ya está en la base y se le puede responder al proveedor.
+    """
+    return NotificacionPago.objects.create(orden_id=orden_id, estado=estado, recibida_en=momento).pk
+
+
+def procesar_lote(lote, momento, servicio_mail=None):
+    """
+    Aplica hasta `lote` notificaciones pendientes, en orden de llegada. Las órdenes se cargan con
+    un solo IN y las que siguen PENDIENTES pasan a PAGADA en un solo UPDATE (marcar_pagadas);
+    las notificaciones repetidas de una misma orden quedan SIN_CAMBIOS y no mandan otro mail. Las
+    de órdenes que expiraron o se cancelaron sin pagarse quedan NO_PAGABLE: el cobro hay que reintegrarlo.
+    Devuelve un Counter con el resultado de cada notificación procesada.
+    """
+    with transaction.atomic():
+        # En PostgreSQL dos consumidores toman lotes distintos; en SQLite la transacción los serializa
+        notificaciones = list(
+            NotificacionPago.objects.select_for_update(skip_locked=True).filter(procesada_en__isnull=True)
+            .order_by("pk").values_list("pk", "orden_id")[:lote]
+        )
+        if not notificaciones:
+            return collections.Counter()
+
+        ordenes = {orden.pk: orden for orden in Orden.objects.filter(
+            pk__in={orden_id for _, orden_id in notificaciones}).prefetch_related("lineas")}
+        pendientes = [pk for pk, orden in ordenes.items() if orden.estado == "PENDIENTE"]
+        marcadas = set(marcar_pagadas(pendientes, momento)) if pendientes else set()
+
+        por_resultado = collections.defaultdict(list)
+        confirmadas = set()
+        for pk, orden_id in notificaciones:
+            if orden_id not in ordenes:
+                resultado = "INEXISTENTE"
+            elif orden_id in marcadas and orden_id not in confirmadas:
+                resultado = "PAGADA"
+                confirmadas.add(orden_id)
+            elif ordenes[orden_id].estado in ESTADOS_FINALES and ordenes[orden_id].pagada_en is None:
+                resultado = "NO_PAGABLE"
+                logger_pagos.warning("Pago de la orden %s, que está %s: hay que reintegrarlo",
+                                     orden_id, ordenes[orden_id].estado)
+            else:
+                resultado = "SIN_CAMBIOS"
+            por_resultado[resultado].append(pk)
+        for resultado, pks in por_resultado.items():
+            NotificacionPago.objects.filter(pk__in=pks).update(procesada_en=momento, resultado=resultado)
+
+    if marcadas:
+        invalidar_ordenes(marcadas)
+    if marcadas and servicio_mail:
+        pagadas = []
+        for orden_id in marcadas:
+            orden = ordenes[orden_id]
+            orden.estado, orden.pagada_en = "PAGADA", momento
+            pagadas.append(orden_a_dict(orden, orden.lineas.all()))
+        if "enviar_confirmaciones" in servicio_mail:
+            servicio_mail["enviar_confirmaciones"](pagadas)
+        else:
+            for orden in pagadas:
+                servicio_mail["enviar_confirmacion"](orden)
+    return collections.Counter({resultado: len(pks) for resultado, pks in por_resultado.items()})
+
+
+def procesar_notificaciones(lote=500, reloj=None, servicio_mail=None):
+    """
+    Procesa lotes hasta vaciar la cola. Devuelve el Counter de resultados de todos los lotes.
+    """
+    total = collections.Counter()
+    while True:
+        momento = reloj["ahora"]() if reloj else timezone.now()
+        resultados = procesar_lote(lote, momento, servicio_mail)
+        if not resultados:
+            return total
+        total += resultados
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -35,6 +36,38 @@ CSRF_TRUSTED_ORIGINS = [
     'https://icsg7.tvergara.cc',
 ]
 
+# Token compartido con el proveedor de pagos para notificar pagos por la API
+API_PAGOS_TOKEN = os.environ.get('API_PAGOS_TOKEN', '')
+
+# Captura opt-in del tráfico de compra a un NDJSON rotativo por worker: la ruta lleva el pid
+# antes de la extensión (captura.1234.ndjson, ver comprar_entradas.captura)
+CAPTURA_TRAFICO = {
+    'ruta': os.environ.get('CAPTURA_TRAFICO_RUTA', ''),
+    'prefijos': ['/comprar-entradas/'],
+    'max_bytes': 50 * 1024 * 1024,
+    'copias': 10,
+}
+
+# Mails de confirmación por SMTP (ver comprar_entradas.mail). Sin EMAIL_HOST no se manda nada.
+EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'entradas@parque.example')
+MAIL_CONFIRMACIONES = {
+    'conexiones': 4,  # conexiones SMTP persistentes por proceso
+    'procesos': 2,  # procesos que renderizan QR/PDF/HTML
+    'reintentos': 3,  # reintentos de una confirmación que falló por un error temporal
+}
+
+# Destino de `python manage.py archivar_ordenes` (meses cerrados en .jsonl.gz)
+ARCHIVO_ORDENES_DIR = os.environ.get('ARCHIVO_ORDENES_DIR', str(BASE_DIR / 'archivo'))
+
+# Instantánea del registro de socios y de los cierres que leen todos los workers por mmap
+# (`python manage.py generar_instantanea`); vacío: se consulta la base
+INSTANTANEA_REGISTRO = os.environ.get('INSTANTANEA_REGISTRO', '')
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -49,6 +82,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Mide una muestra de los requests contra PRESUPUESTO_CONSULTAS (solo si muestreo > 0)
+    'comprar_entradas.consultas.PresupuestoConsultasMiddleware',
+    # Sirve STATIC_ROOT con variantes precomprimidas y cache inmutable (antes que GZip)
+    'comprar_entradas.estaticos.EstaticosMiddleware',
+    # Graba el tráfico de compra para replays (solo si CAPTURA_TRAFICO tiene ruta)
+    'comprar_entradas.captura.CapturaTraficoMiddleware',
+    # Comprime las respuestas HTML dinámicas
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,9 +125,81 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Con varios workers escribiendo, esperar el lock en vez de fallar enseguida
+            'timeout': 20,
+            # Tomar el lock de escritura al abrir la transacción evita deadlocks al reservar cupo
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Cache compartido entre workers (tokens de versión de órdenes, etc.). Sin REDIS_URL se usa
+# memoria local, que alcanza para un único proceso pero no invalida entre workers.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Sesiones y mensajes. SESIONES=db (por defecto) usa la tabla django_session; SESIONES=cookie
+# (cookie firmada con SECRET_KEY) o SESIONES=cache (el cache de arriba, tiene que ser Redis si
+# hay varios workers) no escriben en la base, y los mensajes viajan siempre en cookie para que
+# nunca caigan a la sesión. Con sesiones en la base, correr `limpiar_sesiones` periódicamente.
+SESIONES = os.environ.get('SESIONES', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}[SESIONES]
+if SESIONES != 'db':
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Anti-abuso delante de la compra (ver comprar_entradas.antiabuso): intentos por email, por IP
+# y de la misma compra repetida en los últimos `ventana` segundos. Con varios workers los
+# conteos se suman a través del cache, así que necesita REDIS_URL para verlos todos.
+ANTIABUSO = {
+    'activo': os.environ.get('ANTIABUSO', '') == '1',
+    'ventana': 600,
+    'subventanas': 10,
+    'ancho': 1 << 14,
+    'profundidad': 4,
+    'sincronizar_cada': 5,
+    'umbrales': {
+        'email': {'marcar': 6, 'frenar': 15},
+        'ip': {'marcar': 30, 'frenar': 100},
+        'compra': {'marcar': 2, 'frenar': 4},
+    },
+    # Proxies delante de la app (Traefik = 1): la IP real sale de X-Forwarded-For
+    'proxies': int(os.environ.get('ANTIABUSO_PROXIES', '0')),
+}
+
+# Presupuesto de consultas SQL (ver comprar_entradas.consultas): con muestreo > 0 se mide esa
+# fracción de los requests y de las llamadas de compra y pago, y se registran en el logger
+# comprar_entradas.consultas las que se pasan de su presupuesto o repiten una misma consulta
+# `repetidas` veces (N+1). Los tests usan PresupuestoConsultas con sus propios números.
+PRESUPUESTO_CONSULTAS = {
+    'muestreo': float(os.environ.get('PRESUPUESTO_CONSULTAS_MUESTREO', '0')),
+    'repetidas': 5,
+    'presupuestos': {
+        'request': 25,
+        'realizar_compra': 12,
+        'realizar_compra_multifecha': 15,
+        'confirmar_pago': 6,
+    },
+}
+
+# Entradas vendibles por fecha de visita cuando no hay un CupoDiario cargado
+CAPACIDAD_DIARIA = 5000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +237,19 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Destino de `python manage.py collectstatic`, que es el paso de build de los estáticos
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Nombres con hash de contenido + variantes gzip/brotli (ver comprar_entradas.estaticos)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'comprar_entradas.estaticos.EstaticosComprimidosStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 